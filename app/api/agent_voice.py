@@ -1,19 +1,46 @@
-import os, json, base64, aiohttp
+import os, time, logging
 from fastapi import APIRouter, WebSocket
 from dotenv import load_dotenv
-# Use the simple STT service instead of complex streaming
-from app.services.simple_stt_service import transcribe_audio_simple
-from langchain.prompts import PromptTemplate
-from dotenv import load_dotenv
+# Batch STT over the configured backends (STT_BACKENDS), hedging slow requests and skipping failing backends
+from app.services.stt_router import get_stt_router
+# Continuous-streaming mode (?mode=streaming) feeds chunks into streaming STT
+from app.services.streaming_turns import StreamingTurnSource, BatchTurnSource, ChunkedUtterance
+from app.services.audio_io import AudioClip
+# ...and can start the LLM on a stable interim transcript before the final one arrives
+from app.services.speculation import Speculator, SPECULATE
+# Server-side silence trimming / no-speech detection for batch-mode clips
+from app.services.vad import get_trimmer
+# Recent turns + rolling summary, assembled under a token budget
+from app.services.conversation_context import ConversationContext
+# Sentiment / topic tagging compiled from the product taxonomy
+from app.services.review_classifier import get_classifier
+# Cancels the reply when the customer talks over Sarah
+from app.services.barge_in import BargeIn
+# Per-turn stage spans -> latency histograms (GET /metrics)
+from app.services.tracing import get_tracer, TurnTrace
+# Log records carry this call's session ID and the turn they belong to
+from app.services.logging_config import log_context
+# Call state snapshotted after every turn, so a dropped caller can resume on any worker
+from app.services.session_store import get_session_store, SnapshotWriter, call_snapshot, load_call, new_resume_token
+# At most MAX_ACTIVE_CALLS calls at once (the rest wait in line), provider waits bounded per turn
+from app.services.admission import get_admission, AdmissionRejected
+from app.services.provider_limits import Throttled, start_turn_budget
+# Fixed lines (greeting, fallback reply) are replayed from the TTS audio cache
+from app.services.tts_cache import get_tts_cache
+# "Mm-hmm..." clips that cover dead air while STT + LLM are working
+from app.services.backchannel import LatencyMasker
+# Per-connection audio format (?audio=mp3|opus|pcm or a full ElevenLabs format) and frame coalescing
+from app.services.tts_service import OUTPUT_FORMAT, negotiate_output_format
+from app.services.audio_relay import coalesce
+# Reply post-processing (whole-reply and streaming versions)
+from app.services.reply_filters import INITIAL_REPLY, RESUME_REPLY
+from app.services.turn_pipeline import stream_reply
 from langchain_google_genai import ChatGoogleGenerativeAI
-import time
 
 
 load_dotenv()
 
 
-
-
 GOOGLE_API_KEY = os.getenv("SECRET_KEY_GOOGLE_AI")  # Ensure this exists
 
 # Initialize LLM with better settings for conversation
@@ -26,81 +53,86 @@ llm = ChatGoogleGenerativeAI(
 )
 
 
-from langchain.chains import ConversationChain
-from langchain.memory import ConversationBufferMemory
-from langchain.schema import BaseMessage, HumanMessage, AIMessage
-import json
-
-
-API_KEY  = os.getenv("ELEVEN_LABS_API_KEY")
-# Using a more conversational voice (this is Rachel - sounds more natural for phone calls)
-VOICE_ID = "21m00Tcm4TlvDq8ikWAM"  # Rachel - warm, conversational female voice
-MODEL_ID = "eleven_turbo_v2_5"
-
+logger = logging.getLogger(__name__)
 
 
 router = APIRouter()
 
-# Optimized single-pass response generation
-
-def fix_role_confusion(response: str) -> str:
-    """Fix any role confusion in the AI response"""
-    confusion_phrases = ["hi sarah", "hello sarah", "thanks for calling", "this is a good time", "thanks so much for calling"]
-    
-    if any(phrase in response.lower() for phrase in confusion_phrases):
-        print("[DEBUG] Fixed role confusion in AI response")
-        return "Oh wonderful! I'm so glad to hear you're available to chat. How has your experience been with the pickleball set so far?"
-    
-    return response
-
-def apply_natural_pacing(response: str) -> str:
-    """Add natural pauses to make speech less rushed"""
-    # Add pauses after excitement and between sentences
-    response = response.replace("! ", "!... ")  # Pause after excitement
-    response = response.replace(". ", "... ")   # Longer pauses between sentences
-    
-    # Ensure proper ending
-    if not response.endswith((".", "!", "?")):
-        response += "."
-        
-    return response
-
-
-BASE_PROMPT = """You are Sarah, a customer service representative from Lifelong company. You are CALLING the customer to ask about their experience with the Lifelong Professional Pickleball Set they purchased.
+BUSY_MESSAGE = "All our lines are busy right now - please try again in a few minutes."
+THROTTLED_MESSAGE = "Sorry, that took too long on our side - could you say that again?"
 
-IMPORTANT ROLE CLARITY:
-- YOU are Sarah from Lifelong (the company)
-- The HUMAN is the customer who bought the pickleball set
-- YOU are asking THEM about their experience
-- DO NOT respond as if you are the customer
-- DO NOT say things like "Hi Sarah" - YOU ARE Sarah
+async def stream_tts_to_client(ws: WebSocket, text: str, output_format: str = OUTPUT_FORMAT) -> dict:
+    """Play a fixed line: served from the TTS cache, synthesized with ElevenLabs on a miss."""
+    tts_start = time.time()
+    first_audio_time = None
 
-Your job as Sarah:
-- Ask the customer about their experience with the pickleball set
-- Listen to their feedback and respond appropriately
-- Be warm, friendly, and genuinely interested in their experience
-- Speak naturally and take your time
+    # relay audio to the caller, re-framed into fewer, larger frames
+    audio = get_tts_cache().stream_text(text, output_format=output_format)
+    async for chunk in coalesce(audio, output_format):
+        if first_audio_time is None:
+            first_audio_time = round((time.time() - tts_start) * 1000)
+        await ws.send_bytes(chunk)
 
-How to respond as Sarah:
-1. Acknowledge what the customer just told you
-2. Show genuine interest in their experience  
-3. Ask follow-up questions about the product
-4. Use their words when responding ("You mentioned the grip...")
+    return {
+        "tts_time": round((time.time() - tts_start) * 1000),  # Convert to milliseconds
+        "tts_first_audio_time": first_audio_time or 0,
+    }
 
-Example responses (YOU as Sarah speaking TO the customer):
-- "Oh that's wonderful to hear! What do you love most about the set?"
-- "I'm so glad you're enjoying it! How has the grip been working for you?"
-- "That's exactly what we hoped for! Has it helped improve your game at all?"
-- "Oh no, I'm sorry to hear that. Can you tell me what happened?"
 
-REMEMBER: You are Sarah calling them, not the other way around!
+async def receive_batch_turn(source: BatchTurnSource, masker: LatencyMasker = None, turn: TurnTrace = None):
+    """Batch mode: receive one recorded utterance and transcribe it. None = caller left."""
+    # Step 1: Receive audio from user (read in the background, so interrupts get through mid-reply)
+    audio_bytes = await source.next_audio()
+    if audio_bytes is None:
+        return None
+    if masker:
+        masker.start()  # the customer has stopped talking: the dead-air clock starts now
+    if turn:
+        turn.start()
+    start_turn_budget()  # provider queueing + retries for this turn are bounded from here
+
+    logger.debug("Received audio: %d bytes", len(audio_bytes))
+
+    # Step 1b: trim silence server-side; clips with no speech never reach STT
+    trimmer = get_trimmer()
+    receive_start = time.perf_counter()
+    prepared = await trimmer.prepare_for_stt(audio_bytes)
+    if turn:
+        turn.add("receive", (time.perf_counter() - receive_start) * 1000)
+    vad_metrics = {
+        "vad_speech_ms": prepared.speech_ms,
+        "vad_bytes_saved": prepared.bytes_saved,
+        "vad_stt_ms_saved": trimmer.stt_ms_saved(prepared),
+    }
+    logger.debug("VAD: speech %dms of %dms, sending %d bytes",
+                 prepared.speech_ms, prepared.original_ms, len(prepared.audio_bytes))
+    clip = prepared.audio_bytes
+    if not prepared.has_speech:
+        if isinstance(clip, AudioClip):
+            clip.discard_uploads()
+        return {"text": "[No speech detected]", "upload_time": 0, "processing_time": 0, "total_time": 0,
+                "audio_size": len(audio_bytes), **vad_metrics}
+
+    # Step 2: Convert speech to text (the router picks the backend, and hedges if it's slow)
+    # (a chunked utterance's upload started with its first chunk: only the tail is left)
+    try:
+        stt_result = await get_stt_router().transcribe(clip)
+    finally:
+        if isinstance(clip, AudioClip):
+            clip.discard_uploads()  # the losing backend's, or one a failover didn't need
+    if isinstance(stt_result, dict):
+        trimmer.record_stt(stt_result.get("total_time", 0), prepared.kept_ms / 1000)
+        stt_result["audio_size"] = len(audio_bytes)
+        stt_result["upload_hidden_time"] = clip.upload_hidden_ms() if isinstance(clip, AudioClip) else 0
+        stt_result.update(vad_metrics)
+        if turn and stt_result["upload_hidden_time"]:
+            turn.add("stt_upload_hidden", stt_result["upload_hidden_time"])
+    return stt_result
 
-Current conversation:
-{history}
-Human: {input}
-Sarah:"""
 
-prompt = PromptTemplate.from_template(BASE_PROMPT)
+def start_early_upload(utterance: ChunkedUtterance):
+    """The customer started talking (chunked batch mode): upload to STT as the chunks arrive."""
+    utterance.uploads.update(get_stt_router().start_upload(utterance.stream()))
 
 
 @router.websocket("/agent/voice")
@@ -108,262 +140,286 @@ async def agent_voice(ws: WebSocket):
     """
     This function handles the voice conversation:
     1. Accepts connection from frontend
-    2. Sets up AI conversation memory
+    2. Sets up the conversation context (recent turns + running summary)
     3. Processes audio back and forth
-    """
-    await ws.accept()  # Accept the connection from frontend
-    memory = ConversationBufferMemory()  # Remember conversation history
-    
-    conversation = ConversationChain(
-        llm=llm,
-        prompt=prompt,
-        memory=memory
-    )
-    
-    # Add initial system context to prevent role confusion
-    memory.chat_memory.add_message(HumanMessage(content="[SYSTEM: You are Sarah from Lifelong calling the customer about their pickleball set purchase]"))
-    memory.chat_memory.add_message(AIMessage(content="Understood. I am Sarah from Lifelong calling to ask about their experience."))
-    
-    # Track conversation state (simplified for speed)
-    conversation_state = {
-        "topics_covered": [],
-        "customer_sentiment": "neutral", 
-        "turn_count": 0
-    }
 
-    PRODUCT_NAME = "Lifelong Professional Pickleball Set"
-    PRODUCT_DESC = (
-        "A complete set with durable fiberglass paddles and ergonomic grips—balanced "
-        "performance and comfort for all ages and skill levels."
-    )
+    Connect with ?mode=streaming to send continuous timesliced audio chunks
+    instead of one recorded blob per turn, and with ?resume=<resume_token>
+    (sent in the first message) to carry on a call whose socket dropped.
+    In batch mode an utterance may also arrive as timesliced chunks between
+    {"type": "utterance_start"} and {"type": "utterance_end"}; its STT
+    upload then runs while the customer is still talking.
 
-    try : 
-        
+    When every line is taken the caller waits in line first ({"queued": true,
+    "position": n} as it moves up) or is turned away ({"busy": true}, close 1013).
+    """
+    await ws.accept()  # Accept the connection from frontend
+    admission = get_admission()
+    try:
+        queue_wait_ms = await admission.acquire(lambda position: ws.send_json({"queued": True, "position": position}))
+    except AdmissionRejected as e:
+        logger.warning("Call not admitted (%s), %d calls active", e.reason, admission.active)
+        try:
+            await ws.send_json({"error": BUSY_MESSAGE, "busy": True})
+            await ws.close(code=1013)  # try again later
+        except Exception:
+            pass
+        return
+    except Exception:
+        return  # hung up while waiting
+    # "batch" = one recorded blob per turn (default), "streaming" = continuous timesliced chunks
+    streaming_mode = ws.query_params.get("mode") == "streaming"
+    # TTS audio format for this caller, e.g. ?audio=opus or ?audio=pcm_16000 (default MP3)
+    output_format = negotiate_output_format(ws.query_params.get("audio"))
+    turn_source = None
+    speculator = None
+    session_trace = None
+    context = None
+    snapshots = None
+
+    # the line is ours from here on: anything below failing must still hand it back
+    try:
+        # a reconnecting caller continues from the snapshot taken after its last turn (on any worker)
+        resume_token = ws.query_params.get("resume")
+        snapshot = await load_call(resume_token) if resume_token else None
+        if snapshot is None:
+            resume_token = new_resume_token()
+        snapshots = SnapshotWriter(get_session_store(), resume_token)
+        # spans of every turn go into the process-wide latency histograms, tagged with this call's ID
+        session_trace = get_tracer().session(snapshot["session_id"] if snapshot else None)
+        log_context(session_id=session_trace.session_id)
+        # the customer can talk over Sarah: a control message (or interim words) cancels the reply
+        barge_in = BargeIn(send_ack=lambda: ws.send_json({"interrupted": True}))
+        # Remember the conversation: older turns are summarized by the LLM in the background
+        context = ConversationContext(llm)
+
+        # Track conversation state (simplified for speed)
+        conversation_state = {
+            "topics_covered": [],
+            "customer_sentiment": "neutral",
+            "turn_count": 0
+        }
+        if snapshot:
+            conversation_state.update(snapshot["state"])
+            context.restore(snapshot["context"])
+            logger.info("Resumed call at turn %d", conversation_state["turn_count"])
+
+        if streaming_mode:
+            # Continuous mode: the caller streams small chunks, turns come from end_of_turn.
+            # Started before the greeting so the STT session connects while Sarah talks.
+            if SPECULATE:
+                # the prompt the final transcript would get (turn_count is bumped once the turn is answered)
+                speculator = Speculator(llm, lambda text: context.build_prompt(
+                    text, {**conversation_state, "turn_count": conversation_state["turn_count"] + 1}))
+            def on_interim(text: str):
+                barge_in.on_interim(text)
+                if speculator:
+                    speculator.observe(text)
+            turn_source = StreamingTurnSource(ws, on_interim=on_interim, on_control=barge_in.on_control)
+            await turn_source.start()
+        else:
+            turn_source = BatchTurnSource(ws, on_control=barge_in.on_control, on_utterance=start_early_upload)
+            turn_source.start()
         
         # Generate initial greeting - make it clear who Sarah is
-        initial_reply = "Hi there! This is Sarah calling from Lifelong. I hope you're having a good day. I wanted to give you a quick call about the pickleball set you got from us recently. Is this an okay time to chat for just a minute?"
-        await ws.send_json({"user_text": "Call started", "agent_reply": initial_reply}) # where is this sending and what is it sending which format 
-
-        # Stream initial greeting audio
-        url = f"wss://api.elevenlabs.io/v1/text-to-speech/{VOICE_ID}/stream-input?model_id={MODEL_ID}" # is there a websocket on that end as well , could we access it if this wasnt a websocket
-        
-
-        async with aiohttp.ClientSession() as session:   # what is aiohttp ? is it a websocket or what 
-            async with session.ws_connect(url, max_msg_size=0) as el_ws: #what is session.ws_connect
-                await el_ws.send_json({
-                    "text": " ",
-                    "xi_api_key": API_KEY,
-                    "voice_settings": {
-                        "stability": 0.8,         # Much more stable, less rushed
-                        "similarity_boost": 0.7,   # Softer, more natural voice
-                        "use_speaker_boost": True,
-                        "style": 0.3              # More conversational but not too much
-                    },
-                    "generation_config": {
-                        "chunk_length_schedule": [80, 120]  # Longer chunks = smoother speech
-                    }
-                })
-                await el_ws.send_json({"text": initial_reply, "flush": True})
-                await el_ws.send_json({"text": ""})
-                async for msg in el_ws:
-                    if msg.type is aiohttp.WSMsgType.TEXT:
-                        data = json.loads(msg.data)
-                        audio_b64 = data.get("audio")
-                        if audio_b64:
-                            # Convert the audio data and send to frontend
-                            chunk = base64.b64decode(audio_b64)
-                            await ws.send_bytes(chunk)
-                        else:
-                            print("[DEBUG] No audio in this packet")
-                            print(data)
-                        if data.get("isFinal"):
-                            break
-                    elif msg.type is aiohttp.WSMsgType.ERROR:
-                        break
+        initial_reply = RESUME_REPLY if snapshot else INITIAL_REPLY
+        # tell the frontend how to play the audio that follows (and how to get back into this call)
+        await ws.send_json({"audio_format": output_format, "session_id": session_trace.session_id,
+                            "resume_token": resume_token, "resumed": snapshot is not None,
+                            "turn_count": conversation_state["turn_count"], "queue_wait_ms": round(queue_wait_ms)})
+        await ws.send_json({"user_text": "Call resumed" if snapshot else "Call started", "agent_reply": initial_reply}) # where is this sending and what is it sending which format 
+
+        # Stream initial greeting audio (from the TTS cache - it's the same on every call)
+        await stream_tts_to_client(ws, initial_reply, output_format)
+        if not snapshot:
+            context.add_turn("", initial_reply)
+            snapshots.save(call_snapshot(session_trace.session_id, conversation_state, context))
 
         while True:
-            # Step 1: Receive audio from user
-            first = await ws.receive()
-            if first["type"] != "websocket.receive" or "bytes" not in first:
-                await ws.close(code=4000)
+            # Steps 1 + 2: get the customer's next utterance as text
+            # masks dead air with a short acknowledgement if the reply is slow
+            masker = LatencyMasker(ws.send_bytes, output_format=output_format)
+            turn = session_trace.turn(conversation_state["turn_count"] + 1)
+            log_context(turn_id=turn.turn_id)
+            reply_llm = llm
+            if streaming_mode:
+                if speculator:
+                    speculator.arm()
+                stt_result = await turn_source.next_turn()
+                masker.start()
+                start_turn_budget()
+                if stt_result:
+                    # the turn started when the customer's audio stopped, not when STT finalized
+                    turn.start(time.perf_counter() - stt_result["processing_time"] / 1000)
+                if speculator and stt_result:
+                    # commit the speculative reply if it was started on (nearly) this text
+                    reply_llm = speculator.resolve(stt_result["text"])
+                    logger.debug("Speculation: %s", speculator.last_result)
+            else:
+                stt_result = await receive_batch_turn(turn_source, masker, turn)
+            if stt_result is None:
+                masker.cancel()
                 return
-            audio_bytes = first["bytes"]
-
-            print(f"[DEBUG] Received audio: {len(audio_bytes)} bytes")
-
-            # Step 2: Convert speech to text
-            stt_result = transcribe_audio_simple(audio_bytes)
             
             # Handle new detailed STT response
             if isinstance(stt_result, dict):
                 user_text = stt_result["text"]
                 stt_upload_time = round(stt_result.get("upload_time", 0))
+                stt_upload_hidden_time = round(stt_result.get("upload_hidden_time", 0))
                 stt_processing_time = round(stt_result.get("processing_time", 0))
                 stt_total_time = round(stt_result.get("total_time", 0))
                 audio_duration = stt_result.get("audio_duration", 0)
                 efficiency_ratio = stt_result.get("efficiency_ratio", 0)
+                audio_size = stt_result.get("audio_size", 0)
             else:
                 # Fallback for old format
                 user_text = stt_result
                 stt_upload_time = 0
+                stt_upload_hidden_time = 0
                 stt_processing_time = 0
                 stt_total_time = 0
                 audio_duration = 0
                 efficiency_ratio = 0
+                audio_size = 0
             
-            print("[DEBUG] Transcribed text:", user_text)
-            print("[DEBUG] STT breakdown - Upload:", stt_upload_time, "ms, Processing:", stt_processing_time, "ms, Total:", stt_total_time, "ms")
+            logger.info("Transcribed text: %s", user_text)
+            if not streaming_mode:  # streaming has no upload: its whole STT step is the finalize wait
+                turn.add("stt_upload", stt_upload_time)
+                turn.add("stt_processing", stt_processing_time)
+            turn.add("stt", stt_total_time)
             
             # Check if transcription failed
+            if isinstance(stt_result, dict) and stt_result.get("throttled"):
+                # AssemblyAI had no capacity for us within the turn's budget
+                masker.cancel()
+                await ws.send_json({"error": THROTTLED_MESSAGE, "throttled": True})
+                continue
+            if user_text == "[No speech detected]":
+                # VAD found no speech, so STT was never called
+                masker.cancel()
+                await ws.send_json({"error": "No speech detected"})
+                continue
             if "[ERROR]" in user_text or not user_text.strip():
+                masker.cancel()
                 await ws.send_json({"error": "Could not understand audio"})
                 continue
 
 
-            # Step 3: Generate AI response with optimized single LLM call
-            llm_time1 = time.time()
-            
-            # Update conversation state
-            conversation_state["turn_count"] += 1
-            
-            print(f"[DEBUG] Single-pass LLM call for turn {conversation_state['turn_count']}")
-            
-            # ONE-PASS optimized prompt that does analysis + planning + generation internally
-            optimized_prompt = f"""
-You are Sarah, a warm customer service rep from Lifelong calling about their pickleball set purchase.
-
-CONTEXT:
-- Customer just said: "{user_text}"
-- Turn #{conversation_state['turn_count']} of conversation
-- Topics already discussed: {conversation_state['topics_covered']}
-- Previous sentiment: {conversation_state['customer_sentiment']}
-
-INSTRUCTIONS:
-1. Internally analyze their sentiment, topic, and emotion level
-2. Internally plan your acknowledgment style and empathy approach  
-3. Generate ONE natural response that:
-   - Acknowledges what they specifically said
-   - Shows appropriate empathy/enthusiasm
-   - Asks a relevant follow-up question
-   - Sounds conversational, not robotic
-   - Is 1-2 sentences maximum
-
-IMPORTANT:
-- YOU are Sarah calling THEM (don't respond as the customer)
-- Use their exact words when acknowledging
-- Match their energy level appropriately
-- If turn 6+, consider wrapping up naturally
-
-Return ONLY the final conversational response, nothing else:"""
-
-            # Single LLM call replaces the entire 3-step pipeline
-            response = llm.invoke(optimized_prompt)
-            agent_reply = response.content.strip()
+            # Step 3: Build the single-pass prompt for this turn
+            # (turn_count only moves once the turn is answered: an error or throttle leaves it as it was)
+            turn_state = {**conversation_state, "turn_count": conversation_state["turn_count"] + 1}
             
-            print(f"[DEBUG] Generated response: {agent_reply}")
+            logger.debug("Single-pass LLM call for turn %d", turn_state["turn_count"])
             
-            # Post-processing pipeline (keep these for quality)
-            agent_reply = fix_role_confusion(agent_reply) # remove this function and fix context 
-            agent_reply = apply_natural_pacing(agent_reply)
-            
-            # Simple conversation state updates (without complex analysis)
-            #### CHANGE (use smarter way to do this )
-            user_lower = user_text.lower()
-            if any(word in user_lower for word in ["love", "great", "awesome", "amazing", "perfect"]):
-                conversation_state["customer_sentiment"] = "positive"
-            elif any(word in user_lower for word in ["hate", "terrible", "awful", "bad", "broken"]):
-                conversation_state["customer_sentiment"] = "negative"
+            # ONE-PASS prompt: static instructions + call so far + this turn, within the token budget
+            optimized_prompt = context.build_prompt(user_text, turn_state)
+
+            # Show the customer's words right away, the reply streams in below
+            await ws.send_json({"user_text": user_text})
+
+            # Steps 3 + 4: stream the LLM reply straight into TTS, sentence by sentence
+            # (role-confusion and pacing filters run on each sentence as it completes)
+            # (audio goes through the masker so a backchannel clip and the reply never overlap)
+            # (a barge-in cancels it; agent_reply is then only what the caller heard)
+            try:
+                reply = await stream_reply(reply_llm, optimized_prompt, masker.send, output_format=output_format,
+                                           barge_in=barge_in)
+            except Throttled as e:
+                # Gemini / ElevenLabs had no capacity within the turn's budget; nothing was spoken
+                logger.warning("Reply throttled: %s", e)
+                masker.cancel()
+                await ws.send_json({"error": THROTTLED_MESSAGE, "throttled": True})
+                continue
+            masker.cancel()
+            conversation_state["turn_count"] += 1
+            masking_metrics = masker.metrics()
+            agent_reply = reply["agent_reply"]
+            reply_metrics = reply["metrics"]
+            if reply["interrupted"]:
+                # the browser drops audio frames until it sees this
+                await ws.send_json({"interrupted": True})
             
-            # Update topics based on simple keyword detection (CHANGE ; use smarter way to do this )
-            if any(word in user_lower for word in ["grip", "handle", "comfortable"]) and "grip" not in conversation_state["topics_covered"]:
-                conversation_state["topics_covered"].append("grip")
-            if any(word in user_lower for word in ["durable", "quality", "build"]) and "durability" not in conversation_state["topics_covered"]:
-                conversation_state["topics_covered"].append("durability")
-            if any(word in user_lower for word in ["game", "play", "performance"]) and "performance" not in conversation_state["topics_covered"]:
-                conversation_state["topics_covered"].append("performance")
+            # Sentiment + topics in one pass over the utterance (negation-aware, per-product taxonomy)
+            classify_start = time.perf_counter()
+            get_classifier().update(conversation_state, user_text)
+            postprocess_time = reply_metrics["postprocess_time"] + (time.perf_counter() - classify_start) * 1000
             
-            llm_time = round((time.time() - llm_time1) * 1000)  # Convert to milliseconds
+            llm_time = reply_metrics["llm_time"]
+            tts_time = reply_metrics["tts_time"]
+            for stage in ("llm_first_token", "llm", "tts_first_audio"):
+                if reply_metrics[f"{stage}_time"]:  # 0 = never got there (interrupted)
+                    turn.add(stage, reply_metrics[f"{stage}_time"])
+            turn.add("tts", tts_time)
+            turn.add("postprocess", postprocess_time)
+            spans = turn.finish()
             
-            print("[DEBUG] Optimized LLM time:", llm_time, "ms")
-            print("[DEBUG] Conversation state:", conversation_state)
-            print("[DEBUG] Final agent reply:", agent_reply)
+            logger.info("Turn spans (ms): %s", spans, extra={"spans": spans})
+            logger.debug("Conversation state: %s", conversation_state)
+            logger.info("Final agent reply: %s", agent_reply)
             
             # Send conversation data with detailed performance metrics
             await ws.send_json({
-                "user_text": user_text, 
                 "agent_reply": agent_reply,
                 "metrics": {
                     "stt_total_time": stt_total_time,
                     "stt_upload_time": stt_upload_time,
+                    # upload that happened while the customer was still talking (chunked utterances)
+                    "stt_upload_hidden_time": stt_upload_hidden_time,
                     "stt_processing_time": stt_processing_time,
                     "llm_time": llm_time,
+                    "llm_first_token_time": reply_metrics["llm_first_token_time"],
+                    "postprocess_time": round(postprocess_time, 1),
+                    "prompt_tokens": context.counters["last_prompt_tokens"],
+                    **(speculator.last_result if speculator else {"speculation": "off", "speculation_head_start": 0}),
+                    "tts_first_audio_time": reply_metrics["tts_first_audio_time"],
+                    "tts_time": tts_time,
+                    # LLM and TTS overlap now, so the reply is done when TTS is done
+                    "total_response_time": stt_total_time + tts_time,
+                    # end of speech -> first audio the caller hears (backchannel or reply) vs first reply audio
+                    "perceived_latency": masking_metrics["perceived_latency"],
+                    "actual_latency": masking_metrics["actual_latency"],
+                    "backchannel_played": masking_metrics["backchannel_played"],
                     "turn_count": conversation_state["turn_count"],
-                    "audio_size": len(audio_bytes),
+                    "session_id": session_trace.session_id,
+                    "turn_id": turn.turn_id,
+                    "turn_time": round(spans["turn"]),
+                    "audio_size": audio_size,
                     "audio_duration": audio_duration,
-                    "efficiency_ratio": efficiency_ratio
+                    "efficiency_ratio": efficiency_ratio,
+                    "stt_backend": stt_result.get("stt_backend") if isinstance(stt_result, dict) else None,
+                    "stt_hedged": stt_result.get("stt_hedged", False) if isinstance(stt_result, dict) else False,
+                    "vad_bytes_saved": stt_result.get("vad_bytes_saved", 0) if isinstance(stt_result, dict) else 0,
+                    "vad_stt_ms_saved": stt_result.get("vad_stt_ms_saved", 0) if isinstance(stt_result, dict) else 0,
+                    "interrupted": reply["interrupted"],
+                    "barge_in_cancel_ms": reply_metrics.get("barge_in_cancel_ms", 0),
+                    "barge_in_audio_bytes_saved": reply_metrics.get("barge_in_audio_bytes_saved", 0),
+                    "barge_in_time_saved_ms": reply_metrics.get("barge_in_time_saved_ms", 0),
                 }
             })
 
-            # Step 4: Convert AI response to speech
-            url = (
-                f"wss://api.elevenlabs.io/v1/text-to-speech/"
-                f"{VOICE_ID}/stream-input?model_id={MODEL_ID}"
-            )
-            tts_start = time.time()
-
-            async with aiohttp.ClientSession() as session:
-                async with session.ws_connect(url, max_msg_size=0) as el_ws:
-
-                    # initialise connection (key inside JSON)
-                    await el_ws.send_json({
-                        "text": " ",
-                        "xi_api_key": API_KEY,
-                        "voice_settings": {
-                            "stability": 0.8,         # Much more stable, less rushed
-                            "similarity_boost": 0.7,   # Softer, more natural voice
-                            "use_speaker_boost": True,
-                            "style": 0.3              # More conversational but not too much
-                        },
-                        "generation_config": {
-                            "chunk_length_schedule": [80, 120]  # Longer chunks = smoother speech
-                        }
-                    })
-
-                    # send LLM reply
-                    await el_ws.send_json({"text": agent_reply, "flush": True})
-                    await el_ws.send_json({"text": ""})          # end marker
-
-                    # relay audio chunks to the caller
-                    async for msg in el_ws:
-                        if msg.type is aiohttp.WSMsgType.TEXT:
-                            data = json.loads(msg.data)
-                            audio_b64 = data.get("audio")
-                            if audio_b64:
-                                # Convert and send audio to frontend
-                                chunk = base64.b64decode(audio_b64)
-                                await ws.send_bytes(chunk)
-                            if data.get("isFinal"):
-                                break
-                        elif msg.type is aiohttp.WSMsgType.ERROR:
-                            break
-            tts_time = round((time.time() - tts_start) * 1000)  # Convert to milliseconds
-            print("[DEBUG] TTS stream gen time:", tts_time, "ms")
-            
-            # Send TTS completion metrics
-            await ws.send_json({
-                "metrics": {
-                    "tts_time": tts_time,
-                    "total_response_time": stt_time + llm_time + tts_time
-                }
-            })
+            # the reply is out - older turns get summarized in the background before the next one
+            context.add_turn(user_text, agent_reply)
+            # written in the background; a reconnect with the resume token continues from here
+            snapshots.save(call_snapshot(session_trace.session_id, conversation_state, context))
 
     except Exception as e:
-        print(f"WebSocket error: {e}")
+        logger.exception("WebSocket error: %s", e)
         try:
             await ws.send_json({"error": "Connection error occurred"})
         except:
             pass
     finally:
+        admission.release()
+        if session_trace:
+            session_trace.close()
+        if speculator:
+            speculator.close()
+        if turn_source:
+            await turn_source.stop()
+        if context:
+            await context.close()
+        if snapshots:
+            await snapshots.close()
         # Clean up connection
         try:
             if ws.application_state.name != "DISCONNECTED" and ws.client_state.name != "DISCONNECTED":
@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.services.tracing import get_tracer
+from app.services.admission import get_admission
+from app.services import provider_limits
+from app.services.stt_router import get_stt_router
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Per-stage turn latency, admission queue, provider throttling and STT hedging in Prometheus text format."""
+    text = (get_tracer().render_prometheus() + get_admission().render_prometheus()
+            + provider_limits.render_prometheus() + get_stt_router().render_prometheus())
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
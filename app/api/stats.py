@@ -0,0 +1,69 @@
+from fastapi import APIRouter
+
+from app.services.tts_service import get_tts_manager
+from app.services.tts_cache import get_tts_cache
+from app.services.speculation import speculation_stats
+from app.services.barge_in import barge_in_stats
+from app.services.tracing import get_tracer
+from app.services.logging_config import logging_stats
+from app.services.session_store import session_stats
+from app.services.admission import get_admission
+from app.services.provider_limits import provider_stats
+from app.services.stt_router import get_stt_router
+from app.services.audio_io import audio_io_stats
+
+router = APIRouter()
+
+
+@router.get("/stats/tts")
+async def tts_stats():
+    """Warm-socket pool counters and TTS audio cache hit/miss/bytes-served."""
+    return {
+        "pool": get_tts_manager().stats(),
+        "cache": get_tts_cache().stats(),
+    }
+
+
+@router.get("/stats/speculation")
+async def speculation():
+    """Speculative LLM calls on interim transcripts: hit rate, wasted calls, head start."""
+    return speculation_stats()
+
+
+@router.get("/stats/barge-in")
+async def barge_in():
+    """Replies cancelled by the customer talking over them: cancel latency, audio and time saved."""
+    return barge_in_stats()
+
+
+@router.get("/stats/latency")
+async def latency():
+    """Per-stage turn latency percentiles and the spans of the most recent turns."""
+    return get_tracer().summary()
+
+
+@router.get("/stats/logging")
+async def logging_counters():
+    """Log records queued for the writer thread, dropped on a full queue, suppressed by sampling."""
+    return logging_stats()
+
+
+@router.get("/stats/sessions")
+async def sessions():
+    """Session snapshots: store backend and hit/miss counters, snapshot size and cost per turn, resumes."""
+    return session_stats()
+
+
+@router.get("/stats/admission")
+async def admission():
+    """Calls admitted / waiting / turned away, queue wait times, and per-provider slots, retries and throttling."""
+    return {
+        "calls": get_admission().stats(),
+        "providers": provider_stats(),
+    }
+
+
+@router.get("/stats/stt")
+async def stt():
+    """STT router: hedged requests and who won them, failovers, per-backend latency and circuit breaker state, and audio decodes."""
+    return {**get_stt_router().stats(), "audio_io": audio_io_stats()}
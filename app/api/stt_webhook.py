@@ -0,0 +1,40 @@
+import os
+import hmac
+import logging
+from fastapi import APIRouter, Request, HTTPException
+from dotenv import load_dotenv
+
+from app.services.transcript_registry import handle_transcript_callback, WEBHOOK_AUTH_HEADER
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Shared secret, sent back by AssemblyAI in the auth header on every callback.
+# Without it callbacks are refused (anyone could resolve a transcript by ID),
+# and the STT client polls instead of asking for callbacks.
+WEBHOOK_SECRET = os.getenv("ASSEMBLY_WEBHOOK_SECRET")
+
+if os.getenv("ASSEMBLY_WEBHOOK_URL") and not WEBHOOK_SECRET:
+    logger.warning("ASSEMBLY_WEBHOOK_URL is set without ASSEMBLY_WEBHOOK_SECRET: webhook callbacks are refused")
+
+router = APIRouter()
+
+
+@router.post("/stt/webhook")
+async def transcript_webhook(request: Request):
+    """
+    AssemblyAI calls this when a transcript is completed (or failed).
+    We just wake up whichever call is waiting on that transcript ID.
+    """
+    if not WEBHOOK_SECRET:
+        raise HTTPException(status_code=403, detail="Webhook secret not configured")
+    if not hmac.compare_digest(request.headers.get(WEBHOOK_AUTH_HEADER, ""), WEBHOOK_SECRET):
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
+
+    payload = await request.json()
+    transcript_id = handle_transcript_callback(payload)
+    if transcript_id is None:
+        raise HTTPException(status_code=400, detail="Missing transcript_id")
+
+    return {"status": "ok", "transcript_id": transcript_id}
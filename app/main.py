@@ -1,6 +1,21 @@
 from fastapi import FastAPI # main class to create webapp 
 
+# Logging first, so every module's logger goes through the background writer
+from app.services.logging_config import setup_logging, shutdown_logging
+setup_logging()
+
 from app.api.agent_voice import router as agent_voice_router # router to group endpoints , so they become active 
+from app.api.stt_webhook import router as stt_webhook_router
+from app.api.stats import router as stats_router
+from app.api.metrics import router as metrics_router
+from app.services.async_stt_service import close_stt_client
+from app.services.async_stt_streaming_service import close_streaming_http
+from app.services.tts_service import get_tts_manager, close_tts_manager, API_KEY as ELEVEN_LABS_API_KEY
+from app.services.tts_cache import get_tts_cache
+from app.services.backchannel import get_backchannel_library
+from app.services.reply_filters import INITIAL_REPLY, FALLBACK_REPLY, RESUME_REPLY, apply_natural_pacing
+from app.services.session_store import close_session_store
+from app.services.stt_router import get_stt_router
 
 app = FastAPI(title="AI Voice Review Collector", description="AI-powered voice agent for collecting customer feedback")
 
@@ -16,6 +31,32 @@ app.add_middleware(
 )
 
 app.include_router(agent_voice_router, prefix="/api", tags=["Agent Voice"])
+app.include_router(stt_webhook_router, prefix="/api", tags=["STT Webhook"])
+app.include_router(stats_router, prefix="/api", tags=["Stats"])
+app.include_router(metrics_router, tags=["Metrics"])  # GET /metrics, where scrapers expect it
+
+@app.on_event("startup")
+async def startup():
+    # Open initialized ElevenLabs sockets now so the first greeting doesn't pay the handshake
+    if ELEVEN_LABS_API_KEY:
+        await get_tts_manager().prewarm()
+        # Lines spoken word-for-word on many calls: load (or synthesize) their audio up front.
+        # The fallback is cached exactly as the reply filter speaks it (with pacing applied).
+        await get_tts_cache().prewarm([INITIAL_REPLY, RESUME_REPLY, apply_natural_pacing(FALLBACK_REPLY)])
+        # Backchannel clips ("Mm-hmm...") must be in memory before the first call
+        await get_backchannel_library().load()
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Close shared HTTP connection pools
+    await close_stt_client()
+    await close_streaming_http()
+    await close_tts_manager()
+    await close_session_store()
+    if any(backend.name == "whisper" for backend in get_stt_router().backends):
+        from app.services.whisper_service import close_whisper_engine
+        await close_whisper_engine()
+    shutdown_logging()  # write out whatever is still queued
 
 @app.get("/")
 async def root():
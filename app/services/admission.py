@@ -0,0 +1,172 @@
+# Admission control for voice calls.
+#
+# Past a point every extra call makes every call slower: provider queues grow,
+# the event loop gets busier and each turn's latency climbs for everyone. So
+# at most MAX_ACTIVE_CALLS calls run at once per worker; the next
+# ADMISSION_QUEUE_SIZE callers wait in line (first come, first served) and are
+# told their position as it changes, and anyone beyond that - or still waiting
+# after ADMISSION_QUEUE_TIMEOUT_S - gets a "busy, call back later" instead of
+# a call that answers slowly.
+import os
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+from app.services.tracing import Histogram
+
+logger = logging.getLogger(__name__)
+
+MAX_ACTIVE_CALLS = int(os.getenv("MAX_ACTIVE_CALLS", "100"))  # per worker, 0 = no limit
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "50"))
+ADMISSION_QUEUE_TIMEOUT_S = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_S", "30"))
+# a waiting caller hears its position at least this often (also notices hang-ups)
+ADMISSION_UPDATE_S = float(os.getenv("ADMISSION_UPDATE_S", "5"))
+
+
+class AdmissionRejected(Exception):
+    """The call wasn't admitted: reason is "busy" (queue full) or "timeout" (waited too long)."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class _Waiter:
+    __slots__ = ("admitted", "changed")
+
+    def __init__(self):
+        self.admitted = False
+        self.changed = asyncio.Event()
+
+
+class AdmissionController:
+    """
+    acquire() before a call starts, release() when it ends (once per
+    successful acquire). Single event loop, no locks needed.
+    """
+
+    def __init__(self, max_active: int = MAX_ACTIVE_CALLS, max_queue: int = ADMISSION_QUEUE_SIZE,
+                 queue_timeout_s: float = ADMISSION_QUEUE_TIMEOUT_S, update_s: float = ADMISSION_UPDATE_S):
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+        self.update_s = update_s
+        self.active = 0
+        self._queue: List[_Waiter] = []
+        self.wait_ms = Histogram()  # admitted calls only
+        self.counters = {
+            "admitted": 0,
+            "queued": 0,          # admitted or not, had to wait
+            "rejected_full": 0,
+            "timed_out": 0,
+            "abandoned": 0,       # hung up (or failed) while waiting
+        }
+
+    async def acquire(self, on_position: Optional[Callable[[int], Awaitable[None]]] = None) -> float:
+        """
+        Wait for a free slot. on_position(n) is awaited with the caller's place
+        in line (1 = next) whenever it changes. Returns the milliseconds waited;
+        raises AdmissionRejected.
+        """
+        if self.max_active <= 0 or (self.active < self.max_active and not self._queue):
+            self._admit()
+            return 0.0
+        if len(self._queue) >= self.max_queue:
+            self.counters["rejected_full"] += 1
+            raise AdmissionRejected("busy")
+
+        start = time.monotonic()
+        deadline = start + self.queue_timeout_s
+        waiter = _Waiter()
+        self._queue.append(waiter)
+        self.counters["queued"] += 1
+        told = None
+        try:
+            while not waiter.admitted:
+                position = self._queue.index(waiter) + 1
+                if on_position and position != told:
+                    await on_position(position)
+                    told = position
+                    if waiter.admitted:
+                        break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.counters["timed_out"] += 1
+                    raise AdmissionRejected("timeout")
+                waiter.changed.clear()
+                try:
+                    await asyncio.wait_for(waiter.changed.wait(), min(remaining, self.update_s))
+                except asyncio.TimeoutError:
+                    told = None  # repeat the position (a send to a caller who hung up fails)
+        except BaseException as e:
+            if waiter.admitted:
+                self.release()  # got the slot just as we gave up: pass it on
+            else:
+                self._queue.remove(waiter)
+                self._notify()
+                if not isinstance(e, AdmissionRejected):
+                    self.counters["abandoned"] += 1
+            raise
+        waited = (time.monotonic() - start) * 1000
+        self.wait_ms.record(waited)
+        return waited
+
+    def release(self):
+        """A call ended: the next caller in line gets its slot."""
+        self.active -= 1
+        if self._queue and (self.max_active <= 0 or self.active < self.max_active):
+            waiter = self._queue.pop(0)
+            waiter.admitted = True
+            self._admit()
+            waiter.changed.set()
+            self._notify()
+
+    def stats(self) -> dict:
+        return {
+            "max_active": self.max_active,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queue_depth": len(self._queue),
+            **self.counters,
+            "wait_ms": self.wait_ms.snapshot(),
+        }
+
+    def render_prometheus(self) -> str:
+        return "\n".join([
+            "# HELP voice_calls_active Calls admitted and in progress.",
+            "# TYPE voice_calls_active gauge",
+            f"voice_calls_active {self.active}",
+            "# HELP voice_admission_queue_depth Callers waiting to be admitted.",
+            "# TYPE voice_admission_queue_depth gauge",
+            f"voice_admission_queue_depth {len(self._queue)}",
+            "# HELP voice_admission_wait_ms Time admitted callers spent in the queue.",
+            "# TYPE voice_admission_wait_ms summary",
+            *(f'voice_admission_wait_ms{{quantile="{q}"}} {self.wait_ms.percentile(q):.3f}' for q in (0.5, 0.95, 0.99)),
+            f"voice_admission_wait_ms_sum {self.wait_ms.sum:.3f}",
+            f"voice_admission_wait_ms_count {self.wait_ms.count}",
+            "# HELP voice_admission_rejected_total Callers turned away (queue full or waited too long).",
+            "# TYPE voice_admission_rejected_total counter",
+            f'voice_admission_rejected_total{{reason="busy"}} {self.counters["rejected_full"]}',
+            f'voice_admission_rejected_total{{reason="timeout"}} {self.counters["timed_out"]}',
+        ]) + "\n"
+
+    def _admit(self):
+        self.active += 1
+        self.counters["admitted"] += 1
+
+    def _notify(self):
+        # everyone behind moved up one place
+        for waiter in self._queue:
+            waiter.changed.set()
+
+
+# One controller for the whole process
+_admission: Optional[AdmissionController] = None
+
+
+def get_admission() -> AdmissionController:
+    global _admission
+    if _admission is None:
+        _admission = AdmissionController()
+    return _admission
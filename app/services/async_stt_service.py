@@ -0,0 +1,367 @@
+# Async AssemblyAI client - same upload -> transcribe -> poll flow as simple_stt_service,
+# but it runs on the event loop, so one caller waiting for a transcript doesn't
+# freeze every other call on the worker.
+#
+# One client (and one aiohttp connection pool) is shared by the whole process,
+# so the upload, submit and poll requests reuse keep-alive connections instead
+# of doing a fresh TCP + TLS handshake each time.
+#
+# If ASSEMBLY_WEBHOOK_URL (and ASSEMBLY_WEBHOOK_SECRET) is set, AssemblyAI pushes
+# a callback to /api/stt/webhook when the transcript is ready and we resolve
+# immediately; polling stays on as a slow fallback in case the callback is lost
+# or lands on another worker.
+#
+# Transcriptions go through the "assemblyai" provider limiter: a capped number
+# in flight, uploads / submits paced by a token bucket and retried when
+# AssemblyAI answers 429, all within the turn's time budget.
+#
+# A clip recorded in chunks can be uploaded while it is still being recorded:
+# upload_stream() sends the chunks as they arrive with chunked transfer
+# encoding, and transcribe(..., uploaded=...) then only waits for the tail.
+import os
+import logging
+import time
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+import aiohttp
+from dotenv import load_dotenv
+
+from app.services.transcript_registry import TranscriptRegistry, transcript_registry, WEBHOOK_AUTH_HEADER
+from app.services.provider_limits import RateLimited, Throttled, get_limiter, retry_after_s
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ASSEMBLY_API_KEY = os.getenv("ASSEMBLY_API_KEY")
+# Point this at a local mock server for benchmarks / offline testing
+ASSEMBLY_API_BASE = os.getenv("ASSEMBLY_API_BASE", "https://api.assemblyai.com")
+
+# Poll backoff: start fast (short clips finish quickly), then back off up to the cap
+POLL_INITIAL_DELAY = float(os.getenv("STT_POLL_INITIAL_DELAY", "0.2"))
+POLL_BACKOFF_FACTOR = float(os.getenv("STT_POLL_BACKOFF_FACTOR", "1.5"))
+POLL_MAX_DELAY = float(os.getenv("STT_POLL_MAX_DELAY", "1.0"))
+MAX_WAIT_TIME = float(os.getenv("STT_MAX_WAIT_TIME", "30"))
+
+# Public URL of our /api/stt/webhook route (leave unset to poll only)
+ASSEMBLY_WEBHOOK_URL = os.getenv("ASSEMBLY_WEBHOOK_URL")
+ASSEMBLY_WEBHOOK_SECRET = os.getenv("ASSEMBLY_WEBHOOK_SECRET")
+# With webhooks on, polling is only a safety net, so it starts slower
+WEBHOOK_FALLBACK_POLL_DELAY = float(os.getenv("STT_WEBHOOK_FALLBACK_POLL_DELAY", "2.0"))
+WEBHOOK_FALLBACK_POLL_MAX_DELAY = float(os.getenv("STT_WEBHOOK_FALLBACK_POLL_MAX_DELAY", "5.0"))
+
+
+class AsyncAssemblyAIClient:
+    """
+    Asyncio AssemblyAI batch client:
+      - one shared aiohttp session with a keep-alive connection pool
+      - upload / submit / poll never block the event loop
+      - poll delay grows from poll_initial_delay to poll_max_delay; the first
+        poll is timed from how long recent transcripts took (adaptive)
+      - with webhook_url and webhook_secret set, a callback resolves the wait
+        immediately and polling only runs as a slow fallback (a webhook_url
+        without a secret is ignored: the route refuses unsigned callbacks)
+      - cancelling the awaiting task stops the transcription cleanly
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_connections: int = 100,
+        poll_initial_delay: float = POLL_INITIAL_DELAY,
+        poll_backoff_factor: float = POLL_BACKOFF_FACTOR,
+        poll_max_delay: float = POLL_MAX_DELAY,
+        max_wait_time: float = MAX_WAIT_TIME,
+        webhook_url: Optional[str] = ASSEMBLY_WEBHOOK_URL,
+        webhook_secret: Optional[str] = ASSEMBLY_WEBHOOK_SECRET,
+        registry: TranscriptRegistry = transcript_registry,
+    ):
+        self.api_key = api_key or ASSEMBLY_API_KEY
+        self.base_url = (base_url or ASSEMBLY_API_BASE).rstrip("/")
+        self.max_connections = max_connections
+        self.poll_initial_delay = poll_initial_delay
+        self.poll_backoff_factor = poll_backoff_factor
+        self.poll_max_delay = poll_max_delay
+        self.max_wait_time = max_wait_time
+        if webhook_url and not webhook_secret:
+            logger.warning("Webhook URL set without a secret - polling for transcripts instead")
+            webhook_url = None
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        self.registry = registry
+
+        # Moving average of submit -> completed time, used to time the first poll
+        self._typical_processing: Optional[float] = None
+        self.stats = {"polls": 0, "webhook_hits": 0, "poll_hits": 0}
+
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    # ---------- Public API ----------
+
+    async def transcribe(self, audio_bytes: bytes,
+                         uploaded: Optional[Callable[[], Awaitable[Optional[str]]]] = None) -> dict:
+        """
+        Upload audio, start a transcript and wait for it.
+        Returns the same dict shape as transcribe_audio_simple().
+        uploaded: waits for an upload of these bytes already under way and
+        returns its upload_url (None if it failed: the bytes are uploaded now).
+        """
+        try:
+            async with get_limiter("assemblyai").concurrency():
+                return await self._transcribe(audio_bytes, uploaded)
+        except Throttled as e:
+            logger.warning("Transcription throttled: %s", e)
+            return {**_error_result("[ERROR] Speech recognition is busy", 0, 0), "throttled": True}
+
+    async def _transcribe(self, audio_bytes: bytes,
+                          uploaded: Optional[Callable[[], Awaitable[Optional[str]]]] = None) -> dict:
+        limiter = get_limiter("assemblyai")
+        upload_start = time.time()
+        upload_url = await uploaded() if uploaded is not None else None
+        if not upload_url:
+            try:
+                upload_url = await limiter.request(self.upload, audio_bytes)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error("Upload failed: %s", e)
+                upload_url = None
+        upload_time = (time.time() - upload_start) * 1000
+
+        if not upload_url:
+            return _error_result("[ERROR] Could not upload audio", upload_time, 0)
+
+        processing_start = time.time()
+        try:
+            transcript_id = await limiter.request(self.submit, upload_url, **self._webhook_options())
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error("Transcription request failed: %s", e)
+            transcript_id = None
+
+        if not transcript_id:
+            processing_time = (time.time() - processing_start) * 1000
+            return _error_result("[ERROR] Could not start transcription", upload_time, processing_time)
+
+        try:
+            result = await self.wait_for_transcript(transcript_id)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error("Fetching transcript failed: %s", e)
+            processing_time = (time.time() - processing_start) * 1000
+            return _error_result("[ERROR] Could not get transcript", upload_time, processing_time)
+        processing_time = (time.time() - processing_start) * 1000
+        self._record_processing_time(processing_time / 1000)
+
+        if result is None:
+            return _error_result("[ERROR] Transcription took too long", upload_time, processing_time)
+        if result.get("status") == "error":
+            logger.error("AssemblyAI error: %s", result)
+            return _error_result("[ERROR] Transcription failed", upload_time, processing_time)
+
+        total_time = upload_time + processing_time
+        audio_duration = result.get("audio_duration") or 0  # in seconds
+        efficiency_ratio = audio_duration / (total_time / 1000) if audio_duration and total_time else 0
+
+        logger.debug("STT breakdown - upload: %.0fms, processing: %.0fms, total: %.0fms", upload_time, processing_time, total_time)
+
+        return {
+            "text": result.get("text") or "[No speech detected]",
+            "upload_time": upload_time,
+            "processing_time": processing_time,
+            "total_time": total_time,
+            "audio_duration": audio_duration,
+            "efficiency_ratio": efficiency_ratio,
+        }
+
+    async def upload(self, audio_bytes: bytes) -> Optional[str]:
+        """Upload raw audio bytes (WebM is fine) and return AssemblyAI's upload_url."""
+        session = self._get_session()
+        async with session.post(
+            f"{self.base_url}/v2/upload",
+            headers={"Content-Type": "application/octet-stream"},
+            data=audio_bytes,
+        ) as resp:
+            if resp.status in (429, 503):
+                raise RateLimited(f"upload: {resp.status}", retry_after_s(resp.headers))
+            if resp.status != 200:
+                logger.error("Upload failed: %s - %s", resp.status, await resp.text())
+                return None
+            return (await resp.json()).get("upload_url")
+
+    async def upload_stream(self, chunks: AsyncIterator[bytes]) -> Optional[str]:
+        """
+        Upload audio as it is produced (chunked transfer encoding) and return
+        the upload_url once the last chunk is sent. Not retried: the chunks
+        are gone, so on failure the caller uploads the whole clip instead.
+        """
+        session = self._get_session()
+        try:
+            async with session.post(
+                f"{self.base_url}/v2/upload",
+                headers={"Content-Type": "application/octet-stream"},
+                data=chunks,
+            ) as resp:
+                if resp.status != 200:
+                    logger.warning("Streaming upload failed: %s - %s", resp.status, await resp.text())
+                    return None
+                return (await resp.json()).get("upload_url")
+        except aiohttp.ClientError as e:
+            logger.warning("Streaming upload failed: %s", e)
+            return None
+
+    async def submit(self, upload_url: str, **options) -> Optional[str]:
+        """Start a transcript for an uploaded file and return its ID."""
+        session = self._get_session()
+        payload = {"audio_url": upload_url, "language_code": "en"}  # English for faster processing
+        payload.update(options)
+        async with session.post(f"{self.base_url}/v2/transcript", json=payload) as resp:
+            if resp.status in (429, 503):
+                raise RateLimited(f"submit: {resp.status}", retry_after_s(resp.headers))
+            if resp.status != 200:
+                logger.error("Transcription request failed: %s - %s", resp.status, await resp.text())
+                return None
+            return (await resp.json()).get("id")
+
+    async def get_transcript(self, transcript_id: str) -> dict:
+        """Fetch the current state of a transcript once."""
+        session = self._get_session()
+        async with session.get(f"{self.base_url}/v2/transcript/{transcript_id}") as resp:
+            if not 200 <= resp.status < 300:
+                logger.error("Fetching transcript failed: %s - %s", resp.status, await resp.text())
+                raise aiohttp.ClientResponseError(resp.request_info, resp.history, status=resp.status,
+                                                  message="transcript fetch failed", headers=resp.headers)
+            return await resp.json()
+
+    async def wait_for_transcript(self, transcript_id: str) -> Optional[dict]:
+        """
+        Wait until the transcript is completed or errored.
+        Uses the webhook callback when enabled, otherwise (and as a fallback) polls.
+        Returns None if it took longer than max_wait_time.
+        """
+        if self.webhook_url:
+            return await self._wait_with_webhook(transcript_id)
+        return await self._poll(transcript_id, self._first_poll_delay(), self.poll_max_delay)
+
+    async def close(self):
+        """Close the shared connection pool (call on app shutdown)."""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # ---------- Internals ----------
+
+    async def _poll(self, transcript_id: str, first_delay: float, max_delay: float) -> Optional[dict]:
+        """Poll with backoff from first_delay up to max_delay."""
+        deadline = time.time() + self.max_wait_time
+        delay = first_delay
+
+        while time.time() < deadline:
+            # never sleep past the deadline
+            await asyncio.sleep(min(delay, max(0.0, deadline - time.time())))
+            delay = min(max(delay, self.poll_initial_delay) * self.poll_backoff_factor, max_delay)
+
+            self.stats["polls"] += 1
+            result = await self.get_transcript(transcript_id)
+            if result.get("status") in ("completed", "error"):
+                self.stats["poll_hits"] += 1
+                return result
+
+        return None
+
+    async def _wait_with_webhook(self, transcript_id: str) -> Optional[dict]:
+        """Race the webhook callback against a slow fallback poll."""
+        callback = self.registry.expect(transcript_id)
+        fallback = asyncio.ensure_future(
+            self._poll(transcript_id, WEBHOOK_FALLBACK_POLL_DELAY, WEBHOOK_FALLBACK_POLL_MAX_DELAY)
+        )
+        deadline = time.time() + self.max_wait_time
+        pending = {callback, fallback}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=max(0.0, deadline - time.time()),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if fallback in done:
+                    try:
+                        return fallback.result()
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        # the callback can still arrive: keep waiting for it
+                        logger.warning("Fallback poll failed, waiting for the webhook: %s", e)
+                if callback in done:
+                    # the callback only carries the ID and status - fetch the text once
+                    self.stats["webhook_hits"] += 1
+                    return await self.get_transcript(transcript_id)
+                if not done:
+                    return None
+            return None
+        finally:
+            fallback.cancel()
+            self.registry.discard(transcript_id)
+
+    def _webhook_options(self) -> dict:
+        if not self.webhook_url:
+            return {}
+        return {
+            "webhook_url": self.webhook_url,
+            "webhook_auth_header_name": WEBHOOK_AUTH_HEADER,
+            "webhook_auth_header_value": self.webhook_secret,
+        }
+
+    def _first_poll_delay(self) -> float:
+        # Don't poll before the transcript is likely to be ready
+        if self._typical_processing is None:
+            return self.poll_initial_delay
+        return min(max(self.poll_initial_delay, 0.8 * self._typical_processing), self.poll_max_delay)
+
+    def _record_processing_time(self, seconds: float):
+        if self._typical_processing is None:
+            self._typical_processing = seconds
+        else:
+            self._typical_processing = 0.8 * self._typical_processing + 0.2 * seconds
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily so it binds to the running event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=60,  # keep idle connections warm between turns
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"authorization": self.api_key or ""},
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=30),
+            )
+        return self._session
+
+
+def _error_result(text: str, upload_time: float, processing_time: float) -> dict:
+    return {
+        "text": text,
+        "upload_time": upload_time,
+        "processing_time": processing_time,
+        "total_time": upload_time + processing_time,
+    }
+
+
+# One client for the whole process
+_client: Optional[AsyncAssemblyAIClient] = None
+
+
+def get_stt_client() -> AsyncAssemblyAIClient:
+    global _client
+    if _client is None:
+        _client = AsyncAssemblyAIClient()
+    return _client
+
+
+async def transcribe_audio_async(audio_bytes: bytes) -> dict:
+    """Async drop-in for transcribe_audio_simple() using the shared client."""
+    return await get_stt_client().transcribe(audio_bytes)
+
+
+async def close_stt_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,203 @@
+# app/services/async_stt_streaming_service.py
+# Asyncio version of AAIStreamingSTT: same start / feed_webm / get_final_turn / stop
+# surface, but everything runs on the FastAPI event loop - async subprocess pipes
+# for ffmpeg and an aiohttp WebSocket for AssemblyAI, with no per-session threads,
+# sleeps or polling timeouts. One session costs one ffmpeg process and a few tasks.
+import os
+import json
+import asyncio
+from typing import Callable, Optional
+
+import aiohttp
+from dotenv import load_dotenv
+
+from app.services.stt_streaming_service import ASSEMBLY_STREAMING_URL
+from app.services.pcm_framer import PCMRingBuffer, FRAME_BYTES
+
+load_dotenv()
+ASSEMBLY_API_KEY = os.getenv("ASSEMBLY_API_KEY")
+
+# All streaming sessions share one aiohttp session (and its connection pool)
+_http: Optional[aiohttp.ClientSession] = None
+
+
+def _get_http() -> aiohttp.ClientSession:
+    global _http
+    if _http is None or _http.closed:
+        _http = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+    return _http
+
+
+async def close_streaming_http():
+    global _http
+    if _http is not None and not _http.closed:
+        await _http.close()
+    _http = None
+
+
+class AsyncAAIStreamingSTT:
+    """
+    Persistent streaming STT on asyncio:
+      - write WebM/Opus chunks into ffmpeg stdin (async pipe)
+      - read PCM16 frames from ffmpeg stdout and send them over the WS
+      - emit final transcripts on end_of_turn
+      - pass interim transcripts to on_interim (called on the event loop)
+    """
+
+    def __init__(self, sample_rate: int = 16000, format_turns: bool = False, api_key: Optional[str] = None,
+                 on_interim: Optional[Callable[[str], None]] = None):
+        self.api_key = api_key or ASSEMBLY_API_KEY
+        assert self.api_key, "ASSEMBLY_API_KEY env var missing"
+        self.sample_rate = sample_rate
+        self.format_turns = format_turns
+
+        # WS endpoint (pcm_s16le streaming)
+        params = f"sample_rate={sample_rate}&encoding=pcm_s16le&format_turns={'true' if format_turns else 'false'}"
+        self.ws_url = f"{ASSEMBLY_STREAMING_URL}?{params}"
+
+        self._ffmpeg: Optional[asyncio.subprocess.Process] = None
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._final_turn_q: "asyncio.Queue[str]" = asyncio.Queue()  # finalized transcripts
+        self.on_interim = on_interim  # interim (not end_of_turn) transcripts, e.g. for speculation
+        self._pcm = PCMRingBuffer(FRAME_BYTES, capacity_frames=32)   # stdout -> 50 ms frames
+        self._tasks = []
+        self._stopped = False
+
+    # ---------- Public API ----------
+
+    async def start(self):
+        """Start ffmpeg (webm->pcm) and the WS session."""
+        await self._start_ffmpeg()
+        self._ws = await _get_http().ws_connect(
+            self.ws_url, headers={"Authorization": self.api_key}, max_msg_size=0
+        )
+        self._tasks = [
+            asyncio.ensure_future(self._pump_pcm()),
+            asyncio.ensure_future(self._receive_loop()),
+        ]
+
+    async def stop(self):
+        """Gracefully stop everything."""
+        if self._stopped:
+            return
+        self._stopped = True
+
+        # tell server we're done
+        if self._ws and not self._ws.closed:
+            try:
+                await self._ws.send_str(json.dumps({"type": "Terminate"}))
+            except (aiohttp.ClientError, ConnectionResetError):
+                pass
+
+        # close ffmpeg
+        if self._ffmpeg:
+            try:
+                self._ffmpeg.stdin.close()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            try:
+                await asyncio.wait_for(self._ffmpeg.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                self._ffmpeg.kill()
+                await self._ffmpeg.wait()
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        if self._ws and not self._ws.closed:
+            await self._ws.close()
+
+    async def feed_webm(self, webm_chunk: bytes):
+        """Write incoming WebM/Opus chunk into ffmpeg stdin (waits if ffmpeg falls behind)."""
+        if self._ffmpeg and not self._stopped:
+            try:
+                self._ffmpeg.stdin.write(webm_chunk)
+                await self._ffmpeg.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                # ffmpeg probably closed; ignore to avoid crashing
+                pass
+
+    async def get_final_turn(self, timeout: float = 5.0) -> Optional[str]:
+        """
+        Wait (up to timeout) for a finalized transcript for the current turn.
+        Returns None if nothing finalized yet.
+        """
+        try:
+            return await asyncio.wait_for(self._final_turn_q.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def pcm_stats(self) -> dict:
+        """Frame counters: queued / sent / coalesced / dropped."""
+        return dict(self._pcm.counters)
+
+    # ---------- Internals ----------
+
+    async def _start_ffmpeg(self):
+        """
+        Start one ffmpeg process:
+          input: webm (opus) via stdin
+          output: raw s16le PCM 16k mono via stdout
+        """
+        self._ffmpeg = await asyncio.create_subprocess_exec(
+            "ffmpeg",
+            "-loglevel", "quiet",
+            "-f", "webm",
+            "-i", "pipe:0",
+            "-f", "s16le",
+            "-acodec", "pcm_s16le",
+            "-ac", "1",
+            "-ar", str(self.sample_rate),
+            "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+        )
+
+    async def _pump_pcm(self):
+        """Read ffmpeg stdout into the frame ring and send 50 ms frames to AssemblyAI."""
+        stdout = self._ffmpeg.stdout
+        ring = self._pcm
+        while True:
+            # every frame is sent before the next read, so this always fits
+            chunk = await stdout.read(ring.free_bytes())
+            if not chunk:
+                # ffmpeg finished - send the tail and stop
+                tail = ring.tail()
+                if tail and self._ws and not self._ws.closed:
+                    await self._ws.send_bytes(tail)
+                return
+            ring.write(chunk)
+            while True:
+                frames = ring.peek()  # coalesces if one read produced several frames
+                if frames is None:
+                    break
+                if self._ws.closed:
+                    return
+                try:
+                    # awaiting the send is the backpressure: nothing dropped.
+                    # The client masks a copy of the payload, so the view can be reused right after.
+                    await self._ws.send_bytes(frames)
+                except (aiohttp.ClientError, ConnectionResetError):
+                    return
+                ring.release(frames)
+
+    async def _receive_loop(self):
+        async for msg in self._ws:
+            if msg.type is not aiohttp.WSMsgType.TEXT:
+                if msg.type is aiohttp.WSMsgType.ERROR:
+                    break
+                continue
+            try:
+                data = json.loads(msg.data)
+            except ValueError:
+                continue
+            if data.get("type") == "Turn":
+                # For speed, use unformatted transcript (format_turns=False).
+                tx = data.get("transcript") or ""
+                if data.get("end_of_turn", False) and tx.strip():
+                    # push final text for current turn
+                    self._final_turn_q.put_nowait(tx.strip())
+                elif tx.strip() and self.on_interim:
+                    self.on_interim(tx.strip())
+            # ignore Begin/Termination/etc for now
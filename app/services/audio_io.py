@@ -0,0 +1,208 @@
+# Audio I/O for the STT services, all in memory.
+#
+# Audio never touches the disk: uploads send the bytes we already hold, and
+# decoding / transcoding runs ffmpeg over stdin/stdout pipes into NumPy
+# buffers. Durations come from the decoded samples (no ffprobe). When ffmpeg is
+# missing or fails, the helpers raise FFmpegError - callers that only decode to
+# optimize (VAD) catch it and send the original bytes.
+#
+# An utterance should be decoded at most once. prepare_for_stt() (vad) decodes
+# the browser's clip anyway, so it hands STT an AudioClip: the bytes to
+# upload, plus the samples they decode to. decode_pcm16() returns those
+# samples instead of running ffmpeg again, so a backend that needs PCM
+# (whisper) gets it for free and one that uploads the container (AssemblyAI)
+# just sends the bytes.
+#
+# A clip recorded in chunks (utterance_start ... utterance_end) may already be
+# uploaded, or on its way: its upload to the likely STT backend starts with
+# the first chunk (chunked transfer encoding) while the customer is still
+# talking. Those PendingUploads ride on the AudioClip too, so the backend only
+# waits for the last chunk instead of uploading the whole clip.
+import io
+import time
+import wave
+import asyncio
+import subprocess
+from typing import Awaitable, Dict, List, Optional
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+stats = {"decodes": 0, "decodes_reused": 0, "encodes": 0, "ffmpeg_ms": 0.0, "ffmpeg_errors": 0,
+         "early_uploads": 0, "early_upload_failures": 0}
+
+
+class FFmpegError(Exception):
+    """ffmpeg isn't installed, or exited with an error (e.g. the audio couldn't be decoded)."""
+
+
+class PendingUpload:
+    """An upload that started before its clip was complete: the task resolves to the provider's upload URL."""
+
+    def __init__(self, upload: Awaitable[Optional[str]]):
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.task = asyncio.ensure_future(upload)
+        self.task.add_done_callback(self._done)
+        stats["early_uploads"] += 1
+
+    async def url(self) -> Optional[str]:
+        """The upload URL, or None if the upload failed (upload the clip the usual way then)."""
+        try:
+            return await asyncio.shield(self.task)
+        except asyncio.CancelledError:
+            if not self.task.cancelled():
+                raise  # we were cancelled, not the upload
+            return None
+        except Exception:
+            return None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.task.done() and not self.task.cancelled() and not self.task.exception() and bool(self.task.result())
+
+    def hidden_ms(self, speech_end: float) -> float:
+        """Upload time that overlapped the customer's speech (0 if it failed)."""
+        if not self.succeeded:
+            return 0.0
+        return max(0.0, min(self.finished, speech_end) - self.started) * 1000
+
+    def cancel(self):
+        self.task.cancel()
+
+    def _done(self, task):
+        self.finished = time.perf_counter()
+        if not task.cancelled() and not self.succeeded:
+            stats["early_upload_failures"] += 1
+
+
+class AudioClip(bytes):
+    """
+    Encoded audio (what you'd upload) that remembers its decoded samples and
+    any uploads of it already under way. It is a bytes, so it goes anywhere
+    audio bytes go.
+    """
+
+    def __new__(cls, data: bytes, pcm: Optional[np.ndarray] = None, sample_rate: int = SAMPLE_RATE,
+                uploads: Optional[Dict[str, PendingUpload]] = None, speech_end: Optional[float] = None):
+        clip = super().__new__(cls, data)
+        clip.pcm = pcm
+        clip.sample_rate = sample_rate
+        clip.uploads = uploads if uploads is not None else {}  # by STT backend name
+        clip.speech_end = speech_end  # perf_counter() when the last chunk arrived
+        return clip
+
+    def upload_hidden_ms(self) -> float:
+        if not self.uploads or self.speech_end is None:
+            return 0.0
+        return max(upload.hidden_ms(self.speech_end) for upload in self.uploads.values())
+
+    def discard_uploads(self):
+        """Cancel uploads still running (nobody is going to use them)."""
+        for upload in self.uploads.values():
+            upload.cancel()
+
+
+# ---------- ffmpeg pipes ----------
+
+def _decode_args(sample_rate: int) -> List[str]:
+    return ["-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"]
+
+
+def _webm_args(sample_rate: int) -> List[str]:
+    return ["-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+            "-c:a", "libopus", "-b:a", "32k", "-f", "webm", "pipe:1"]
+
+
+async def run_ffmpeg(args: List[str], data: bytes) -> bytes:
+    start = time.perf_counter()
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-loglevel", "quiet", *args,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+        )
+        out, _ = await proc.communicate(data)
+    except OSError as e:  # not installed / not executable, or it died on the pipe
+        stats["ffmpeg_errors"] += 1
+        raise FFmpegError(f"ffmpeg failed to run: {e}") from e
+    finally:
+        stats["ffmpeg_ms"] += (time.perf_counter() - start) * 1000
+    return _check(proc.returncode, out)
+
+
+def run_ffmpeg_sync(args: List[str], data: bytes) -> bytes:
+    """Same as run_ffmpeg, for the blocking legacy services (they run in a thread)."""
+    start = time.perf_counter()
+    try:
+        proc = subprocess.run(["ffmpeg", "-loglevel", "quiet", *args], input=data,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except OSError as e:
+        stats["ffmpeg_errors"] += 1
+        raise FFmpegError(f"ffmpeg failed to run: {e}") from e
+    finally:
+        stats["ffmpeg_ms"] += (time.perf_counter() - start) * 1000
+    return _check(proc.returncode, proc.stdout)
+
+
+def _check(returncode: int, out: bytes) -> bytes:
+    if returncode != 0:
+        stats["ffmpeg_errors"] += 1
+        raise FFmpegError(f"ffmpeg exited with {returncode}")
+    return out
+
+
+def _reuse(audio_bytes: bytes, sample_rate: int) -> Optional[np.ndarray]:
+    if isinstance(audio_bytes, AudioClip) and audio_bytes.pcm is not None and audio_bytes.sample_rate == sample_rate:
+        stats["decodes_reused"] += 1
+        return audio_bytes.pcm
+    return None
+
+
+async def decode_pcm16(audio_bytes: bytes, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Any container ffmpeg understands -> mono int16 PCM (FFmpegError if it can't be decoded)."""
+    pcm = _reuse(audio_bytes, sample_rate)
+    if pcm is None:
+        stats["decodes"] += 1
+        pcm = np.frombuffer(await run_ffmpeg(_decode_args(sample_rate), audio_bytes), dtype=np.int16)
+    return pcm
+
+
+def decode_pcm16_sync(audio_bytes: bytes, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    pcm = _reuse(audio_bytes, sample_rate)
+    if pcm is None:
+        stats["decodes"] += 1
+        pcm = np.frombuffer(run_ffmpeg_sync(_decode_args(sample_rate), audio_bytes), dtype=np.int16)
+    return pcm
+
+
+async def encode_webm(pcm: np.ndarray, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Mono int16 PCM -> WebM/Opus (same format the browser records)."""
+    stats["encodes"] += 1
+    return await run_ffmpeg(_webm_args(sample_rate), pcm.tobytes())
+
+
+# ---------- Samples ----------
+
+def to_float32(pcm: np.ndarray) -> np.ndarray:
+    """int16 PCM -> float32 in [-1, 1) (what faster-whisper wants)."""
+    return pcm.astype(np.float32) / 32768.0
+
+
+def duration_s(pcm: np.ndarray, sample_rate: int = SAMPLE_RATE) -> float:
+    return len(pcm) / sample_rate
+
+
+def to_wav(pcm: np.ndarray, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Mono int16 PCM -> a WAV file's bytes (header + samples, no ffmpeg)."""
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.astype("<i2", copy=False).tobytes())
+    return out.getvalue()
+
+
+def audio_io_stats() -> dict:
+    return {**stats, "ffmpeg_ms": round(stats["ffmpeg_ms"], 1)}
@@ -0,0 +1,123 @@
+# ElevenLabs -> browser audio relay.
+#
+# ElevenLabs sends speech as many small packets; relaying each one as its own
+# WebSocket frame costs a send (and a frame header, and a wakeup in the
+# browser) per packet. coalesce() joins packets into frames of about
+# RELAY_FRAME_MS of audio, but never holds audio longer than RELAY_MAX_DELAY_MS,
+# so the first syllable isn't delayed waiting for a full frame.
+import os
+import asyncio
+from typing import AsyncIterator, Optional
+
+from app.services.tts_service import OUTPUT_FORMAT, bytes_per_second
+
+RELAY_FRAME_MS = int(os.getenv("RELAY_FRAME_MS", "200"))
+RELAY_MAX_DELAY_MS = float(os.getenv("RELAY_MAX_DELAY_MS", "40"))
+
+
+def frame_bytes_for(output_format: str = OUTPUT_FORMAT, frame_ms: int = RELAY_FRAME_MS) -> int:
+    return bytes_per_second(output_format) * frame_ms // 1000
+
+
+class AudioCoalescer:
+    """
+    Size-bounded frame builder over one reused bytearray.
+    add() returns a frame once min_bytes are buffered; flush() returns the rest.
+    """
+
+    def __init__(self, min_bytes: int):
+        self.min_bytes = min_bytes
+        self._buf = bytearray()
+        self.counters = {"packets_in": 0, "frames_out": 0, "bytes": 0}
+
+    def __len__(self):
+        return len(self._buf)
+
+    def add(self, packet: bytes) -> Optional[bytes]:
+        self.counters["packets_in"] += 1
+        if not self._buf and len(packet) >= self.min_bytes:
+            return self._emit(packet)  # already big enough - no copy
+        self._buf += packet
+        if len(self._buf) >= self.min_bytes:
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[bytes]:
+        if not self._buf:
+            return None
+        frame = bytes(self._buf)
+        self._buf.clear()  # keeps the allocation for the next frame
+        return self._emit(frame)
+
+    def _emit(self, frame: bytes) -> bytes:
+        self.counters["frames_out"] += 1
+        self.counters["bytes"] += len(frame)
+        return frame
+
+
+async def coalesce(
+    chunks: AsyncIterator[bytes],
+    output_format: str = OUTPUT_FORMAT,
+    frame_ms: int = RELAY_FRAME_MS,
+    max_delay_ms: float = RELAY_MAX_DELAY_MS,
+    coalescer: Optional[AudioCoalescer] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Re-frame an audio chunk stream: frames of ~frame_ms of audio, and no byte
+    waits more than max_delay_ms. The pending read is never cancelled (a
+    timeout only flushes), so the source iterator is left in a clean state.
+    """
+    if coalescer is None:  # (an empty coalescer is falsy - it has __len__)
+        coalescer = AudioCoalescer(frame_bytes_for(output_format, frame_ms))
+    if coalescer.min_bytes <= 0:
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    loop = asyncio.get_running_loop()
+    max_delay = max_delay_ms / 1000
+    source = chunks.__aiter__()
+    pending_since = None
+    next_chunk = None
+    try:
+        while True:
+            if pending_since is None:
+                # nothing buffered - no deadline, so just wait for the next packet
+                # (finishing a read left pending by a deadline flush, if there is one)
+                read, next_chunk = next_chunk or source.__anext__(), None
+                try:
+                    chunk = await read
+                except StopAsyncIteration:
+                    break
+            else:
+                # something buffered - wait for more, but only until its deadline
+                if next_chunk is None:
+                    next_chunk = asyncio.ensure_future(source.__anext__())
+                timeout = max(0.0, pending_since + max_delay - loop.time())
+                done, _ = await asyncio.wait({next_chunk}, timeout=timeout)
+                if not done:
+                    # audio has waited long enough - send what we have (the read stays pending)
+                    pending_since = None
+                    frame = coalescer.flush()
+                    if frame:
+                        yield frame
+                    continue
+                task, next_chunk = next_chunk, None
+                try:
+                    chunk = task.result()
+                except StopAsyncIteration:
+                    break
+
+            frame = coalescer.add(chunk)
+            if frame:
+                pending_since = None
+                yield frame
+            elif pending_since is None and len(coalescer):
+                pending_since = loop.time()
+
+        frame = coalescer.flush()
+        if frame:
+            yield frame
+    finally:
+        if next_chunk is not None and not next_chunk.done():
+            next_chunk.cancel()
@@ -0,0 +1,156 @@
+# Latency masking: a short acknowledgement ("Mm-hmm...") when the reply is slow.
+#
+# Between the end of the customer's speech and Sarah's first audio byte the
+# caller hears nothing while STT and the LLM work. If no audio has gone out
+# by BACKCHANNEL_DEADLINE_MS, one pre-rendered clip is played; the real reply
+# is queued straight behind it (the frontend plays audio blobs in order).
+import os
+import logging
+import time
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.services.tts_cache import TTSCache, get_tts_cache, cache_key
+from app.services.tts_service import OUTPUT_FORMAT
+
+logger = logging.getLogger(__name__)
+
+BACKCHANNEL_DEADLINE_MS = float(os.getenv("BACKCHANNEL_DEADLINE_MS", "700"))
+LOAD_ATTEMPTS = 2  # a failed background load is retried once, on a later turn
+BACKCHANNEL_LINES = [
+    "Mm-hmm...",
+    "Oh, got it...",
+    "Okay...",
+    "I see...",
+]
+
+
+class BackchannelLibrary:
+    """The acknowledgement clips in one output format, rendered once (via the TTS cache) and held in memory."""
+
+    def __init__(self, lines: List[str] = BACKCHANNEL_LINES, cache: Optional[TTSCache] = None,
+                 output_format: str = OUTPUT_FORMAT):
+        self.lines = lines
+        self.cache = cache
+        self.output_format = output_format
+        self.clips: List[List[bytes]] = []
+        self._next = 0
+        self._loading: Optional[asyncio.Task] = None
+        self._attempts = 0
+
+    async def load(self):
+        cache = self.cache or get_tts_cache()
+        await cache.prewarm(self.lines, output_format=self.output_format)
+        self.clips = []
+        for line in self.lines:
+            chunks = await cache.get(cache_key(line, output_format=self.output_format))
+            if chunks:
+                self.clips.append([b"".join(chunks)])  # a clip is short: send it as one frame
+
+    def pick(self) -> Optional[List[bytes]]:
+        """Rotate through the clips so the same one doesn't play twice in a row."""
+        if not self.clips:
+            return None
+        clip = self.clips[self._next % len(self.clips)]
+        self._next += 1
+        return clip
+
+    def ensure_loaded(self):
+        """Start loading in the background (formats other than the default aren't loaded at startup)."""
+        if self.clips or self._attempts >= LOAD_ATTEMPTS:
+            return
+        if self._loading is not None and not self._loading.done():
+            return
+        self._attempts += 1
+        self._loading = asyncio.ensure_future(self.load())
+        self._loading.add_done_callback(self._loaded)
+
+    def _loaded(self, task: asyncio.Task):
+        if task.cancelled():
+            return
+        error = task.exception()  # retrieved here, so it never goes unreported
+        if self.clips:
+            return
+        retry = "retrying on the next turn" if self._attempts < LOAD_ATTEMPTS else "turns go without them"
+        if error is not None:
+            logger.error("Could not load backchannel clips (%s), %s: %r", self.output_format, retry, error)
+        else:
+            logger.warning("No backchannel clips rendered (%s), %s", self.output_format, retry)
+
+
+class LatencyMasker:
+    """
+    One per turn. start() when the customer stops talking; pass send() as the
+    reply's audio sink. If the deadline passes before the first reply byte,
+    a clip is played first - reply audio waits behind it, so there is no overlap.
+    """
+
+    def __init__(self, send_audio: Callable[[bytes], Awaitable[None]],
+                 library: Optional["BackchannelLibrary"] = None, deadline_ms: float = BACKCHANNEL_DEADLINE_MS,
+                 output_format: str = OUTPUT_FORMAT):
+        self.send_audio = send_audio
+        self.library = library or get_backchannel_library(output_format)
+        self.deadline = deadline_ms / 1000
+
+        self.turn_start: Optional[float] = None
+        self.first_audio_at: Optional[float] = None   # anything the caller hears
+        self.first_reply_at: Optional[float] = None   # first byte of the real reply
+        self.played = False
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.turn_start = time.time()
+        self.library.ensure_loaded()
+        if self.deadline > 0 and self.library.clips:
+            self._timer = asyncio.ensure_future(self._play_after_deadline())
+
+    def cancel(self):
+        """Don't acknowledge (reply started, or nothing was understood). A clip already playing finishes."""
+        if self._timer and not self.played:
+            self._timer.cancel()
+
+    async def send(self, chunk: bytes):
+        """Audio sink for the real reply."""
+        if self.first_reply_at is None:
+            self.first_reply_at = time.time()
+            self.cancel()
+        async with self._lock:  # wait for a clip that is mid-send
+            if self.first_audio_at is None:
+                self.first_audio_at = time.time()
+            await self.send_audio(chunk)
+
+    def metrics(self) -> dict:
+        def since_start(t):
+            return round((t - self.turn_start) * 1000) if t and self.turn_start else 0
+        return {
+            "perceived_latency": since_start(self.first_audio_at),  # end of speech -> caller hears something
+            "actual_latency": since_start(self.first_reply_at),     # end of speech -> first reply audio
+            "backchannel_played": self.played,
+        }
+
+    async def _play_after_deadline(self):
+        await asyncio.sleep(self.deadline)
+        async with self._lock:
+            if self.first_reply_at is not None:
+                return
+            clip = self.library.pick()
+            if not clip:
+                return
+            self.played = True
+            self.first_audio_at = time.time()
+            try:
+                for chunk in clip:
+                    await self.send_audio(chunk)
+            except Exception as e:
+                logger.error("Could not play backchannel clip: %r", e)
+
+
+# One library per output format (clips must match the caller's negotiated format)
+_libraries: Dict[str, BackchannelLibrary] = {}
+
+
+def get_backchannel_library(output_format: str = OUTPUT_FORMAT) -> BackchannelLibrary:
+    if output_format not in _libraries:
+        _libraries[output_format] = BackchannelLibrary(output_format=output_format)
+    return _libraries[output_format]
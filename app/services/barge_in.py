@@ -0,0 +1,93 @@
+# Barge-in: the customer talks over Sarah.
+#
+# The caller's socket is read by a background task for the whole call, so an
+# interrupt can arrive while a reply is streaming: a control message from the
+# browser ({"type": "interrupt"}), or - in streaming mode - interim words from
+# STT. The reply's LLM call and ElevenLabs stream are cancelled, and only the
+# part of the reply the caller actually heard goes into the history.
+import os
+import logging
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+BARGE_IN_MIN_WORDS = int(os.getenv("BARGE_IN_MIN_WORDS", "2"))  # streaming mode; 0 = interrupt messages only
+BARGE_IN_CANCEL_TIMEOUT_MS = float(os.getenv("BARGE_IN_CANCEL_TIMEOUT_MS", "200"))
+MS_PER_CHAR = 65  # ElevenLabs speech rate, roughly 15 characters a second
+
+# Across all calls (GET /api/stats/barge-in)
+stats = {
+    "interrupts": 0,
+    "cancel_ms_max": 0,        # interrupt -> LLM and TTS work stopped
+    "audio_bytes_saved": 0,    # estimated TTS audio never pulled from ElevenLabs
+    "time_saved_ms": 0,        # reply audio the customer didn't have to sit through
+}
+
+
+def spoken_prefix(text: str, played_ms: float, ms_per_char: float = MS_PER_CHAR) -> str:
+    """The words of `text` heard in played_ms of audio (cut at a word boundary)."""
+    chars = int(played_ms / ms_per_char)
+    if chars >= len(text):
+        return text
+    cut = text.rfind(" ", 0, chars + 1)
+    return text[:cut].rstrip(" ,;:") if cut > 0 else ""
+
+
+class BargeIn:
+    """
+    One per call. stream_reply() brackets each reply with start_reply() /
+    end_reply() and waits on `event`; interrupt() sets it. Interrupts that
+    arrive between replies are just acknowledged (send_ack), so the browser
+    stops discarding audio.
+    """
+
+    def __init__(self, send_ack: Optional[Callable[[], Awaitable[None]]] = None,
+                 min_words: int = BARGE_IN_MIN_WORDS):
+        self.send_ack = send_ack
+        self.min_words = min_words
+        self.event = asyncio.Event()
+        self.active = False
+        self.reason: Optional[str] = None
+        self.client_played_ms: Optional[float] = None
+
+    def start_reply(self):
+        self.event.clear()
+        self.active = True
+        self.reason = None
+        self.client_played_ms = None
+
+    def end_reply(self):
+        self.active = False
+
+    def interrupt(self, reason: str, played_ms: Optional[float] = None):
+        if not self.active:
+            if reason == "client" and self.send_ack:
+                asyncio.ensure_future(self._ack())
+            return
+        if self.event.is_set():
+            return
+        self.reason = reason
+        self.client_played_ms = played_ms
+        self.event.set()
+
+    def on_control(self, message: dict):
+        """A JSON control message from the browser."""
+        if message.get("type") == "interrupt":
+            played_ms = message.get("played_ms")
+            self.interrupt("client", float(played_ms) if isinstance(played_ms, (int, float)) else None)
+
+    def on_interim(self, text: str):
+        """Streaming mode: the customer is audibly talking over the reply."""
+        if self.min_words and len(text.split()) >= self.min_words:
+            self.interrupt("speech")
+
+    async def _ack(self):
+        try:
+            await self.send_ack()
+        except Exception as e:
+            logger.error("Could not acknowledge interrupt: %r", e)
+
+
+def barge_in_stats() -> dict:
+    return dict(stats)
@@ -0,0 +1,265 @@
+# Conversation context for Sarah's per-turn prompt.
+#
+# The prompt used to carry only the customer's latest sentence, so Sarah
+# forgot everything said before it; sending the whole transcript instead
+# grows the prompt (and LLM latency) with every turn. ConversationContext
+# keeps the last few turns word for word, folds older ones into a running
+# summary, and assembles prompts under a hard token budget. The instructions
+# come first and never change, so the provider can reuse the prompt prefix.
+# Summaries are written by the LLM in the background, after the reply has
+# been sent, so they never add to a turn's latency.
+import os
+import logging
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import List, Optional
+
+from app.services.provider_limits import get_limiter
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "900"))        # whole prompt
+CONTEXT_RECENT_TURNS = int(os.getenv("CONTEXT_RECENT_TURNS", "4"))      # kept verbatim
+CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "120"))
+
+# Identical on every turn of every call - keep anything that changes out of it
+STATIC_PREFIX = """You are Sarah, a warm customer service rep from Lifelong calling about their pickleball set purchase.
+
+INSTRUCTIONS:
+1. Internally analyze their sentiment, topic, and emotion level
+2. Internally plan your acknowledgment style and empathy approach
+3. Generate ONE natural response that:
+   - Acknowledges what they specifically said
+   - Shows appropriate empathy/enthusiasm
+   - Asks a relevant follow-up question
+   - Sounds conversational, not robotic
+   - Is 1-2 sentences maximum
+
+IMPORTANT:
+- YOU are Sarah calling THEM (don't respond as the customer)
+- Use their exact words when acknowledging
+- Match their energy level appropriately
+- Don't ask again about something already covered in the conversation
+- If turn 6+, consider wrapping up naturally
+"""
+
+SUMMARY_PROMPT = """You keep notes on a customer feedback call. Sarah (from Lifelong) is calling a customer about the pickleball set they bought.
+
+Notes so far:
+{summary}
+
+Next part of the call:
+{turns}
+
+Rewrite the notes to include the new part. Keep what the customer said about the product (likes, problems, specifics) and what Sarah already asked. At most {words} words, plain sentences, no preamble:"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English) - no tokenizer needed for budgeting."""
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Cut text to about `tokens` tokens, keeping the end (the most recent part)."""
+    if estimate_tokens(text) <= tokens:
+        return text
+    if tokens <= 0:
+        return ""
+    cut = text[-tokens * 4:]
+    space = cut.find(" ")
+    return "..." + (cut[space + 1:] if 0 <= space < 20 else cut)
+
+
+@dataclass
+class Turn:
+    user_text: str   # empty for Sarah's greeting
+    agent_reply: str
+
+    def render(self) -> str:
+        lines = []
+        if self.user_text:
+            lines.append(f"Customer: {self.user_text}")
+        if self.agent_reply:
+            lines.append(f"Sarah: {self.agent_reply}")
+        return "\n".join(lines)
+
+
+class ConversationContext:
+    """
+    One per call. add_turn() after each reply, build_prompt() for the next one.
+    Turns beyond recent_turns are summarized by `llm` in a background task; if
+    there is no llm (or it fails) they are folded into the summary as-is and
+    trimmed to the summary budget.
+    """
+
+    def __init__(self, llm=None, max_tokens: int = CONTEXT_MAX_TOKENS,
+                 recent_turns: int = CONTEXT_RECENT_TURNS, summary_tokens: int = CONTEXT_SUMMARY_TOKENS,
+                 prefix: str = STATIC_PREFIX):
+        self.llm = llm
+        self.max_tokens = max_tokens
+        self.recent_turns = recent_turns
+        self.summary_tokens = summary_tokens
+        self.prefix = prefix
+        self._prefix_tokens = estimate_tokens(prefix)
+
+        self.summary = ""
+        self.recent: List[Turn] = []
+        self._to_summarize: List[Turn] = []   # fell out of `recent`, not in `summary` yet
+        self._summarizing: Optional[asyncio.Task] = None
+
+        self.counters = {
+            "turns": 0,
+            "summaries": 0,
+            "summary_failures": 0,
+            "turns_summarized": 0,
+            "summary_ms": 0,
+            "trimmed_prompts": 0,   # prompts that hit the budget and dropped context
+            "last_prompt_tokens": 0,
+            "max_prompt_tokens": 0,
+        }
+
+    # ---------- Public API ----------
+
+    def add_turn(self, user_text: str, agent_reply: str):
+        """Record a finished turn. Older turns are summarized in the background."""
+        self.counters["turns"] += 1
+        self.recent.append(Turn(user_text, agent_reply))
+        if len(self.recent) > self.recent_turns:
+            overflow = len(self.recent) - self.recent_turns
+            self._to_summarize.extend(self.recent[:overflow])
+            del self.recent[:overflow]
+        if self._to_summarize and self._summarizing is None:
+            self._summarizing = asyncio.ensure_future(self._summarize_pending())
+
+    def build_prompt(self, user_text: str, state: Optional[dict] = None) -> str:
+        """
+        Static prefix + summary + recent turns + this turn, within max_tokens.
+        Over budget, the oldest recent turns go first, then the summary is cut,
+        and only then the customer's own words.
+        """
+        state = state or {}
+
+        def render_current(said: str) -> str:
+            lines = [f'- Customer just said: "{said}"']
+            if "turn_count" in state:
+                lines.append(f"- Turn #{state['turn_count']} of conversation")
+            if "topics_covered" in state:
+                lines.append(f"- Topics already discussed: {state['topics_covered']}")
+            if "customer_sentiment" in state:
+                lines.append(f"- Previous sentiment: {state['customer_sentiment']}")
+            return "\nTHIS TURN:\n" + "\n".join(lines) + "\n\nReturn ONLY the final conversational response, nothing else:"
+
+        current = render_current(user_text)
+        trimmed = False
+        spare = self.max_tokens - self._prefix_tokens - estimate_tokens(current)
+        if spare < 0:
+            # a very long utterance: keep its end, it's what Sarah is replying to
+            current = render_current(truncate_to_tokens(user_text, max(1, estimate_tokens(user_text) + spare - 1)))
+            trimmed = True
+
+        summary = self.summary
+        # turns waiting for the background summary are still context - show them verbatim
+        turns = [t.render() for t in self._to_summarize + self.recent]
+
+        def assemble() -> str:
+            parts = [self.prefix]
+            if summary:
+                parts.append(f"\nCALL SO FAR (summary):\n{summary}\n")
+            if turns:
+                parts.append("\nRECENT CONVERSATION:\n" + "\n".join(turns) + "\n")
+            parts.append(current)
+            return "".join(parts)
+
+        prompt_text = assemble()
+        while estimate_tokens(prompt_text) > self.max_tokens and turns:
+            turns.pop(0)
+            trimmed = True
+            prompt_text = assemble()
+        if estimate_tokens(prompt_text) > self.max_tokens and summary:
+            spare = self.max_tokens - estimate_tokens(prompt_text) + estimate_tokens(summary) - 10
+            summary = truncate_to_tokens(summary, spare)
+            trimmed = True
+            prompt_text = assemble()
+
+        if trimmed:
+            self.counters["trimmed_prompts"] += 1
+        tokens = estimate_tokens(prompt_text)
+        self.counters["last_prompt_tokens"] = tokens
+        self.counters["max_prompt_tokens"] = max(self.counters["max_prompt_tokens"], tokens)
+        return prompt_text
+
+    async def close(self):
+        """Stop any summary still running (the call is over, nobody will read it)."""
+        if self._summarizing is not None:
+            self._summarizing.cancel()
+            try:
+                await self._summarizing
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._summarizing = None
+
+    def snapshot(self) -> dict:
+        """Summary + turns not folded into it yet, as plain lists (see session_store)."""
+        return {
+            "summary": self.summary,
+            "turns": [[t.user_text, t.agent_reply] for t in self._to_summarize + self.recent],
+            "n": self.counters["turns"],
+        }
+
+    def restore(self, snapshot: dict):
+        """Continue a call from snapshot(); turns beyond recent_turns go to the background summary again."""
+        self.summary = snapshot.get("summary", "")
+        turns = [Turn(user_text, agent_reply) for user_text, agent_reply in snapshot.get("turns", [])]
+        self.counters["turns"] = snapshot.get("n", len(turns))
+        self.recent = turns[-self.recent_turns:] if self.recent_turns else []
+        self._to_summarize = turns[:len(turns) - len(self.recent)]
+        if self._to_summarize and self._summarizing is None:
+            self._summarizing = asyncio.ensure_future(self._summarize_pending())
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "recent_turns": len(self.recent),
+            "pending_turns": len(self._to_summarize),
+            "summary_tokens": estimate_tokens(self.summary),
+            "prefix_tokens": self._prefix_tokens,
+        }
+
+    # ---------- Internals ----------
+
+    async def _summarize_pending(self):
+        try:
+            while self._to_summarize:
+                batch = list(self._to_summarize)
+                start = time.time()
+                summary = await self._write_summary(batch)
+                self.counters["summary_ms"] += round((time.time() - start) * 1000)
+                # turns added while the LLM was busy stay queued for the next round
+                del self._to_summarize[:len(batch)]
+                self.summary = summary
+                self.counters["turns_summarized"] += len(batch)
+        finally:
+            self._summarizing = None
+
+    async def _write_summary(self, turns: List[Turn]) -> str:
+        rendered = "\n".join(t.render() for t in turns)
+        if self.llm is not None:
+            try:
+                gemini = get_limiter("gemini")
+                async with gemini.concurrency(background=True):
+                    result = await gemini.request(self.llm.ainvoke, SUMMARY_PROMPT.format(
+                        summary=self.summary or "(none yet)",
+                        turns=rendered,
+                        words=self.summary_tokens * 3 // 4,
+                    ), background=True)
+                text = str(getattr(result, "content", result)).strip()
+                if text:
+                    self.counters["summaries"] += 1
+                    return truncate_to_tokens(text, self.summary_tokens)
+            except Exception as e:
+                logger.warning("Conversation summary failed, keeping raw turns: %r", e)
+            self.counters["summary_failures"] += 1
+        # no LLM summary: keep the newest raw lines that fit the summary budget
+        combined = f"{self.summary}\n{rendered}" if self.summary else rendered
+        return truncate_to_tokens(combined, self.summary_tokens)
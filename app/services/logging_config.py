@@ -0,0 +1,188 @@
+# App logging: records are queued on the event loop and written by a
+# background thread, so a slow stdout (terminal, container log driver) never
+# blocks a call.
+#
+#   - bounded queue: when the writer falls behind, new records are dropped and
+#     counted instead of growing memory or blocking
+#   - levels per module: LOG_LEVEL for everything, LOG_LEVELS to override,
+#     e.g. "app.services.tts_service=DEBUG,app.services.vad=WARNING"
+#   - sampling: records logged with extra={"sample": key} (per-chunk events)
+#     are limited to LOG_SAMPLE_PER_S per key; the next one that gets through
+#     carries the number suppressed
+#   - context: log_context(session_id=..., turn_id=...) tags every record
+#     logged from that call's task; LOG_FORMAT=json writes one JSON object
+#     per line with those fields
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import contextvars
+import logging.handlers
+from typing import Dict, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # "text" or "json"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLE_PER_S = float(os.getenv("LOG_SAMPLE_PER_S", "1"))
+
+_session_id = contextvars.ContextVar("session_id", default=None)
+_turn_id = contextvars.ContextVar("turn_id", default=None)
+
+# Fields of a LogRecord that aren't user data (everything else came in via extra=)
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+stats = {"queued": 0, "dropped": 0, "suppressed": 0}
+
+
+def log_context(session_id: Optional[str] = None, turn_id: Optional[int] = None):
+    """Tag records logged from the current task (and tasks it starts from now on)."""
+    if session_id is not None:
+        _session_id.set(session_id)
+    if turn_id is not None:
+        _turn_id.set(turn_id)
+
+
+class ContextFilter(logging.Filter):
+    """Adds session_id / turn_id from the current context to every record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.session_id = _session_id.get()
+        record.turn_id = _turn_id.get()
+        return True
+
+
+class SampleFilter(logging.Filter):
+    """At most `per_second` records per sample key; unkeyed records always pass."""
+
+    def __init__(self, per_second: float = LOG_SAMPLE_PER_S):
+        super().__init__()
+        self.interval = 1.0 / per_second if per_second > 0 else float("inf")
+        self._next: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample", None)
+        if key is None:
+            return True
+        now = time.monotonic()
+        if now < self._next.get(key, 0.0):
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            stats["suppressed"] += 1
+            return False
+        self._next[key] = now + self.interval
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full."""
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+            stats["queued"] += 1
+        except queue.Full:
+            stats["dropped"] += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only what has to happen now: render args (they may be mutated later)
+        # and the traceback. Formatting and I/O happen on the writer thread.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """[LEVEL] logger: message  session=... turn=...  (like the old [DEBUG] prints, plus context)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"[{record.levelname}] {record.name}: {record.getMessage()}"
+        if getattr(record, "session_id", None):
+            line += f"  session={record.session_id}"
+        if getattr(record, "turn_id", None) is not None:
+            line += f" turn={record.turn_id}"
+        if getattr(record, "suppressed", 0):
+            line += f"  (+{record.suppressed} similar suppressed)"
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """"a.b=DEBUG,c=WARNING" -> {"a.b": 10, "c": 30}; bad entries are ignored."""
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        level = logging.getLevelName(level.strip().upper())
+        if name.strip() and isinstance(level, int):
+            levels[name.strip()] = level
+    return levels
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(level: str = LOG_LEVEL, levels: str = LOG_LEVELS, fmt: str = LOG_FORMAT,
+                  queue_size: int = LOG_QUEUE_SIZE, sample_per_s: float = LOG_SAMPLE_PER_S,
+                  stream=None) -> logging.Handler:
+    """Route the "app" loggers through the queue to a writer thread. Safe to call again."""
+    global _listener
+    shutdown_logging()
+
+    writer = logging.StreamHandler(stream or sys.stdout)
+    writer.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    handler = BoundedQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(SampleFilter(sample_per_s))
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger("app")
+    root.handlers[:] = [handler]
+    root.setLevel(parse_levels(f"app={level}").get("app", logging.INFO))
+    root.propagate = False
+    for name, module_level in parse_levels(levels).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener = logging.handlers.QueueListener(handler.queue, writer, respect_handler_level=False)
+    _listener.start()
+    return handler
+
+
+def shutdown_logging():
+    """Flush what's queued and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def logging_stats() -> dict:
+    return dict(stats)
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,179 @@
+# app/services/pcm_framer.py
+# Fixed-size PCM framing without re-slicing the buffer for every frame.
+#
+# The old framing loop did `buff += chunk` and `frame, buff = buff[:N], buff[N:]`,
+# which copies the whole remaining buffer once per 50 ms frame, and it dropped
+# frames whenever the send queue was full. PCMRingBuffer preallocates one
+# bytearray, lets the reader fill it in place (readinto) and hands out
+# memoryview frames that stay valid until released. When frames back up they
+# are coalesced into one larger send instead of being dropped.
+import threading
+from typing import Optional
+
+# 50 ms @ 16kHz mono, 16-bit PCM = 16000 * 0.05 * 2 bytes = 1600 bytes
+FRAME_BYTES = 1600
+
+
+class PCMRingBuffer:
+    """
+    Single-producer / single-consumer ring of PCM bytes, read in whole frames.
+
+    Write side:  writable() -> memoryview to fill (e.g. with readinto), then commit(n);
+                 or write(data) to copy bytes in.
+    Read side:   peek() -> memoryview over 1..max_coalesce complete frames,
+                 then release(view) once it has been sent.
+
+    Not thread-safe by itself - see ThreadedPCMFramer for the locking wrapper.
+    """
+
+    def __init__(self, frame_bytes: int = FRAME_BYTES, capacity_frames: int = 128, max_coalesce: int = 4):
+        self.frame_bytes = frame_bytes
+        self.capacity = frame_bytes * capacity_frames
+        self.max_coalesce = max_coalesce
+
+        self._buf = bytearray(self.capacity)
+        self._view = memoryview(self._buf)
+        # absolute byte counters; position in the ring is counter % capacity
+        self._write_pos = 0
+        self._read_pos = 0
+
+        self.counters = {
+            "queued": 0,     # complete frames that entered the ring
+            "sent": 0,       # frames handed out and released
+            "coalesced": 0,  # frames that rode along in a multi-frame send
+            "dropped": 0,    # frames thrown away (only when a producer gives up waiting)
+        }
+
+    # ---------- Write side ----------
+
+    def free_bytes(self) -> int:
+        return self.capacity - (self._write_pos - self._read_pos)
+
+    def writable(self) -> memoryview:
+        """Contiguous free region to write into (may be shorter than free_bytes() at the wrap)."""
+        offset = self._write_pos % self.capacity
+        size = min(self.free_bytes(), self.capacity - offset)
+        return self._view[offset:offset + size]
+
+    def commit(self, n: int):
+        """Mark n bytes written into the last writable() view."""
+        before = self._write_pos // self.frame_bytes - self._read_pos // self.frame_bytes
+        self._write_pos += n
+        after = self._write_pos // self.frame_bytes - self._read_pos // self.frame_bytes
+        self.counters["queued"] += after - before
+
+    def write(self, data) -> int:
+        """Copy as much of data as fits. Returns the number of bytes accepted."""
+        src = memoryview(data)
+        accepted = 0
+        while accepted < len(src):
+            dest = self.writable()
+            if not len(dest):
+                break
+            n = min(len(dest), len(src) - accepted)
+            dest[:n] = src[accepted:accepted + n]
+            self.commit(n)
+            accepted += n
+        return accepted
+
+    # ---------- Read side ----------
+
+    def frames_available(self) -> int:
+        return (self._write_pos - self._read_pos) // self.frame_bytes
+
+    def peek(self) -> Optional[memoryview]:
+        """
+        View over the oldest complete frames - one normally, up to max_coalesce
+        when a backlog has built up. Valid until release(); None if no frame is ready.
+        """
+        available = self.frames_available()
+        if not available:
+            return None
+        offset = self._read_pos % self.capacity
+        contiguous = (self.capacity - offset) // self.frame_bytes
+        n = min(available, contiguous, self.max_coalesce)
+        return self._view[offset:offset + n * self.frame_bytes]
+
+    def release(self, view: memoryview):
+        n_frames = len(view) // self.frame_bytes
+        self._read_pos += n_frames * self.frame_bytes
+        self.counters["sent"] += n_frames
+        self.counters["coalesced"] += n_frames - 1
+
+    def drop_oldest(self, n_frames: int = 1):
+        """Throw frames away - only for producers that refuse to wait."""
+        n_frames = min(n_frames, self.frames_available())
+        self._read_pos += n_frames * self.frame_bytes
+        self.counters["dropped"] += n_frames
+
+    def tail(self) -> bytes:
+        """Whatever incomplete frame is left at the end of the stream."""
+        n = (self._write_pos - self._read_pos) % self.frame_bytes
+        if not n or self.frames_available():
+            return b""
+        offset = self._read_pos % self.capacity
+        out = bytes(self._view[offset:offset + n]) if offset + n <= self.capacity else \
+            bytes(self._view[offset:]) + bytes(self._view[:n - (self.capacity - offset)])
+        self._read_pos += n
+        return out
+
+
+class ThreadedPCMFramer:
+    """
+    PCMRingBuffer shared between a reader thread (ffmpeg stdout) and a sender
+    thread. A full ring blocks the reader instead of dropping audio - that
+    pushes back on ffmpeg's pipe. Frames are only dropped if the sender has
+    taken nothing for `put_timeout` seconds (it's stuck), and those are counted.
+    """
+
+    def __init__(self, frame_bytes: int = FRAME_BYTES, capacity_frames: int = 128,
+                 max_coalesce: int = 4, put_timeout: float = 2.0):
+        self.ring = PCMRingBuffer(frame_bytes, capacity_frames, max_coalesce)
+        self.ring.counters["backpressure_waits"] = 0
+        self.put_timeout = put_timeout
+        self._cond = threading.Condition()
+        self._outstanding = False  # sender holds a peeked view
+        self._closed = False
+
+    @property
+    def counters(self) -> dict:
+        return self.ring.counters
+
+    def readinto_from(self, stream) -> int:
+        """Fill free ring space straight from a raw stream (stream.readinto). Returns bytes read, 0 at EOF."""
+        with self._cond:
+            if not self.ring.free_bytes():
+                self.ring.counters["backpressure_waits"] += 1
+            while not self.ring.free_bytes() and not self._closed:
+                if not self._cond.wait(timeout=self.put_timeout) and not self._outstanding:
+                    # sender stopped taking frames: make room rather than deadlock the ffmpeg pipe
+                    self.ring.drop_oldest(self.ring.max_coalesce)
+            if self._closed:
+                return 0
+            # only this producer writes; free space only grows while we read unlocked
+            view = self.ring.writable()
+        n = stream.readinto(view) or 0
+        with self._cond:
+            self.ring.commit(n)
+            if self.ring.frames_available():
+                self._cond.notify_all()
+        return n
+
+    def get_frames(self, timeout: float = 0.1) -> Optional[memoryview]:
+        """Wait up to timeout for one or more frames. Call done(view) after sending."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.ring.frames_available() or self._closed, timeout=timeout)
+            view = self.ring.peek()
+            self._outstanding = view is not None
+            return view
+
+    def done(self, view: memoryview):
+        with self._cond:
+            self.ring.release(view)
+            self._outstanding = False
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
@@ -0,0 +1,287 @@
+# Per-provider concurrency limits and request rates, with rate-limit-aware retries.
+#
+# Each provider (AssemblyAI, Gemini, ElevenLabs) gets a ProviderLimiter:
+#   - concurrency(): at most max_concurrency calls in flight (a transcription
+#     job, a reply stream, a spoken utterance); the rest wait their turn
+#   - request(fn): one token from the provider's token bucket per request, and
+#     if the provider answers "rate limited" (HTTP 429 / 503, Retry-After
+#     honoured) the whole bucket pauses and the request is retried with backoff
+# Every wait is bounded by the current turn's time budget (start_turn_budget(),
+# a contextvar like the log context); when a wait can't finish inside it the
+# call fails fast with Throttled instead of making the caller sit in silence.
+#
+# PROVIDER_LIMITS sets them per provider, to match the plan you're on:
+# "name=concurrency:rate_per_s[:burst],..." e.g. "assemblyai=32:10,gemini=20:5:10,elevenlabs=8:10"
+# (0 or unset = no limit). Retries on rate limiting are always on.
+import os
+import time
+import random
+import asyncio
+import logging
+import contextvars
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from app.services.tracing import Histogram
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_LIMITS = os.getenv("PROVIDER_LIMITS", "")
+TURN_BUDGET_MS = float(os.getenv("TURN_BUDGET_MS", "8000"))  # queueing + retries allowed per turn
+PROVIDER_MAX_WAIT_S = float(os.getenv("PROVIDER_MAX_WAIT_S", "10"))  # work outside a turn (pre-warming)
+RETRY_ATTEMPTS = int(os.getenv("PROVIDER_RETRY_ATTEMPTS", "3"))
+RETRY_BASE_MS = float(os.getenv("PROVIDER_RETRY_BASE_MS", "250"))
+
+_turn_deadline = contextvars.ContextVar("turn_deadline", default=None)
+
+
+class Throttled(Exception):
+    """A provider call couldn't get a slot, a token or a successful retry within the turn's budget."""
+
+    def __init__(self, provider: str, reason: str):
+        super().__init__(f"{provider}: {reason}")
+        self.provider = provider
+        self.reason = reason
+
+
+class RateLimited(Exception):
+    """Raised by provider clients for a "slow down" answer; retry_after in seconds if the provider said."""
+
+    def __init__(self, message: str = "rate limited", retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def start_turn_budget(ms: float = TURN_BUDGET_MS):
+    """Provider waits from here on (in this task and tasks it starts) must finish within ms."""
+    _turn_deadline.set(time.monotonic() + ms / 1000)
+
+
+def clear_turn_budget():
+    _turn_deadline.set(None)
+
+
+def _deadline(background: bool) -> float:
+    deadline = None if background else _turn_deadline.get()
+    return deadline if deadline is not None else time.monotonic() + PROVIDER_MAX_WAIT_S
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """429 / 503 from aiohttp (incl. WebSocket handshakes), google-api-core or our own clients."""
+    if isinstance(error, RateLimited):
+        return True
+    status = getattr(error, "status", None) or getattr(error, "code", None)
+    if callable(status):
+        status = status()
+    if status in (429, 503) or getattr(status, "value", None) in (429, 503):
+        return True
+    return type(error).__name__ in ("ResourceExhausted", "TooManyRequests", "ServiceUnavailable")
+
+
+def retry_after_s(headers) -> Optional[float]:
+    """Seconds from a Retry-After header (the delta form), or None."""
+    try:
+        return float(headers.get("Retry-After")) if headers and headers.get("Retry-After") else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """`rate` requests per second with bursts of up to `burst`; pause() empties it for a while."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self) -> float:
+        """Take a token (possibly borrowed from the future). Returns how long to wait before using it."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate) + max(0.0, self.updated - now)
+
+    def refund(self):
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + 1)
+
+    def pause(self, seconds: float):
+        """The provider said slow down: nothing goes out for `seconds`, then it refills from empty."""
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0)
+        self.updated = max(self.updated, now + seconds)
+
+
+class ProviderLimiter:
+    """Concurrency cap + token bucket + retries for one provider (see the module comment)."""
+
+    def __init__(self, name: str, max_concurrency: int = 0, rate_per_s: float = 0, burst: Optional[float] = None,
+                 retry_attempts: int = RETRY_ATTEMPTS, retry_base_ms: float = RETRY_BASE_MS):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.bucket = TokenBucket(rate_per_s, burst)
+        self.retry_attempts = retry_attempts
+        self.retry_base = retry_base_ms / 1000
+        self.in_flight = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self.wait_ms = Histogram()
+        self.counters = {
+            "calls": 0,
+            "requests": 0,
+            "queued": 0,          # calls that had to wait for a slot
+            "rate_limited": 0,    # "slow down" answers from the provider
+            "retries": 0,
+            "throttled": 0,       # gave up: the turn's budget ran out while waiting
+        }
+
+    @asynccontextmanager
+    async def concurrency(self, background: bool = False):
+        """Hold one of max_concurrency slots for the duration of the block."""
+        self.counters["calls"] += 1
+        if self._slots is not None:
+            start = time.monotonic()
+            if self._slots.locked():
+                self.counters["queued"] += 1
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), max(0.0, _deadline(background) - start))
+            except asyncio.TimeoutError:
+                self.counters["throttled"] += 1
+                raise Throttled(self.name, "no free slot within the turn budget") from None
+            finally:
+                self.waiting -= 1
+            self.wait_ms.record((time.monotonic() - start) * 1000)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            if self._slots is not None:
+                self._slots.release()
+
+    async def request(self, fn, *args, background: bool = False, **kwargs):
+        """await fn(*args, **kwargs) paced by the bucket, retried on rate limiting within the budget."""
+        deadline = _deadline(background)
+        attempt = 0
+        while True:
+            wait = self.bucket.reserve()
+            if time.monotonic() + wait > deadline:
+                self.bucket.refund()
+                self.counters["throttled"] += 1
+                raise Throttled(self.name, "request rate limit within the turn budget")
+            if wait:
+                await asyncio.sleep(wait)
+            self.counters["requests"] += 1
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limited(e):
+                    raise
+                self.counters["rate_limited"] += 1
+                attempt += 1
+                delay = getattr(e, "retry_after", None) or self.retry_base * 2 ** (attempt - 1)
+                delay *= random.uniform(1.0, 1.25)  # don't retry in lockstep with other calls
+                self.bucket.pause(delay)
+                if attempt > self.retry_attempts or time.monotonic() + delay > deadline:
+                    self.counters["throttled"] += 1
+                    raise Throttled(self.name, f"still rate limited after {attempt} attempt(s)") from e
+                self.counters["retries"] += 1
+                logger.info("%s rate limited, retry %d in %.0fms", self.name, attempt, delay * 1000,
+                            extra={"sample": f"limits.{self.name}"})
+
+    async def stream(self, open_stream, *args, background: bool = False, **kwargs):
+        """
+        Async-iterate a streaming call (e.g. llm.astream) under a concurrency
+        slot. Rate limiting before the first item is retried like request();
+        once items have gone out a failure is the caller's to handle.
+        """
+        async with self.concurrency(background):
+            async def first():
+                iterator = open_stream(*args, **kwargs).__aiter__()
+                try:
+                    return iterator, await iterator.__anext__()
+                except StopAsyncIteration:
+                    return iterator, None
+                except BaseException:
+                    if hasattr(iterator, "aclose"):
+                        await iterator.aclose()
+                    raise
+
+            iterator, item = await self.request(first, background=background)
+            try:
+                if item is None:
+                    return
+                yield item
+                async for item in iterator:
+                    yield item
+            finally:
+                if hasattr(iterator, "aclose"):
+                    await iterator.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "rate_per_s": self.bucket.rate,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            **self.counters,
+            "wait_ms": self.wait_ms.snapshot(),
+        }
+
+
+def parse_limits(spec: str) -> Dict[str, tuple]:
+    """"gemini=20:5:10,elevenlabs=8:10" -> {"gemini": (20, 5.0, 10.0), "elevenlabs": (8, 10.0, None)}; bad entries are ignored."""
+    limits = {}
+    for item in spec.split(","):
+        name, _, values = item.partition("=")
+        parts = values.split(":")
+        try:
+            concurrency = int(parts[0])
+            rate = float(parts[1]) if len(parts) > 1 and parts[1] else 0.0
+            burst = float(parts[2]) if len(parts) > 2 and parts[2] else None
+        except ValueError:
+            continue
+        if name.strip():
+            limits[name.strip()] = (concurrency, rate, burst)
+    return limits
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+
+
+def get_limiter(name: str) -> ProviderLimiter:
+    if name not in _limiters:
+        _limiters[name] = ProviderLimiter(name, *parse_limits(PROVIDER_LIMITS).get(name, (0, 0.0, None)))
+    return _limiters[name]
+
+
+def provider_stats() -> dict:
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
+
+
+def render_prometheus() -> str:
+    lines = [
+        "# HELP voice_provider_in_flight Provider calls in progress.",
+        "# TYPE voice_provider_in_flight gauge",
+    ]
+    lines += [f'voice_provider_in_flight{{provider="{n}"}} {l.in_flight}' for n, l in _limiters.items()]
+    lines += ["# HELP voice_provider_waiting Provider calls waiting for a concurrency slot.",
+              "# TYPE voice_provider_waiting gauge"]
+    lines += [f'voice_provider_waiting{{provider="{n}"}} {l.waiting}' for n, l in _limiters.items()]
+    for counter in ("rate_limited", "retries", "throttled"):
+        lines += [f"# HELP voice_provider_{counter}_total Provider calls {counter.replace('_', ' ')}.",
+                  f"# TYPE voice_provider_{counter}_total counter"]
+        lines += [f'voice_provider_{counter}_total{{provider="{n}"}} {l.counters[counter]}' for n, l in _limiters.items()]
+    return "\n".join(lines) + "\n"
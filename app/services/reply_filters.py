@@ -0,0 +1,129 @@
+# Post-processing for Sarah's replies.
+# fix_role_confusion / apply_natural_pacing work on a whole reply; the
+# SentenceChunker + IncrementalReplyFilter pair does the same job clause by
+# clause while the LLM is still streaming, so TTS can start on the first sentence.
+import re
+import logging
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+CONFUSION_PHRASES = ["hi sarah", "hello sarah", "thanks for calling", "this is a good time", "thanks so much for calling"]
+# Sarah's opening line - identical on every call, so its audio comes from the TTS cache
+INITIAL_REPLY = "Hi there! This is Sarah calling from Lifelong. I hope you're having a good day. I wanted to give you a quick call about the pickleball set you got from us recently. Is this an okay time to chat for just a minute?"
+# Said when a dropped call is resumed (?resume=...) - also cached
+RESUME_REPLY = "Sorry about that, I think we got cut off for a second. Where were we?"
+FALLBACK_REPLY = "Oh wonderful! I'm so glad to hear you're available to chat. How has your experience been with the pickleball set so far?"
+
+
+def fix_role_confusion(response: str) -> str:
+    """Fix any role confusion in the AI response"""
+    if has_role_confusion(response):
+        logger.info("Fixed role confusion in AI response")
+        return FALLBACK_REPLY
+
+    return response
+
+
+def has_role_confusion(text: str) -> bool:
+    lower = text.lower()
+    return any(phrase in lower for phrase in CONFUSION_PHRASES)
+
+
+def apply_natural_pacing(response: str) -> str:
+    """Add natural pauses to make speech less rushed"""
+    response = _add_pauses(response)
+
+    # Ensure proper ending
+    if not response.endswith((".", "!", "?")):
+        response += "."
+
+    return response
+
+
+def _add_pauses(text: str) -> str:
+    # Add pauses after excitement and between sentences
+    text = text.replace("! ", "!... ")  # Pause after excitement
+    text = text.replace(". ", "... ")   # Longer pauses between sentences
+    return text
+
+
+# Sentence end (plus any closing quote/bracket) followed by whitespace
+_SENTENCE_END = re.compile(r"""[.!?]+["')\]]*(?=\s)""")
+
+
+class SentenceChunker:
+    """
+    Collect streamed LLM tokens and hand back finished sentences.
+    A sentence is only released once the whitespace after its punctuation has
+    arrived, so "2.5" or "!!" split across tokens aren't cut early. Very short
+    sentences ("Oh!") are held and joined to the next one so TTS gets
+    enough text to sound natural.
+    """
+
+    def __init__(self, min_chars: int = 8):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, token: str) -> List[str]:
+        self._buffer += token
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            sentence = self._buffer[start:match.end()].strip()
+            if len(sentence) < self.min_chars:
+                continue  # keep it in the buffer, it goes out with the next sentence
+            sentences.append(sentence)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        """End of stream - whatever is left is the last sentence."""
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
+
+
+class IncrementalReplyFilter:
+    """
+    Clause-by-clause version of fix_role_confusion + apply_natural_pacing.
+
+    - If the very first sentence is role-confused, the whole reply becomes
+      FALLBACK_REPLY, same as the batch filter, and `stop` is set so the caller
+      can stop reading the LLM.
+    - If confusion shows up after we've already spoken, the rest is dropped
+      (we can't unsay the start).
+    - Pacing is applied per sentence exactly as apply_natural_pacing would on
+      the full reply.
+    """
+
+    def __init__(self):
+        self.spoken: List[str] = []
+        self.replaced = False
+        self.stop = False
+
+    def process(self, sentence: str, last: bool = False) -> Optional[str]:
+        """Return the text to send to TTS for this sentence (None = send nothing)."""
+        if self.stop:
+            return None
+
+        if has_role_confusion(sentence):
+            logger.info("Fixed role confusion in AI response")
+            self.stop = True
+            if self.spoken:
+                return None
+            self.replaced = True
+            return self._emit(apply_natural_pacing(FALLBACK_REPLY))
+
+        if last:
+            return self._emit(apply_natural_pacing(sentence))
+        # not the last sentence: pace it as if the next one follows after a space
+        return self._emit(_add_pauses(sentence + " "))
+
+    def text(self) -> str:
+        """Everything that was sent to TTS - this is what the caller actually heard."""
+        return "".join(self.spoken).strip()
+
+    def _emit(self, text: str) -> str:
+        self.spoken.append(text)
+        return text
@@ -0,0 +1,220 @@
+# Sentiment / topic tagging for what the customer says.
+#
+# A product's taxonomy (topics, positive and negative words, negators) is
+# compiled into one lookup table keyed by every inflection of every word
+# ("loved", "grips", "playing"), so each utterance is tokenized and scanned
+# once. Only inflections are generated, not -ly / -er derivations: those
+# change the meaning ("like" -> "likely") and are listed as words of their own
+# where they matter ("lovely"). A negator ("not", "never", "haven't"...) flips
+# the sentiment words right after it, so "not great" counts as negative.
+# Negation stays inside its clause: punctuation, a conjunction or a subject
+# right after the negator ("no, I love it", "no I love it") ends it, and
+# articles, copulas and "it" don't count toward its window. classify_batch()
+# scores stored transcripts in bulk.
+import os
+import re
+import json
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+REVIEW_TAXONOMY = os.getenv("REVIEW_TAXONOMY", "")  # path to a taxonomy JSON file; empty = built-in
+NEGATION_WINDOW = 3  # words after a negator that it applies to
+
+_ENDINGS = ("", "s", "es", "ed", "ing")
+_TOKENS = re.compile(r"[\w'\u2019]+|[.!?;,]")
+# Clause boundaries: negation doesn't carry past these
+_RESET = {".", "!", "?", ";", ",", "but", "and", "so", "because", "though", "although", "while"}
+# A subject right after the negator starts a new clause ("no I love it"); anywhere
+# else in the window it is the negated clause's own ("I didn't find it comfortable")
+_SUBJECTS = {"i", "we", "you", "he", "she", "they", "it", "i'm", "it's", "we're", "you're", "they're"}
+_SUBJECTS |= {word.replace("'", "\u2019") for word in _SUBJECTS}
+# Words that don't use up the negation window ("I would not say it is durable")
+_FILLER = {"a", "an", "the", "it", "it's", "it\u2019s", "is", "was", "be", "been", "very", "that", "this"}
+
+
+def _forms(word: str, endings: bool = True):
+    """The spellings a lexicon word matches: its inflections, and a curly apostrophe (STT writes both)."""
+    word = word.lower()
+    for base in {word, word.replace("'", "\u2019")}:
+        for ending in (_ENDINGS if endings else ("",)):
+            yield base + ending
+        if endings and base.endswith("e"):
+            yield base + "d"  # love -> loved
+            yield base[:-1] + "ing"  # love -> loving
+
+
+@dataclass
+class Taxonomy:
+    product: str
+    topics: Dict[str, List[str]]
+    positive: List[str]
+    negative: List[str]
+    negators: List[str] = field(default_factory=lambda: [
+        "not", "no", "never", "nothing", "hardly", "barely", "without",
+        "don't", "doesn't", "didn't", "isn't", "wasn't", "aren't", "weren't", "won't", "wouldn't",
+        "can't", "couldn't", "shouldn't", "haven't", "hasn't", "hadn't",
+    ])
+    negation_window: int = NEGATION_WINDOW
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Taxonomy":
+        return cls(**data)
+
+
+PICKLEBALL_TAXONOMY = Taxonomy(
+    product="Lifelong Professional Pickleball Set",
+    topics={
+        "grip": ["grip", "handle", "comfortable", "comfort"],
+        "durability": ["durable", "durability", "quality", "build", "built", "sturdy", "break", "broke", "broken",
+                       "crack", "chip", "chipped", "chipping"],
+        "performance": ["game", "play", "performance", "control", "power", "spin"],
+        "weight": ["weight", "heavy", "light", "lighter"],
+        "balls": ["ball"],
+        "bag": ["bag"],
+        "delivery": ["shipping", "delivery", "arrived", "package"],
+    },
+    positive=["love", "lovely", "great", "awesome", "amazing", "perfect", "good", "nice", "excellent",
+              "happy", "enjoy", "fantastic", "recommend", "like", "helps", "better", "fun",
+              "comfortable", "durable", "sturdy", "solid", "easy"],
+    negative=["hate", "terrible", "awful", "bad", "badly", "break", "broken", "broke", "disappointed", "poor",
+              "poorly", "worse", "worst", "problem", "issue", "cheap", "cheaper", "flimsy", "sore", "crack",
+              "chip", "chipped", "chipping", "loose"],
+)
+
+
+@dataclass
+class Classification:
+    sentiment: Optional[str]  # "positive" / "negative" / "mixed", None = no sentiment words
+    score: int                # positive hits - negative hits (after negation)
+    topics: List[str]         # in the order they were first mentioned
+
+
+class ReviewClassifier:
+    """Compiled form of a Taxonomy. Stateless, so one instance serves every call."""
+
+    def __init__(self, taxonomy: Taxonomy = PICKLEBALL_TAXONOMY):
+        self.taxonomy = taxonomy
+
+        # token -> (is_negator, sentiment, topics). A word can be a sentiment word
+        # AND a topic ("broken"); every ending of every word is a key, so
+        # classifying is one tokenizing pass plus a dict lookup per token.
+        self._lexicon: Dict[str, tuple] = {}
+
+        def tag(words: Iterable[str], sentiment: Optional[str] = None, topic: Optional[str] = None):
+            for word in words:
+                for form in _forms(word):
+                    _, old_sentiment, old_topics = self._lexicon.get(form, (False, None, ()))
+                    topics = old_topics + (topic,) if topic and topic not in old_topics else old_topics
+                    self._lexicon[form] = (False, sentiment or old_sentiment, topics)
+
+        tag(taxonomy.positive, sentiment="positive")
+        tag(taxonomy.negative, sentiment="negative")
+        for topic, words in taxonomy.topics.items():
+            tag(words, topic=topic)
+        for word in taxonomy.negators:
+            for form in _forms(word, endings=False):
+                self._lexicon[form] = (True, None, ())
+
+    def classify(self, text: str) -> Classification:
+        """One pass over the utterance's tokens."""
+        lexicon = self._lexicon
+        window = self.taxonomy.negation_window
+        positive = negative = 0
+        topics = []
+        negate_left = 0  # words left that the last negator applies to
+        after_negator = False
+        for token in _TOKENS.findall(text.lower()):
+            entry = lexicon.get(token)
+            if entry is None:
+                if token in _RESET or (after_negator and token in _SUBJECTS):
+                    negate_left = 0
+                elif token not in _FILLER:
+                    negate_left -= 1
+                after_negator = False
+                continue
+
+            is_negator, sentiment, word_topics = entry
+            after_negator = is_negator
+            if is_negator:
+                negate_left = window
+                continue
+            for topic in word_topics:
+                if topic not in topics:
+                    topics.append(topic)
+            if sentiment:
+                if (sentiment == "positive") != (negate_left > 0):
+                    positive += 1
+                else:
+                    negative += 1
+            negate_left -= 1
+
+        if positive and negative:
+            sentiment = "mixed" if positive == negative else ("positive" if positive > negative else "negative")
+        elif positive or negative:
+            sentiment = "positive" if positive else "negative"
+        else:
+            sentiment = None
+        return Classification(sentiment, positive - negative, topics)
+
+    def update(self, state: dict, text: str) -> Classification:
+        """Fold one utterance into conversation_state (customer_sentiment, topics_covered)."""
+        result = self.classify(text)
+        if result.sentiment:
+            state["customer_sentiment"] = result.sentiment
+        covered = state.setdefault("topics_covered", [])
+        for topic in result.topics:
+            if topic not in covered:
+                covered.append(topic)
+        return result
+
+    def summarize(self, texts: Iterable[str]) -> dict:
+        """Aggregate one transcript (the customer's utterances): sentiment counts, topic mentions, net score."""
+        sentiments = {"positive": 0, "negative": 0, "mixed": 0, "none": 0}
+        topics: Dict[str, int] = {}
+        score = 0
+        for text in texts:
+            result = self.classify(text)
+            sentiments[result.sentiment or "none"] += 1
+            score += result.score
+            for topic in result.topics:
+                topics[topic] = topics.get(topic, 0) + 1
+        return {"sentiments": sentiments, "topics": topics, "score": score}
+
+    def classify_batch(self, transcripts: Iterable[List[str]], processes: int = 1,
+                       chunksize: int = 64) -> List[dict]:
+        """summarize() for many stored transcripts; processes > 1 spreads them over worker processes."""
+        if processes <= 1:
+            return [self.summarize(t) for t in transcripts]
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(self.taxonomy,)) as pool:
+            return list(pool.map(_summarize_in_worker, transcripts, chunksize=chunksize))
+
+
+# ---------- Worker-process side (classify_batch) ----------
+
+_worker_classifier: Optional[ReviewClassifier] = None
+
+
+def _init_worker(taxonomy: Taxonomy):
+    global _worker_classifier
+    _worker_classifier = ReviewClassifier(taxonomy)  # compiled once per worker, not per chunk
+
+
+def _summarize_in_worker(texts: List[str]) -> dict:
+    return _worker_classifier.summarize(texts)
+
+
+def load_taxonomy(path: str) -> Taxonomy:
+    with open(path, "r", encoding="utf-8") as f:
+        return Taxonomy.from_dict(json.load(f))
+
+
+_classifier: Optional[ReviewClassifier] = None
+
+
+def get_classifier() -> ReviewClassifier:
+    global _classifier
+    if _classifier is None:
+        _classifier = ReviewClassifier(load_taxonomy(REVIEW_TAXONOMY) if REVIEW_TAXONOMY else PICKLEBALL_TAXONOMY)
+    return _classifier
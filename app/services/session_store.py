@@ -0,0 +1,266 @@
+# Per-call state outside the worker process.
+#
+# Everything a call needs to carry on - conversation_state, the conversation
+# context (summary + recent turns) and the session ID - is snapshotted after
+# every turn under the call's resume token. A caller whose socket dropped
+# reconnects with ?resume=<token> and the call picks up where it was, on
+# whichever worker the load balancer sends it to.
+#
+#   SESSION_STORE=memory   (default) this process only: a resume has to land
+#                          on the same worker
+#   SESSION_STORE=sqlite   one SQLite file shared by every worker on the host
+#                          (SESSION_DB_PATH), in WAL mode so reads don't wait
+#                          for writes
+#
+# Snapshots are compact JSON, zlib-compressed above SESSION_COMPRESS_BYTES.
+# They are written off the turn's critical path: SnapshotWriter keeps only
+# the newest pending snapshot of a call and writes it in the background.
+import os
+import json
+import time
+import zlib
+import sqlite3
+import asyncio
+import logging
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")  # "memory" or "sqlite"
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", ".cache/sessions.db")
+SESSION_TTL_S = float(os.getenv("SESSION_TTL_S", "900"))  # how long a dropped call can be resumed
+SESSION_MAX_MEMORY = int(os.getenv("SESSION_MAX_MEMORY", "10000"))  # memory backend: calls kept
+SESSION_COMPRESS_BYTES = int(os.getenv("SESSION_COMPRESS_BYTES", "1024"))
+
+SNAPSHOT_VERSION = 1
+
+
+def new_resume_token() -> str:
+    """Unguessable: whoever holds it can continue the call."""
+    return secrets.token_urlsafe(18)
+
+
+def encode_snapshot(snapshot: dict, compress_above: int = SESSION_COMPRESS_BYTES) -> bytes:
+    data = json.dumps(snapshot, separators=(",", ":"), ensure_ascii=False).encode()
+    if len(data) > compress_above:
+        return b"z" + zlib.compress(data, 6)
+    return b"j" + data
+
+
+def decode_snapshot(blob: bytes) -> Optional[dict]:
+    try:
+        data = zlib.decompress(blob[1:]) if blob[:1] == b"z" else blob[1:]
+        snapshot = json.loads(data)
+    except (zlib.error, ValueError) as e:
+        logger.error("Unreadable session snapshot: %r", e)
+        return None
+    if snapshot.get("v") != SNAPSHOT_VERSION:
+        return None  # written by an incompatible release - start the call over
+    return snapshot
+
+
+def call_snapshot(session_id: str, conversation_state: dict, context) -> dict:
+    """Snapshot of one call after a turn (context: a ConversationContext)."""
+    return {"v": SNAPSHOT_VERSION, "session_id": session_id, "state": conversation_state,
+            "context": context.snapshot(), "at": round(time.time(), 1)}
+
+
+class MemorySessionStore:
+    """Snapshots in this process, oldest dropped beyond max_sessions."""
+
+    name = "memory"
+
+    def __init__(self, ttl_s: float = SESSION_TTL_S, max_sessions: int = SESSION_MAX_MEMORY):
+        self.ttl_s = ttl_s
+        self.max_sessions = max_sessions
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()  # token -> (saved_at, blob)
+        self.counters = _new_counters()
+
+    async def save(self, token: str, blob: bytes):
+        self._data.pop(token, None)
+        self._data[token] = (time.time(), blob)
+        while len(self._data) > self.max_sessions:
+            self._data.popitem(last=False)
+            self.counters["evicted"] += 1
+        self.counters["saves"] += 1
+        self.counters["bytes_written"] += len(blob)
+
+    async def load(self, token: str) -> Optional[bytes]:
+        self.counters["loads"] += 1
+        entry = self._data.get(token)
+        if entry is None:
+            self.counters["misses"] += 1
+            return None
+        if time.time() - entry[0] > self.ttl_s:
+            del self._data[token]
+            self.counters["expired"] += 1
+            return None
+        self.counters["hits"] += 1
+        return entry[1]
+
+    async def delete(self, token: str):
+        self._data.pop(token, None)
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "sessions": len(self._data), **self.counters}
+
+    async def close(self):
+        pass
+
+
+class SQLiteSessionStore:
+    """
+    Snapshots in a SQLite file every worker on the host opens. Queries run in
+    a thread (asyncio.to_thread) on one connection per store; expired rows
+    are purged every `purge_every` saves.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = SESSION_DB_PATH, ttl_s: float = SESSION_TTL_S, purge_every: int = 500):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.purge_every = purge_every
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")  # durable enough for a call in progress
+        self._db.execute("CREATE TABLE IF NOT EXISTS sessions "
+                         "(token TEXT PRIMARY KEY, saved_at REAL NOT NULL, data BLOB NOT NULL)")
+        self._lock = threading.Lock()
+        self.counters = _new_counters()
+
+    async def save(self, token: str, blob: bytes):
+        await asyncio.to_thread(self._save, token, blob)
+        self.counters["saves"] += 1
+        self.counters["bytes_written"] += len(blob)
+
+    async def load(self, token: str) -> Optional[bytes]:
+        self.counters["loads"] += 1
+        row = await asyncio.to_thread(self._query, "SELECT saved_at, data FROM sessions WHERE token = ?", (token,))
+        if row is None:
+            self.counters["misses"] += 1
+            return None
+        if time.time() - row[0] > self.ttl_s:
+            self.counters["expired"] += 1
+            return None
+        self.counters["hits"] += 1
+        return row[1]
+
+    async def delete(self, token: str):
+        await asyncio.to_thread(self._query, "DELETE FROM sessions WHERE token = ?", (token,))
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "path": self.path, **self.counters}
+
+    async def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _save(self, token: str, blob: bytes):
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO sessions (token, saved_at, data) VALUES (?, ?, ?)",
+                             (token, now, blob))
+            if (self.counters["saves"] + 1) % self.purge_every == 0:
+                purged = self._db.execute("DELETE FROM sessions WHERE saved_at < ?", (now - self.ttl_s,)).rowcount
+                self.counters["expired"] += purged
+
+    def _query(self, sql: str, params: tuple):
+        with self._lock:
+            return self._db.execute(sql, params).fetchone()
+
+
+def _new_counters() -> dict:
+    return {"saves": 0, "bytes_written": 0, "loads": 0, "hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+
+
+class SnapshotWriter:
+    """
+    One per call. save() encodes the snapshot right away (the call's state
+    keeps changing) and hands it to a background task; if a write is still
+    in flight, only the newest snapshot is kept for the next one.
+    """
+
+    def __init__(self, store, token: str):
+        self.store = store
+        self.token = token
+        self._pending: Optional[bytes] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def save(self, snapshot: dict):
+        start = time.perf_counter()
+        self._pending = encode_snapshot(snapshot)
+        stats["encode_ms"] += (time.perf_counter() - start) * 1000
+        stats["snapshots"] += 1
+        stats["last_bytes"] = len(self._pending)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._write())
+        else:
+            stats["coalesced"] += 1
+
+    async def close(self):
+        """Wait for the last snapshot to be written."""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def _write(self):
+        while self._pending is not None:
+            blob, self._pending = self._pending, None
+            start = time.perf_counter()
+            try:
+                await self.store.save(self.token, blob)
+            except Exception as e:
+                stats["errors"] += 1
+                logger.error("Could not save session snapshot: %r", e)
+            stats["write_ms"] += (time.perf_counter() - start) * 1000
+
+
+# Snapshot costs across all calls (store counters are in get_session_store().stats())
+stats = {"snapshots": 0, "coalesced": 0, "errors": 0, "encode_ms": 0.0, "write_ms": 0.0, "last_bytes": 0,
+         "resumed": 0, "resume_misses": 0}
+
+
+async def load_call(token: str) -> Optional[dict]:
+    """The snapshot a resuming caller continues from, or None (unknown, expired or unreadable)."""
+    try:
+        blob = await get_session_store().load(token)
+    except Exception as e:
+        logger.error("Could not load session snapshot: %r", e)
+        blob = None
+    snapshot = decode_snapshot(blob) if blob is not None else None
+    stats["resumed" if snapshot else "resume_misses"] += 1
+    return snapshot
+
+
+def session_stats() -> dict:
+    n = stats["snapshots"] or 1
+    return {
+        **get_session_store().stats(),
+        **stats,
+        "encode_ms": round(stats["encode_ms"], 2),
+        "write_ms": round(stats["write_ms"], 2),
+        "encode_ms_per_turn": round(stats["encode_ms"] / n, 3),
+        "write_ms_per_turn": round(stats["write_ms"] / n, 3),
+    }
+
+
+_store = None
+
+
+def get_session_store():
+    global _store
+    if _store is None:
+        _store = SQLiteSessionStore() if SESSION_STORE == "sqlite" else MemorySessionStore()
+    return _store
+
+
+async def close_session_store():
+    global _store
+    if _store is not None:
+        await _store.close()
+        _store = None
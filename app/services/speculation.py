@@ -0,0 +1,225 @@
+# Speculative reply generation on interim transcripts (streaming mode).
+#
+# AssemblyAI sends interim Turn messages while the customer talks and the final
+# one only after its end-of-turn silence. Once an interim has stopped changing
+# for SPECULATE_STABLE_MS, the LLM is started on it in the background. When
+# the final transcript arrives the speculation is committed if the two texts
+# match closely enough - the reply then starts with the tokens already
+# generated - or cancelled and the LLM restarted on the final text.
+# At most SPECULATE_MAX_WASTED speculative calls are started per turn, so no
+# turn can waste more LLM calls than that.
+import os
+import logging
+import re
+import time
+import asyncio
+from difflib import SequenceMatcher
+from typing import Callable, List, Optional
+
+from app.services.provider_limits import get_limiter
+
+logger = logging.getLogger(__name__)
+
+SPECULATE = os.getenv("SPECULATE", "1") == "1"
+SPECULATE_STABLE_MS = float(os.getenv("SPECULATE_STABLE_MS", "400"))  # longer than a pause between words
+SPECULATE_SIMILARITY = float(os.getenv("SPECULATE_SIMILARITY", "0.9"))
+SPECULATE_MAX_WASTED = int(os.getenv("SPECULATE_MAX_WASTED", "2"))
+
+_WORDS = re.compile(r"[\w']+")
+
+# Across all calls (GET /api/stats/speculation)
+stats = {
+    "turns": 0,
+    "speculated_turns": 0,   # turns where at least one speculation started
+    "hits": 0,               # speculation committed
+    "misses": 0,             # final text differed - restarted on the final transcript
+    "llm_calls": 0,          # speculative LLM calls started
+    "wasted_calls": 0,       # speculative LLM calls cancelled
+    "head_start_ms": 0,      # sum over hits: how long the LLM had been running when the final came
+}
+
+
+def similarity(a: str, b: str) -> float:
+    """Word-level similarity in [0, 1], ignoring case and punctuation."""
+    wa, wb = _WORDS.findall(a.lower()), _WORDS.findall(b.lower())
+    if not wa and not wb:
+        return 1.0
+    return SequenceMatcher(None, wa, wb, autojunk=False).ratio()
+
+
+class _Speculation:
+    """One background LLM call; buffers its tokens until someone replays them."""
+
+    def __init__(self, llm, text: str, prompt_text: str):
+        self.text = text
+        self.started_at = time.time()
+        self.tokens: List = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run(llm, prompt_text))
+
+    async def _run(self, llm, prompt_text: str):
+        try:
+            # a guess, not a turn: it waits for a Gemini slot without using the turn's budget
+            async for token in get_limiter("gemini").stream(llm.astream, prompt_text, background=True):
+                self.tokens.append(token)
+                self._changed.set()
+        except Exception as e:
+            self.error = e  # raised to whoever replays it (the reply would have failed the same way)
+        finally:
+            self.finished = True
+            self._changed.set()
+
+    def cancel(self):
+        self._task.cancel()
+
+    async def replay(self):
+        """The buffered tokens, then the rest of the stream as it arrives."""
+        i = 0
+        while True:
+            while i < len(self.tokens):
+                yield self.tokens[i]
+                i += 1
+            if self.finished:
+                if self.error is not None:
+                    raise self.error
+                return
+            self._changed.clear()
+            await self._changed.wait()
+
+
+class _CommittedLLM:
+    """Stands in for the LLM in stream_reply: astream() replays a committed speculation."""
+
+    limited = True  # the provider call already went through the Gemini limiter
+
+    def __init__(self, speculation: _Speculation):
+        self.speculation = speculation
+
+    async def astream(self, prompt_text: str):
+        try:
+            async for token in self.speculation.replay():
+                yield token
+        finally:
+            self.cancel()  # a reply cut short would otherwise leave the LLM call running
+
+    def cancel(self):
+        """Stop the speculative LLM call (no-op once it has finished)."""
+        self.speculation.cancel()
+
+
+class Speculator:
+    """
+    One per call. observe() every interim transcript (arm() first, once the
+    previous reply is done), then resolve() the final one: it returns the LLM
+    object to hand to stream_reply - the real llm, or one replaying the
+    committed speculation.
+
+    build_prompt(text) must give the same prompt the final turn would get.
+    """
+
+    def __init__(self, llm, build_prompt: Callable[[str], str], stable_ms: float = SPECULATE_STABLE_MS,
+                 threshold: float = SPECULATE_SIMILARITY, max_wasted: int = SPECULATE_MAX_WASTED):
+        self.llm = llm
+        self.build_prompt = build_prompt
+        self.stable = stable_ms / 1000
+        self.threshold = threshold
+        self.max_wasted = max_wasted
+
+        self.armed = False
+        self.last_result = {"speculation": "off", "speculation_head_start": 0}
+        self._interim = ""
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._current: Optional[_Speculation] = None
+        self._started = 0  # speculative calls this turn
+
+    def arm(self):
+        """Start listening for the next turn (interims during Sarah's reply are ignored)."""
+        self._reset()
+        self.armed = True
+
+    def observe(self, text: str):
+        """An interim transcript. Must be called on the event loop."""
+        if not self.armed or not text.strip() or text == self._interim:
+            return
+        self._interim = text
+        if self._current is not None and similarity(self._current.text, text) < self.threshold:
+            self._discard()  # the customer kept talking - that reply would be wrong
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(self.stable, self._on_stable, text)
+
+    def resolve(self, final_text: str):
+        """The final transcript is in: commit or cancel. Returns the llm for stream_reply."""
+        self.armed = False
+        if self._timer is not None:
+            self._timer.cancel()
+        stats["turns"] += 1
+        if self._started:
+            stats["speculated_turns"] += 1
+
+        current, self._current = self._current, None
+        if current is not None and similarity(current.text, final_text) >= self.threshold:
+            head_start = round((time.time() - current.started_at) * 1000)
+            stats["hits"] += 1
+            stats["head_start_ms"] += head_start
+            self.last_result = {"speculation": "hit", "speculation_head_start": head_start}
+            return _CommittedLLM(current)
+
+        if current is not None:
+            current.cancel()
+            stats["wasted_calls"] += 1
+        if self._started:
+            stats["misses"] += 1
+            self.last_result = {"speculation": "miss", "speculation_head_start": 0}
+        else:
+            self.last_result = {"speculation": "none", "speculation_head_start": 0}
+        return self.llm
+
+    def close(self):
+        self.armed = False
+        self._reset()
+
+    # ---------- Internals ----------
+
+    def _on_stable(self, text: str):
+        self._timer = None
+        if not self.armed or text != self._interim:
+            return
+        if self._current is not None:
+            return  # already running on text this close
+        if self._started >= self.max_wasted:
+            return  # any of these could be wasted: the turn's budget is used up, wait for the final
+        try:
+            prompt_text = self.build_prompt(text)
+        except Exception as e:
+            logger.error("Could not build speculative prompt: %r", e)
+            return
+        self._current = _Speculation(self.llm, text, prompt_text)
+        self._started += 1
+        stats["llm_calls"] += 1
+
+    def _discard(self):
+        self._current.cancel()
+        self._current = None
+        stats["wasted_calls"] += 1
+
+    def _reset(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._current is not None:
+            self._current.cancel()
+            self._current = None
+        self._interim = ""
+        self._started = 0
+
+
+def speculation_stats() -> dict:
+    """Counters plus hit rate (of turns that speculated) and average head start per hit."""
+    return {
+        **stats,
+        "hit_rate": round(stats["hits"] / stats["speculated_turns"], 3) if stats["speculated_turns"] else 0,
+        "avg_head_start_ms": round(stats["head_start_ms"] / stats["hits"]) if stats["hits"] else 0,
+    }
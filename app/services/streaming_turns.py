@@ -0,0 +1,249 @@
+# Turn sources for /api/agent/voice. Both read the caller's WebSocket in the
+# background for the whole call, so control messages (barge-in interrupts)
+# are seen even while a reply is being streamed back.
+#
+# Continuous-streaming mode: the caller sends small timesliced WebM chunks; we
+# feed them into a streaming STT session and hand out each finished turn the
+# moment AssemblyAI marks end_of_turn - no upload and no batch processing per turn.
+# Batch mode: one recorded utterance per turn, queued for the caller's loop.
+# The browser sends it either as one blob after the customer stops, or as
+# timesliced chunks between {"type": "utterance_start"} and
+# {"type": "utterance_end"} - then its STT upload can start with the first
+# chunk (on_utterance) and only the tail is left to send when they stop.
+import json
+import logging
+import time
+import asyncio
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, List, Optional
+
+from app.services.audio_io import AudioClip, PendingUpload
+
+if TYPE_CHECKING:
+    from app.services.async_stt_streaming_service import AsyncAAIStreamingSTT
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingTurnSource:
+    """
+    Reads audio chunks from the caller's WebSocket in the background and
+    returns finalized turns from next_turn().
+
+    ws only needs an async receive() returning ASGI messages, so tests and
+    benchmarks can pass a fake socket. on_interim gets every interim
+    transcript (see speculation.Speculator.observe), on_control every JSON
+    text message (see barge_in.BargeIn.on_control).
+    """
+
+    def __init__(self, ws, stt: Optional["AsyncAAIStreamingSTT"] = None, poll_timeout: float = 1.0,
+                 on_interim: Optional[Callable[[str], None]] = None,
+                 on_control: Optional[Callable[[dict], None]] = None):
+        self.ws = ws
+        self.on_control = on_control
+        if stt is None:
+            # imported here so batch mode doesn't need the streaming client (websocket-client)
+            from app.services.async_stt_streaming_service import AsyncAAIStreamingSTT
+            stt = AsyncAAIStreamingSTT()
+        self.stt = stt
+        if on_interim is not None:
+            self.stt.on_interim = on_interim
+        self.poll_timeout = poll_timeout
+
+        self.closed = False
+        self.bytes_received = 0
+        self.last_audio_at: Optional[float] = None
+        self._bytes_at_last_turn = 0
+        self._reader: Optional[asyncio.Task] = None
+
+    # ---------- Public API ----------
+
+    async def start(self):
+        await self.stt.start()
+        self._reader = asyncio.ensure_future(self._read_loop())
+
+    async def next_turn(self) -> Optional[dict]:
+        """
+        Wait for the next finalized transcript.
+        Returns an STT result dict (same keys as transcribe_audio_async) or
+        None once the caller has disconnected.
+        """
+        while not self.closed:
+            text = await self.stt.get_final_turn(self.poll_timeout)
+            if not text:
+                continue
+
+            # time from the last audio we got to the final transcript
+            finalize_time = (time.time() - self.last_audio_at) * 1000 if self.last_audio_at else 0
+            audio_size = self.bytes_received - self._bytes_at_last_turn
+            self._bytes_at_last_turn = self.bytes_received
+            return {
+                "text": text,
+                "upload_time": 0,  # audio was already streamed while the customer spoke
+                "processing_time": finalize_time,
+                "total_time": finalize_time,
+                "audio_size": audio_size,
+            }
+        return None
+
+    async def stop(self):
+        self.closed = True
+        if self._reader:
+            self._reader.cancel()
+        await self.stt.stop()
+
+    # ---------- Internals ----------
+
+    async def _read_loop(self):
+        try:
+            while True:
+                message = await self.ws.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                chunk = message.get("bytes")
+                if chunk:
+                    await self.stt.feed_webm(chunk)
+                    self.bytes_received += len(chunk)
+                    self.last_audio_at = time.time()
+                elif message.get("text"):
+                    _dispatch_control(message["text"], self.on_control)
+        finally:
+            self.closed = True
+
+
+class ChunkedUtterance:
+    """
+    One batch-mode utterance arriving in chunks. stream() yields the chunks
+    as they come (one consumer: the early upload); clip() is the whole
+    recording once it has ended.
+    """
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.started = time.perf_counter()
+        self.ended: Optional[float] = None
+        self.uploads: Dict[str, PendingUpload] = {}  # filled in by on_utterance
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def add(self, chunk: bytes):
+        self.chunks.append(chunk)
+        self._queue.put_nowait(chunk)
+
+    def end(self):
+        self.ended = time.perf_counter()
+        self._queue.put_nowait(None)
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        while True:
+            chunk = await self._queue.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    def clip(self) -> AudioClip:
+        return AudioClip(b"".join(self.chunks), uploads=self.uploads, speech_end=self.ended)
+
+    def discard(self):
+        for upload in self.uploads.values():
+            upload.cancel()
+
+
+class BatchTurnSource:
+    """
+    Batch mode: reads the caller's WebSocket in the background, queues each
+    recorded utterance for next_audio() and passes other JSON text messages
+    to on_control as they arrive (any other text closes the socket with
+    4000). on_utterance gets each chunked utterance when it starts (before
+    any audio), to start uploading it.
+    """
+
+    def __init__(self, ws, on_control: Optional[Callable[[dict], None]] = None,
+                 on_utterance: Optional[Callable[[ChunkedUtterance], None]] = None):
+        self.ws = ws
+        self.on_control = on_control
+        self.on_utterance = on_utterance
+        self.closed = False
+        self._blobs: asyncio.Queue = asyncio.Queue()
+        self._utterance: Optional[ChunkedUtterance] = None
+        self._reader: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._reader = asyncio.ensure_future(self._read_loop())
+
+    async def next_audio(self) -> Optional[AudioClip]:
+        """The next recorded utterance, or None once the caller has disconnected."""
+        return await self._blobs.get()
+
+    async def stop(self):
+        self.closed = True
+        if self._reader:
+            self._reader.cancel()
+
+    async def _read_loop(self):
+        try:
+            while True:
+                message = await self.ws.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes"):
+                    if self._utterance is not None:
+                        self._utterance.add(message["bytes"])
+                    else:
+                        self._blobs.put_nowait(AudioClip(message["bytes"]))  # a whole recording
+                elif message.get("text"):
+                    control = _parse_control(message["text"])
+                    if control is None:
+                        # not our protocol: close like a caller that sends something other than audio
+                        logger.warning("Unexpected text frame in batch mode, closing")
+                        await self._close(4000)
+                        break
+                    kind = control.get("type")
+                    if kind == "utterance_start":
+                        self._begin_utterance()
+                    elif kind == "utterance_end":
+                        self._end_utterance()
+                    elif self.on_control is not None:
+                        self.on_control(control)
+        finally:
+            self.closed = True
+            if self._utterance is not None:
+                self._utterance.end()
+                self._utterance.discard()  # hung up mid-sentence
+            self._blobs.put_nowait(None)
+
+    async def _close(self, code: int):
+        try:
+            await self.ws.close(code=code)
+        except Exception:
+            pass  # already gone
+
+    def _begin_utterance(self):
+        if self._utterance is not None:
+            self._end_utterance()  # the end marker got lost: what we have is one utterance
+        self._utterance = ChunkedUtterance()
+        if self.on_utterance is not None:
+            self.on_utterance(self._utterance)
+
+    def _end_utterance(self):
+        utterance, self._utterance = self._utterance, None
+        if utterance is None:
+            return
+        utterance.end()
+        if utterance.chunks:
+            self._blobs.put_nowait(utterance.clip())
+        else:
+            utterance.discard()
+
+
+def _parse_control(text: str) -> Optional[dict]:
+    try:
+        message = json.loads(text)
+    except ValueError:
+        logger.debug("Non-JSON text message: %r", text[:80], extra={"sample": "ws.non_json"})
+        return None
+    return message if isinstance(message, dict) else None
+
+
+def _dispatch_control(text: str, on_control: Optional[Callable[[dict], None]]):
+    message = _parse_control(text)
+    if message is not None and on_control is not None:
+        on_control(message)
@@ -0,0 +1,382 @@
+# STT router: one async transcribe() over several STT backends.
+#
+# A batch transcript usually comes back in well under a second, but now and
+# then one takes many times that (a slow AssemblyAI job, a busy whisper
+# worker) and the caller sits in silence. The router sends each utterance to
+# the preferred backend and, if it hasn't answered by that backend's recent
+# p90 latency, hedges: the same audio goes to the next backend too, the first
+# good transcript wins and the other request is cancelled. A backend that
+# errors (or answers "[ERROR] ...") is failed over from at once. So is one
+# our provider limiter throttled, but that doesn't count against its breaker.
+#
+# Each backend has a circuit breaker: once STT_BREAKER_ERROR_RATE of its last
+# STT_BREAKER_WINDOW requests failed it is skipped for STT_BREAKER_COOLDOWN_S,
+# then one trial request decides whether it comes back.
+#
+#   STT_BACKENDS=assemblyai,whisper     preference order (default: STT_BACKEND)
+#     assemblyai          shared async AssemblyAI client (async_stt_service)
+#     whisper             local faster-whisper batching engine (whisper_service)
+#     assemblyai_simple   legacy blocking client (simple_stt_service), in a thread
+#     assemblyai_wav      legacy WAV upload to AssemblyAI (stt2_service), in a thread
+# Thread-backed backends can't be cancelled: a losing request finishes in the background.
+#
+# An utterance recorded in chunks can start uploading before the customer stops
+# talking (start_upload, STT_STREAM_UPLOAD): it goes to the backend most likely
+# to transcribe it, if that backend takes early uploads (assemblyai does).
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from app.services.tracing import Histogram
+from app.services.audio_io import PendingUpload
+
+logger = logging.getLogger(__name__)
+
+STT_BACKENDS = os.getenv("STT_BACKENDS") or os.getenv("STT_BACKEND", "assemblyai")
+STT_HEDGE = os.getenv("STT_HEDGE", "1") == "1"
+STT_HEDGE_QUANTILE = float(os.getenv("STT_HEDGE_QUANTILE", "0.9"))
+STT_HEDGE_DEFAULT_MS = float(os.getenv("STT_HEDGE_DEFAULT_MS", "2500"))  # until enough latencies are seen
+STT_HEDGE_MIN_MS = float(os.getenv("STT_HEDGE_MIN_MS", "300"))
+STT_HEDGE_MAX_FRACTION = float(os.getenv("STT_HEDGE_MAX_FRACTION", "0.2"))  # extra load cap
+STT_LATENCY_WINDOW = int(os.getenv("STT_LATENCY_WINDOW", "200"))  # recent latencies per backend
+STT_BREAKER_WINDOW = int(os.getenv("STT_BREAKER_WINDOW", "20"))
+STT_BREAKER_MIN_CALLS = int(os.getenv("STT_BREAKER_MIN_CALLS", "5"))
+STT_BREAKER_ERROR_RATE = float(os.getenv("STT_BREAKER_ERROR_RATE", "0.5"))
+STT_BREAKER_COOLDOWN_S = float(os.getenv("STT_BREAKER_COOLDOWN_S", "30"))
+STT_STREAM_UPLOAD = os.getenv("STT_STREAM_UPLOAD", "1") == "1"
+
+MIN_SAMPLES = 20  # latencies needed before the observed quantile replaces STT_HEDGE_DEFAULT_MS
+
+
+def is_error(result) -> bool:
+    text = result.get("text", "") if isinstance(result, dict) else result
+    return not isinstance(text, str) or text.startswith("[ERROR]")
+
+
+class CircuitBreaker:
+    """closed -> open after too many failures -> half_open (one trial) after the cooldown -> closed."""
+
+    def __init__(self, window: int = STT_BREAKER_WINDOW, min_calls: int = STT_BREAKER_MIN_CALLS,
+                 error_rate: float = STT_BREAKER_ERROR_RATE, cooldown_s: float = STT_BREAKER_COOLDOWN_S):
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.cooldown_s = cooldown_s
+        self.outcomes = deque(maxlen=window)  # True = failed
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.trips = 0
+        self._trial = False
+
+    def allow(self) -> bool:
+        """May a request go to this backend now? (a half-open one takes a single trial at a time)"""
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown_s:
+            self.state = "half_open"
+            self._trial = False
+        return self.state == "closed" or (self.state == "half_open" and not self._trial)
+
+    def start(self):
+        """A request is going out (after allow())."""
+        if self.state == "half_open":
+            self._trial = True
+
+    def abandon(self):
+        """The request was cancelled before it said anything about the backend."""
+        if self.state == "half_open":
+            self._trial = False
+
+    def record(self, failed: bool):
+        if self.state == "half_open":
+            self._trial = False
+            if failed:
+                self._open()
+            else:
+                self.state = "closed"
+                self.outcomes.clear()
+            return
+        self.outcomes.append(failed)
+        if (self.state == "closed" and len(self.outcomes) >= self.min_calls
+                and sum(self.outcomes) / len(self.outcomes) >= self.error_rate):
+            self._open()
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        self.outcomes.clear()
+
+
+class STTBackend:
+    """
+    A named async transcribe(audio_bytes) -> result dict, with its recent
+    latencies and breaker. A backend that takes early uploads has
+    upload(chunks) -> upload URL, and its transcribe accepts uploaded=.
+    """
+
+    def __init__(self, name: str, transcribe: Callable[..., Awaitable[dict]],
+                 breaker: Optional[CircuitBreaker] = None, window: int = STT_LATENCY_WINDOW,
+                 upload: Optional[Callable[[AsyncIterator[bytes]], Awaitable[Optional[str]]]] = None):
+        self.name = name
+        self.transcribe = transcribe
+        self.upload = upload
+        self.breaker = breaker or CircuitBreaker()
+        self.recent = deque(maxlen=window)  # successful latencies, ms
+        self.latency = Histogram()
+        self.counters = {"requests": 0, "errors": 0, "throttled": 0, "wins": 0, "cancelled": 0}
+
+    def quantile(self, q: float) -> Optional[float]:
+        if len(self.recent) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    async def run(self, audio_bytes: bytes) -> dict:
+        """Transcribe, recording latency and outcome. Never raises (except CancelledError)."""
+        self.counters["requests"] += 1
+        start = time.perf_counter()
+        pending = getattr(audio_bytes, "uploads", {}).get(self.name)
+        try:
+            if pending is not None:
+                result = await self.transcribe(audio_bytes, uploaded=pending.url)
+            else:
+                result = await self.transcribe(audio_bytes)
+            if not isinstance(result, dict):
+                result = {"text": result, "upload_time": 0, "processing_time": 0, "total_time": 0}
+        except Exception as e:
+            logger.error("STT backend %s failed: %r", self.name, e)
+            result = {"text": f"[ERROR] {self.name} failed", "upload_time": 0, "processing_time": 0, "total_time": 0}
+        ms = (time.perf_counter() - start) * 1000
+        if result.get("throttled"):
+            # our own provider limiter said no: nothing about the backend's health
+            self.counters["throttled"] += 1
+            self.breaker.abandon()
+            return result
+        failed = is_error(result)
+        self.breaker.record(failed)
+        if failed:
+            self.counters["errors"] += 1
+        else:
+            self.recent.append(ms)
+            self.latency.record(ms)
+        return result
+
+    def cancelled(self):
+        """A request lost the race (or the turn was abandoned) before it finished."""
+        self.counters["cancelled"] += 1
+        self.breaker.abandon()
+
+    def stats(self) -> dict:
+        p90 = self.quantile(STT_HEDGE_QUANTILE)
+        return {
+            **self.counters,
+            "breaker": self.breaker.state,
+            "breaker_trips": self.breaker.trips,
+            "hedge_after_ms": round(p90, 1) if p90 is not None else None,
+            "latency_ms": self.latency.snapshot(),
+        }
+
+
+class STTRouter:
+    """
+    transcribe() returns the first good result from the backends, in
+    preference order, hedging a slow one (see the module comment). Results
+    gain "stt_backend" (who answered) and "stt_hedged".
+    """
+
+    def __init__(self, backends: List[STTBackend], hedge: bool = STT_HEDGE,
+                 hedge_quantile: float = STT_HEDGE_QUANTILE, hedge_default_ms: float = STT_HEDGE_DEFAULT_MS,
+                 hedge_min_ms: float = STT_HEDGE_MIN_MS, hedge_max_fraction: float = STT_HEDGE_MAX_FRACTION,
+                 stream_upload: bool = STT_STREAM_UPLOAD):
+        self.backends = backends
+        self.stream_upload = stream_upload
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_default_ms = hedge_default_ms
+        self.hedge_min_ms = hedge_min_ms
+        self.hedge_max_fraction = hedge_max_fraction
+        self.latency = Histogram()
+        self.counters = {
+            "requests": 0,
+            "hedged": 0,          # a second backend was started because the first was slow
+            "hedge_wins": 0,      # ...and answered first
+            "failovers": 0,       # a second backend was started because the first failed
+            "skipped_open": 0,    # backends passed over with their breaker open
+            "all_failed": 0,
+        }
+
+    def hedge_after_ms(self, backend: STTBackend) -> float:
+        observed = backend.quantile(self.hedge_quantile)
+        return max(self.hedge_min_ms, observed if observed is not None else self.hedge_default_ms)
+
+    async def transcribe(self, audio_bytes: bytes) -> dict:
+        self.counters["requests"] += 1
+        start = time.perf_counter()
+        candidates = self._available()
+        if not candidates:
+            # every breaker is open: try the preferred backend anyway rather than fail the turn
+            candidates = self.backends[:1]
+        primary = candidates[0]
+        running: Dict[asyncio.Task, STTBackend] = {}
+        last_error = None
+        hedged = False
+
+        def launch(force: bool = False) -> bool:
+            # the next candidate whose breaker still lets it in (it may have changed since we started)
+            while candidates:
+                backend = candidates.pop(0)
+                if force or backend.breaker.allow():
+                    backend.breaker.start()
+                    task = asyncio.ensure_future(backend.run(audio_bytes))
+                    task.add_done_callback(lambda t, b=backend: t.cancelled() and b.cancelled())
+                    running[task] = backend
+                    return True
+            return False
+
+        launch(force=True)
+        try:
+            while running:
+                timeout = None
+                if candidates and len(running) == 1 and not hedged and self._may_hedge():
+                    elapsed = (time.perf_counter() - start) * 1000
+                    timeout = max(0.0, self.hedge_after_ms(primary) - elapsed) / 1000
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if launch():
+                        hedged = True
+                        self.counters["hedged"] += 1
+                    continue
+                for task in done:
+                    backend = running.pop(task)
+                    result = task.result()
+                    if not is_error(result):
+                        backend.counters["wins"] += 1
+                        if hedged and backend is not primary:
+                            self.counters["hedge_wins"] += 1
+                        self.latency.record((time.perf_counter() - start) * 1000)
+                        return {**result, "stt_backend": backend.name, "stt_hedged": hedged}
+                    last_error = result
+                if not running and launch():
+                    self.counters["failovers"] += 1
+        finally:
+            for task in running:
+                task.cancel()  # the loser (or whatever is left when we're cancelled)
+        self.counters["all_failed"] += 1
+        self.latency.record((time.perf_counter() - start) * 1000)
+        return {**last_error, "stt_backend": None, "stt_hedged": hedged}
+
+    def start_upload(self, chunks: AsyncIterator[bytes]) -> Dict[str, PendingUpload]:
+        """
+        Start uploading an utterance that is still being recorded to the first
+        backend a request would go to now, if it takes early uploads. Returns
+        {backend name: PendingUpload} for AudioClip.uploads (empty if none).
+        """
+        backend = next((b for b in self.backends if b.breaker.allow()), None)
+        if not self.stream_upload or backend is None or backend.upload is None:
+            return {}
+        return {backend.name: PendingUpload(backend.upload(chunks))}
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "latency_ms": self.latency.snapshot(),
+            "backends": {b.name: b.stats() for b in self.backends},
+        }
+
+    def render_prometheus(self) -> str:
+        lines = [
+            "# HELP voice_stt_requests_total Utterances sent to the STT router.",
+            "# TYPE voice_stt_requests_total counter",
+            f"voice_stt_requests_total {self.counters['requests']}",
+            "# HELP voice_stt_hedged_total Utterances also sent to a second backend because the first was slow.",
+            "# TYPE voice_stt_hedged_total counter",
+            f"voice_stt_hedged_total {self.counters['hedged']}",
+            "# HELP voice_stt_failovers_total Utterances retried on another backend after an error.",
+            "# TYPE voice_stt_failovers_total counter",
+            f"voice_stt_failovers_total {self.counters['failovers']}",
+            "# HELP voice_stt_backend_wins_total Transcripts served, by backend.",
+            "# TYPE voice_stt_backend_wins_total counter",
+            *(f'voice_stt_backend_wins_total{{backend="{b.name}"}} {b.counters["wins"]}' for b in self.backends),
+            "# HELP voice_stt_breaker_open Whether a backend's circuit breaker is open (skipped).",
+            "# TYPE voice_stt_breaker_open gauge",
+            *(f'voice_stt_breaker_open{{backend="{b.name}"}} {int(b.breaker.state == "open")}' for b in self.backends),
+        ]
+        return "\n".join(lines) + "\n"
+
+    def _may_hedge(self) -> bool:
+        # hedges are capped at hedge_max_fraction of requests, so a backend that is
+        # slow across the board doesn't double the load on the next one
+        return self.hedge and self.counters["hedged"] < self.hedge_max_fraction * self.counters["requests"]
+
+    def _available(self) -> List[STTBackend]:
+        """Backends a request may use, in preference order."""
+        available = []
+        for backend in self.backends:
+            if backend.breaker.allow():
+                available.append(backend)
+            else:
+                self.counters["skipped_open"] += 1
+        return available
+
+
+# ---------- Backends ----------
+
+async def _assemblyai(audio_bytes: bytes, uploaded: Optional[Callable[[], Awaitable[Optional[str]]]] = None) -> dict:
+    from app.services.async_stt_service import get_stt_client
+    return await get_stt_client().transcribe(audio_bytes, uploaded)
+
+
+async def _assemblyai_upload(chunks: AsyncIterator[bytes]) -> Optional[str]:
+    from app.services.async_stt_service import get_stt_client
+    return await get_stt_client().upload_stream(chunks)
+
+
+async def _whisper(audio_bytes: bytes) -> dict:
+    # imported lazily so the default deployment doesn't need faster-whisper installed
+    from app.services.whisper_service import transcribe_audio_local
+    return await transcribe_audio_local(audio_bytes)
+
+
+async def _assemblyai_simple(audio_bytes: bytes) -> dict:
+    from app.services.simple_stt_service import transcribe_audio_simple
+    return await asyncio.to_thread(transcribe_audio_simple, audio_bytes)
+
+
+async def _assemblyai_wav(audio_bytes: bytes) -> dict:
+    from app.services.stt2_service import transcribe_audio
+    return await asyncio.to_thread(transcribe_audio, audio_bytes)  # text only
+
+
+BACKENDS: Dict[str, Callable[[bytes], Awaitable[dict]]] = {
+    "assemblyai": _assemblyai,
+    "whisper": _whisper,
+    "assemblyai_simple": _assemblyai_simple,
+    "assemblyai_wav": _assemblyai_wav,
+}
+
+# Backends that can take an utterance's upload while it is still being recorded
+UPLOADERS: Dict[str, Callable[[AsyncIterator[bytes]], Awaitable[Optional[str]]]] = {
+    "assemblyai": _assemblyai_upload,
+}
+
+
+def build_router(spec: str = STT_BACKENDS) -> STTRouter:
+    """"assemblyai,whisper" -> a router over those backends; unknown names are skipped."""
+    names = [name.strip() for name in spec.split(",") if name.strip()]
+    for name in names:
+        if name not in BACKENDS:
+            logger.warning("Unknown STT backend %r (known: %s)", name, ", ".join(BACKENDS))
+    backends = [STTBackend(name, BACKENDS[name], upload=UPLOADERS.get(name)) for name in names if name in BACKENDS]
+    return STTRouter(backends or [STTBackend("assemblyai", _assemblyai, upload=_assemblyai_upload)])
+
+
+# One router for the whole process
+_router: Optional[STTRouter] = None
+
+
+def get_stt_router() -> STTRouter:
+    global _router
+    if _router is None:
+        _router = build_router()
+    return _router
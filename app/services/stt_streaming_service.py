@@ -5,16 +5,17 @@ import time
 import queue
 import threading # how are we using threading here? is it related to async or parellelism 
 import subprocess #hwat is subprocess
-from typing import Optional
+from typing import Callable, Optional
 from dotenv import load_dotenv
 
 import websocket  # pip install websocket-client
 
+from app.services.pcm_framer import ThreadedPCMFramer, FRAME_BYTES
+
 load_dotenv()
 ASSEMBLY_API_KEY = os.getenv("ASSEMBLY_API_KEY")
-
-# 50 ms @ 16kHz mono, 16-bit PCM = 16000 * 0.05 * 2 bytes = 1600 bytes
-FRAME_BYTES = 1600
+# Point this at a local stand-in for offline testing
+ASSEMBLY_STREAMING_URL = os.getenv("ASSEMBLY_STREAMING_URL", "wss://streaming.assemblyai.com/v3/ws")
 
 class AAIStreamingSTT:
     """
@@ -23,24 +24,27 @@ class AAIStreamingSTT:
       - read PCM16 frames from ffmpeg stdout
       - send PCM frames over WS to AssemblyAI streaming API
       - emit final transcripts on end_of_turn
+      - pass interim transcripts to on_interim (called on the WebSocket thread)
     """
 
-    def __init__(self, sample_rate: int = 16000, format_turns: bool = False):
+    def __init__(self, sample_rate: int = 16000, format_turns: bool = False,
+                 on_interim: Optional[Callable[[str], None]] = None):
         assert ASSEMBLY_API_KEY, "ASSEMBLY_API_KEY env var missing"
         self.sample_rate = sample_rate
         self.format_turns = format_turns
 
         # WS endpoint (pcm_s16le streaming)
         params = f"sample_rate={sample_rate}&encoding=pcm_s16le&format_turns={'true' if format_turns else 'false'}"
-        self.ws_url = f"wss://streaming.assemblyai.com/v3/ws?{params}"
+        self.ws_url = f"{ASSEMBLY_STREAMING_URL}?{params}"
 
         # Threading primitives
         self._stop = threading.Event()
         self._ws: Optional[websocket.WebSocketApp] = None
 
-        # Queues
-        self._pcm_q: "queue.Queue[bytes]" = queue.Queue(maxsize=128)  # PCM frames to send
+        # PCM frames to send (ring buffer: backpressure + coalescing instead of drops)
+        self._pcm = ThreadedPCMFramer(FRAME_BYTES, capacity_frames=128)
         self._final_turn_q: "queue.Queue[str]" = queue.Queue()        # finalized transcripts
+        self.on_interim = on_interim  # interim (not end_of_turn) transcripts, e.g. for speculation
 
         # FFmpeg process handles
         self._ffmpeg: Optional[subprocess.Popen] = None
@@ -61,6 +65,7 @@ class AAIStreamingSTT:
     def stop(self):
         """Gracefully stop everything."""
         self._stop.set()
+        self._pcm.close()
 
         try:
             # tell server we're done
@@ -114,6 +119,10 @@ class AAIStreamingSTT:
         except queue.Empty:
             return None
 
+    def pcm_stats(self) -> dict:
+        """Frame counters: queued / sent / coalesced / dropped / backpressure_waits."""
+        return dict(self._pcm.counters)
+
     # ---------- Internals ----------
 
     def _start_ffmpeg(self):
@@ -137,23 +146,13 @@ class AAIStreamingSTT:
             cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0
         )
 
-        # read ffmpeg stdout and split into 50ms frames
+        # read ffmpeg stdout straight into the PCM ring buffer (split into 50ms frames there)
         def _read_pcm():
-            buff = b""
             while not self._stop.is_set():
                 try:
-                    chunk = self._ffmpeg.stdout.read(4096)
-                    if not chunk:
-                        time.sleep(0.005)
-                        continue
-                    buff += chunk
-                    while len(buff) >= FRAME_BYTES:
-                        frame, buff = buff[:FRAME_BYTES], buff[FRAME_BYTES:]
-                        # push to PCM queue (drop if full to avoid blocking pipeline)
-                        try:
-                            self._pcm_q.put_nowait(frame)
-                        except queue.Full:
-                            pass
+                    # blocks while the ring is full, which pushes back on ffmpeg
+                    if not self._pcm.readinto_from(self._ffmpeg.stdout):
+                        break  # ffmpeg closed stdout
                 except Exception:
                     break
 
@@ -177,6 +176,8 @@ class AAIStreamingSTT:
                 if end and tx.strip():
                     # push final text for current turn
                     self._final_turn_q.put(tx.strip())
+                elif tx.strip() and self.on_interim:
+                    self.on_interim(tx.strip())
             # ignore Begin/Termination/etc for now
 
         def on_error(ws, error):
@@ -205,16 +206,19 @@ class AAIStreamingSTT:
         """Send PCM frames to AssemblyAI as they arrive."""
         def _send_loop():
             while not self._stop.is_set():
-                try:
-                    frame = self._pcm_q.get(timeout=0.1)
-                except queue.Empty:
+                frames = self._pcm.get_frames(timeout=0.1)  # 1+ frames, coalesced if backed up
+                if frames is None:
+                    continue
+                if not (self._ws and self._ws.sock and self._ws.sock.connected):
+                    # not connected yet - keep the frames and let the ring apply backpressure
+                    self._stop.wait(0.05)
                     continue
                 try:
-                    if self._ws and self._ws.sock and self._ws.sock.connected:
-                        self._ws.send(frame, opcode=websocket.ABNF.OPCODE_BINARY)
+                    self._ws.send(frames, opcode=websocket.ABNF.OPCODE_BINARY)
                 except Exception:
                     # Ignore transient send errors
                     pass
+                self._pcm.done(frames)
 
         self._ws_sender_t = threading.Thread(target=_send_loop, daemon=True)
         self._ws_sender_t.start()
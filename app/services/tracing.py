@@ -0,0 +1,205 @@
+# Per-turn latency tracing.
+#
+# Every call gets a SessionTrace, every turn a TurnTrace that records how
+# long each stage took (receive, STT, LLM, post-processing, TTS). Durations go
+# straight into process-wide log-bucketed histograms - one list increment per
+# span, no samples kept - so p50/p95/p99 per stage are cheap to record and to
+# scrape from GET /metrics (Prometheus text format).
+import os
+import math
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+TRACE_RECENT_TURNS = int(os.getenv("TRACE_RECENT_TURNS", "50"))  # kept for GET /api/stats/latency
+
+# Turn stages, in pipeline order (all milliseconds)
+STAGES = (
+    "receive",          # utterance in hand -> ready for STT (batch: VAD trim)
+    "stt_upload",
+    "stt_upload_hidden",  # upload done while the customer was still talking (chunked utterances, not in the turn)
+    "stt_processing",
+    "stt",              # whole STT step (streaming: last audio -> final transcript)
+    "llm_first_token",  # reply stream start -> first LLM token
+    "llm",              # reply stream start -> LLM done
+    "postprocess",      # reply filters + sentiment/topic tagging
+    "tts_first_audio",  # reply stream start -> first audio byte to the caller
+    "tts",              # reply stream start -> last audio byte
+    "turn",             # utterance in hand -> reply finished
+)
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Histogram buckets: geometric, 8 per doubling (<= 4.5% relative error) from
+# 10 us to ~100 s; anything outside lands in the first / last bucket.
+_MIN_MS = 0.01
+_PER_DOUBLING = 8
+_N_BUCKETS = _PER_DOUBLING * 24
+_SCALE = _PER_DOUBLING / math.log(2)
+
+
+class Histogram:
+    """Log-bucketed latency histogram: O(1) record, percentiles within one bucket."""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * _N_BUCKETS
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, ms: float):
+        if ms > _MIN_MS:
+            i = int(math.log(ms / _MIN_MS) * _SCALE)
+            if i >= _N_BUCKETS:
+                i = _N_BUCKETS - 1
+        else:
+            i = 0
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, q: float) -> float:
+        """Geometric middle of the bucket holding the q-th sample (0 if empty)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(self.max, _MIN_MS * math.exp((i + 0.5) / _SCALE))
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": round(self.sum / self.count, 2) if self.count else 0,
+            **{f"p{round(q * 100)}": round(self.percentile(q), 2) for q in QUANTILES},
+            "max": round(self.max, 2),
+        }
+
+
+class TurnTrace:
+    """
+    Spans of one turn. span(stage) times a block; add(stage, ms) records a
+    duration measured elsewhere (e.g. the STT result or stream_reply metrics).
+    Each span goes into the tracer's histograms as soon as it's recorded, so
+    abandoned turns still count. start() marks when the customer's utterance
+    was in hand - the turn is timed from there to finish().
+    """
+
+    __slots__ = ("tracer", "session_id", "turn_id", "started_at", "spans")
+
+    def __init__(self, tracer: "Tracer", session_id: str, turn_id: int):
+        self.tracer = tracer
+        self.session_id = session_id
+        self.turn_id = turn_id
+        self.started_at = time.perf_counter()
+        self.spans: Dict[str, float] = {}
+
+    def start(self, at: Optional[float] = None):
+        """at: a time.perf_counter() value, default now."""
+        self.started_at = time.perf_counter() if at is None else at
+
+    @contextmanager
+    def span(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, (time.perf_counter() - start) * 1000)
+
+    def add(self, stage: str, ms: float):
+        if ms is None or ms < 0:
+            return
+        self.spans[stage] = self.spans.get(stage, 0.0) + ms
+        self.tracer.record(stage, ms)
+
+    def finish(self) -> dict:
+        """Record the whole turn; returns {stage: ms} for logging / the client."""
+        self.add("turn", (time.perf_counter() - self.started_at) * 1000)
+        record = {"session_id": self.session_id, "turn_id": self.turn_id,
+                  "spans": {stage: round(ms, 1) for stage, ms in self.spans.items()}}
+        self.tracer.recent.append(record)
+        return record["spans"]
+
+
+class SessionTrace:
+    """One call. turn() starts the next turn's trace; close() when the call ends."""
+
+    def __init__(self, tracer: "Tracer", session_id: Optional[str] = None):
+        self.tracer = tracer
+        self.session_id = session_id or uuid.uuid4().hex[:12]
+        self.closed = False
+        tracer.sessions += 1
+        tracer.active_sessions += 1
+
+    def turn(self, turn_id: int) -> TurnTrace:
+        return TurnTrace(self.tracer, self.session_id, turn_id)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.tracer.active_sessions -= 1
+
+
+class Tracer:
+    """Process-wide histograms per stage plus the last few turns' spans."""
+
+    def __init__(self, recent_turns: int = TRACE_RECENT_TURNS):
+        self.histograms: Dict[str, Histogram] = {stage: Histogram() for stage in STAGES}
+        self.recent = deque(maxlen=recent_turns)
+        self.sessions = 0
+        self.active_sessions = 0
+
+    def record(self, stage: str, ms: float):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram()
+        histogram.record(ms)
+
+    def session(self, session_id: Optional[str] = None) -> SessionTrace:
+        return SessionTrace(self, session_id)
+
+    def summary(self) -> dict:
+        return {
+            "sessions": self.sessions,
+            "active_sessions": self.active_sessions,
+            "stages": {stage: h.snapshot() for stage, h in self.histograms.items() if h.count},
+            "recent_turns": list(self.recent),
+        }
+
+    def render_prometheus(self) -> str:
+        lines = [
+            "# HELP voice_turn_stage_ms Latency of each voice-turn stage in milliseconds.",
+            "# TYPE voice_turn_stage_ms summary",
+        ]
+        for stage, h in self.histograms.items():
+            for q in QUANTILES:
+                lines.append(f'voice_turn_stage_ms{{stage="{stage}",quantile="{q}"}} {h.percentile(q):.3f}')
+            lines.append(f'voice_turn_stage_ms_sum{{stage="{stage}"}} {h.sum:.3f}')
+            lines.append(f'voice_turn_stage_ms_count{{stage="{stage}"}} {h.count}')
+        lines += [
+            "# HELP voice_sessions_total Voice calls started.",
+            "# TYPE voice_sessions_total counter",
+            f"voice_sessions_total {self.sessions}",
+            "# HELP voice_sessions_active Voice calls in progress.",
+            "# TYPE voice_sessions_active gauge",
+            f"voice_sessions_active {self.active_sessions}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
@@ -0,0 +1,92 @@
+# In-process registry of transcripts we're waiting on.
+# The STT client registers a transcript ID and awaits its future; the webhook
+# route resolves it the moment AssemblyAI calls back, so the turn doesn't
+# have to wait for the next poll.
+import time
+import asyncio
+from typing import Dict, Optional, Tuple
+
+# How long to remember callbacks for IDs nobody has registered yet
+EARLY_CALLBACK_TTL = 60.0
+
+# Header AssemblyAI echoes back on callbacks when we give it a webhook secret
+WEBHOOK_AUTH_HEADER = "X-Webhook-Secret"
+
+
+class TranscriptRegistry:
+    """
+    transcript_id -> asyncio.Future mapping.
+
+    A callback can beat the registration (AssemblyAI may finish a short clip
+    before our submit() call has returned), so unmatched callbacks are kept
+    for a short while and handed out when the ID gets registered.
+
+    Futures live on the worker's event loop. With several uvicorn workers a
+    callback can land on a different worker - the polling fallback in the STT
+    client covers that case.
+    """
+
+    def __init__(self, early_ttl: float = EARLY_CALLBACK_TTL):
+        self.early_ttl = early_ttl
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._early: Dict[str, Tuple[float, dict]] = {}
+        self.stats = {"registered": 0, "resolved": 0, "early": 0, "unmatched": 0}
+
+    def expect(self, transcript_id: str) -> asyncio.Future:
+        """Register interest in a transcript and get a future for its callback payload."""
+        fut = asyncio.get_running_loop().create_future()
+        self.stats["registered"] += 1
+
+        early = self._early.pop(transcript_id, None)
+        if early is not None:
+            fut.set_result(early[1])
+        else:
+            self._pending[transcript_id] = fut
+        return fut
+
+    def resolve(self, transcript_id: str, payload: dict) -> bool:
+        """Deliver a callback. Returns True if someone was waiting for it."""
+        fut = self._pending.pop(transcript_id, None)
+        if fut is not None:
+            if not fut.done():
+                fut.set_result(payload)
+                self.stats["resolved"] += 1
+            return True
+
+        # nobody waiting (yet) - keep it around in case the register is about to happen
+        self._prune_early()
+        self._early[transcript_id] = (time.monotonic(), payload)
+        self.stats["early"] += 1
+        return False
+
+    def discard(self, transcript_id: str):
+        """Stop waiting (transcript finished via polling, timed out or the call was cancelled)."""
+        fut = self._pending.pop(transcript_id, None)
+        if fut is not None and not fut.done():
+            fut.cancel()
+        self._early.pop(transcript_id, None)
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def _prune_early(self):
+        cutoff = time.monotonic() - self.early_ttl
+        for tid in [tid for tid, (ts, _) in self._early.items() if ts < cutoff]:
+            del self._early[tid]
+            self.stats["unmatched"] += 1
+
+
+# One registry for the whole process
+transcript_registry = TranscriptRegistry()
+
+
+def handle_transcript_callback(payload: dict) -> Optional[str]:
+    """
+    Handle an AssemblyAI webhook body ({"transcript_id": ..., "status": ...}).
+    Returns the transcript ID, or None if the payload wasn't usable.
+    """
+    transcript_id = payload.get("transcript_id")
+    if not transcript_id:
+        return None
+    transcript_registry.resolve(transcript_id, payload)
+    return transcript_id
@@ -0,0 +1,183 @@
+# Content-addressed cache for synthesized speech.
+#
+# Some lines are spoken word-for-word on many calls (the greeting, the canned
+# role-confusion fallback). They are synthesized once, kept as the exact
+# chunks ElevenLabs sent, and replayed from memory - or from disk after a
+# restart - so they start playing without a TTS round trip.
+import os
+import logging
+import json
+import struct
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import AsyncIterator, Iterable, List, Optional
+
+from app.services.tts_service import (
+    TTSConnectionManager, get_tts_manager, VOICE_ID, MODEL_ID, VOICE_SETTINGS, OUTPUT_FORMAT,
+)
+
+logger = logging.getLogger(__name__)
+
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", ".cache/tts")  # empty = memory only
+
+_LEN = struct.Struct(">I")  # on disk: [4-byte length][chunk] repeated
+
+
+def cache_key(text: str, voice_id: str = VOICE_ID, model_id: str = MODEL_ID,
+              voice_settings: dict = VOICE_SETTINGS, output_format: str = OUTPUT_FORMAT) -> str:
+    """sha256 over everything that changes the audio."""
+    material = json.dumps([text, voice_id, model_id, voice_settings, output_format], sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Two tiers: an in-memory LRU bounded by total audio bytes, backed by one
+    file per entry under cache_dir. stream_text() serves a hit chunk by chunk,
+    or synthesizes through the TTS manager and stores the result.
+    """
+
+    def __init__(self, manager: Optional[TTSConnectionManager] = None,
+                 max_bytes: int = TTS_CACHE_MAX_BYTES, cache_dir: Optional[str] = TTS_CACHE_DIR):
+        self.manager = manager
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir or None
+
+        self._memory: "OrderedDict[str, List[bytes]]" = OrderedDict()
+        self._memory_bytes = 0
+
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "bytes_served": 0,    # audio bytes sent from the cache
+            "bytes_synthesized": 0,
+            "evictions": 0,
+        }
+
+    # ---------- Public API ----------
+
+    async def stream_text(self, text: str, voice_id: str = VOICE_ID, model_id: str = MODEL_ID,
+                          output_format: str = OUTPUT_FORMAT) -> AsyncIterator[bytes]:
+        """Yield the audio for text - cached if we have it, synthesized (and stored) if not."""
+        key = cache_key(text, voice_id, model_id, output_format=output_format)
+        chunks = await self.get(key)
+        if chunks is not None:
+            for chunk in chunks:
+                self.counters["bytes_served"] += len(chunk)
+                yield chunk
+            return
+
+        self.counters["misses"] += 1
+        manager = self.manager or get_tts_manager()
+        collected = []
+        finished = []
+        async for chunk in manager.stream_text(text, voice_id, model_id, output_format,
+                                               on_final=lambda: finished.append(True)):
+            collected.append(chunk)
+            yield chunk
+        # the stream also ends quietly when the socket drops mid-utterance: never cache a cut-off line
+        if not finished:
+            if collected:
+                logger.warning("TTS for %r ended before isFinal - not caching it", text[:30])
+            return
+        if collected:
+            self.counters["bytes_synthesized"] += sum(len(c) for c in collected)
+            await self.put(key, collected)
+
+    async def get(self, key: str) -> Optional[List[bytes]]:
+        chunks = self._memory.get(key)
+        if chunks is not None:
+            self._memory.move_to_end(key)
+            self.counters["memory_hits"] += 1
+            return chunks
+
+        if self.cache_dir:
+            chunks = await asyncio.to_thread(self._read_file, key)
+            if chunks is not None:
+                self.counters["disk_hits"] += 1
+                self._remember(key, chunks)
+                return chunks
+        return None
+
+    async def put(self, key: str, chunks: List[bytes]):
+        self._remember(key, chunks)
+        if self.cache_dir:
+            try:
+                await asyncio.to_thread(self._write_file, key, chunks)
+            except OSError as e:
+                logger.error("Could not write TTS cache entry: %s", e)
+
+    async def prewarm(self, texts: Iterable[str], voice_id: str = VOICE_ID, model_id: str = MODEL_ID,
+                      output_format: str = OUTPUT_FORMAT):
+        """Make sure these lines are cached (synthesizing the ones that aren't)."""
+        for text in texts:
+            try:
+                async for _ in self.stream_text(text, voice_id, model_id, output_format):
+                    pass
+            except Exception as e:
+                logger.error("Could not pre-warm TTS cache for %r: %r", text[:30], e)
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    # ---------- Internals ----------
+
+    def _remember(self, key: str, chunks: List[bytes]):
+        size = sum(len(c) for c in chunks)
+        if size > self.max_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= sum(len(c) for c in old)
+        self._memory[key] = chunks
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= sum(len(c) for c in evicted)
+            self.counters["evictions"] += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.chunks")
+
+    def _read_file(self, key: str) -> Optional[List[bytes]]:
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        chunks, pos = [], 0
+        while pos + _LEN.size <= len(data):
+            (n,) = _LEN.unpack_from(data, pos)
+            pos += _LEN.size
+            chunks.append(data[pos:pos + n])
+            pos += n
+        if pos != len(data):
+            return None  # truncated file - treat as a miss, it gets rewritten
+        return chunks
+
+    def _write_file(self, key: str, chunks: List[bytes]):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = self._path(key) + ".tmp"
+        with open(tmp, "wb") as f:
+            for chunk in chunks:
+                f.write(_LEN.pack(len(chunk)))
+                f.write(chunk)
+        os.replace(tmp, self._path(key))  # readers never see a half-written entry
+
+
+_cache: Optional[TTSCache] = None
+
+
+def get_tts_cache() -> TTSCache:
+    global _cache
+    if _cache is None:
+        _cache = TTSCache()
+    return _cache
@@ -0,0 +1,351 @@
+# ElevenLabs stream-input TTS with a pool of pre-warmed sockets.
+#
+# Opening the stream-input WebSocket costs TCP + TLS + WebSocket handshakes plus
+# the voice_settings init frame. Instead of paying that on every reply, one
+# process-wide manager keeps already-initialized sockets ready per voice/model.
+# ElevenLabs closes a socket after its final audio (isFinal), so each socket
+# serves one utterance and a replacement is warmed in the background.
+#
+# Utterances in flight and socket opens are capped / paced by the "elevenlabs"
+# provider limiter (see provider_limits); warm-ups don't use a turn's budget.
+import os
+import logging
+import re
+import json
+import time
+import asyncio
+import binascii
+from contextlib import asynccontextmanager
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Dict, Optional, Set, Tuple
+
+import aiohttp
+from dotenv import load_dotenv
+
+from app.services.provider_limits import get_limiter
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+API_KEY = os.getenv("ELEVEN_LABS_API_KEY")
+# Using a more conversational voice (this is Rachel - sounds more natural for phone calls)
+VOICE_ID = "21m00Tcm4TlvDq8ikWAM"  # Rachel - warm, conversational female voice
+MODEL_ID = "eleven_turbo_v2_5"
+# Point this at a local stand-in for benchmarks / offline testing
+ELEVENLABS_WS_BASE = os.getenv("ELEVENLABS_WS_BASE", "wss://api.elevenlabs.io")
+
+VOICE_SETTINGS = {
+    "stability": 0.8,         # Much more stable, less rushed
+    "similarity_boost": 0.7,   # Softer, more natural voice
+    "use_speaker_boost": True,
+    "style": 0.3              # More conversational but not too much
+}
+# ElevenLabs' default stream format, spelled out so cached audio is keyed on it
+OUTPUT_FORMAT = "mp3_44100_128"
+# Formats a caller may ask for (?audio=...), bitrate included in the name
+OUTPUT_FORMATS = {
+    "mp3_22050_32", "mp3_44100_64", "mp3_44100_128",
+    "opus_48000_32", "opus_48000_64",
+    "pcm_16000", "pcm_22050", "pcm_24000",
+}
+FORMAT_ALIASES = {"mp3": "mp3_44100_128", "opus": "opus_48000_32", "pcm": "pcm_16000"}
+GENERATION_CONFIG = {
+    "chunk_length_schedule": [80, 120]  # Longer chunks = smoother speech
+}
+
+# ElevenLabs drops idle sockets after inactivity_timeout seconds (max 180);
+# we retire warm sockets a bit before that.
+INACTIVITY_TIMEOUT = 180
+MAX_WARM_IDLE = float(os.getenv("TTS_MAX_WARM_IDLE", "150"))
+WARM_SOCKETS_PER_VOICE = int(os.getenv("TTS_WARM_SOCKETS_PER_VOICE", "2"))
+
+
+def negotiate_output_format(requested: Optional[str]) -> str:
+    """Map a caller's ?audio= request to a format we support (default MP3 if unknown)."""
+    if not requested:
+        return OUTPUT_FORMAT
+    requested = FORMAT_ALIASES.get(requested.lower(), requested.lower())
+    return requested if requested in OUTPUT_FORMATS else OUTPUT_FORMAT
+
+
+def bytes_per_second(output_format: str) -> int:
+    """Audio bytes per second of speech for a format name like mp3_44100_128 / pcm_16000."""
+    codec, rate, *bitrate = output_format.split("_")
+    if codec == "pcm":
+        return int(rate) * 2  # s16le mono
+    return int(bitrate[0]) * 1000 // 8
+
+
+def build_tts_url(voice_id: str = VOICE_ID, model_id: str = MODEL_ID, base_url: str = ELEVENLABS_WS_BASE,
+                  output_format: str = OUTPUT_FORMAT) -> str:
+    return (
+        f"{base_url}/v1/text-to-speech/{voice_id}/stream-input"
+        f"?model_id={model_id}&inactivity_timeout={INACTIVITY_TIMEOUT}&output_format={output_format}"
+    )
+
+
+def build_init_message(api_key: Optional[str] = API_KEY) -> dict:
+    # initialise connection (key inside JSON)
+    return {
+        "text": " ",
+        "xi_api_key": api_key,
+        "voice_settings": VOICE_SETTINGS,
+        "generation_config": GENERATION_CONFIG,
+    }
+
+
+# Audio packets are mostly one long base64 string; pull it out without json.loads
+_AUDIO_FIELD = re.compile(r'"audio"\s*:\s*"')
+_IS_FINAL = re.compile(r'"isFinal"\s*:\s*true')
+
+
+def parse_audio_message(raw: str):
+    """
+    Returns (audio_bytes or None, is_final, data) for one ElevenLabs message.
+    Audio packets take the fast path (regex + binascii, no JSON parse of the
+    base64 payload, data is None); anything else is parsed as JSON.
+    """
+    match = _AUDIO_FIELD.search(raw)
+    if match:
+        end = raw.find('"', match.end())
+        audio = binascii.a2b_base64(raw[match.end():end])
+        return audio, _IS_FINAL.search(raw, end) is not None, None
+    data = json.loads(raw)
+    return None, bool(data.get("isFinal")), data
+
+
+class TTSStream:
+    """One initialized stream-input socket, used for a single utterance."""
+
+    def __init__(self, ws: aiohttp.ClientWebSocketResponse, key: Tuple[str, str, str]):
+        self.ws = ws
+        self.key = key
+        self.created_at = time.monotonic()
+        self.finished = False
+
+    def is_usable(self, max_idle: float) -> bool:
+        return not self.ws.closed and (time.monotonic() - self.created_at) < max_idle
+
+    async def send_text(self, text: str, flush: bool = False):
+        message = {"text": text}
+        if flush:
+            message["flush"] = True
+        await self.ws.send_json(message)
+
+    async def end(self):
+        """Tell ElevenLabs there's no more text; it sends the rest of the audio then isFinal."""
+        await self.ws.send_json({"text": ""})  # end marker
+
+    async def audio_chunks(self) -> AsyncIterator[bytes]:
+        """Yield decoded audio chunks until isFinal."""
+        async for msg in self.ws:
+            if msg.type is aiohttp.WSMsgType.TEXT:
+                audio, is_final, data = parse_audio_message(msg.data)
+                if audio:
+                    yield audio
+                elif data is not None:
+                    logger.debug("No audio in this packet: %s", data, extra={"sample": "tts.no_audio"})
+                if is_final:
+                    self.finished = True
+                    break
+            elif msg.type is aiohttp.WSMsgType.ERROR:
+                break
+
+    async def close(self):
+        if not self.ws.closed:
+            await self.ws.close()
+
+
+class TTSConnectionManager:
+    """
+    Process-wide pool of warm ElevenLabs stream-input sockets:
+      - one shared aiohttp ClientSession
+      - `warm_per_voice` initialized sockets kept ready per (voice, model, output format)
+      - a socket is retired after its utterance (isFinal) and replaced in the background
+      - stale or dead warm sockets are replaced on checkout
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = API_KEY,
+        base_url: str = ELEVENLABS_WS_BASE,
+        warm_per_voice: int = WARM_SOCKETS_PER_VOICE,
+        max_warm_idle: float = MAX_WARM_IDLE,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.warm_per_voice = warm_per_voice
+        self.max_warm_idle = max_warm_idle
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._warm: Dict[Tuple[str, str, str], Deque[TTSStream]] = {}
+        self._opening: Dict[Tuple[str, str, str], int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.counters = {
+            "opened": 0,       # sockets opened (handshake + init paid)
+            "reused": 0,       # checkouts served from the warm pool
+            "cold": 0,         # checkouts that had to open a socket inline
+            "reconnects": 0,   # warm sockets found dead/stale and replaced
+            "open_errors": 0,
+        }
+
+    # ---------- Public API ----------
+
+    @asynccontextmanager
+    async def stream(self, voice_id: str = VOICE_ID, model_id: str = MODEL_ID,
+                     output_format: str = OUTPUT_FORMAT) -> AsyncIterator[TTSStream]:
+        """Check out a ready socket for one utterance; it is retired and replaced afterwards."""
+        async with get_limiter("elevenlabs").concurrency():
+            tts = await self.acquire(voice_id, model_id, output_format)
+            try:
+                yield tts
+            finally:
+                await self.release(tts)
+
+    async def acquire(self, voice_id: str = VOICE_ID, model_id: str = MODEL_ID,
+                      output_format: str = OUTPUT_FORMAT) -> TTSStream:
+        key = (voice_id, model_id, output_format)
+        pool = self._warm.setdefault(key, deque())
+
+        tts = None
+        while pool:
+            candidate = pool.popleft()
+            if candidate.is_usable(self.max_warm_idle):
+                tts = candidate
+                self.counters["reused"] += 1
+                break
+            self.counters["reconnects"] += 1
+            self._spawn(candidate.close())
+
+        if tts is None:
+            self.counters["cold"] += 1
+            tts = await self._open(key)
+
+        # top the pool back up for the next reply
+        self._schedule_refill(key)
+        return tts
+
+    async def release(self, tts: TTSStream):
+        # stream-input sockets end with the utterance, so never put them back
+        await tts.close()
+        self._schedule_refill(tts.key)
+
+    async def stream_text(self, text: str, voice_id: str = VOICE_ID, model_id: str = MODEL_ID,
+                          output_format: str = OUTPUT_FORMAT,
+                          on_final: Optional[Callable[[], None]] = None) -> AsyncIterator[bytes]:
+        """
+        Synthesize one complete text and yield its audio chunks.
+        A warm socket the server already dropped shows up as a close with no
+        audio - in that case retry once on a fresh socket. The stream just
+        ends if the socket closes or errors mid-utterance; on_final is only
+        called once ElevenLabs has sent isFinal (the audio is complete).
+        """
+        for attempt in range(2):
+            got_audio = False
+            async with self.stream(voice_id, model_id, output_format) as tts:
+                try:
+                    await tts.send_text(text, flush=True)
+                    await tts.end()
+                    async for chunk in tts.audio_chunks():
+                        got_audio = True
+                        yield chunk
+                except (aiohttp.ClientError, ConnectionResetError):
+                    if got_audio:
+                        raise
+                if tts.finished and on_final is not None:
+                    on_final()
+                if got_audio or tts.finished or attempt:
+                    return
+            self.counters["reconnects"] += 1
+
+    async def prewarm(self, voice_id: str = VOICE_ID, model_id: str = MODEL_ID, output_format: str = OUTPUT_FORMAT):
+        """Open the warm sockets for a voice/model/format now (e.g. at app startup)."""
+        key = (voice_id, model_id, output_format)
+        self._warm.setdefault(key, deque())
+        await self._refill(key)
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "warm": {f"{v}/{m}/{f}": len(pool) for (v, m, f), pool in self._warm.items()},
+        }
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+        for pool in self._warm.values():
+            while pool:
+                await pool.popleft().close()
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # ---------- Internals ----------
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=0, keepalive_timeout=60)
+            )
+        return self._session
+
+    async def _open(self, key: Tuple[str, str, str], background: bool = False) -> TTSStream:
+        # a 429 on the handshake pauses the limiter's bucket and is retried
+        return await get_limiter("elevenlabs").request(self._connect, key, background=background)
+
+    async def _connect(self, key: Tuple[str, str, str]) -> TTSStream:
+        voice_id, model_id, output_format = key
+        ws = await self._get_session().ws_connect(
+            build_tts_url(voice_id, model_id, self.base_url, output_format), max_msg_size=0
+        )
+        await ws.send_json(build_init_message(self.api_key))
+        self.counters["opened"] += 1
+        return TTSStream(ws, key)
+
+    def _schedule_refill(self, key: Tuple[str, str, str]):
+        self._spawn(self._refill(key))
+
+    async def _refill(self, key: Tuple[str, str, str]):
+        pool = self._warm.setdefault(key, deque())
+        missing = self.warm_per_voice - len(pool) - self._opening.get(key, 0)
+        if missing <= 0:
+            return
+
+        self._opening[key] = self._opening.get(key, 0) + missing
+        try:
+            results = await asyncio.gather(*(self._open(key, background=True) for _ in range(missing)),
+                                     return_exceptions=True)
+        finally:
+            self._opening[key] -= missing
+
+        for result in results:
+            if isinstance(result, BaseException):
+                self.counters["open_errors"] += 1
+                logger.error("Could not pre-warm TTS socket: %r", result)
+            else:
+                pool.append(result)
+
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+# One manager for the whole process
+_manager: Optional[TTSConnectionManager] = None
+
+
+def get_tts_manager() -> TTSConnectionManager:
+    global _manager
+    if _manager is None:
+        _manager = TTSConnectionManager()
+    return _manager
+
+
+async def close_tts_manager():
+    global _manager
+    if _manager is not None:
+        await _manager.close()
+        _manager = None
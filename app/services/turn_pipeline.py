@@ -0,0 +1,216 @@
+# Streaming turn pipeline: LLM tokens -> sentence chunks -> ElevenLabs -> caller.
+#
+# The old turn waited for the whole LLM reply, post-processed it, and only then
+# opened TTS, so time-to-first-audio was the sum of every stage. Here the first
+# sentence goes to TTS as soon as the LLM finishes writing it, while the LLM
+# keeps generating the rest and audio is relayed in parallel.
+#
+# The LLM stream and the ElevenLabs utterance each take a slot from their
+# provider limiter; Throttled is raised if one isn't free within the turn's
+# budget (nothing has been spoken yet at that point).
+import time
+import logging
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from app.services.reply_filters import SentenceChunker, IncrementalReplyFilter
+from app.services.tts_service import (
+    TTSConnectionManager, get_tts_manager, VOICE_ID, MODEL_ID, OUTPUT_FORMAT, bytes_per_second,
+)
+from app.services.tts_cache import TTSCache, get_tts_cache
+from app.services.audio_relay import coalesce
+from app.services.barge_in import BargeIn, BARGE_IN_CANCEL_TIMEOUT_MS, MS_PER_CHAR, spoken_prefix, stats
+from app.services.provider_limits import get_limiter
+
+logger = logging.getLogger(__name__)
+
+
+async def stream_reply(
+    llm,
+    prompt_text: str,
+    send_audio: Callable[[bytes], Awaitable[None]],
+    tts_manager: TTSConnectionManager = None,
+    voice_id: str = VOICE_ID,
+    model_id: str = MODEL_ID,
+    tts_cache: TTSCache = None,
+    output_format: str = OUTPUT_FORMAT,
+    barge_in: Optional[BargeIn] = None,
+) -> dict:
+    """
+    Generate a reply with llm.astream() and speak it sentence by sentence.
+
+    Returns {"agent_reply": <what was spoken>, "interrupted": bool, "metrics": {...}}
+    where metrics are milliseconds from the start of the call to this function:
+      llm_first_token_time   - first token from the LLM
+      tts_first_audio_time   - first audio byte sent to the caller
+      llm_time               - LLM stream finished
+      tts_time               - last audio byte sent (isFinal)
+    plus postprocess_time, the total time spent in the reply filters.
+
+    If the reply is replaced by the canned fallback line, its audio comes from
+    the TTS cache instead of the live socket. Audio is re-framed by
+    audio_relay.coalesce, so audio_chunks counts frames sent to the caller.
+
+    With barge_in, an interrupt cancels the LLM call and the ElevenLabs stream;
+    agent_reply is then only the part the caller heard, and metrics gain
+    barge_in_* figures (see _interrupted_metrics).
+    """
+    tts_manager = tts_manager or get_tts_manager()
+    tts_cache = tts_cache or get_tts_cache()
+    start = time.time()
+    metrics = {"llm_first_token_time": 0, "tts_first_audio_time": 0, "llm_time": 0, "tts_time": 0,
+               "postprocess_time": 0.0, "audio_chunks": 0, "audio_bytes": 0}
+
+    def elapsed_ms() -> int:
+        return round((time.time() - start) * 1000)
+
+    async def relay(chunks):
+        # relay audio chunks to the caller while the LLM is still writing
+        async for chunk in coalesce(chunks, output_format):
+            if not metrics["tts_first_audio_time"]:
+                metrics["tts_first_audio_time"] = elapsed_ms()
+            metrics["audio_chunks"] += 1
+            metrics["audio_bytes"] += len(chunk)
+            await send_audio(chunk)
+
+    chunker = SentenceChunker()
+    reply_filter = IncrementalReplyFilter()
+
+    def postprocess(sentence: str, last: bool = False) -> str:
+        t0 = time.perf_counter()
+        spoken = reply_filter.process(sentence, last=last)
+        metrics["postprocess_time"] += (time.perf_counter() - t0) * 1000
+        return spoken
+
+    async def generate():
+        try:
+            await speak()
+        finally:
+            if hasattr(llm, "cancel"):
+                llm.cancel()  # a committed speculation: stop it even if its tokens were never read
+
+    async def speak():
+        async with tts_manager.stream(voice_id, model_id, output_format) as tts:
+            relay_task = asyncio.ensure_future(relay(tts.audio_chunks()))
+            if getattr(llm, "limited", False):
+                tokens = llm.astream(prompt_text)
+            else:
+                tokens = get_limiter("gemini").stream(llm.astream, prompt_text)
+            try:
+                async for token in tokens:
+                    text = getattr(token, "content", token)
+                    if not text:
+                        continue
+                    if not metrics["llm_first_token_time"]:
+                        metrics["llm_first_token_time"] = elapsed_ms()
+
+                    for sentence in chunker.feed(text):
+                        spoken = postprocess(sentence)
+                        if spoken and not reply_filter.replaced:
+                            await tts.send_text(spoken, flush=True)
+                    if reply_filter.stop:
+                        break  # role confusion - the rest of the reply is thrown away anyway
+
+                if not reply_filter.stop:
+                    for sentence in chunker.flush():
+                        spoken = postprocess(sentence, last=True)
+                        if spoken and not reply_filter.replaced:
+                            await tts.send_text(spoken, flush=True)
+                metrics["llm_time"] = elapsed_ms()
+
+                if not reply_filter.replaced:
+                    await tts.end()
+                    await relay_task
+            finally:
+                relay_task.cancel()
+                if hasattr(tokens, "aclose"):
+                    await tokens.aclose()  # stops the provider stream if we're leaving early
+
+        if reply_filter.replaced:
+            # nothing went to the live socket: play the canned line from the cache
+            await relay(tts_cache.stream_text(reply_filter.text(), voice_id, model_id, output_format))
+
+    if barge_in is None:
+        await generate()
+    else:
+        barge_in.start_reply()
+        try:
+            cancel_ms = await _until_interrupted(generate(), barge_in.event)
+        finally:
+            barge_in.end_reply()
+        if cancel_ms is not None:
+            metrics["tts_time"] = elapsed_ms()
+            metrics.update(_interrupted_metrics(reply_filter.text(), metrics, start, cancel_ms,
+                                                barge_in, output_format))
+            logger.info("Barge-in (%s): stopped in %dms, heard %dms of the reply",
+                        barge_in.reason, cancel_ms, metrics["barge_in_played_ms"])
+            return {"agent_reply": metrics.pop("barge_in_spoken"), "interrupted": True, "metrics": metrics}
+
+    metrics["tts_time"] = elapsed_ms()
+    return {"agent_reply": reply_filter.text(), "interrupted": False, "metrics": metrics}
+
+
+async def _until_interrupted(work, interrupt: asyncio.Event) -> Optional[int]:
+    """
+    Run `work` unless `interrupt` is set first. Returns None if it finished,
+    or the milliseconds it took to cancel it (waiting at most
+    BARGE_IN_CANCEL_TIMEOUT_MS - a socket close can finish in the background).
+    """
+    task = asyncio.ensure_future(work)
+    waiter = asyncio.ensure_future(interrupt.wait())
+    try:
+        await asyncio.wait({task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        waiter.cancel()
+
+    if task.done():
+        task.result()
+        return None
+
+    cancel_start = time.time()
+    task.cancel()
+    await asyncio.wait({task}, timeout=BARGE_IN_CANCEL_TIMEOUT_MS / 1000)
+    if not task.done():
+        logger.warning("Reply still unwinding after barge-in, finishing in the background")
+    # don't leave an exception unretrieved if cleanup failed
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return round((time.time() - cancel_start) * 1000)
+
+
+def _interrupted_metrics(said: str, metrics: dict, start: float, cancel_ms: int,
+                         barge_in: BargeIn, output_format: str) -> dict:
+    """
+    What the caller heard, and what stopping early saved. Audio is played in
+    real time from the first frame, so the caller heard at most the time since
+    then (or what the browser reports, if less) and no more than was sent.
+    Savings count only text already sent to TTS, so they are a lower bound.
+    """
+    bps = bytes_per_second(output_format)
+    sent_ms = metrics["audio_bytes"] * 1000 / bps
+    played_ms = 0.0
+    if metrics["tts_first_audio_time"]:
+        since_first = (time.time() - start) * 1000 - metrics["tts_first_audio_time"]
+        played_ms = min(sent_ms, since_first)
+    if barge_in.client_played_ms is not None:
+        played_ms = min(played_ms, barge_in.client_played_ms)
+
+    spoken = spoken_prefix(said, played_ms)
+    full_ms = max(sent_ms, len(said) * MS_PER_CHAR)
+    saved_bytes = round((full_ms - sent_ms) * bps / 1000)
+    time_saved = round(full_ms - played_ms)
+
+    stats["interrupts"] += 1
+    stats["cancel_ms_max"] = max(stats["cancel_ms_max"], cancel_ms)
+    stats["audio_bytes_saved"] += saved_bytes
+    stats["time_saved_ms"] += time_saved
+    return {
+        "barge_in_spoken": spoken + "..." if spoken and spoken != said else spoken,
+        "barge_in_reason": barge_in.reason,
+        "barge_in_cancel_ms": cancel_ms,
+        "barge_in_played_ms": round(played_ms),
+        "barge_in_audio_bytes_saved": saved_bytes,
+        "barge_in_time_saved_ms": time_saved,
+    }
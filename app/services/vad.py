@@ -0,0 +1,226 @@
+# Server-side voice activity detection for batch-mode turns.
+#
+# The browser sends the whole MediaRecorder blob, leading/trailing silence
+# included, and upload + provider processing time both grow with its length.
+# prepare_for_stt() decodes the clip, finds speech with a vectorized
+# energy / zero-crossing detector, and
+#   - skips STT entirely when there is no speech and the clip is quiet,
+#   - otherwise trims the edges and collapses long pauses, re-encoding to
+#     WebM/Opus only when that saves enough to be worth the encode (and the
+#     clip isn't already uploaded: see streaming_turns.ChunkedUtterance).
+# It fails open: a loud clip the detector finds no speech in (speech barely
+# above steady noise, a tone), or one ffmpeg can't decode or isn't installed
+# for, goes to STT untouched.
+import os
+import logging
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.services.audio_io import AudioClip, FFmpegError, decode_pcm16, encode_webm
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+
+# A frame is speech if it is ENERGY_MARGIN_DB above the clip's noise floor
+# (and above an absolute minimum), and not hiss-like (very high zero-crossing rate)
+VAD_MIN_ENERGY_DB = float(os.getenv("VAD_MIN_ENERGY_DB", "-50"))
+VAD_ENERGY_MARGIN_DB = float(os.getenv("VAD_ENERGY_MARGIN_DB", "12"))
+VAD_MAX_ZCR = 0.35              # fraction of sign changes per sample; fricatives sit below, white noise ~0.5
+VAD_LOUD_DB_OVER_ZCR = 25       # this far above the floor counts as speech whatever the ZCR
+VAD_MIN_SPEECH_MS = 120         # less speech than this in the whole clip (before padding) = no speech ...
+VAD_QUIET_DB = float(os.getenv("VAD_QUIET_DB", "-40"))  # ... if its loud frames (95th percentile) are also below this
+VAD_PAD_MS = 200                # keep this much around each speech region
+VAD_MAX_GAP_MS = 600            # pauses longer than this are collapsed ...
+VAD_KEEP_GAP_MS = 300           # ... down to this
+VAD_MIN_SAVING_MS = int(os.getenv("VAD_MIN_SAVING_MS", "400"))  # below this, upload the original bytes
+
+# Provider cost per second of audio, learned from real turns (ms of STT time per audio second)
+STT_MS_PER_AUDIO_SECOND = 300.0
+EMA_ALPHA = 0.2
+
+
+@dataclass
+class PreparedAudio:
+    audio_bytes: bytes            # what to send to STT (original or trimmed re-encode), an AudioClip once decoded
+    has_speech: bool
+    original_bytes: int
+    original_ms: int
+    kept_ms: int
+    speech_ms: int
+    trimmed: bool = False         # audio_bytes is a re-encode
+    segments: List[Tuple[int, int]] = field(default_factory=list)  # speech regions in ms
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - len(self.audio_bytes) if self.has_speech else self.original_bytes
+
+
+# ---------- Detection (pure NumPy) ----------
+
+def frame_features(pcm: np.ndarray, sample_rate: int = SAMPLE_RATE, frame_ms: int = FRAME_MS):
+    """Per-frame energy (dBFS) and zero-crossing rate for mono int16/float PCM."""
+    frame_len = sample_rate * frame_ms // 1000
+    n_frames = len(pcm) // frame_len
+    if not n_frames:
+        return np.empty(0), np.empty(0)
+    frames = pcm[:n_frames * frame_len].astype(np.float32).reshape(n_frames, frame_len)
+    if pcm.dtype == np.int16:
+        frames /= 32768.0
+
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    energy_db = 20 * np.log10(rms + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_len - 1)
+    return energy_db, zcr
+
+
+def voiced_frames(energy_db: np.ndarray, zcr: np.ndarray) -> np.ndarray:
+    """Boolean speech flag per frame, unpadded."""
+    if not len(energy_db):
+        return np.zeros(0, dtype=bool)
+    noise_floor = np.percentile(energy_db, 10)
+    threshold = max(VAD_MIN_ENERGY_DB, noise_floor + VAD_ENERGY_MARGIN_DB)
+    return (energy_db > threshold) & (
+        (zcr < VAD_MAX_ZCR) | (energy_db > noise_floor + VAD_LOUD_DB_OVER_ZCR)
+    )
+
+
+def pad_mask(voiced: np.ndarray) -> np.ndarray:
+    """Dilate speech by VAD_PAD_MS on both sides (hangover), closing short gaps - one convolution, no Python loop."""
+    pad = VAD_PAD_MS // FRAME_MS
+    if pad and voiced.any():
+        return np.convolve(voiced.astype(np.int8), np.ones(2 * pad + 1, dtype=np.int8), mode="same") > 0
+    return voiced
+
+
+def speech_mask(energy_db: np.ndarray, zcr: np.ndarray) -> np.ndarray:
+    """Boolean speech flag per frame, with short gaps and edges padded by VAD_PAD_MS."""
+    return pad_mask(voiced_frames(energy_db, zcr))
+
+
+def speech_segments(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """[start, end) frame ranges where mask is True."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def trim_silence(pcm: np.ndarray, sample_rate: int = SAMPLE_RATE):
+    """
+    Returns (kept_pcm, segments_ms, speech_ms). Leading/trailing silence is
+    dropped and pauses longer than VAD_MAX_GAP_MS are cut to VAD_KEEP_GAP_MS.
+    speech_ms counts voiced frames only (not the padding around them).
+    kept_pcm is empty when the clip has no speech and is quiet; a loud clip
+    without detected speech comes back whole (fail open: let STT decide).
+    """
+    energy_db, zcr = frame_features(pcm, sample_rate)
+    voiced = voiced_frames(energy_db, zcr)
+    speech_ms = int(voiced.sum()) * FRAME_MS
+    if speech_ms < VAD_MIN_SPEECH_MS:
+        if not len(energy_db) or np.percentile(energy_db, 95) < VAD_QUIET_DB:
+            return pcm[:0], [], 0
+        return pcm, [(0, len(pcm) * 1000 // sample_rate)], speech_ms
+    segments = speech_segments(pad_mask(voiced))
+
+    frame_len = sample_rate * FRAME_MS // 1000
+    keep_gap = VAD_KEEP_GAP_MS // FRAME_MS
+    max_gap = VAD_MAX_GAP_MS // FRAME_MS
+    pieces = []
+    prev_end = None
+    for start, end in segments:
+        if prev_end is not None:
+            gap = start - prev_end
+            if gap > max_gap:
+                # keep a natural-sounding pause, split around the middle of the gap
+                half = keep_gap // 2
+                pieces.append(pcm[prev_end * frame_len:(prev_end + half) * frame_len])
+                pieces.append(pcm[(start - (keep_gap - half)) * frame_len:start * frame_len])
+            else:
+                pieces.append(pcm[prev_end * frame_len:start * frame_len])
+        pieces.append(pcm[start * frame_len:end * frame_len])
+        prev_end = end
+    segments_ms = [(s * FRAME_MS, e * FRAME_MS) for s, e in segments]
+    return np.concatenate(pieces), segments_ms, speech_ms
+
+
+# ---------- STT preprocessing ----------
+
+class SilenceTrimmer:
+    """
+    prepare_for_stt() + the bookkeeping for "how much did that save".
+    STT ms saved is estimated from removed audio seconds times the provider's
+    observed ms-per-audio-second (an EMA updated by record_stt()).
+    """
+
+    def __init__(self, min_saving_ms: int = VAD_MIN_SAVING_MS):
+        self.min_saving_ms = min_saving_ms
+        self.ms_per_audio_second = STT_MS_PER_AUDIO_SECOND
+        self.stats = {"turns": 0, "skipped": 0, "trimmed": 0, "undecoded": 0, "bytes_saved": 0, "stt_ms_saved": 0}
+
+    async def prepare_for_stt(self, audio_bytes: bytes) -> PreparedAudio:
+        try:
+            pcm = await decode_pcm16(audio_bytes)
+        except FFmpegError as e:
+            logger.warning("VAD skipped, sending the clip untrimmed: %s", e, extra={"sample": "vad.decode"})
+            pcm = None
+        if pcm is None or not len(pcm):
+            # ffmpeg couldn't decode it - let the provider decide, don't guess
+            self.stats["turns"] += 1
+            self.stats["undecoded"] += 1
+            return PreparedAudio(audio_bytes, True, len(audio_bytes), 0, 0, 0)
+        original_ms = len(pcm) * 1000 // SAMPLE_RATE
+
+        kept, segments, speech_ms = trim_silence(pcm)
+        kept_ms = len(kept) * 1000 // SAMPLE_RATE
+        prepared = PreparedAudio(audio_bytes, len(kept) > 0, len(audio_bytes), original_ms, kept_ms,
+                                 speech_ms, segments=segments)
+
+        # a clip uploaded while it was recorded is already at the provider: not worth a re-upload
+        uploaded = bool(getattr(audio_bytes, "uploads", None))
+        if prepared.has_speech and not uploaded and original_ms - kept_ms >= self.min_saving_ms:
+            try:
+                encoded = await encode_webm(kept)
+            except FFmpegError as e:
+                logger.warning("Re-encode failed, sending the clip untrimmed: %s", e, extra={"sample": "vad.encode"})
+                encoded = None
+            if encoded and len(encoded) < len(audio_bytes):
+                prepared.audio_bytes = AudioClip(encoded, kept)
+                prepared.trimmed = True
+        if not prepared.trimmed:
+            # STT backends that need PCM skip the decode, ones with an early upload just finish it
+            prepared.audio_bytes = AudioClip(audio_bytes, pcm, uploads=getattr(audio_bytes, "uploads", None),
+                                             speech_end=getattr(audio_bytes, "speech_end", None))
+            prepared.kept_ms = original_ms if prepared.has_speech else 0
+
+        self.stats["turns"] += 1
+        self.stats["skipped"] += not prepared.has_speech
+        self.stats["trimmed"] += prepared.trimmed
+        self.stats["bytes_saved"] += prepared.bytes_saved
+        self.stats["stt_ms_saved"] += self.stt_ms_saved(prepared)
+        return prepared
+
+    def stt_ms_saved(self, prepared: PreparedAudio) -> int:
+        """Estimated provider time avoided for this clip."""
+        removed_s = (prepared.original_ms - prepared.kept_ms) / 1000
+        return round(removed_s * self.ms_per_audio_second)
+
+    def record_stt(self, stt_ms: float, audio_seconds: float):
+        """Feed back a real turn's STT time so savings estimates track the provider."""
+        if stt_ms > 0 and audio_seconds > 0:
+            rate = stt_ms / audio_seconds
+            self.ms_per_audio_second += EMA_ALPHA * (rate - self.ms_per_audio_second)
+
+
+_trimmer: Optional[SilenceTrimmer] = None
+
+
+def get_trimmer() -> SilenceTrimmer:
+    global _trimmer
+    if _trimmer is None:
+        _trimmer = SilenceTrimmer()
+    return _trimmer
@@ -1,38 +1,350 @@
 # currently im conveting wav file from Downsampling from 48kHz → 16kHz
 #                                      🔊 Converting from stereo → mono
                                        # 💾 Saving in PCM 16-bit format
-# using: ffmpeg -i abc.wav -ar 16000 -ac 1 -c:a pcm_s16le fixed1.wav 
+# using: ffmpeg -i abc.wav -ar 16000 -ac 1 -c:a pcm_s16le fixed1.wav
+#
+# Local (offline) STT on faster-whisper.
+#   transcribe_audio()      - the original one-at-a-time helper, now without a temp WAV
+#   WhisperBatchEngine      - worker process pool that batches utterances from all
+#                             concurrent calls inside a short window; async API
+#   transcribe_audio_local  - async helper for the voice endpoint (STT_BACKENDS=whisper,...)
 import os
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 import onnxruntime  # ✅ Force import early so Silero VAD doesn't fail
 # print("onnxruntime:", onnxruntime.__version__)  # optional debug line
 
-import soundfile as sf
 import io
+import time
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import soundfile as sf
 import numpy as np
+import faster_whisper
 from faster_whisper import WhisperModel
-import tempfile
+from faster_whisper.vad import VadOptions, collect_chunks, get_speech_timestamps
 
-# Load model once
-model = WhisperModel("small", device="cpu", compute_type="int8")
-SAMPLE_RATE = 16000  # For saving output WAV
+from app.services.audio_io import decode_pcm16, to_float32
 
-def transcribe_audio(audio_bytes: bytes) -> str:
-    # Step 1: Read from real .wav (not raw PCM)
-    data, sr = sf.read(io.BytesIO(audio_bytes))  # No format=RAW here!
+SAMPLE_RATE = 16000  # faster-whisper wants 16 kHz mono float32
+
+WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "small")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE", "en")  # fixed language so a batch shares one prompt
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", "2"))
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))  # 0 = let CTranslate2 decide
+WHISPER_MAX_BATCH = int(os.getenv("WHISPER_MAX_BATCH", "8"))
+WHISPER_BATCH_WINDOW_MS = float(os.getenv("WHISPER_BATCH_WINDOW_MS", "30"))
+WHISPER_BEAM_SIZE = 2
+
+# Whisper's encoder always sees 30 s windows; longer utterances go through model.transcribe
+MAX_BATCHED_SECONDS = 30
+# Same Silero VAD settings on both paths, so an utterance transcribes the same batched or not
+VAD_MIN_SILENCE_MS = 500
+# ... and the same decoding: no timestamp tokens (the text is all we keep), same token suppression.
+# The batched path has no temperature fallback, so a clip where greedy/beam decoding
+# looks degenerate can still differ.
+DECODE_OPTIONS = dict(without_timestamps=True, suppress_blank=True, suppress_tokens=[-1])
+# The batched path calls faster-whisper internals (encode, get_prompt, model.generate,
+# collect_chunks' return type) - only on the version requirements.txt pins.
+BATCHING_SUPPORTED = faster_whisper.__version__.startswith("1.0.")
+
+_model: Optional[WhisperModel] = None
 
-    # Step 2: Convert stereo to mono if needed
-    if len(data.shape) == 2:
-        data = data.mean(axis=1)
 
-    # Step 3: Save to temp WAV file
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-        sf.write(f.name, data, SAMPLE_RATE)
-        segments, _ = model.transcribe(
-            f.name,
-            beam_size=2,
-            vad_filter=True,
-            vad_parameters=dict(min_silence_duration_ms=500)
+def get_model() -> WhisperModel:
+    """Load the model on first use (not at import time) and keep it."""
+    global _model
+    if _model is None:
+        _model = WhisperModel(
+            WHISPER_MODEL_SIZE, device="cpu", compute_type=WHISPER_COMPUTE_TYPE, cpu_threads=WHISPER_CPU_THREADS
         )
+    return _model
 
+
+def read_audio(audio_bytes: bytes) -> np.ndarray:
+    """WAV/FLAC/OGG bytes -> mono float32, all in memory."""
+    data, sr = sf.read(io.BytesIO(audio_bytes), dtype="float32")  # No format=RAW here!
+    # Convert stereo to mono if needed
+    if data.ndim == 2:
+        data = data.mean(axis=1)
+    return data
+
+
+def transcribe_audio(audio_bytes: bytes) -> str:
+    audio = read_audio(audio_bytes)
+    segments, _ = get_model().transcribe(
+        audio,
+        beam_size=WHISPER_BEAM_SIZE,
+        vad_filter=True,
+        vad_parameters=dict(min_silence_duration_ms=VAD_MIN_SILENCE_MS)
+    )
     return " ".join([seg.text for seg in segments])
+
+
+# ---------- Worker process side ----------
+
+def _init_worker(model_size: str, compute_type: str, cpu_threads: int):
+    # Runs once per worker process: each worker owns one model instance
+    global _model
+    _model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+
+
+def _transcribe_one(model: WhisperModel, audio: np.ndarray, beam_size: int, language: str) -> str:
+    segments, _ = model.transcribe(
+        audio,
+        beam_size=beam_size,
+        language=language,
+        vad_filter=True,
+        vad_parameters=dict(min_silence_duration_ms=VAD_MIN_SILENCE_MS),
+        **DECODE_OPTIONS,
+    )
+    return " ".join(seg.text for seg in segments).strip()
+
+
+def _speech_only(audio: np.ndarray) -> np.ndarray:
+    """What model.transcribe(vad_filter=True) keeps of an utterance: its speech, silence cut out."""
+    chunks = get_speech_timestamps(audio, VadOptions(min_silence_duration_ms=VAD_MIN_SILENCE_MS))
+    return collect_chunks(audio, chunks) if chunks else audio[:0]
+
+
+def _transcribe_batch(audios: List[np.ndarray], beam_size: int, language: str) -> List[str]:
+    """
+    Transcribe several utterances with one encoder pass and one generate() call.
+    Each utterance goes through the same VAD as _transcribe_one (leading and
+    trailing silence is where Whisper hallucinates), then its speech (< 30 s)
+    is padded to Whisper's 30 s window, so they stack into a single batch the
+    way faster-whisper's own batched pipeline does.
+    """
+    from faster_whisper.tokenizer import Tokenizer
+
+    model = get_model()
+    if len(audios) == 1 or not BATCHING_SUPPORTED:
+        return [_transcribe_one(model, a, beam_size, language) for a in audios]
+
+    speech = [_speech_only(a) for a in audios]
+    if any(len(s) > MAX_BATCHED_SECONDS * SAMPLE_RATE for s in speech):
+        return [_transcribe_one(model, a, beam_size, language) for a in audios]
+    texts = [""] * len(audios)  # no speech: "", as from _transcribe_one
+    batch = [i for i, s in enumerate(speech) if len(s)]
+    if not batch:
+        return texts
+
+    n_frames = model.feature_extractor.nb_max_frames
+    features = []
+    for audio in (speech[i] for i in batch):
+        feat = model.feature_extractor(audio)[:, :n_frames]
+        if feat.shape[-1] < n_frames:
+            feat = np.pad(feat, ((0, 0), (0, n_frames - feat.shape[-1])))
+        features.append(feat)
+    encoder_output = model.encode(np.stack(features).astype(np.float32))
+
+    tokenizer = Tokenizer(model.hf_tokenizer, model.model.is_multilingual, task="transcribe", language=language)
+    prompt = model.get_prompt(tokenizer, [], without_timestamps=DECODE_OPTIONS["without_timestamps"])
+    results = model.model.generate(
+        encoder_output,
+        [prompt] * len(batch),
+        beam_size=beam_size,
+        max_length=model.max_length,
+        suppress_blank=DECODE_OPTIONS["suppress_blank"],
+        suppress_tokens=DECODE_OPTIONS["suppress_tokens"],
+    )
+    for i, r in zip(batch, results):
+        texts[i] = tokenizer.decode([t for t in r.sequences_ids[0] if t < tokenizer.eot]).strip()
+    return texts
+
+
+# ---------- Async batching engine ----------
+
+class EngineClosed(Exception):
+    """The engine was closed while an utterance was still waiting for a batch."""
+
+
+class WhisperBatchEngine:
+    """
+    Offline STT shared by every call in this worker.
+
+    transcribe() queues an utterance (float32, 16 kHz mono) and awaits its text.
+    A collector task waits up to batch_window_ms for more utterances (up to
+    max_batch) and hands the batch to a free worker process. While every worker
+    is busy, new utterances keep piling into the next batch, so batches grow
+    with load instead of requests queueing one by one.
+    """
+
+    def __init__(
+        self,
+        workers: int = WHISPER_WORKERS,
+        max_batch: int = WHISPER_MAX_BATCH,
+        batch_window_ms: float = WHISPER_BATCH_WINDOW_MS,
+        model_size: str = WHISPER_MODEL_SIZE,
+        compute_type: str = WHISPER_COMPUTE_TYPE,
+        cpu_threads: int = WHISPER_CPU_THREADS,
+        language: str = WHISPER_LANGUAGE,
+        beam_size: int = WHISPER_BEAM_SIZE,
+    ):
+        self.workers = workers
+        self.max_batch = max_batch
+        self.batch_window = batch_window_ms / 1000
+        self.language = language
+        self.beam_size = beam_size
+        self._model_args = (model_size, compute_type, cpu_threads)
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._free_workers: Optional[asyncio.Semaphore] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._batches = set()
+
+        self.stats = {"utterances": 0, "batches": 0, "audio_seconds": 0.0, "busy_seconds": 0.0}
+
+    # ---------- Public API ----------
+
+    async def start(self):
+        if self._pool is not None:
+            return
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=self._model_args
+        )
+        self._queue = asyncio.Queue()
+        self._free_workers = asyncio.Semaphore(self.workers)
+        self._collector = asyncio.ensure_future(self._collect())
+
+    async def transcribe(self, audio: np.ndarray) -> dict:
+        """
+        Transcribe one utterance. Returns {"text", "processing_time",
+        "queue_time", "audio_duration", "batch_size"} (times in ms).
+        """
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((np.asarray(audio, dtype=np.float32), time.time(), future))
+        return await future
+
+    async def close(self):
+        if self._collector:
+            self._collector.cancel()
+            await asyncio.gather(self._collector, return_exceptions=True)
+        if self._queue:
+            # never batched: nobody is going to answer them now
+            _fail(self._drain(), EngineClosed("whisper engine closed"))
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = self._collector = None
+
+    # ---------- Internals ----------
+
+    def _drain(self) -> list:
+        items = []
+        while not self._queue.empty():
+            items.append(self._queue.get_nowait())
+        return items
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = loop.time() + self.batch_window
+                while len(batch) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                await self._free_workers.acquire()
+                # anything that arrived while we waited for a worker rides along
+                while len(batch) < self.max_batch and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+
+                task = asyncio.ensure_future(self._run_batch(batch))
+                batch = []
+                self._batches.add(task)
+                task.add_done_callback(self._batches.discard)
+        finally:
+            _fail(batch, EngineClosed("whisper engine closed"))  # collected, never handed to a worker
+
+    async def _run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        audios = [audio for audio, _, _ in batch]
+        started = time.time()
+        try:
+            texts = await loop.run_in_executor(
+                self._pool, _transcribe_batch, audios, self.beam_size, self.language
+            )
+        except Exception as e:
+            _fail(batch, e)
+            return
+        finally:
+            self._free_workers.release()
+
+        finished = time.time()
+        self.stats["batches"] += 1
+        self.stats["utterances"] += len(batch)
+        self.stats["busy_seconds"] += finished - started
+        for (audio, queued_at, future), text in zip(batch, texts):
+            self.stats["audio_seconds"] += len(audio) / SAMPLE_RATE
+            if not future.done():
+                future.set_result({
+                    "text": text,
+                    "processing_time": (finished - started) * 1000,
+                    "queue_time": (started - queued_at) * 1000,
+                    "audio_duration": len(audio) / SAMPLE_RATE,
+                    "batch_size": len(batch),
+                })
+
+
+def _fail(batch, error: Exception):
+    for _, _, future in batch:
+        if not future.done():
+            future.set_exception(error)
+
+
+# ---------- Voice endpoint helpers ----------
+
+_engine: Optional[WhisperBatchEngine] = None
+
+
+def get_whisper_engine() -> WhisperBatchEngine:
+    global _engine
+    if _engine is None:
+        _engine = WhisperBatchEngine()
+    return _engine
+
+
+async def close_whisper_engine():
+    global _engine
+    if _engine is not None:
+        await _engine.close()
+        _engine = None
+
+
+async def decode_to_float32(audio_bytes: bytes) -> np.ndarray:
+    """Browser audio (WebM/Opus) -> 16 kHz mono float32, through audio_io: no decode if VAD already did one."""
+    return to_float32(await decode_pcm16(audio_bytes, SAMPLE_RATE))
+
+
+async def transcribe_audio_local(audio_bytes: bytes) -> dict:
+    """Same result keys as transcribe_audio_async, served by the local batching engine."""
+    start = time.time()
+    try:
+        audio = await decode_to_float32(audio_bytes)
+        result = await get_whisper_engine().transcribe(audio)
+    except Exception as e:
+        return {"text": f"[ERROR] Local STT failed: {e}", "upload_time": 0, "processing_time": 0,
+                "total_time": 0, "audio_duration": 0, "efficiency_ratio": 0}
+
+    total_time = (time.time() - start) * 1000
+    return {
+        "text": result["text"],
+        "upload_time": result["queue_time"],  # no upload: time spent waiting for a batch slot
+        "processing_time": result["processing_time"],
+        "total_time": total_time,
+        "audio_duration": result["audio_duration"],
+        "efficiency_ratio": result["audio_duration"] / (total_time / 1000) if total_time else 0,
+    }
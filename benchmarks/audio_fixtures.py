@@ -0,0 +1,52 @@
+# Synthetic test audio for the benchmarks: tone bursts stand in for speech,
+# zeros for silence. Encoding to WebM/Opus needs ffmpeg on PATH (same as
+# the streaming STT service).
+import math
+import subprocess
+from array import array
+from typing import List, Tuple
+
+
+def synth_pcm(pattern: List[Tuple[str, float]], sample_rate: int = 16000, amplitude: int = 6000) -> bytes:
+    """
+    Build mono s16le PCM from a pattern like [("silence", 0.5), ("speech", 1.2), ...].
+    "speech" is a warbling tone loud enough to trip an energy detector.
+    """
+    samples = array("h")
+    t = 0
+    for kind, seconds in pattern:
+        n = int(seconds * sample_rate)
+        if kind == "speech":
+            for i in range(n):
+                x = (t + i) / sample_rate
+                freq = 180 + 60 * math.sin(2 * math.pi * 3 * x)  # pitch wobble, a bit voice-like
+                samples.append(int(amplitude * math.sin(2 * math.pi * freq * x)))
+        else:
+            samples.extend([0] * n)
+        t += n
+    return samples.tobytes()
+
+
+def encode_webm(pcm: bytes, sample_rate: int = 16000) -> bytes:
+    """Encode mono s16le PCM to WebM/Opus, like the browser's MediaRecorder would."""
+    proc = subprocess.run(
+        [
+            "ffmpeg", "-loglevel", "quiet",
+            "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+            "-c:a", "libopus", "-b:a", "32k", "-f", "webm", "pipe:1",
+        ],
+        input=pcm, stdout=subprocess.PIPE, check=True,
+    )
+    return proc.stdout
+
+
+def pattern_duration(pattern: List[Tuple[str, float]]) -> float:
+    return sum(seconds for _, seconds in pattern)
+
+
+# A short call: three customer utterances separated by pauses
+CALL_PATTERN = [
+    ("silence", 0.4), ("speech", 1.2), ("silence", 1.0),
+    ("speech", 2.0), ("silence", 1.0),
+    ("speech", 1.6), ("silence", 1.0),
+]
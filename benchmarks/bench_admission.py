@@ -0,0 +1,163 @@
+"""
+Overload: turn latency with and without admission control + provider limits.
+
+--callers callers keep dialling one worker for --seconds: each call is
+--turns turns of --think-ms thinking, --stt-ms of STT, --cpu-ms of our own
+work on the event loop (busy loop: VAD, prompt, filters) and a real
+stream_reply() against MockLLM (Gemini, which allows --llm-capacity streams
+at once and answers 429 beyond that) and an in-process ElevenLabs socket.
+A caller that is turned away or whose call fails dials again after 1s.
+
+  open      no admission control, no provider limits, no retries - every
+            caller is let in (how the server behaved before)
+  limited   at most --max-calls calls, --queue-size more waiting in line
+            (--queue-timeout-s), a Gemini limiter of --llm-capacity streams
+            with 429 retries inside a --budget-ms turn budget
+
+Turn latency is end of the customer's speech -> end of Sarah's reply, for
+turns that got a reply. Failed = a turn that got an error instead.
+
+Usage:
+    python -m benchmarks.bench_admission --callers 400 --max-calls 120 --seconds 20
+"""
+import time
+import random
+import asyncio
+import argparse
+
+from app.services import provider_limits, tts_service, tts_cache
+from app.services.admission import AdmissionController, AdmissionRejected
+from app.services.provider_limits import ProviderLimiter, Throttled, start_turn_budget
+from app.services.tts_service import TTSConnectionManager, TTSStream
+from app.services.turn_pipeline import stream_reply
+from benchmarks.microbench import FakeElevenLabsSocket
+from benchmarks.mock_services import MockLLM, MockRateLimited
+
+PROMPT = "You are Sarah... Customer just said: the grip is really comfortable and my wrist doesn't hurt anymore."
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def busy(ms: float):
+    end = time.perf_counter() + ms / 1000
+    while time.perf_counter() < end:
+        pass
+
+
+class InProcessTTSManager(TTSConnectionManager):
+    async def _open(self, key, background=False):
+        self.counters["opened"] += 1
+        return TTSStream(FakeElevenLabsSocket(), key)
+
+
+async def noop_send(chunk: bytes):
+    pass
+
+
+async def call(args, rng, llm, admission, results):
+    """One call: admission, then --turns turns. Returns False if it was turned away or failed."""
+    if admission is not None:
+        try:
+            results["queue_wait_ms"].append(await admission.acquire())
+        except AdmissionRejected as e:
+            results[f"rejected_{e.reason}"] += 1
+            return False
+    results["calls"] += 1
+    try:
+        for _ in range(args.turns):
+            await asyncio.sleep(args.think_ms / 1000 * rng.uniform(0.5, 1.5))
+            start = time.perf_counter()
+            start_turn_budget(args.budget_ms)
+            await asyncio.sleep(args.stt_ms / 1000 * rng.uniform(0.7, 1.3))
+            busy(args.cpu_ms)
+            try:
+                await stream_reply(llm, PROMPT, noop_send)
+            except (Throttled, MockRateLimited):
+                results["failed_turns"] += 1
+                continue
+            results["turn_ms"].append((time.perf_counter() - start) * 1000)
+        return True
+    finally:
+        if admission is not None:
+            admission.release()
+
+
+async def run(mode: str, args) -> dict:
+    limited = mode == "limited"
+    tts_service._manager = InProcessTTSManager(api_key="fake", warm_per_voice=0)
+    tts_cache._cache = tts_cache.TTSCache(manager=tts_service._manager, cache_dir=None)
+    provider_limits._limiters.clear()
+    if limited:
+        provider_limits._limiters["gemini"] = ProviderLimiter("gemini", args.llm_capacity, retry_base_ms=100)
+    else:
+        provider_limits._limiters["gemini"] = ProviderLimiter("gemini", retry_attempts=0)
+    admission = AdmissionController(args.max_calls, args.queue_size, args.queue_timeout_s) if limited else None
+    llm = MockLLM(base_ms=args.llm_ms, token_ms=10, jitter_ms=args.llm_ms / 4, max_concurrent=args.llm_capacity)
+    results = {"calls": 0, "turn_ms": [], "failed_turns": 0, "queue_wait_ms": [],
+               "rejected_busy": 0, "rejected_timeout": 0}
+    loop_lag = []
+    deadline = time.perf_counter() + args.seconds
+
+    async def caller(index: int):
+        rng = random.Random(index)
+        await asyncio.sleep(rng.uniform(0, args.ramp_s))
+        while time.perf_counter() < deadline:
+            if not await call(args, rng, llm, admission, results):
+                await asyncio.sleep(1.0)
+
+    async def monitor():
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.05)
+            loop_lag.append((time.perf_counter() - t0 - 0.05) * 1000)
+
+    tasks = [asyncio.ensure_future(caller(i)) for i in range(args.callers)]
+    await monitor()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await tts_service._manager.close()
+    results["gemini"] = provider_limits._limiters["gemini"].stats()
+    results["loop_lag_p99"] = percentile(loop_lag, 0.99)
+    return results
+
+
+def report(mode: str, r: dict, seconds: float):
+    turns = r["turn_ms"]
+    print(f"{mode:>8} | {len(turns) / seconds:>7.1f} | {percentile(turns, 0.5):>7.0f} | {percentile(turns, 0.95):>7.0f} | "
+          f"{percentile(turns, 0.99):>7.0f} | {r['failed_turns']:>6} | {r['calls']:>6} | "
+          f"{r['rejected_busy'] + r['rejected_timeout']:>7} | {percentile(r['queue_wait_ms'], 0.95):>9.0f} | "
+          f"{r['gemini']['retries']:>7} | {r['loop_lag_p99']:>7.1f}")
+
+
+async def main(args):
+    print(f"{args.callers} callers, {args.turns} turns per call, Gemini allows {args.llm_capacity} streams, "
+          f"{args.cpu_ms:.1f} ms CPU per turn, {args.seconds:.0f}s per mode")
+    print(f"{'mode':>8} | {'turns/s':>7} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7} | {'failed':>6} | "
+          f"{'calls':>6} | {'refused':>7} | {'wait p95':>9} | {'retries':>7} | {'lag p99':>7}")
+    for mode in args.modes:
+        random.seed(0)
+        report(mode, await run(mode, args), args.seconds)
+    print("(failed = turns answered with an error; refused = calls turned away, busy or queue timeout)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=["open", "limited"], default=["open", "limited"])
+    parser.add_argument("--callers", type=int, default=400)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--ramp-s", type=float, default=2)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--think-ms", type=float, default=1500)
+    parser.add_argument("--stt-ms", type=float, default=300)
+    parser.add_argument("--cpu-ms", type=float, default=4)
+    parser.add_argument("--llm-ms", type=float, default=300)
+    parser.add_argument("--llm-capacity", type=int, default=40, help="Gemini streams allowed at once")
+    parser.add_argument("--max-calls", type=int, default=120)
+    parser.add_argument("--queue-size", type=int, default=100)
+    parser.add_argument("--queue-timeout-s", type=float, default=10)
+    parser.add_argument("--budget-ms", type=float, default=3000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,156 @@
+"""
+Per-utterance audio overhead in the STT paths: temp files + repeated ffmpeg vs audio_io.
+
+For --utterances clips of --seconds of browser-style WebM/Opus, measures the
+work done around the STT provider call (not the call itself):
+
+  upload   simple_stt_service: write a NamedTemporaryFile, reopen it for the
+           upload, delete it  vs  upload the bytes we hold
+  wav      stt2_service: WebM to a temp file, ffmpeg to a temp WAV, a second
+           ffmpeg (os.system) and ffprobe for the duration, read, delete
+           vs  one ffmpeg over pipes, WAV header in memory, duration from samples
+  whisper  batch turn with STT_BACKENDS=whisper: VAD decodes the clip, then
+           whisper_service decodes it again  vs  whisper reuses VAD's samples
+
+Reports ms per utterance, decoder/encoder processes per utterance and bytes
+written to disk per utterance. "wav" and "whisper" need ffmpeg (and ffprobe)
+on PATH and are skipped without it.
+
+Usage:
+    python -m benchmarks.bench_audio_io --utterances 50 --seconds 3
+"""
+import os
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+from app.services import audio_io
+from app.services.audio_io import AudioClip, decode_pcm16, decode_pcm16_sync, duration_s, to_float32, to_wav
+from benchmarks.audio_fixtures import synth_pcm, encode_webm
+
+
+# ---------- before: the code paths this replaced ----------
+
+def upload_via_tempfile(audio_bytes: bytes) -> int:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as temp_file:
+        temp_file.write(audio_bytes)
+        temp_path = temp_file.name
+    try:
+        with open(temp_path, "rb") as audio_file:
+            audio_file.read()  # what requests does with the file object
+    finally:
+        os.remove(temp_path)
+    return len(audio_bytes)
+
+
+def wav_via_tempfiles(audio_bytes: bytes) -> int:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as temp_webm:
+        temp_webm.write(audio_bytes)
+        temp_webm_path = temp_webm.name
+    wav_path = temp_webm_path.replace(".webm", ".wav")
+    subprocess.run(["ffmpeg", "-i", temp_webm_path, "-ar", "16000", "-ac", "1", "-c:a", "pcm_s16le", wav_path, "-y"],
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.remove(temp_webm_path)
+    os.system(f'ffmpeg -i "{wav_path}" > /dev/null 2>&1')
+    subprocess.check_output(["ffprobe", "-i", wav_path, "-show_entries", "format=duration",
+                             "-v", "quiet", "-of", "csv=p=0"])
+    written = os.path.getsize(wav_path)
+    with open(wav_path, "rb") as f:
+        f.read()
+    os.remove(wav_path)
+    return len(audio_bytes) + written
+
+
+async def decode_f32_pipe(audio_bytes: bytes) -> np.ndarray:
+    """whisper_service's old decode_to_float32: its own ffmpeg, whatever VAD did."""
+    proc = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-loglevel", "quiet", "-i", "pipe:0", "-f", "f32le", "-ac", "1", "-ar", "16000", "pipe:1",
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+    )
+    pcm, _ = await proc.communicate(audio_bytes)
+    return np.frombuffer(pcm, dtype=np.float32)
+
+
+# ---------- cases ----------
+
+def timed(fn, clips):
+    start = time.perf_counter()
+    written = sum(fn(clip) or 0 for clip in clips)
+    return (time.perf_counter() - start) * 1000 / len(clips), written / len(clips)
+
+
+async def timed_async(fn, clips):
+    start = time.perf_counter()
+    for clip in clips:
+        await fn(clip)
+    return (time.perf_counter() - start) * 1000 / len(clips), 0
+
+
+def processes(before: dict) -> float:
+    return (audio_io.stats["decodes"] + audio_io.stats["encodes"]) - (before["decodes"] + before["encodes"])
+
+
+def wav_in_memory(audio_bytes: bytes):
+    """stt2_service.convert_webm_to_wav now (without importing requests)."""
+    pcm = decode_pcm16_sync(audio_bytes)
+    duration_s(pcm)
+    to_wav(pcm)
+
+
+async def whisper_before(clip: bytes):
+    await decode_pcm16(clip)       # VAD
+    await decode_f32_pipe(clip)    # whisper_service, again
+
+
+async def whisper_after(clip: bytes):
+    pcm = await decode_pcm16(clip)                   # VAD
+    await decode_pcm16(AudioClip(clip, pcm))         # whisper_service: reuses the samples
+    to_float32(pcm)
+
+
+def row(case, variant, ms, procs, written):
+    print(f"{case:>8} | {variant:>6} | {ms:>8.2f} | {procs:>9.1f} | {written / 1024:>9.1f}")
+
+
+async def main(args):
+    pcm = synth_pcm([("silence", 0.3), ("speech", args.seconds), ("silence", 0.3)])
+    have_ffmpeg = bool(shutil.which("ffmpeg") and shutil.which("ffprobe"))
+    clip = encode_webm(pcm) if have_ffmpeg else pcm[: int(len(pcm) * 0.125)]  # roughly Opus-sized stand-in
+    clips = [bytes(clip) for _ in range(args.utterances)]
+    print(f"{args.utterances} utterances of {args.seconds:.1f}s speech, {len(clip) / 1024:.1f} KB each")
+    print(f"{'case':>8} | {'path':>6} | {'ms/utt':>8} | {'processes':>9} | {'disk KB':>9}")
+
+    ms, written = timed(upload_via_tempfile, clips)
+    row("upload", "before", ms, 0, written)
+    ms, _ = timed(lambda c: None, clips)
+    row("upload", "after", ms, 0, 0)
+
+    if not have_ffmpeg:
+        print("(ffmpeg/ffprobe not on PATH: skipping the wav and whisper cases)")
+        return
+
+    ms, written = timed(wav_via_tempfiles, clips)
+    row("wav", "before", ms, 3, written)
+    before = dict(audio_io.stats)
+    ms, _ = timed(wav_in_memory, clips)
+    row("wav", "after", ms, processes(before) / len(clips), 0)
+
+    before = dict(audio_io.stats)
+    ms, _ = await timed_async(whisper_before, clips)
+    row("whisper", "before", ms, processes(before) / len(clips) + 1, 0)
+    before = dict(audio_io.stats)
+    ms, _ = await timed_async(whisper_after, clips)
+    row("whisper", "after", ms, processes(before) / len(clips), 0)
+    print("(processes = ffmpeg/ffprobe runs per utterance; disk KB = bytes written to temp files per utterance)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--utterances", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=3)
+    asyncio.run(main(parser.parse_args()))
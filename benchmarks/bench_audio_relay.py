@@ -0,0 +1,176 @@
+"""
+ElevenLabs -> browser audio relay: per-packet relay vs the fast path.
+
+1. CPU per second of audio (no network). For each output format, N seconds
+   of speech arrive as small packets (--packet-ms each, with alignment data
+   like the real API):
+     before   json.loads + base64.b64decode + one send per packet
+     after    parse_audio_message (regex + binascii) + AudioCoalescer frames
+   Reports frames sent, bytes on the wire (payload + WebSocket frame headers)
+   and CPU ms per second of audio.
+
+2. Load test: --relays simultaneous relays, each streaming from the local
+   ElevenLabs stand-in through TTSConnectionManager to a WebSocket client,
+   per-packet vs coalesce().
+
+Usage:
+    python -m benchmarks.bench_audio_relay --seconds 60 --relays 100
+"""
+import json
+import time
+import base64
+import asyncio
+import argparse
+
+import aiohttp
+from aiohttp import web
+
+from app.services.tts_service import TTSConnectionManager, parse_audio_message, bytes_per_second, OUTPUT_FORMAT
+from app.services.audio_relay import AudioCoalescer, coalesce, frame_bytes_for
+from benchmarks.mock_services import create_elevenlabs_app, start_app
+
+FORMATS = ["mp3_44100_128", "mp3_22050_32", "opus_48000_32", "pcm_16000"]
+REPLY = "Oh that's wonderful to hear!... What do you love most about the set?"
+
+
+def ws_header_bytes(payload: int) -> int:
+    # server -> client frames are unmasked: 2-byte header, +2 or +8 for extended length
+    return 2 if payload < 126 else 4 if payload < 65536 else 10
+
+
+def make_packets(output_format: str, seconds: float, packet_ms: float) -> list:
+    size = int(bytes_per_second(output_format) * packet_ms / 1000)
+    n_chars = max(1, int(packet_ms / 70))
+    packets = []
+    for i in range(int(seconds * 1000 / packet_ms)):
+        packets.append(json.dumps({
+            "audio": base64.b64encode(bytes((i + j) % 256 for j in range(size))).decode(),
+            "isFinal": None,
+            "normalizedAlignment": {
+                "chars": list("pickleball"[:n_chars].ljust(n_chars)),
+                "charStartTimesMs": [k * 70 for k in range(n_chars)],
+                "charDurationsMs": [70] * n_chars,
+            },
+        }))
+    packets.append(json.dumps({"audio": None, "isFinal": True}))
+    return packets
+
+
+def relay_before(packets: list) -> list:
+    frames = []
+    for raw in packets:
+        data = json.loads(raw)
+        if data.get("audio"):
+            frames.append(base64.b64decode(data["audio"]))
+        if data.get("isFinal"):
+            break
+    return frames
+
+
+def relay_after(packets: list, output_format: str) -> list:
+    frames = []
+    coalescer = AudioCoalescer(frame_bytes_for(output_format))
+    for raw in packets:
+        audio, is_final, _ = parse_audio_message(raw)
+        if audio:
+            frame = coalescer.add(audio)
+            if frame:
+                frames.append(frame)
+        if is_final:
+            break
+    frame = coalescer.flush()
+    if frame:
+        frames.append(frame)
+    return frames
+
+
+def cpu_ms(fn, repeat: int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.process_time()
+        result = fn()
+        best = min(best, time.process_time() - t0)
+    return best * 1000, result
+
+
+def wire_bytes(frames: list) -> int:
+    return sum(len(f) + ws_header_bytes(len(f)) for f in frames)
+
+
+def cpu_benchmark(args):
+    print(f"1) relay CPU: {args.seconds:.0f}s of speech in {args.packet_ms:.0f} ms packets")
+    print(f"{'format':>14} | {'path':>6} | {'frames':>6} | {'wire KB':>8} | {'CPU ms/audio s':>14}")
+    for fmt in FORMATS:
+        packets = make_packets(fmt, args.seconds, args.packet_ms)
+        for name, fn in (("before", lambda: relay_before(packets)), ("after", lambda: relay_after(packets, fmt))):
+            ms, frames = cpu_ms(fn)
+            print(f"{fmt:>14} | {name:>6} | {len(frames):>6} | {wire_bytes(frames) / 1024:>8.1f} | "
+                  f"{ms / args.seconds:>14.3f}")
+
+
+async def load_test(args):
+    el_runner, el_url = await start_app(create_elevenlabs_app(
+        handshake_ms=20, first_audio_ms=50, chunks_per_flush=args.packets_per_reply,
+        chunk_interval_ms=args.packet_ms / 4, packet_ms=args.packet_ms, alignment=True,
+    ))
+    manager = TTSConnectionManager(api_key="mock", base_url=el_url.replace("http://", "ws://"),
+                                   warm_per_voice=args.relays)
+    await manager.prewarm(output_format=OUTPUT_FORMAT)
+    audio_seconds = args.relays * args.packets_per_reply * args.packet_ms / 1000
+
+    # the relay side, like agent_voice: TTS audio -> ws.send_bytes to the browser
+    async def relay_handler(request: web.Request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        chunks = manager.stream_text(REPLY, output_format=OUTPUT_FORMAT)
+        if request.query.get("coalesce") == "1":
+            chunks = coalesce(chunks, OUTPUT_FORMAT)
+        async for frame in chunks:
+            await ws.send_bytes(frame)
+        await ws.close()
+        return ws
+
+    relay_app = web.Application()
+    relay_app.router.add_get("/relay", relay_handler)
+    relay_runner, relay_url = await start_app(relay_app)
+
+    async def run(coalesced: bool):
+        received = {"frames": 0, "wire": 0}
+
+        async def browser(session):
+            async with session.ws_connect(f"{relay_url}/relay?coalesce={int(coalesced)}") as ws:
+                async for msg in ws:
+                    if msg.type is aiohttp.WSMsgType.BINARY:
+                        received["frames"] += 1
+                        received["wire"] += len(msg.data) + ws_header_bytes(len(msg.data))
+
+        await asyncio.sleep(1.0)  # let the TTS pool refill between runs
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+            t0, c0 = time.perf_counter(), time.process_time()
+            await asyncio.gather(*(browser(session) for _ in range(args.relays)))
+            return time.perf_counter() - t0, time.process_time() - c0, received
+
+    print(f"\n2) load test: {args.relays} simultaneous relays to WebSocket clients, {OUTPUT_FORMAT}, "
+          f"{args.packets_per_reply} x {args.packet_ms:.0f} ms packets each")
+    print("   (CPU includes the mock ElevenLabs server and the clients, all in this process)")
+    print(f"{'path':>10} | {'wall s':>6} | {'CPU ms/audio s':>14} | {'frames':>7} | {'wire KB':>8}")
+    try:
+        for name, coalesced in (("per-packet", False), ("coalesced", True)):
+            wall, cpu, received = await run(coalesced)
+            print(f"{name:>10} | {wall:>6.2f} | {cpu * 1000 / audio_seconds:>14.3f} | "
+                  f"{received['frames']:>7} | {received['wire'] / 1024:>8.1f}")
+    finally:
+        await manager.close()
+        await relay_runner.cleanup()
+        await el_runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--packet-ms", type=float, default=40)
+    parser.add_argument("--relays", type=int, default=100)
+    parser.add_argument("--packets-per-reply", type=int, default=50)
+    args = parser.parse_args()
+    cpu_benchmark(args)
+    asyncio.run(load_test(args))
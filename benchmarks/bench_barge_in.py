@@ -0,0 +1,104 @@
+"""
+Barge-in: what stopping a reply early saves, and how fast it stops.
+
+Each call streams one reply through stream_reply() - MockLLM tokens into the
+local ElevenLabs stand-in, audio relayed to a counting sink - and the customer
+talks over it --interrupt-ms after the reply starts. Compared with letting
+the reply play out (the old behaviour: the browser just kept playing):
+
+  cancel ms      interrupt -> stream_reply() returned (LLM call and TTS stream stopped)
+  audio KB       audio relayed to the caller for the reply
+  TTS packets    audio packets ElevenLabs produced for the reply
+  LLM cancelled  LLM streams cut short
+  history        characters of the reply that went into the conversation history
+
+Usage:
+    python -m benchmarks.bench_barge_in --calls 50 --interrupt-ms 2000
+"""
+import time
+import asyncio
+import argparse
+import statistics
+
+from app.services import barge_in as barge_in_module
+from app.services.barge_in import BargeIn
+from app.services.tts_service import TTSConnectionManager, OUTPUT_FORMAT
+from app.services.tts_cache import TTSCache
+from app.services.turn_pipeline import stream_reply
+from benchmarks.mock_services import MockLLM, create_elevenlabs_app, start_app
+
+LONG_REPLY = ("Oh that's wonderful to hear! It sounds like the set has become part of your weekends. "
+              "A lot of families tell us the same thing about the paddles. "
+              "What do you love most about it, the grip or how light the paddles feel?")
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run_call(manager, cache, llm, interrupt_ms):
+    sink = {"bytes": 0}
+
+    async def send_audio(chunk: bytes):
+        sink["bytes"] += len(chunk)
+
+    barge_in = BargeIn() if interrupt_ms else None
+    if barge_in:
+        def interrupt():
+            interrupted_at[0] = time.perf_counter()
+            barge_in.interrupt("client")
+        interrupted_at = [None]
+        asyncio.get_running_loop().call_later(interrupt_ms / 1000, interrupt)
+
+    reply = await stream_reply(llm, "PROMPT", send_audio, tts_manager=manager, tts_cache=cache,
+                               output_format=OUTPUT_FORMAT, barge_in=barge_in)
+    done_at = time.perf_counter()
+    cancel_ms = (done_at - interrupted_at[0]) * 1000 if barge_in and reply["interrupted"] else None
+    return reply, sink["bytes"], cancel_ms
+
+
+async def main(args):
+    el_app = create_elevenlabs_app(handshake_ms=20, first_audio_ms=80, chunks_per_flush=args.packets_per_sentence,
+                                   chunk_interval_ms=args.packet_ms, packet_ms=args.packet_ms)
+    el_runner, el_url = await start_app(el_app)
+    manager = TTSConnectionManager(api_key="mock", base_url=el_url.replace("http://", "ws://"),
+                                   warm_per_voice=args.calls)
+    cache = TTSCache(manager=manager)
+    await manager.prewarm(output_format=OUTPUT_FORMAT)
+
+    print(f"{args.calls} calls, reply of {len(LONG_REPLY)} chars in 3 sentences; ElevenLabs stand-in sends "
+          f"{args.packets_per_sentence} x {args.packet_ms:.0f} ms packets per sentence in real time; "
+          f"interrupt at {args.interrupt_ms:.0f} ms")
+    print(f"{'mode':>10} | {'cancel ms p50/p95/max':>21} | {'audio KB':>8} | {'TTS packets':>11} | "
+          f"{'LLM cancelled':>13} | {'history chars':>13}")
+    try:
+        for interrupt_ms in (0, args.interrupt_ms):
+            await asyncio.sleep(1.0)  # let the TTS pool refill between runs
+            llm = MockLLM(base_ms=args.llm_ms, token_ms=args.token_ms, replies=[LONG_REPLY])
+            packets_before = el_app["stats"]["audio_packets"]
+            results = await asyncio.gather(*(run_call(manager, cache, llm, interrupt_ms) for _ in range(args.calls)))
+            await asyncio.sleep(0.5)  # packets the stand-in was still sending after the cancel
+            packets = (el_app["stats"]["audio_packets"] - packets_before) / args.calls
+            audio_kb = statistics.mean(b for _, b, _ in results) / 1024
+            history = statistics.mean(len(r["agent_reply"]) for r, _, _ in results)
+            cancels = [c for _, _, c in results if c is not None]
+            cancel = (f"{percentile(cancels, 0.5):.0f} / {percentile(cancels, 0.95):.0f} / {max(cancels):.0f}"
+                      if cancels else "-")
+            print(f"{'barge-in' if interrupt_ms else 'play out':>10} | {cancel:>21} | {audio_kb:>8.1f} | "
+                  f"{packets:>11.1f} | {llm.stats['cancelled']:>13} | {history:>13.0f}")
+        print(f"barge-in stats: {barge_in_module.barge_in_stats()}")
+    finally:
+        await manager.close()
+        await el_runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--interrupt-ms", type=float, default=2000, help="reply start -> customer talks over it")
+    parser.add_argument("--llm-ms", type=float, default=300, help="MockLLM time to first token")
+    parser.add_argument("--token-ms", type=float, default=60, help="MockLLM time per word")
+    parser.add_argument("--packet-ms", type=float, default=100)
+    parser.add_argument("--packets-per-sentence", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
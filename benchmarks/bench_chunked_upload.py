@@ -0,0 +1,166 @@
+"""
+Batch-mode STT latency: one blob after the customer stops vs chunked utterances.
+
+--calls callers each say --turns utterances of --speech-s seconds (WebM/Opus
+at --bitrate-kbps), with a pause between turns. Their audio reaches the server
+over a --caller-kbps uplink, and the server reaches the AssemblyAI stand-in at
+--provider-kbps (it also spends --upload-ms on every upload once the body is in,
+and --processing-ms transcribing).
+
+  blob      the recording is sent as one message when the customer stops;
+            the server then uploads all of it (how batch mode worked before)
+  chunked   --timeslice-ms chunks between utterance_start / utterance_end;
+            the server's upload starts with the first chunk (chunked transfer
+            encoding), so at the end only the last chunk is left to send
+
+Latency is end of speech -> transcript on the server, through the real
+BatchTurnSource, STTRouter and AsyncAssemblyAIClient (VAD is skipped: it
+needs ffmpeg). "in hand" is end of speech -> whole utterance on the server,
+"upload" the upload time left after that, "hidden" the upload time that
+overlapped speech.
+
+Usage:
+    python -m benchmarks.bench_chunked_upload --calls 20 --turns 5 --caller-kbps 256
+"""
+import time
+import random
+import asyncio
+import argparse
+from collections import deque
+
+from app.services.async_stt_service import AsyncAssemblyAIClient
+from app.services.audio_io import AudioClip
+from app.services.streaming_turns import BatchTurnSource
+from app.services.stt_router import STTRouter, STTBackend
+from benchmarks.mock_services import create_assemblyai_app, start_app
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+class CallerLink:
+    """The caller's uplink as a WebSocket: each message arrives after its transfer time, one at a time."""
+
+    def __init__(self, kbps: float):
+        self.kbps = kbps
+        self.free_at = 0.0
+        self.inbox: asyncio.Queue = asyncio.Queue()
+
+    def send(self, message: dict, size: int):
+        loop = asyncio.get_running_loop()
+        self.free_at = max(loop.time(), self.free_at) + size * 8 / (self.kbps * 1000)
+        loop.call_at(self.free_at, self.inbox.put_nowait, message)
+
+    def send_bytes(self, data: bytes):
+        self.send({"type": "websocket.receive", "bytes": data}, len(data))
+
+    def send_text(self, text: str):
+        self.send({"type": "websocket.receive", "text": text}, len(text))
+
+    def hang_up(self):
+        self.send({"type": "websocket.disconnect"}, 0)
+
+    async def receive(self) -> dict:
+        return await self.inbox.get()
+
+
+async def call(mode: str, args, router: STTRouter, rng: random.Random, results: dict):
+    link = CallerLink(args.caller_kbps)
+    speech_ends = deque()
+    chunk_bytes = int(args.bitrate_kbps * 1000 / 8 * args.timeslice_ms / 1000)
+    chunks = int(args.speech_s * 1000 / args.timeslice_ms)
+
+    async def caller():
+        for _ in range(args.turns):
+            await asyncio.sleep(rng.uniform(0.5, 1.5))
+            if mode == "chunked":
+                link.send_text('{"type": "utterance_start"}')
+                for _ in range(chunks):
+                    await asyncio.sleep(args.timeslice_ms / 1000)
+                    link.send_bytes(bytes(chunk_bytes))
+                speech_ends.append(time.perf_counter())
+                link.send_text('{"type": "utterance_end"}')
+            else:
+                await asyncio.sleep(chunks * args.timeslice_ms / 1000)
+                speech_ends.append(time.perf_counter())
+                link.send_bytes(bytes(chunk_bytes * chunks))
+            await turn_done.wait()
+            turn_done.clear()
+        link.hang_up()
+
+    def start_upload(utterance):
+        utterance.uploads.update(router.start_upload(utterance.stream()))
+
+    turn_done = asyncio.Event()
+    source = BatchTurnSource(link, on_utterance=start_upload if mode == "chunked" else None)
+    source.start()
+    talking = asyncio.ensure_future(caller())
+    while True:
+        audio = await source.next_audio()
+        if audio is None:
+            break
+        in_hand = time.perf_counter()
+        speech_end = speech_ends.popleft()
+        result = await router.transcribe(audio)
+        done = time.perf_counter()
+        results["latency_ms"].append((done - speech_end) * 1000)
+        results["in_hand_ms"].append((in_hand - speech_end) * 1000)
+        results["upload_ms"].append(result.get("upload_time", 0))
+        if isinstance(audio, AudioClip):
+            results["hidden_ms"].append(audio.upload_hidden_ms())
+        if result["text"].startswith("[ERROR]"):
+            results["errors"] += 1
+        turn_done.set()
+    await talking
+
+
+async def run_mode(mode: str, args, client: AsyncAssemblyAIClient) -> dict:
+    backend = STTBackend("assemblyai", client.transcribe, upload=client.upload_stream)
+    router = STTRouter([backend], hedge=False, stream_upload=True)
+    results = {"latency_ms": [], "in_hand_ms": [], "upload_ms": [], "hidden_ms": [], "errors": 0}
+    rng = random.Random(7)
+    await asyncio.gather(*(call(mode, args, router, random.Random(rng.random()), results) for _ in range(args.calls)))
+    return results
+
+
+async def main(args):
+    random.seed(0)
+    app = create_assemblyai_app(processing_ms=args.processing_ms, jitter_ms=args.processing_ms * 0.1,
+                                upload_ms=args.upload_ms, upload_kbps=args.provider_kbps)
+    runner, url = await start_app(app)
+    client = AsyncAssemblyAIClient(api_key="mock", base_url=url, webhook_url=None,
+                                   poll_initial_delay=0.05, poll_max_delay=0.1)
+    size_kb = args.bitrate_kbps * args.speech_s / 8
+    try:
+        print(f"{args.calls} calls x {args.turns} turns, {args.speech_s:.1f}s utterances ({size_kb:.0f} KB), "
+              f"caller uplink {args.caller_kbps:.0f} kbps, server -> STT {args.provider_kbps:.0f} kbps "
+              f"+ {args.upload_ms:.0f} ms per upload, {args.timeslice_ms:.0f} ms chunks")
+        print(f"{'mode':>8} | {'p50 ms':>7} | {'p95 ms':>7} | {'in hand':>7} | {'upload':>7} | {'hidden':>7} | {'errors':>6}")
+        for mode in args.modes:
+            r = await run_mode(mode, args, client)
+            hidden = sum(r["hidden_ms"]) / len(r["hidden_ms"]) if r["hidden_ms"] else 0
+            print(f"{mode:>8} | {percentile(r['latency_ms'], 0.5):>7.0f} | {percentile(r['latency_ms'], 0.95):>7.0f} | "
+                  f"{percentile(r['in_hand_ms'], 0.5):>7.0f} | {percentile(r['upload_ms'], 0.5):>7.0f} | "
+                  f"{hidden:>7.0f} | {r['errors']:>6}")
+        print("(p50/p95 = end of speech -> transcript; in hand / upload are p50s; hidden = mean ms the upload\n"
+              " request was already under way before the customer stopped talking)")
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=["blob", "chunked"], default=["blob", "chunked"])
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--speech-s", type=float, default=3)
+    parser.add_argument("--bitrate-kbps", type=float, default=48, help="MediaRecorder Opus bitrate")
+    parser.add_argument("--timeslice-ms", type=float, default=250)
+    parser.add_argument("--caller-kbps", type=float, default=256, help="caller -> server uplink")
+    parser.add_argument("--provider-kbps", type=float, default=2000, help="server -> AssemblyAI")
+    parser.add_argument("--upload-ms", type=float, default=120)
+    parser.add_argument("--processing-ms", type=float, default=500)
+    asyncio.run(main(parser.parse_args()))
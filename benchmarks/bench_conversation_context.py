@@ -0,0 +1,117 @@
+"""
+Per-turn prompt size and LLM latency over long calls.
+
+  latest    the old prompt: instructions + the customer's latest sentence only
+            (flat, but Sarah remembers nothing)
+  full      instructions + the whole transcript (what a plain buffer memory
+            would send - grows every turn)
+  context   ConversationContext: recent turns verbatim + rolling summary,
+            under CONTEXT_MAX_TOKENS
+
+The LLM is a local stand-in whose time to first token grows with prompt
+size (--base-ms + --ms-per-1k-tokens) and whose summaries take --summary-ms,
+so the numbers show the shape, not Gemini's absolute latency. Summaries run
+in the background between turns (--gap-ms of customer speech), as in a call.
+
+Usage:
+    python -m benchmarks.bench_conversation_context --turns 30 --calls 5
+"""
+import time
+import asyncio
+import argparse
+import statistics
+
+from app.services.conversation_context import ConversationContext, STATIC_PREFIX, Turn, estimate_tokens
+from benchmarks.mock_services import MockLLM
+
+CUSTOMER_LINES = [
+    "Yeah, we've been playing with it most weekends.",
+    "The grip is really comfortable, my hands don't get sore anymore.",
+    "One of the paddles started chipping on the edge after a couple of weeks though.",
+    "My kids love it, they take it to the park after school.",
+    "The balls are a bit too bouncy on the concrete court near us.",
+    "Honestly the carry bag is my favourite part, everything fits.",
+    "I play doubles with my neighbours on Tuesdays and Thursdays.",
+    "It feels lighter than the set I had before, which helps my wrist.",
+    "Shipping was quick, it arrived two days early.",
+    "I'd probably recommend it, maybe with better balls.",
+]
+
+
+def latest_prompt(user_text: str, turn: int) -> str:
+    return STATIC_PREFIX + f'\nTHIS TURN:\n- Customer just said: "{user_text}"\n- Turn #{turn} of conversation\n'
+
+
+def full_prompt(history: list, user_text: str, turn: int) -> str:
+    transcript = "\n".join(t.render() for t in history)
+    return STATIC_PREFIX + f"\nCONVERSATION:\n{transcript}\n" + latest_prompt(user_text, turn)[len(STATIC_PREFIX):]
+
+
+async def run_call(llm: MockLLM, mode: str, turns: int, gap_ms: float) -> list:
+    """Returns [(prompt_tokens, first_token_ms, build_ms)] per turn."""
+    context = ConversationContext(llm)
+    history = [Turn("", "Hi there! This is Sarah calling from Lifelong.")]
+    context.add_turn("", history[0].agent_reply)
+    rows = []
+    for turn in range(1, turns + 1):
+        user_text = CUSTOMER_LINES[(turn - 1) % len(CUSTOMER_LINES)]
+        t0 = time.perf_counter()
+        if mode == "latest":
+            prompt_text = latest_prompt(user_text, turn)
+        elif mode == "full":
+            prompt_text = full_prompt(history, user_text, turn)
+        else:
+            prompt_text = context.build_prompt(user_text, {"turn_count": turn})
+        build_ms = (time.perf_counter() - t0) * 1000
+
+        start = time.perf_counter()
+        reply = []
+        async for token in llm.astream(prompt_text):
+            if not reply:
+                first_ms = (time.perf_counter() - start) * 1000
+            reply.append(token)
+        agent_reply = "".join(reply).strip()
+
+        history.append(Turn(user_text, agent_reply))
+        t0 = time.perf_counter()
+        context.add_turn(user_text, agent_reply)  # must not wait for the summary
+        build_ms += (time.perf_counter() - t0) * 1000
+        rows.append((estimate_tokens(prompt_text), first_ms, build_ms))
+        await asyncio.sleep(gap_ms / 1000)  # the customer talking
+    stats = context.stats()
+    await context.close()
+    return rows, stats
+
+
+async def main(args):
+    llm = MockLLM(args.base_ms, args.ms_per_1k_tokens, token_ms=0, summary_ms=args.summary_ms)
+    checkpoints = [t for t in (1, 5, 10, 20, 30, args.turns) if t <= args.turns]
+    checkpoints = sorted(set(checkpoints))
+    print(f"{args.calls} calls x {args.turns} turns; stand-in LLM: {args.base_ms:.0f} ms + "
+          f"{args.ms_per_1k_tokens:.0f} ms per 1k prompt tokens, summaries {args.summary_ms:.0f} ms")
+    print(f"{'mode':>8} | " + " | ".join(f"turn {t:>2} tok / ms" for t in checkpoints) + " | add+build ms")
+    for mode in ("latest", "full", "context"):
+        calls = await asyncio.gather(*(run_call(llm, mode, args.turns, args.gap_ms) for _ in range(args.calls)))
+        cells = []
+        for t in checkpoints:
+            tokens = statistics.mean(rows[t - 1][0] for rows, _ in calls)
+            first = statistics.mean(rows[t - 1][1] for rows, _ in calls)
+            cells.append(f"{tokens:>9.0f} / {first:>4.0f}")
+        overhead = max(r[2] for rows, _ in calls for r in rows)
+        print(f"{mode:>8} | " + " | ".join(f"{c:>17}" for c in cells) + f" | {overhead:>12.3f}")
+        if mode == "context":
+            stats = calls[0][1]
+            print(f"context stats (one call): summaries {stats['summaries']}, turns summarized "
+                  f"{stats['turns_summarized']}, max prompt {stats['max_prompt_tokens']} tokens, "
+                  f"prefix {stats['prefix_tokens']} tokens (same on every turn)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--calls", type=int, default=5)
+    parser.add_argument("--base-ms", type=float, default=250)
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=300)
+    parser.add_argument("--summary-ms", type=float, default=400)
+    parser.add_argument("--gap-ms", type=float, default=500)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,138 @@
+"""
+Event-loop stalls caused by logging, at high concurrency.
+
+--sessions simulated calls share one event loop. Each turn logs what
+agent_voice and the services log per turn (--lines-per-turn lines) plus one
+event per relayed audio chunk (--chunk-events), and the loop's lag is
+sampled every 10 ms. Output goes to a pipe drained by a reader limited to
+--sink-kbps, like a terminal or a container log driver that can't keep up:
+once the pipe is full, a print() blocks the whole event loop.
+
+  off            no logging at all (the floor)
+  print          print() on the event loop - the old [DEBUG] lines
+  queue INFO     logging_config: queued, written by a background thread
+  queue DEBUG    same, with per-chunk DEBUG events on (sampled per key)
+
+Usage:
+    python -m benchmarks.bench_logging --sessions 500 --seconds 5
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+import argparse
+import threading
+
+from app.services import logging_config
+from app.services.logging_config import setup_logging, shutdown_logging, log_context
+
+logger = logging.getLogger("app.bench")
+
+LINE = "Transcribed text: yeah the grip is really comfortable, my hands don't get sore anymore"
+CHUNK = "No audio in this packet: {'audio': None, 'isFinal': None, 'normalizedAlignment': None}"
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def start_sink(kbps: float):
+    """A pipe whose reader takes at most kbps KB/s. Returns (writable file, stop)."""
+    r, w = os.pipe()
+    stop = threading.Event()
+
+    def drain():
+        budget = kbps * 1024 / 100  # bytes per 10 ms
+        while True:
+            data = os.read(r, int(budget))
+            if not data:
+                break
+            time.sleep(0.01 * len(data) / budget)
+        os.close(r)
+
+    reader = threading.Thread(target=drain, daemon=True)
+    reader.start()
+    sink = os.fdopen(w, "w", buffering=1)  # line-buffered, like a terminal
+
+    def close():
+        sink.close()
+        reader.join()
+
+    return sink, close
+
+
+async def session(i: int, mode: str, sink, args, until: float):
+    rng = random.Random(i)
+    log_context(session_id=f"s{i:04d}")
+    turn = 0
+    await asyncio.sleep(rng.uniform(0, args.turn_ms / 1000))
+    while time.perf_counter() < until:
+        turn += 1
+        log_context(turn_id=turn)
+        for n in range(args.lines_per_turn):
+            if mode == "print":
+                print(f"[DEBUG] {LINE} (turn {turn}, line {n})", file=sink)
+            elif mode != "off":
+                logger.info("%s (turn %d, line %d)", LINE, turn, n)
+        for _ in range(args.chunk_events):
+            await asyncio.sleep(0)  # an audio chunk arrives
+            if mode == "print":
+                print(f"[DEBUG] {CHUNK}", file=sink)
+            elif mode != "off":
+                logger.debug(CHUNK, extra={"sample": "tts.no_audio"})
+        await asyncio.sleep(rng.uniform(0.5, 1.5) * args.turn_ms / 1000)
+
+
+async def monitor(lags: list, until: float, interval: float = 0.01):
+    loop = asyncio.get_running_loop()
+    while time.perf_counter() < until:
+        t0 = loop.time()
+        await asyncio.sleep(interval)
+        lags.append((loop.time() - t0 - interval) * 1000)
+
+
+async def run(mode: str, args) -> dict:
+    sink, close_sink = start_sink(args.sink_kbps)
+    if mode.startswith("queue"):
+        for key in logging_config.stats:
+            logging_config.stats[key] = 0
+        setup_logging(level="DEBUG" if mode == "queue DEBUG" else "INFO", fmt="json", stream=sink,
+                      queue_size=args.queue_size)
+    until = time.perf_counter() + args.seconds
+    lags = []
+    await asyncio.gather(monitor(lags, until), *(session(i, mode, sink, args, until) for i in range(args.sessions)))
+    # Everything below is after the measured window: flush and let the reader catch up
+    if mode.startswith("queue"):
+        shutdown_logging()
+    close_sink()
+    return {
+        "p50": percentile(lags, 0.5), "p99": percentile(lags, 0.99), "max": max(lags),
+        "stalled": sum(l for l in lags if l > 50),
+        **(logging_config.logging_stats() if mode.startswith("queue") else {}),
+    }
+
+
+async def main(args):
+    print(f"{args.sessions} sessions, {args.lines_per_turn} lines + {args.chunk_events} chunk events per turn "
+          f"every ~{args.turn_ms:.0f} ms, sink {args.sink_kbps:.0f} KB/s, {args.seconds:.0f}s per mode")
+    print(f"{'mode':>12} | {'lag p50 ms':>10} | {'lag p99 ms':>10} | {'lag max ms':>10} | {'stalled ms':>10} | "
+          f"{'queued':>7} | {'dropped':>7} | {'suppressed':>10}")
+    for mode in ("off", "print", "queue INFO", "queue DEBUG"):
+        r = await run(mode, args)
+        print(f"{mode:>12} | {r['p50']:>10.1f} | {r['p99']:>10.1f} | {r['max']:>10.1f} | {r['stalled']:>10.0f} | "
+              f"{r.get('queued', '-'):>7} | {r.get('dropped', '-'):>7} | {r.get('suppressed', '-'):>10}")
+    print("(stalled ms = total loop lag beyond 50 ms; queued / dropped / suppressed from logging_stats())")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--turn-ms", type=float, default=1000)
+    parser.add_argument("--lines-per-turn", type=int, default=12)
+    parser.add_argument("--chunk-events", type=int, default=20)
+    parser.add_argument("--sink-kbps", type=float, default=1024)
+    parser.add_argument("--queue-size", type=int, default=logging_config.LOG_QUEUE_SIZE)
+    asyncio.run(main(parser.parse_args()))
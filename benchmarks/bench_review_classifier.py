@@ -0,0 +1,121 @@
+"""
+Sentiment / topic tagging: the old keyword any() scans vs ReviewClassifier.
+
+1. Per-utterance cost (microseconds) on a synthetic corpus of customer lines.
+   The substring scans cost grows with every word added to the taxonomy;
+   the classifier's cost depends on the utterance length only.
+2. Bulk throughput of classify_batch() over stored transcripts, in-process
+   and spread over --processes worker processes.
+3. A few negation cases where the substring scans get the sentiment wrong.
+
+Usage:
+    python -m benchmarks.bench_review_classifier --transcripts 20000 --processes 1 4
+"""
+import time
+import random
+import argparse
+
+from app.services.review_classifier import ReviewClassifier
+
+FRAGMENTS = [
+    "the grip is really comfortable", "one paddle started chipping on the edge", "we play most weekends",
+    "the balls are a bit too bouncy", "honestly it's not great", "my kids love it", "shipping was quick",
+    "it feels lighter than my old set", "I wouldn't say the quality is bad", "the bag is awesome",
+    "it hasn't helped my game much", "the handle got loose after a month", "yeah it's fine",
+    "I don't really like the colour", "it's perfect for beginners", "the build feels cheap",
+]
+NEGATION_CASES = [
+    ("It's not great, to be honest", "negative"),
+    ("I don't love the balls", "negative"),
+    ("Never had a bad game with it", "positive"),
+    ("The grip isn't comfortable at all", "negative"),
+]
+
+
+def old_scan(state: dict, user_text: str):
+    """The per-turn keyword scans agent_voice used to run."""
+    user_lower = user_text.lower()
+    if any(word in user_lower for word in ["love", "great", "awesome", "amazing", "perfect"]):
+        state["customer_sentiment"] = "positive"
+    elif any(word in user_lower for word in ["hate", "terrible", "awful", "bad", "broken"]):
+        state["customer_sentiment"] = "negative"
+    if any(word in user_lower for word in ["grip", "handle", "comfortable"]) and "grip" not in state["topics_covered"]:
+        state["topics_covered"].append("grip")
+    if any(word in user_lower for word in ["durable", "quality", "build"]) and "durability" not in state["topics_covered"]:
+        state["topics_covered"].append("durability")
+    if any(word in user_lower for word in ["game", "play", "performance"]) and "performance" not in state["topics_covered"]:
+        state["topics_covered"].append("performance")
+
+
+def old_scan_full(taxonomy):
+    """The same substring any() scans, extended to every word of the taxonomy (no negation)."""
+    def scan(state: dict, user_text: str):
+        user_lower = user_text.lower()
+        if any(word in user_lower for word in taxonomy.positive):
+            state["customer_sentiment"] = "positive"
+        elif any(word in user_lower for word in taxonomy.negative):
+            state["customer_sentiment"] = "negative"
+        for topic, words in taxonomy.topics.items():
+            if any(word in user_lower for word in words) and topic not in state["topics_covered"]:
+                state["topics_covered"].append(topic)
+    return scan
+
+
+def make_utterance(rng: random.Random) -> str:
+    return ", and ".join(rng.sample(FRAGMENTS, rng.randint(1, 3))).capitalize() + "."
+
+
+def per_utterance(classifier: ReviewClassifier, utterances: list):
+    def run(fn):
+        state = {"topics_covered": [], "customer_sentiment": "neutral"}
+        t0 = time.perf_counter()
+        for text in utterances:
+            fn(state, text)
+        return (time.perf_counter() - t0) * 1e6 / len(utterances)
+
+    taxonomy = classifier.taxonomy
+    n_words = len(taxonomy.positive) + len(taxonomy.negative) + sum(len(w) for w in taxonomy.topics.values())
+    old = min(run(old_scan) for _ in range(3))
+    old_full = min(run(old_scan_full(taxonomy)) for _ in range(3))
+    new = min(run(classifier.update) for _ in range(3))
+    print(f"1) per utterance ({len(utterances)} utterances, avg {sum(map(len, utterances)) / len(utterances):.0f} chars)")
+    print(f"   {'old keyword scans (3 topics, 19 words)':<48} {old:6.2f} us")
+    print(f"   {f'same scans over the full taxonomy ({n_words} words)':<48} {old_full:6.2f} us")
+    print(f"   {'ReviewClassifier (full taxonomy + negation)':<48} {new:6.2f} us")
+
+
+def bulk(classifier: ReviewClassifier, transcripts: list, process_counts: list):
+    n_utterances = sum(len(t) for t in transcripts)
+    n_bytes = sum(len(u) for t in transcripts for u in t)
+    print(f"\n2) bulk: {len(transcripts)} transcripts, {n_utterances} utterances, {n_bytes / 1e6:.1f} MB")
+    print(f"{'processes':>10} | {'seconds':>7} | {'utterances/s':>12} | {'MB/s':>6}")
+    for processes in process_counts:
+        t0 = time.perf_counter()
+        results = classifier.classify_batch(transcripts, processes=processes)
+        elapsed = time.perf_counter() - t0
+        assert len(results) == len(transcripts)
+        print(f"{processes:>10} | {elapsed:>7.2f} | {n_utterances / elapsed:>12.0f} | {n_bytes / 1e6 / elapsed:>6.1f}")
+
+
+def negation(classifier: ReviewClassifier):
+    print("\n3) negation")
+    for text, expected in NEGATION_CASES:
+        state = {"topics_covered": [], "customer_sentiment": "neutral"}
+        old_scan(state, text)
+        new = classifier.classify(text).sentiment
+        print(f"   {text!r:40} expected {expected:8} old {state['customer_sentiment']:8} new {new}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--utterances", type=int, default=50000)
+    parser.add_argument("--transcripts", type=int, default=20000)
+    parser.add_argument("--turns", type=int, default=15, help="customer utterances per transcript")
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    classifier = ReviewClassifier()
+    per_utterance(classifier, [make_utterance(rng) for _ in range(args.utterances)])
+    bulk(classifier, [[make_utterance(rng) for _ in range(args.turns)] for _ in range(args.transcripts)], args.processes)
+    negation(classifier)
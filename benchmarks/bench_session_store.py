@@ -0,0 +1,205 @@
+"""
+Session snapshots: cost per turn, and calls spread over several workers.
+
+1. Snapshot cost per turn over a --turns turn call: building + encoding the
+   snapshot (on the event loop) and writing it to the memory and SQLite
+   stores (in the background), plus its size as JSON and as stored.
+
+2. Throughput with 1 vs N worker processes sharing one store. Every worker
+   runs --calls concurrent calls; a turn is --turn-ms of provider time,
+   --cpu-ms of our own work (busy loop) plus the real per-turn state work
+   (prompt assembly, keyword state, snapshot). --drop of the turns end with
+   the socket dropping: the call's resume token goes on a shared queue and
+   the next free caller on *any* worker resumes it from the store. With the
+   memory store only resumes that land on the same worker succeed.
+
+Usage:
+    python -m benchmarks.bench_session_store --turns 30 --workers 1 2 4 --seconds 5
+"""
+import os
+import time
+import queue
+import random
+import asyncio
+import argparse
+import tempfile
+import multiprocessing
+
+from app.services import session_store
+from app.services.session_store import (
+    MemorySessionStore, SQLiteSessionStore, SnapshotWriter, call_snapshot, load_call, new_resume_token,
+    encode_snapshot,
+)
+from app.services.conversation_context import ConversationContext
+from app.services.review_classifier import get_classifier
+
+UTTERANCES = [
+    "Honestly it's been great, the grip is really comfortable and my wrist doesn't hurt anymore.",
+    "One of the paddles chipped on the edge after a couple of weeks though.",
+    "We play on the concrete court at the park, three times a week.",
+    "The balls are a bit too bouncy on concrete, but the bag is really handy.",
+]
+REPLY = "Oh I'm so glad to hear that! Has the grip helped your game at all, or is it mostly about comfort?"
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def new_state() -> dict:
+    return {"topics_covered": [], "customer_sentiment": "neutral", "turn_count": 0}
+
+
+def state_work(context: ConversationContext, state: dict, rng) -> str:
+    """What agent_voice does with call state on every turn."""
+    said = rng.choice(UTTERANCES)
+    state["turn_count"] += 1
+    context.build_prompt(said, state)
+    get_classifier().update(state, said)
+    context.add_turn(said, REPLY)
+    return said
+
+
+# ---------- 1. cost per turn ----------
+
+async def snapshot_cost(turns: int, db_path: str):
+    rng = random.Random(1)
+    stores = {"memory": MemorySessionStore(), "sqlite": SQLiteSessionStore(db_path)}
+    context, state = ConversationContext(), new_state()
+    encode_us, write_ms = [], {name: [] for name in stores}
+    json_bytes = stored_bytes = 0
+    for _ in range(turns):
+        state_work(context, state, rng)
+        start = time.perf_counter()
+        snapshot = call_snapshot("bench", state, context)
+        blob = encode_snapshot(snapshot)
+        encode_us.append((time.perf_counter() - start) * 1e6)
+        json_bytes, stored_bytes = len(encode_snapshot(snapshot, compress_above=1 << 30)), len(blob)
+        for name, store in stores.items():
+            start = time.perf_counter()
+            await store.save("token", blob)
+            write_ms[name].append((time.perf_counter() - start) * 1000)
+    await context.close()
+    for store in stores.values():
+        await store.close()
+
+    print(f"1) snapshot cost per turn ({turns}-turn call)")
+    print(f"   build + encode (event loop)   p50 {percentile(encode_us, 0.5):.0f} us, p99 {percentile(encode_us, 0.99):.0f} us")
+    for name, values in write_ms.items():
+        print(f"   write, {name:<7} (background) p50 {percentile(values, 0.5):.3f} ms, p99 {percentile(values, 0.99):.3f} ms")
+    print(f"   size at the last turn: {json_bytes} bytes JSON, {stored_bytes} bytes stored "
+          f"(summary + last {context.recent_turns} turns, so it stops growing)")
+
+
+# ---------- 2. workers ----------
+
+def busy(ms: float):
+    end = time.perf_counter() + ms / 1000
+    while time.perf_counter() < end:
+        pass
+
+
+async def caller(rng, args, resumes, results, deadline):
+    while time.perf_counter() < deadline:
+        context, state, snapshot = ConversationContext(), new_state(), None
+        try:
+            token, expected = resumes.get_nowait()
+            snapshot = await load_call(token)
+            results["resume_hits" if snapshot and snapshot["state"]["turn_count"] == expected else "resume_misses"] += 1
+        except queue.Empty:
+            token = None
+        if snapshot:
+            state.update(snapshot["state"])
+            context.restore(snapshot["context"])
+        else:
+            token = new_resume_token()
+        writer = SnapshotWriter(session_store.get_session_store(), token)
+        for _ in range(args.turns_per_call):
+            await asyncio.sleep(args.turn_ms / 1000 * rng.uniform(0.5, 1.5))  # STT / LLM / TTS
+            busy(args.cpu_ms)
+            state_work(context, state, rng)
+            start = time.perf_counter()
+            writer.save(call_snapshot("bench", state, context))
+            results["save_us"].append((time.perf_counter() - start) * 1e6)
+            results["turns"] += 1
+            if rng.random() < args.drop:
+                await writer.close()  # the server's finally: the last snapshot is written
+                resumes.put((token, state["turn_count"]))
+                break
+        await writer.close()
+        await context.close()
+
+
+def worker(index, backend, db_path, args, resumes, out):
+    session_store._store = SQLiteSessionStore(db_path) if backend == "sqlite" else MemorySessionStore()
+    results = {"turns": 0, "resume_hits": 0, "resume_misses": 0, "save_us": []}
+    loop_lag = []
+
+    async def main():
+        deadline = time.perf_counter() + args.seconds
+
+        async def monitor():
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                await asyncio.sleep(0.01)
+                loop_lag.append((time.perf_counter() - t0 - 0.01) * 1000)
+
+        rng = random.Random(index)
+        await asyncio.gather(monitor(), *(caller(random.Random(rng.random()), args, resumes, results, deadline)
+                                          for _ in range(args.calls)))
+        await session_store.close_session_store()
+
+    asyncio.run(main())
+    out.put({"turns": results["turns"], "resume_hits": results["resume_hits"],
+             "resume_misses": results["resume_misses"], "save_us_p99": percentile(results["save_us"], 0.99),
+             "lag_p99": percentile(loop_lag, 0.99)})
+
+
+def run_workers(n_workers: int, backend: str, args) -> dict:
+    ctx = multiprocessing.get_context("fork")
+    resumes, out = ctx.Queue(), ctx.Queue()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "sessions.db")
+        procs = [ctx.Process(target=worker, args=(i, backend, db_path, args, resumes, out)) for i in range(n_workers)]
+        for p in procs:
+            p.start()
+        results = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+    return {
+        "turns_per_s": sum(r["turns"] for r in results) / args.seconds,
+        "resume_hits": sum(r["resume_hits"] for r in results),
+        "resume_misses": sum(r["resume_misses"] for r in results),
+        "save_us_p99": max(r["save_us_p99"] for r in results),
+        "lag_p99": max(r["lag_p99"] for r in results),
+    }
+
+
+def throughput(args):
+    print(f"\n2) {args.calls} calls per worker, {args.turn_ms:.0f} ms provider time + {args.cpu_ms:.1f} ms CPU per turn, "
+          f"{args.drop * 100:.0f}% of turns drop and resume, {args.seconds:.0f}s")
+    print(f"{'store':>7} | {'workers':>7} | {'turns/s':>8} | {'resumed':>7} | {'lost':>5} | "
+          f"{'save p99 us':>11} | {'loop lag p99 ms':>15}")
+    configs = [("memory", n) for n in args.workers] + [("sqlite", n) for n in args.workers]
+    for backend, n in configs:
+        r = run_workers(n, backend, args)
+        print(f"{backend:>7} | {n:>7} | {r['turns_per_s']:>8.0f} | {r['resume_hits']:>7} | {r['resume_misses']:>5} | "
+              f"{r['save_us_p99']:>11.0f} | {r['lag_p99']:>15.1f}")
+    print("(lost = reconnects whose snapshot wasn't found, or was stale; memory can only resume on the same worker)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=30, help="part 1: turns in the call")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--calls", type=int, default=100, help="part 2: concurrent calls per worker")
+    parser.add_argument("--turns-per-call", type=int, default=8)
+    parser.add_argument("--turn-ms", type=float, default=200)
+    parser.add_argument("--cpu-ms", type=float, default=2.0)
+    parser.add_argument("--drop", type=float, default=0.05)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(snapshot_cost(args.turns, os.path.join(tmp, "sessions.db")))
+    throughput(args)
@@ -0,0 +1,125 @@
+"""
+Speculative LLM generation on interim transcripts vs waiting for the final.
+
+Each turn plays a scripted utterance through ScriptedStreamingSTT (interims
+while the customer talks, the final transcript --endpoint-ms after the last
+word) and measures the time from the final transcript to the reply's first
+token, with and without a Speculator. Turn kinds (--mix, in percent):
+
+  clean    the final transcript equals the last interim        -> hit
+  pause    the customer stops mid-sentence, then goes on        -> wasted call, then hit
+  revised  the final transcript rewrites a few words            -> miss, LLM restarted
+
+Everything is in-process (MockLLM + scripted STT), so runs are repeatable.
+
+Usage:
+    python -m benchmarks.bench_speculation --turns 60
+"""
+import time
+import random
+import asyncio
+import argparse
+import statistics
+
+from app.services import speculation
+from app.services.speculation import Speculator
+from benchmarks.mock_services import MockLLM, ScriptedStreamingSTT
+
+UTTERANCES = [
+    "yeah we have been playing with it most weekends with my neighbours",
+    "the grip is really comfortable my hands do not get sore anymore",
+    "one of the paddles started chipping on the edge after a couple of weeks",
+    "my kids love it they take it to the park after school every day",
+    "the balls are a bit too bouncy on the concrete court near our house",
+]
+REVISIONS = {  # what a final transcript can look like after STT re-decodes the turn
+    "playing with it most weekends": "played with it almost every weekend",
+    "really comfortable": "real comfy honestly",
+    "started chipping on the edge": "started to chip around the edges",
+    "take it to the park": "take them to the park",
+    "a bit too bouncy": "a little too bouncy I think",
+}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def revise(text: str) -> str:
+    for old, new in REVISIONS.items():
+        if old in text:
+            return text.replace(old, new)
+    return text + " I guess"
+
+
+async def run_turn(llm: MockLLM, kind: str, text: str, speculate: bool, args) -> float:
+    """Milliseconds from the final transcript to the first reply token."""
+    speculator = Speculator(llm, lambda t: f"PROMPT\nCustomer just said: {t}", stable_ms=args.stable_ms,
+                            threshold=args.threshold, max_wasted=args.max_wasted) if speculate else None
+    stt = ScriptedStreamingSTT(word_ms=args.word_ms, endpoint_ms=args.endpoint_ms,
+                               on_interim=speculator.observe if speculator else None)
+    if speculator:
+        speculator.arm()
+    words = len(text.split())
+    speaking = asyncio.ensure_future(stt.speak(
+        text,
+        pause_after=words // 2 if kind == "pause" else 0,
+        pause_ms=args.pause_ms if kind == "pause" else 0,
+        final_text=revise(text) if kind == "revised" else None,
+    ))
+    final = await stt.get_final_turn(timeout=30)
+    final_at = time.perf_counter()
+    await speaking
+
+    reply_llm = speculator.resolve(final) if speculator else llm
+    first_ms = None
+    async for _ in reply_llm.astream(f"PROMPT\nCustomer just said: {final}"):
+        if first_ms is None:
+            first_ms = (time.perf_counter() - final_at) * 1000
+    if speculator:
+        speculator.close()
+    return first_ms
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    clean, pause, _ = args.mix
+    kinds = ["clean" if r < clean else "pause" if r < clean + pause else "revised"
+             for r in (rng.uniform(0, 100) for _ in range(args.turns))]
+    texts = [rng.choice(UTTERANCES) for _ in range(args.turns)]
+
+    print(f"{args.turns} turns ({kinds.count('clean')} clean, {kinds.count('pause')} pause, "
+          f"{kinds.count('revised')} revised); MockLLM first token {args.base_ms:.0f} ms + prefill, "
+          f"end-of-turn {args.endpoint_ms:.0f} ms, stable {args.stable_ms:.0f} ms")
+    print(f"{'mode':>11} | {'mean ms':>7} | {'p50 ms':>6} | {'p95 ms':>6} | {'LLM calls/turn':>14} | "
+          f"{'wasted/turn':>11} | {'hit rate':>8}")
+    for speculate in (False, True):
+        for key in speculation.stats:
+            speculation.stats[key] = 0
+        llm = MockLLM(base_ms=args.base_ms, token_ms=args.token_ms)
+        firsts = await asyncio.gather(*(run_turn(llm, k, t, speculate, args) for k, t in zip(kinds, texts)))
+        s = speculation.speculation_stats()
+        calls = llm.stats["calls"] / args.turns
+        wasted = s["wasted_calls"] / args.turns
+        hit_rate = f"{s['hit_rate'] * 100:.0f}%" if speculate else "-"
+        print(f"{'speculate' if speculate else 'final only':>11} | {statistics.mean(firsts):>7.0f} | "
+              f"{percentile(firsts, 0.5):>6.0f} | {percentile(firsts, 0.95):>6.0f} | {calls:>14.2f} | "
+              f"{wasted:>11.2f} | {hit_rate:>8}")
+    print(f"speculation stats: {s}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--mix", type=float, nargs=3, default=[60, 25, 15], metavar=("CLEAN", "PAUSE", "REVISED"))
+    parser.add_argument("--base-ms", type=float, default=350, help="MockLLM time to first token (before prefill)")
+    parser.add_argument("--token-ms", type=float, default=15)
+    parser.add_argument("--word-ms", type=float, default=250)
+    parser.add_argument("--pause-ms", type=float, default=600)
+    parser.add_argument("--endpoint-ms", type=float, default=750, help="last word -> final transcript")
+    parser.add_argument("--stable-ms", type=float, default=speculation.SPECULATE_STABLE_MS)
+    parser.add_argument("--threshold", type=float, default=speculation.SPECULATE_SIMILARITY)
+    parser.add_argument("--max-wasted", type=int, default=speculation.SPECULATE_MAX_WASTED)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,158 @@
+"""
+Streaming STT scaling: threads, RSS and CPU per concurrent session.
+
+Runs N simultaneous streaming sessions (each fed a WebM call in real-time
+250 ms slices) with either the threaded AAIStreamingSTT or the asyncio
+AsyncAAIStreamingSTT, against the mock AssemblyAI streaming server running
+in a separate process. ffmpeg CPU is reported separately since both engines
+run one ffmpeg per session. Linux only (reads /proc). Needs ffmpeg.
+
+Usage:
+    python -m benchmarks.bench_streaming_scaling --engine async --sessions 1 10 50 100
+    python -m benchmarks.bench_streaming_scaling --engine threaded --sessions 1 10 50
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.audio_fixtures import CALL_PATTERN, synth_pcm, encode_webm, pattern_duration
+
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+
+
+def proc_status(pid="self") -> dict:
+    out = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            out[key] = value.strip()
+    return out
+
+
+def proc_cpu_seconds(pid) -> float:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / CLK_TCK  # utime + stime
+    except (FileNotFoundError, ProcessLookupError):
+        return 0.0
+
+
+def rss_mb() -> float:
+    return int(proc_status()["VmRSS"].split()[0]) / 1024
+
+
+def start_mock_server(port: int) -> subprocess.Popen:
+    proc = subprocess.Popen([sys.executable, "-m", "benchmarks.mock_services", "assemblyai-streaming", "--port", str(port)])
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("mock streaming server did not start")
+
+
+async def run_session(engine: str, webm: bytes, duration: float, slice_s: float, ffmpeg_pids: list, turns: list):
+    slices = max(1, int(duration / slice_s))
+    per_slice = len(webm) // slices + 1
+
+    if engine == "async":
+        from app.services.async_stt_streaming_service import AsyncAAIStreamingSTT
+        stt = AsyncAAIStreamingSTT()
+        await stt.start()
+        ffmpeg_pids.append(stt._ffmpeg.pid)
+        for i in range(0, len(webm), per_slice):
+            await stt.feed_webm(webm[i:i + per_slice])
+            await asyncio.sleep(slice_s)
+        while await stt.get_final_turn(timeout=1.5):
+            turns.append(1)
+        await stt.stop()
+    else:
+        from app.services.stt_streaming_service import AAIStreamingSTT
+        stt = AAIStreamingSTT()
+        await asyncio.to_thread(stt.start)
+        ffmpeg_pids.append(stt._ffmpeg.pid)
+        for i in range(0, len(webm), per_slice):
+            stt.feed_webm(webm[i:i + per_slice])
+            await asyncio.sleep(slice_s)
+        while await asyncio.to_thread(stt.get_final_turn, 1.5):
+            turns.append(1)
+        await asyncio.to_thread(stt.stop)
+
+
+async def measure(engine: str, sessions: int, webm: bytes, duration: float, slice_s: float) -> dict:
+    ffmpeg_pids, turns = [], []
+    peak = {"threads": 0, "rss": 0.0}
+    ffmpeg_cpu = {}  # pid -> last seen CPU seconds (read while the process is still alive)
+    stop = asyncio.Event()
+
+    async def sampler():
+        while not stop.is_set():
+            peak["threads"] = max(peak["threads"], int(proc_status()["Threads"]))
+            peak["rss"] = max(peak["rss"], rss_mb())
+            for pid in ffmpeg_pids:
+                ffmpeg_cpu[pid] = max(ffmpeg_cpu.get(pid, 0.0), proc_cpu_seconds(pid))
+            await asyncio.sleep(0.2)
+
+    base_rss = rss_mb()
+    cpu0 = os.times()
+    wall0 = time.time()
+    sampler_task = asyncio.ensure_future(sampler())
+    await asyncio.gather(*(run_session(engine, webm, duration, slice_s, ffmpeg_pids, turns) for _ in range(sessions)))
+    stop.set()
+    await sampler_task
+    wall = time.time() - wall0
+    cpu1 = os.times()
+
+    own_cpu = (cpu1.user - cpu0.user) + (cpu1.system - cpu0.system)
+    return {
+        "sessions": sessions,
+        "threads": peak["threads"],
+        "threads_per_session": peak["threads"] / sessions,
+        "rss_mb_per_session": max(0.0, peak["rss"] - base_rss) / sessions,
+        "cpu_pct_per_session": 100 * own_cpu / wall / sessions,
+        "ffmpeg_cpu_pct_per_session": 100 * sum(ffmpeg_cpu.values()) / wall / sessions,
+        "turns": len(turns),
+    }
+
+
+async def main(args):
+    mock = start_mock_server(args.port)
+    os.environ["ASSEMBLY_STREAMING_URL"] = f"ws://127.0.0.1:{args.port}/v3/ws"
+    os.environ.setdefault("ASSEMBLY_API_KEY", "mock")
+    # the threaded engine's ws/ffmpeg threads are plain threading.Threads; the
+    # default executor is used for its blocking start/stop calls
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=max(args.sessions) * 2))
+
+    duration = pattern_duration(CALL_PATTERN)
+    webm = encode_webm(synth_pcm(CALL_PATTERN))
+    print(f"engine={args.engine}, call={duration:.1f}s, timeslice={args.timeslice * 1000:.0f} ms, "
+          f"baseline threads={threading.active_count()}")
+    print(f"{'sessions':>8} | {'threads':>7} | {'thr/sess':>8} | {'RSS MB/sess':>11} | {'CPU %/sess':>10} | {'ffmpeg %/sess':>13} | {'turns':>5}")
+    try:
+        for n in args.sessions:
+            r = await measure(args.engine, n, webm, duration, args.timeslice)
+            print(f"{r['sessions']:>8} | {r['threads']:>7} | {r['threads_per_session']:>8.2f} | "
+                  f"{r['rss_mb_per_session']:>11.2f} | {r['cpu_pct_per_session']:>10.2f} | "
+                  f"{r['ffmpeg_cpu_pct_per_session']:>13.2f} | {r['turns']:>5}")
+    finally:
+        if args.engine == "async":
+            from app.services.async_stt_streaming_service import close_streaming_http
+            await close_streaming_http()
+        mock.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine", choices=["async", "threaded"], default="async")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--timeslice", type=float, default=0.25)
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(main(parser.parse_args()))
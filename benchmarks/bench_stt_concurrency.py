@@ -0,0 +1,65 @@
+"""
+Concurrent STT sessions against a local mock AssemblyAI server.
+
+Compares the old blocking transcribe_audio_simple() (called straight from the
+coroutine, like agent_voice used to) with the shared async client. With the
+blocking client throughput stays flat as sessions grow; with the async client
+it grows with N until the mock's processing time is the limit.
+
+Usage:
+    python -m benchmarks.bench_stt_concurrency --sessions 1 4 16 32 --turns 3
+"""
+import os
+import time
+import asyncio
+import argparse
+
+from benchmarks.mock_services import create_assemblyai_app, start_app_in_thread
+
+FAKE_AUDIO = b"\x1a\x45\xdf\xa3" + os.urandom(24_000)  # ~3 s of opus-sized webm
+
+
+async def run_sessions(transcribe, sessions: int, turns: int) -> float:
+    """Run `sessions` callers doing `turns` transcriptions each; return transcripts/sec."""
+    async def caller():
+        for _ in range(turns):
+            result = await transcribe(FAKE_AUDIO)
+            assert not result["text"].startswith("[ERROR]"), result["text"]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(sessions)))
+    return sessions * turns / (time.perf_counter() - start)
+
+
+async def main(args):
+    base_url, stop = start_app_in_thread(create_assemblyai_app(processing_ms=args.processing_ms))
+    os.environ["ASSEMBLY_API_BASE"] = base_url
+
+    # import after ASSEMBLY_API_BASE is set - both modules read it at import time
+    from app.services.simple_stt_service import transcribe_audio_simple
+    from app.services.async_stt_service import AsyncAssemblyAIClient
+
+    async def blocking(audio):
+        return transcribe_audio_simple(audio)
+
+    client = AsyncAssemblyAIClient(base_url=base_url, api_key="mock")
+
+    print(f"mock processing time: {args.processing_ms} ms, turns per session: {args.turns}")
+    print(f"{'sessions':>8} | {'blocking (tx/s)':>16} | {'async (tx/s)':>13}")
+    try:
+        for n in args.sessions:
+            blocking_tps = await run_sessions(blocking, n, args.turns) if not args.skip_blocking else float("nan")
+            async_tps = await run_sessions(client.transcribe, n, args.turns)
+            print(f"{n:>8} | {blocking_tps:>16.2f} | {async_tps:>13.2f}")
+    finally:
+        await client.close()
+        stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--processing-ms", type=float, default=500)
+    parser.add_argument("--skip-blocking", action="store_true", help="only run the async client")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,147 @@
+"""
+STT tail latency: one backend vs failover vs hedged requests, under faults.
+
+Two AssemblyAI stand-ins play the backends (the real AsyncAssemblyAIClient
+talks to each over HTTP):
+  primary     --primary-ms +/- jitter, --stall-rate of transcripts take
+              --stall-ms longer, and a full outage (every submit 500s) for
+              --outage-s in the middle of the run
+  secondary   slower but steady (--secondary-ms), like local whisper or
+              another region
+--sessions callers each send an utterance, wait for the transcript, think
+for 200-600 ms and repeat, for --seconds per mode:
+
+  primary     the primary only (how the endpoint worked before)
+  failover    STTRouter over both, no hedging: errors fail over, the
+              circuit breaker takes the primary out during the outage
+  hedged      ...and a request still running at the primary's recent p90
+              is sent to the secondary too; first transcript wins
+
+Usage:
+    python -m benchmarks.bench_stt_hedging --sessions 20 --seconds 30
+"""
+import time
+import random
+import asyncio
+import logging
+import argparse
+
+from app.services.async_stt_service import AsyncAssemblyAIClient
+from app.services.stt_router import STTRouter, STTBackend, CircuitBreaker, is_error
+from benchmarks.mock_services import create_assemblyai_app, start_app
+
+FAKE_AUDIO = b"\x1a\x45\xdf\xa3" + bytes(16_000)
+WARMUP = 40  # utterances before measuring, so the hedge delay comes from observed latencies
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def make_router(mode: str, clients: dict, args) -> STTRouter:
+    names = ["primary"] if mode == "primary" else ["primary", "secondary"]
+    backends = [STTBackend(name, clients[name].transcribe, CircuitBreaker(cooldown_s=args.cooldown_s))
+                for name in names]
+    return STTRouter(backends, hedge=mode == "hedged")
+
+
+async def run_mode(mode: str, clients: dict, primary_app, args) -> dict:
+    router = make_router(mode, clients, args)
+    latencies, errors = [], 0
+
+    for _ in range(WARMUP // args.sessions + 1):
+        await asyncio.gather(*(router.transcribe(FAKE_AUDIO) for _ in range(args.sessions)))
+    for backend in router.backends:
+        backend.counters.update(requests=0, errors=0, wins=0, cancelled=0)
+    router.counters.update({key: 0 for key in router.counters})
+
+    start = time.perf_counter()
+    deadline = start + args.seconds
+
+    async def outage():
+        await asyncio.sleep(args.seconds / 2 - args.outage_s / 2)
+        primary_app["faults"]["error_rate"] = 1.0
+        await asyncio.sleep(args.outage_s)
+        primary_app["faults"]["error_rate"] = 0.0
+
+    async def caller(rng):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            result = await router.transcribe(FAKE_AUDIO)
+            if is_error(result):
+                errors += 1
+            else:
+                latencies.append((time.perf_counter() - t0) * 1000)
+            await asyncio.sleep(rng.uniform(0.2, 0.6))
+
+    rng = random.Random(1)
+    faults = asyncio.ensure_future(outage())
+    await asyncio.gather(*(caller(random.Random(rng.random())) for _ in range(args.sessions)))
+    faults.cancel()
+    primary_app["faults"]["error_rate"] = 0.0
+    stats = router.stats()
+    backend_requests = sum(b["requests"] for b in stats["backends"].values())
+    return {
+        "latencies": latencies,
+        "errors": errors,
+        "hedged": stats["hedged"],
+        "hedge_wins": stats["hedge_wins"],
+        "failovers": stats["failovers"],
+        "trips": stats["backends"]["primary"]["breaker_trips"],
+        "load": backend_requests / max(1, stats["requests"]),
+        "requests": stats["requests"],
+    }
+
+
+async def main(args):
+    random.seed(0)
+    # the outage makes every primary submit fail; that's the point, not news
+    logging.getLogger("app.services.async_stt_service").setLevel(logging.CRITICAL)
+    primary_app = create_assemblyai_app(processing_ms=args.primary_ms, jitter_ms=args.primary_ms * 0.3,
+                                        upload_ms=10, stall_rate=args.stall_rate, stall_ms=args.stall_ms)
+    secondary_app = create_assemblyai_app(processing_ms=args.secondary_ms, jitter_ms=args.secondary_ms * 0.15,
+                                          upload_ms=10)
+    runners, clients = [], {}
+    for name, app in (("primary", primary_app), ("secondary", secondary_app)):
+        runner, url = await start_app(app)
+        runners.append(runner)
+        # fast polling, so the poll interval doesn't hide the backend's latency
+        clients[name] = AsyncAssemblyAIClient(api_key="mock", base_url=url, webhook_url=None,
+                                              poll_initial_delay=0.05, poll_max_delay=0.1)
+    try:
+        print(f"{args.sessions} callers, {args.seconds:.0f}s per mode; primary {args.primary_ms:.0f} ms "
+              f"({args.stall_rate * 100:.0f}% stall +{args.stall_ms:.0f} ms, {args.outage_s:.0f}s outage), "
+              f"secondary {args.secondary_ms:.0f} ms")
+        print(f"{'mode':>9} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7} | {'max ms':>7} | {'errors':>6} | "
+              f"{'hedged':>6} | {'won':>5} | {'failover':>8} | {'trips':>5} | {'load':>5}")
+        for mode in args.modes:
+            r = await run_mode(mode, clients, primary_app, args)
+            lat = r["latencies"]
+            print(f"{mode:>9} | {percentile(lat, 0.5):>7.0f} | {percentile(lat, 0.95):>7.0f} | "
+                  f"{percentile(lat, 0.99):>7.0f} | {max(lat or [0]):>7.0f} | {r['errors']:>6} | "
+                  f"{r['hedged'] / max(1, r['requests']):>6.1%} | {r['hedge_wins']:>5} | {r['failovers']:>8} | "
+                  f"{r['trips']:>5} | {r['load']:>5.2f}")
+        print("(hedged = share of utterances also sent to the secondary, won = how many it answered first;\n"
+              " load = backend requests per utterance; trips = times the primary's breaker opened)")
+    finally:
+        for client in clients.values():
+            await client.close()
+        for runner in runners:
+            await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=["primary", "failover", "hedged"],
+                        default=["primary", "failover", "hedged"])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--primary-ms", type=float, default=500)
+    parser.add_argument("--secondary-ms", type=float, default=700)
+    parser.add_argument("--stall-rate", type=float, default=0.05)
+    parser.add_argument("--stall-ms", type=float, default=4000)
+    parser.add_argument("--outage-s", type=float, default=6)
+    parser.add_argument("--cooldown-s", type=float, default=3, help="circuit breaker cooldown")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,87 @@
+"""
+Transcript-ready latency: fixed 1 s polling vs adaptive polling vs webhook callbacks.
+
+The mock AssemblyAI server finishes each transcript after --processing-ms and,
+for webhook runs, POSTs the completion callback to a local receiver that feeds
+the same handle_transcript_callback() the FastAPI /api/stt/webhook route uses.
+"Dead time" is how long after the transcript was actually ready we noticed it.
+
+Usage:
+    python -m benchmarks.bench_stt_webhook --sessions 8 --turns 5
+"""
+import asyncio
+import argparse
+import statistics
+
+from aiohttp import web
+
+from app.services.async_stt_service import AsyncAssemblyAIClient
+from app.services.transcript_registry import handle_transcript_callback, transcript_registry, WEBHOOK_AUTH_HEADER
+from benchmarks.mock_services import create_assemblyai_app, start_app, start_app_in_thread
+
+FAKE_AUDIO = b"\x1a\x45\xdf\xa3" + bytes(16_000)
+WEBHOOK_SECRET = "bench-secret"
+
+
+def create_webhook_receiver() -> web.Application:
+    async def callback(request: web.Request):
+        if request.headers.get(WEBHOOK_AUTH_HEADER) != WEBHOOK_SECRET:
+            return web.json_response({"detail": "Invalid webhook secret"}, status=401)
+        handle_transcript_callback(await request.json())
+        return web.json_response({"status": "ok"})
+
+    app = web.Application()
+    app.router.add_post("/api/stt/webhook", callback)
+    return app
+
+
+async def run_mode(client: AsyncAssemblyAIClient, processing_ms: float, sessions: int, turns: int):
+    dead_times = []
+
+    async def caller():
+        for _ in range(turns):
+            result = await client.transcribe(FAKE_AUDIO)
+            assert not result["text"].startswith("[ERROR]"), result["text"]
+            dead_times.append(result["processing_time"] - processing_ms)
+
+    await asyncio.gather(*(caller() for _ in range(sessions)))
+    dead_times.sort()
+    p95 = dead_times[min(len(dead_times) - 1, int(len(dead_times) * 0.95))]
+    polls = client.stats["polls"] / len(dead_times)
+    return statistics.mean(dead_times), p95, polls
+
+
+async def main(args):
+    base_url, stop = start_app_in_thread(create_assemblyai_app(processing_ms=args.processing_ms, jitter_ms=args.jitter_ms))
+    receiver, receiver_url = await start_app(create_webhook_receiver())
+
+    modes = {
+        "fixed 1s poll": dict(poll_initial_delay=1.0, poll_backoff_factor=1.0, poll_max_delay=1.0),
+        "adaptive poll": dict(),
+        "webhook": dict(webhook_url=f"{receiver_url}/api/stt/webhook", webhook_secret=WEBHOOK_SECRET),
+    }
+
+    print(f"mock processing: {args.processing_ms} ms ± {args.jitter_ms} ms, {args.sessions} sessions x {args.turns} turns")
+    print(f"{'mode':>14} | {'mean dead ms':>12} | {'p95 dead ms':>11} | {'polls/tx':>8}")
+    try:
+        for name, options in modes.items():
+            options.setdefault("webhook_url", None)
+            client = AsyncAssemblyAIClient(base_url=base_url, api_key="mock", **options)
+            try:
+                mean, p95, polls = await run_mode(client, args.processing_ms, args.sessions, args.turns)
+            finally:
+                await client.close()
+            print(f"{name:>14} | {mean:>12.0f} | {p95:>11.0f} | {polls:>8.2f}")
+        print(f"registry: {transcript_registry.stats}")
+    finally:
+        await receiver.cleanup()
+        stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--processing-ms", type=float, default=700)
+    parser.add_argument("--jitter-ms", type=float, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,110 @@
+"""
+Cost and accuracy of per-turn latency tracing.
+
+1. Recording overhead per call, in nanoseconds: a bare time.time() delta (what
+   agent_voice used to do), TurnTrace.add(), a span() block, and a whole turn
+   (every stage recorded + finish()) - compared to the turn it measures.
+2. Percentile error of the log-bucketed histogram against exact percentiles
+   of the same samples (lognormal latencies, like real stage timings).
+3. Cost of rendering GET /metrics.
+
+Usage:
+    python -m benchmarks.bench_tracing --n 200000
+"""
+import time
+import math
+import random
+import argparse
+
+from app.services.tracing import Tracer, Histogram, STAGES
+
+
+def ns_per_op(fn, n: int) -> float:
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter_ns()
+        fn(n)
+        best = min(best, (time.perf_counter_ns() - t0) / n)
+    return best
+
+
+def overhead(n: int):
+    tracer = Tracer()
+    turn = tracer.session().turn(1)
+
+    def bare_delta(n):
+        for _ in range(n):
+            start = time.time()
+            _ = round((time.time() - start) * 1000)
+
+    def add(n):
+        for _ in range(n):
+            turn.add("stt", 812.0)
+
+    def span(n):
+        for _ in range(n):
+            with turn.span("postprocess"):
+                pass
+
+    session = tracer.session()
+
+    def whole_turn(n):
+        for i in range(n):
+            t = session.turn(i)
+            for stage in STAGES[:-1]:
+                t.add(stage, 250.0)
+            t.finish()
+
+    print(f"1) recording overhead ({n} ops, best of 3)")
+    for name, fn, ops in (("time.time() delta (old)", bare_delta, n), ("TurnTrace.add()", add, n),
+                          ("with turn.span()", span, n), (f"whole turn ({len(STAGES)} spans + finish)", whole_turn, n // 10)):
+        print(f"   {name:<36} {ns_per_op(fn, ops):>8.0f} ns")
+    per_turn_us = ns_per_op(whole_turn, n // 10) / 1000
+    print(f"   -> {per_turn_us:.1f} us per traced turn, {per_turn_us / 1.5e6 * 100:.5f}% of a 1.5 s turn")
+
+
+def accuracy(n: int, seed: int):
+    rng = random.Random(seed)
+    print(f"\n2) percentile error vs exact ({n} samples per stage)")
+    print(f"{'stage':>16} | {'p50 exact/hist':>16} | {'p95 exact/hist':>16} | {'p99 exact/hist':>16} | {'max err':>7}")
+    for stage, median_ms, sigma in (("postprocess", 0.08, 0.6), ("llm_first_token", 420, 0.35),
+                                    ("stt", 900, 0.5), ("turn", 1600, 0.4)):
+        samples = [rng.lognormvariate(math.log(median_ms), sigma) for _ in range(n)]
+        h = Histogram()
+        for ms in samples:
+            h.record(ms)
+        samples.sort()
+        cells, worst = [], 0.0
+        for q in (0.5, 0.95, 0.99):
+            exact = samples[max(0, math.ceil(q * n) - 1)]
+            approx = h.percentile(q)
+            worst = max(worst, abs(approx - exact) / exact)
+            cells.append(f"{exact:>7.2f}/{approx:<8.2f}")
+        print(f"{stage:>16} | " + " | ".join(f"{c:>16}" for c in cells) + f" | {worst * 100:>6.1f}%")
+
+
+def render(n_turns: int):
+    tracer = Tracer()
+    session = tracer.session()
+    rng = random.Random(1)
+    for i in range(n_turns):
+        t = session.turn(i)
+        for stage in STAGES[:-1]:
+            t.add(stage, rng.lognormvariate(5, 0.5))
+        t.finish()
+    t0 = time.perf_counter()
+    for _ in range(100):
+        text = tracer.render_prometheus()
+    ms = (time.perf_counter() - t0) * 1000 / 100
+    print(f"\n3) GET /metrics body: {len(text.splitlines())} lines, {len(text)} bytes, rendered in {ms:.3f} ms "
+          f"({n_turns} turns recorded)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+    overhead(args.n)
+    accuracy(args.n, args.seed)
+    render(args.n // 10)
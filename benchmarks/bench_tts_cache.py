@@ -0,0 +1,81 @@
+"""
+Greeting time-to-first-audio: live TTS (warm pool) vs the TTS audio cache.
+
+  live    every call synthesizes the greeting over a pre-warmed socket
+  memory  cache hit from the in-memory LRU
+  disk    cache hit from the on-disk tier (fresh process / empty memory tier)
+
+Also checks a hit replays exactly the chunks the live stream produced.
+Runs against the local ElevenLabs stand-in.
+
+Usage:
+    python -m benchmarks.bench_tts_cache --calls 20
+"""
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+from app.services.reply_filters import INITIAL_REPLY
+from app.services.tts_service import TTSConnectionManager
+from app.services.tts_cache import TTSCache
+from benchmarks.mock_services import create_elevenlabs_app, start_app
+
+
+async def ttfa(chunks) -> tuple:
+    start = time.perf_counter()
+    first, received = None, []
+    async for chunk in chunks:
+        if first is None:
+            first = (time.perf_counter() - start) * 1000
+        received.append(chunk)
+    return first, (time.perf_counter() - start) * 1000, received
+
+
+async def measure(make_stream, calls: int) -> tuple:
+    firsts, totals = [], []
+    for _ in range(calls):
+        first, total, _ = await ttfa(make_stream())
+        firsts.append(first)
+        totals.append(total)
+    return statistics.mean(firsts), statistics.mean(totals)
+
+
+async def main(args):
+    runner, http_url = await start_app(create_elevenlabs_app(handshake_ms=args.handshake_ms, first_audio_ms=args.first_audio_ms))
+    manager = TTSConnectionManager(api_key="mock", base_url=http_url.replace("http://", "ws://"))
+    await manager.prewarm()
+    cache_dir = tempfile.mkdtemp(prefix="tts-cache-")
+    cache = TTSCache(manager, cache_dir=cache_dir)
+
+    try:
+        _, _, live_chunks = await ttfa(manager.stream_text(INITIAL_REPLY))
+        _, _, first_fill = await ttfa(cache.stream_text(INITIAL_REPLY))  # miss: synthesizes and stores
+        _, _, replay = await ttfa(cache.stream_text(INITIAL_REPLY))
+        assert [len(c) for c in replay] == [len(c) for c in first_fill], "cache changed the chunk framing"
+
+        live = await measure(lambda: manager.stream_text(INITIAL_REPLY), args.calls)
+        memory = await measure(lambda: cache.stream_text(INITIAL_REPLY), args.calls)
+
+        def disk_stream():
+            return TTSCache(manager, cache_dir=cache_dir).stream_text(INITIAL_REPLY)  # empty memory tier
+        disk = await measure(disk_stream, args.calls)
+
+        print(f"greeting: {len(INITIAL_REPLY)} chars, {len(live_chunks)} chunks, "
+              f"{sum(len(c) for c in replay)} bytes; {args.calls} calls each")
+        print(f"{'':>7} | {'first audio ms':>14} | {'all audio ms':>12}")
+        for name, (first, total) in (("live", live), ("memory", memory), ("disk", disk)):
+            print(f"{name:>7} | {first:>14.2f} | {total:>12.2f}")
+        print(f"cache stats: {cache.stats()}")
+    finally:
+        await manager.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--handshake-ms", type=float, default=150)
+    parser.add_argument("--first-audio-ms", type=float, default=120)
+    asyncio.run(main(parser.parse_args()))
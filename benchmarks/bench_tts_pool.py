@@ -0,0 +1,92 @@
+"""
+Time-to-first-audio: fresh ElevenLabs socket per reply vs the pre-warmed pool.
+
+"before" is what agent_voice used to do every turn: new ClientSession,
+ws_connect, init frame, text, then wait for audio. "after" checks a warm,
+already-initialized socket out of TTSConnectionManager. Runs against a local
+WebSocket stand-in that charges --handshake-ms per connection.
+
+Usage:
+    python -m benchmarks.bench_tts_pool --turns 10 --sessions 4
+"""
+import json
+import time
+import asyncio
+import argparse
+import statistics
+
+import aiohttp
+
+from app.services.tts_service import TTSConnectionManager, build_tts_url, build_init_message
+from benchmarks.mock_services import create_elevenlabs_app, start_app
+
+REPLY = "Oh that's wonderful to hear!... What do you love most about the set?"
+
+
+async def ttfa_fresh_socket(base_url: str) -> float:
+    start = time.perf_counter()
+    first = None
+    async with aiohttp.ClientSession() as session:
+        async with session.ws_connect(build_tts_url(base_url=base_url), max_msg_size=0) as el_ws:
+            await el_ws.send_json(build_init_message("mock"))
+            await el_ws.send_json({"text": REPLY, "flush": True})
+            await el_ws.send_json({"text": ""})
+            async for msg in el_ws:
+                data = json.loads(msg.data)
+                if data.get("audio") and first is None:
+                    first = time.perf_counter() - start
+                if data.get("isFinal"):
+                    break
+    return first * 1000
+
+
+async def ttfa_pooled(manager: TTSConnectionManager) -> float:
+    start = time.perf_counter()
+    first = None
+    async for _ in manager.stream_text(REPLY):
+        if first is None:
+            first = time.perf_counter() - start
+    return first * 1000
+
+
+async def run(measure, sessions: int, turns: int, think_ms: float):
+    samples = []
+
+    async def caller():
+        for _ in range(turns):
+            samples.append(await measure())
+            await asyncio.sleep(think_ms / 1000)  # the customer talking
+
+    await asyncio.gather(*(caller() for _ in range(sessions)))
+    samples.sort()
+    return statistics.mean(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+async def main(args):
+    runner, http_url = await start_app(create_elevenlabs_app(handshake_ms=args.handshake_ms, first_audio_ms=args.first_audio_ms))
+    ws_url = http_url.replace("http://", "ws://")
+    manager = TTSConnectionManager(api_key="mock", base_url=ws_url, warm_per_voice=args.sessions)
+
+    print(f"handshake {args.handshake_ms} ms, first audio {args.first_audio_ms} ms, "
+          f"{args.sessions} sessions x {args.turns} turns")
+    try:
+        before = await run(lambda: ttfa_fresh_socket(ws_url), args.sessions, args.turns, args.think_ms)
+        await manager.prewarm()
+        after = await run(lambda: ttfa_pooled(manager), args.sessions, args.turns, args.think_ms)
+        print(f"{'':>8} | {'mean TTFA ms':>12} | {'p95 TTFA ms':>11}")
+        print(f"{'before':>8} | {before[0]:>12.1f} | {before[1]:>11.1f}")
+        print(f"{'after':>8} | {after[0]:>12.1f} | {after[1]:>11.1f}")
+        print(f"pool counters: {manager.stats()}")
+    finally:
+        await manager.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--handshake-ms", type=float, default=150)
+    parser.add_argument("--first-audio-ms", type=float, default=120)
+    parser.add_argument("--think-ms", type=float, default=300)
+    asyncio.run(main(parser.parse_args()))
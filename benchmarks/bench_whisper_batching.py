@@ -0,0 +1,98 @@
+"""
+Local faster-whisper engine: realtime factor and throughput vs batch size and workers.
+
+Simulates N concurrent calls, each sending `--turns` utterances back to back
+into one WhisperBatchEngine, for every combination of --workers and
+--max-batch (max-batch 1 = no batching, one utterance per model call).
+Reports:
+  RTF          wall-clock seconds per second of audio (lower is better, <1 = faster than realtime)
+  audio s/s    seconds of audio transcribed per wall-clock second
+  p50/p95 ms   per-utterance latency (queue + inference)
+  avg batch    utterances per model call actually achieved
+
+Needs faster-whisper, numpy and soundfile; downloads the model on first run.
+Uses synthetic tone "speech" unless --wav points at 16 kHz WAV files.
+
+Usage:
+    python -m benchmarks.bench_whisper_batching --sessions 8 --workers 1 2 --max-batch 1 4 8
+    python -m benchmarks.bench_whisper_batching --wav samples/*.wav
+"""
+import time
+import asyncio
+import argparse
+import statistics
+
+import numpy as np
+
+from benchmarks.audio_fixtures import synth_pcm
+from app.services.whisper_service import WhisperBatchEngine, read_audio, SAMPLE_RATE
+
+
+def load_utterances(wav_paths) -> list:
+    if wav_paths:
+        out = []
+        for path in wav_paths:
+            with open(path, "rb") as f:
+                out.append(read_audio(f.read()))
+        return out
+    # 1.5 s, 3 s and 5 s utterances
+    return [
+        np.frombuffer(synth_pcm([("silence", 0.2), ("speech", seconds), ("silence", 0.3)]), dtype=np.int16)
+        .astype(np.float32) / 32768
+        for seconds in (1.0, 2.5, 4.5)
+    ]
+
+
+async def run(workers: int, max_batch: int, window_ms: float, sessions: int, turns: int, utterances: list) -> dict:
+    engine = WhisperBatchEngine(workers=workers, max_batch=max_batch, batch_window_ms=window_ms)
+    await engine.start()
+    # warm every worker (model load) before timing
+    await asyncio.gather(*(engine.transcribe(utterances[0]) for _ in range(workers * max_batch)))
+    engine.stats.update(utterances=0, batches=0, audio_seconds=0.0, busy_seconds=0.0)
+
+    latencies = []
+
+    async def call(i: int):
+        for t in range(turns):
+            audio = utterances[(i + t) % len(utterances)]
+            t0 = time.time()
+            await engine.transcribe(audio)
+            latencies.append((time.time() - t0) * 1000)
+
+    t0 = time.time()
+    await asyncio.gather(*(call(i) for i in range(sessions)))
+    wall = time.time() - t0
+    stats = dict(engine.stats)
+    await engine.close()
+
+    latencies.sort()
+    return {
+        "rtf": wall / stats["audio_seconds"],
+        "throughput": stats["audio_seconds"] / wall,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "avg_batch": stats["utterances"] / stats["batches"],
+    }
+
+
+async def main(args):
+    utterances = load_utterances(args.wav)
+    avg_seconds = sum(len(u) for u in utterances) / len(utterances) / SAMPLE_RATE
+    print(f"{args.sessions} calls x {args.turns} turns, avg utterance {avg_seconds:.1f}s, window {args.window_ms:.0f} ms")
+    print(f"{'workers':>7} | {'max batch':>9} | {'RTF':>6} | {'audio s/s':>9} | {'p50 ms':>8} | {'p95 ms':>8} | {'avg batch':>9}")
+    for workers in args.workers:
+        for max_batch in args.max_batch:
+            r = await run(workers, max_batch, args.window_ms, args.sessions, args.turns, utterances)
+            print(f"{workers:>7} | {max_batch:>9} | {r['rtf']:>6.3f} | {r['throughput']:>9.2f} | "
+                  f"{r['p50']:>8.0f} | {r['p95']:>8.0f} | {r['avg_batch']:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--max-batch", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--window-ms", type=float, default=30)
+    parser.add_argument("--wav", nargs="*")
+    asyncio.run(main(parser.parse_args()))
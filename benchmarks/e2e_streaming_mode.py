@@ -0,0 +1,87 @@
+"""
+End-to-end check of the continuous-streaming mode against a local stand-in.
+
+Synthesizes a WebM/Opus "call" with three utterances, sends it in 250 ms
+timeslices (paced in real time, like MediaRecorder.start(250)) through
+StreamingTurnSource -> AAIStreamingSTT -> ffmpeg -> mock AssemblyAI v3
+streaming server, and reports how long after each utterance ended its final
+transcript arrived. Needs ffmpeg on PATH.
+
+Usage:
+    python -m benchmarks.e2e_streaming_mode
+"""
+import os
+import time
+import asyncio
+import argparse
+
+from benchmarks.audio_fixtures import CALL_PATTERN, synth_pcm, encode_webm, pattern_duration
+from benchmarks.mock_services import create_assemblyai_streaming_app, start_app_in_thread
+
+
+class FakeCallerSocket:
+    """Just enough of a Starlette WebSocket for StreamingTurnSource: receive() paced in real time."""
+
+    def __init__(self, webm: bytes, duration: float, timeslice: float, linger: float):
+        per_slice = max(1, int(len(webm) * timeslice / duration))
+        self.slices = [webm[i:i + per_slice] for i in range(0, len(webm), per_slice)]
+        self.timeslice = timeslice
+        self.linger = linger
+        self.started_at = None
+
+    async def receive(self):
+        if self.started_at is None:
+            self.started_at = time.time()
+        if self.slices:
+            await asyncio.sleep(self.timeslice)
+            return {"type": "websocket.receive", "bytes": self.slices.pop(0)}
+        await asyncio.sleep(self.linger)  # stay on the line while the last turn finalizes
+        return {"type": "websocket.disconnect", "code": 1000}
+
+
+async def main(args):
+    base_url, stop = start_app_in_thread(create_assemblyai_streaming_app(silence_ms=args.silence_ms))
+    os.environ["ASSEMBLY_STREAMING_URL"] = base_url.replace("http://", "ws://") + "/v3/ws"
+    os.environ.setdefault("ASSEMBLY_API_KEY", "mock")
+
+    # import after the env is set - the service reads it at import time
+    from app.services.streaming_turns import StreamingTurnSource
+
+    duration = pattern_duration(CALL_PATTERN)
+    webm = encode_webm(synth_pcm(CALL_PATTERN))
+    ws = FakeCallerSocket(webm, duration, args.timeslice, linger=2.0)
+
+    # when each utterance stops, relative to the start of the call
+    speech_ends, t = [], 0.0
+    for kind, seconds in CALL_PATTERN:
+        t += seconds
+        if kind == "speech":
+            speech_ends.append(t)
+
+    source = StreamingTurnSource(ws)
+    await source.start()
+    turns = []
+    try:
+        while True:
+            result = await source.next_turn()
+            if result is None:
+                break
+            turns.append((time.time() - ws.started_at, result))
+    finally:
+        await source.stop()
+        stop()
+
+    print(f"{len(webm)} bytes of WebM, {duration:.1f} s, {args.timeslice * 1000:.0f} ms timeslices")
+    for i, (at, result) in enumerate(turns):
+        lag = (at - speech_ends[i]) * 1000 if i < len(speech_ends) else float("nan")
+        print(f"turn {i + 1}: +{lag:.0f} ms after speech ended (mock waits {args.silence_ms:.0f} ms of silence) "
+              f"- {result['text']!r}")
+    assert len(turns) == len(speech_ends), f"expected {len(speech_ends)} turns, got {len(turns)}"
+    print("OK")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--timeslice", type=float, default=0.25)
+    parser.add_argument("--silence-ms", type=float, default=600)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,478 @@
+"""
+Capacity test for one server process: N simultaneous callers on /api/agent/voice.
+
+Starts, each in its own process:
+  - the AssemblyAI stand-in (batch, or v3 streaming with --mode streaming)
+  - the ElevenLabs stand-in
+  - the app under uvicorn (one worker), with Gemini replaced by MockLLM
+and then runs --callers simulated callers against it for --duration seconds.
+Each caller places calls back to back: listens to the greeting, then for
+--turns turns sends an utterance, waits for the reply, "listens" to it (its
+audio length) and thinks for a while (--think-s, lognormal) before the next.
+Utterances are the .webm files in --audio, or synthetic ones (needs ffmpeg).
+
+Reports completed calls/s and turns/s, caller-side latency (utterance sent ->
+first reply audio, -> reply done), the server's per-stage percentiles
+(GET /api/stats/latency), its event-loop lag, and RSS per open session.
+
+Overload: --max-calls / --queue-size / --queue-timeout-s set the server's
+admission control and --provider-limits its PROVIDER_LIMITS; --llm-capacity
+and --stt-max-active make the stand-ins answer 429 past that many concurrent
+requests. The report then adds calls refused, time spent in the queue and
+turns answered with an error (throttled).
+Linux only (reads /proc). Needs the full app requirements (fastapi, uvicorn,
+langchain) installed.
+
+Usage:
+    python -m benchmarks.loadgen --callers 50 --duration 60
+    python -m benchmarks.loadgen --callers 200 --ramp-s 20 --stt-ms 800 --stt-jitter-ms 300 --llm-ms 400
+    python -m benchmarks.loadgen --callers 100 --mode streaming
+    python -m benchmarks.loadgen --callers 300 --max-calls 100 --llm-capacity 40 --provider-limits gemini=40
+"""
+import os
+import sys
+import glob
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import statistics
+import subprocess
+
+import aiohttp
+
+STATS_PATH = "/loadgen/stats"
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_mb(pid="self") -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+# ---------- server side (runs in the uvicorn subprocess) ----------
+
+def serve(args):
+    """The app with Gemini swapped for MockLLM, plus a loop-lag monitor at /loadgen/stats."""
+    import uvicorn
+    from fastapi import Request
+    from benchmarks.mock_services import MockLLM
+
+    from app.main import app  # reads ASSEMBLY_API_BASE / ELEVENLABS_WS_BASE set by the parent
+    from app.api import agent_voice
+    from app.services.tracing import get_tracer
+
+    agent_voice.llm = MockLLM(base_ms=args.llm_ms, jitter_ms=args.llm_jitter_ms, token_ms=args.token_ms,
+                              summary_ms=args.llm_ms, max_concurrent=args.llm_capacity)
+    lags = []
+
+    async def monitor(interval: float = 0.01):
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(interval)
+            lags.append((loop.time() - t0 - interval) * 1000)
+
+    @app.on_event("startup")
+    async def start_monitor():
+        asyncio.ensure_future(monitor())
+
+    @app.get(STATS_PATH, include_in_schema=False)
+    async def loadgen_stats(request: Request):
+        snapshot = {
+            "rss_mb": rss_mb(),
+            "active_sessions": get_tracer().active_sessions,
+            "lag_p50": percentile(lags, 0.5), "lag_p99": percentile(lags, 0.99), "lag_max": max(lags or [0]),
+        }
+        if request.query_params.get("reset"):
+            lags.clear()
+        return snapshot
+
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", ws_max_size=16 * 1024 * 1024)
+
+
+# ---------- processes ----------
+
+def spawn(argv, env=None) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-m", *argv], env={**os.environ, **(env or {})})
+
+
+def wait_for_port(port: int, proc: subprocess.Popen, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{proc.args[2:4]} exited with {proc.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"nothing listening on port {port}")
+
+
+def start_stack(args):
+    """Mocks + app server. Returns (base_url, [processes])."""
+    stt_port, tts_port, app_port = free_port(), free_port(), free_port()
+    if args.mode == "streaming":
+        stt = spawn(["benchmarks.mock_services", "assemblyai-streaming", "--port", str(stt_port),
+                     "--set", f"finalize_ms={args.stt_ms}"])
+    else:
+        stt = spawn(["benchmarks.mock_services", "assemblyai", "--port", str(stt_port),
+                     "--set", f"processing_ms={args.stt_ms}", "--set", f"jitter_ms={args.stt_jitter_ms}",
+                     "--set", f"max_active={args.stt_max_active}"])
+    tts = spawn(["benchmarks.mock_services", "elevenlabs", "--port", str(tts_port),
+                 "--set", f"first_audio_ms={args.tts_ms}", "--set", f"jitter_ms={args.tts_jitter_ms}",
+                 "--set", "packet_ms=100", "--set", "chunk_interval_ms=50"])
+    env = {
+        "ASSEMBLY_API_KEY": "mock", "ELEVEN_LABS_API_KEY": "mock", "SECRET_KEY_GOOGLE_AI": "mock",
+        "ASSEMBLY_API_BASE": f"http://127.0.0.1:{stt_port}",
+        "ASSEMBLY_STREAMING_URL": f"ws://127.0.0.1:{stt_port}/v3/ws",
+        "ELEVENLABS_WS_BASE": f"ws://127.0.0.1:{tts_port}",
+        "TTS_CACHE_DIR": "",  # memory only: every run starts cold
+        "LOG_LEVEL": "WARNING",
+        "MAX_ACTIVE_CALLS": str(args.max_calls),
+        "ADMISSION_QUEUE_SIZE": str(args.queue_size),
+        "ADMISSION_QUEUE_TIMEOUT_S": str(args.queue_timeout_s),
+        "PROVIDER_LIMITS": args.provider_limits,
+    }
+    server = spawn(["benchmarks.loadgen", "serve", "--port", str(app_port), "--llm-ms", str(args.llm_ms),
+                    "--llm-jitter-ms", str(args.llm_jitter_ms), "--token-ms", str(args.token_ms),
+                    "--llm-capacity", str(args.llm_capacity)], env)
+    procs = [stt, tts, server]
+    try:
+        for port, proc in ((stt_port, stt), (tts_port, tts), (app_port, server)):
+            wait_for_port(port, proc)
+    except Exception:
+        stop_stack(procs)
+        raise
+    return f"127.0.0.1:{app_port}", procs
+
+
+def stop_stack(procs):
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+# ---------- utterances ----------
+
+def load_utterances(args) -> list:
+    if args.audio:
+        files = sorted(glob.glob(os.path.join(args.audio, "*.webm")))
+        if not files:
+            raise SystemExit(f"no .webm files in {args.audio}")
+        return [open(path, "rb").read() for path in files]
+    from benchmarks.audio_fixtures import CALL_PATTERN, synth_pcm, encode_webm
+    if args.mode == "streaming":
+        return [encode_webm(synth_pcm(CALL_PATTERN))]  # a whole call per file
+    return [encode_webm(synth_pcm([("silence", 0.3), ("speech", seconds), ("silence", 0.3)]))
+            for seconds in (1.2, 2.0, 1.6)]
+
+
+# ---------- callers ----------
+
+class Results:
+    def __init__(self):
+        self.calls = 0
+        self.turns = 0
+        self.errors = 0
+        self.refused = 0          # turned away by admission control
+        self.failed_turns = 0     # turns answered with an error (e.g. throttled) instead of a reply
+        self.queue_wait_ms = []
+        self.first_audio_ms = []
+        self.reply_done_ms = []
+        self.server_metrics = []
+
+
+class Call:
+    """One caller connection: messages are read in the background and awaited by kind."""
+
+    def __init__(self, ws, bytes_per_second: float):
+        self.ws = ws
+        self.bps = bytes_per_second
+        self.events: asyncio.Queue = asyncio.Queue()
+        self.audio_bytes = 0
+        self.reader = asyncio.ensure_future(self._read())
+
+    async def _read(self):
+        async for msg in self.ws:
+            if msg.type is aiohttp.WSMsgType.BINARY:
+                self.audio_bytes += len(msg.data)
+                self.events.put_nowait(("audio", time.perf_counter(), None))
+            elif msg.type is aiohttp.WSMsgType.TEXT:
+                self.events.put_nowait(("json", time.perf_counter(), json.loads(msg.data)))
+        self.events.put_nowait(("closed", time.perf_counter(), None))
+
+    async def until(self, predicate, timeout: float):
+        """Next event matching predicate(kind, data) -> (time, data)."""
+        deadline = time.perf_counter() + timeout
+        while True:
+            kind, at, data = await asyncio.wait_for(self.events.get(), max(0.01, deadline - time.perf_counter()))
+            if kind == "closed":
+                raise ConnectionError("server closed the call")
+            if predicate(kind, data):
+                return at, data
+
+    async def quiet(self, seconds: float):
+        """Wait until nothing has arrived for `seconds`."""
+        while True:
+            try:
+                kind, _, _ = await asyncio.wait_for(self.events.get(), seconds)
+            except asyncio.TimeoutError:
+                return
+            if kind == "closed":
+                raise ConnectionError("server closed the call")
+
+    def playback_s(self, since_bytes: int) -> float:
+        return (self.audio_bytes - since_bytes) / self.bps
+
+
+async def batch_call(session, url, utterances, rng, args, results: Results):
+    async with session.ws_connect(url, max_msg_size=0) as ws:
+        call = Call(ws, args.bytes_per_second)
+        try:
+            if not await admitted(call, args, results):
+                return
+            await call.until(lambda k, d: k == "json" and d.get("agent_reply"), args.timeout)  # greeting text
+            greeted = time.perf_counter()
+            await call.quiet(0.5)  # greeting audio has arrived...
+            heard = time.perf_counter() - greeted
+            await asyncio.sleep(max(0.0, call.playback_s(0) - heard) + think(rng, args))  # ...and is heard
+            for _ in range(args.turns):
+                await call_turn(call, rng.choice(utterances), rng, args, results)
+            results.calls += 1
+        finally:
+            call.reader.cancel()
+
+
+async def call_turn(call: Call, utterance: bytes, rng, args, results: Results):
+    # drop anything left over from the previous reply
+    while not call.events.empty():
+        call.events.get_nowait()
+    await call.ws.send_bytes(utterance)
+    sent = time.perf_counter()
+    _, data = await call.until(lambda k, d: k == "json" and ("user_text" in d or "error" in d), args.timeout)
+    if "error" in data:
+        results.failed_turns += 1
+        await asyncio.sleep(think(rng, args))
+        return
+    bytes_before = call.audio_bytes
+    first_audio, _ = await call.until(lambda k, d: k == "audio", args.timeout)
+    done, data = await call.until(lambda k, d: k == "json" and "metrics" in d, args.timeout)
+    results.turns += 1
+    results.first_audio_ms.append((first_audio - sent) * 1000)
+    results.reply_done_ms.append((done - sent) * 1000)
+    results.server_metrics.append(data["metrics"])
+    # listen to the rest of the reply, then think
+    heard = time.perf_counter() - first_audio
+    await asyncio.sleep(max(0.0, call.playback_s(bytes_before) - heard) + think(rng, args))
+
+
+async def streaming_call(session, url, utterances, rng, args, results: Results):
+    """Streams one whole recorded call in real-time timeslices; turns are ended by the server."""
+    webm = rng.choice(utterances)
+    timeslice = args.timeslice_ms / 1000
+    per_slice = max(1, int(len(webm) * timeslice / args.call_seconds))
+    async with session.ws_connect(url + "&mode=streaming", max_msg_size=0) as ws:
+        call = Call(ws, args.bytes_per_second)
+        turns_before = results.turns
+        try:
+            if not await admitted(call, args, results):
+                return
+            for i in range(0, len(webm), per_slice):
+                await ws.send_bytes(webm[i:i + per_slice])
+                await asyncio.sleep(timeslice)
+                while not call.events.empty():
+                    _, at, data = call.events.get_nowait()
+                    if data and "metrics" in data:
+                        record_streaming_turn(results, data, at)
+            deadline = time.perf_counter() + args.timeout
+            while time.perf_counter() < deadline and results.turns - turns_before < args.turns:
+                at, data = await call.until(lambda k, d: k == "json" and "metrics" in d, deadline - time.perf_counter())
+                record_streaming_turn(results, data, at)
+            results.calls += 1
+        except asyncio.TimeoutError:
+            results.calls += 1  # the call audio had fewer turns than --turns
+        finally:
+            call.reader.cancel()
+
+
+async def admitted(call: Call, args, results: Results) -> bool:
+    """Wait out the server's queue: True once the call starts, False if it was turned away."""
+    _, data = await call.until(lambda k, d: k == "json" and ("audio_format" in d or d.get("busy")),
+                               args.queue_timeout_s + args.timeout)
+    if data.get("busy"):
+        results.refused += 1
+        return False
+    results.queue_wait_ms.append(data.get("queue_wait_ms", 0))
+    return True
+
+
+def record_streaming_turn(results: Results, data: dict, at: float):
+    results.turns += 1
+    m = data["metrics"]
+    results.server_metrics.append(m)
+    # no "sent" moment in streaming mode: end of speech -> first audio / done, as the server measured it
+    results.first_audio_ms.append(m.get("stt_total_time", 0) + m.get("tts_first_audio_time", 0))
+    results.reply_done_ms.append(m.get("stt_total_time", 0) + m.get("tts_time", 0))
+
+
+def think(rng, args) -> float:
+    return rng.lognormvariate(0, 0.4) * args.think_s
+
+
+async def caller(i, base, utterances, args, results: Results, deadline: float):
+    rng = random.Random(args.seed + i)
+    await asyncio.sleep(args.ramp_s * i / max(1, args.callers))
+    url = f"ws://{base}/api/agent/voice?audio={args.audio_format}"
+    place = streaming_call if args.mode == "streaming" else batch_call
+    async with aiohttp.ClientSession() as session:
+        while time.perf_counter() < deadline:
+            try:
+                refused = results.refused
+                await place(session, url, utterances, rng, args, results)
+                if results.refused > refused:
+                    await asyncio.sleep(1.0)  # call back later
+            except (asyncio.TimeoutError, aiohttp.ClientError, ConnectionError) as e:
+                results.errors += 1
+                print(f"caller {i}: {e!r}")
+                await asyncio.sleep(1.0)
+
+
+async def poll_server(session, base, samples: list, stop: asyncio.Event):
+    while not stop.is_set():
+        async with session.get(f"http://{base}{STATS_PATH}") as resp:
+            samples.append(await resp.json())
+        try:
+            await asyncio.wait_for(stop.wait(), 1.0)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run(args, base):
+    from app.services.tts_service import bytes_per_second, negotiate_output_format
+    args.bytes_per_second = bytes_per_second(negotiate_output_format(args.audio_format))
+    if args.mode == "streaming":
+        from benchmarks.audio_fixtures import CALL_PATTERN, pattern_duration
+        args.call_seconds = pattern_duration(CALL_PATTERN) if not args.audio else args.call_seconds
+    utterances = load_utterances(args)
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"http://{base}{STATS_PATH}?reset=1") as resp:
+            idle = await resp.json()
+        samples, stop = [], asyncio.Event()
+        poller = asyncio.ensure_future(poll_server(session, base, samples, stop))
+
+        results = Results()
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(caller(i, base, utterances, args, results, deadline) for i in range(args.callers)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await poller
+
+        async with session.get(f"http://{base}{STATS_PATH}") as resp:
+            final = await resp.json()
+        async with session.get(f"http://{base}/api/stats/latency") as resp:
+            stages = (await resp.json())["stages"]
+        async with session.get(f"http://{base}/api/stats/admission") as resp:
+            admission = await resp.json()
+    report(args, results, elapsed, idle, samples, final, stages, admission)
+
+
+def report(args, results: Results, elapsed, idle, samples, final, stages, admission):
+    peak = max(samples, key=lambda s: s["rss_mb"]) if samples else final
+    sessions = max((s["active_sessions"] for s in samples), default=0)
+    print(f"\n{args.callers} callers, {args.mode} mode, {elapsed:.0f}s; STT {args.stt_ms:.0f}+/-{args.stt_jitter_ms:.0f} ms, "
+          f"LLM {args.llm_ms:.0f}+/-{args.llm_jitter_ms:.0f} ms, TTS {args.tts_ms:.0f}+/-{args.tts_jitter_ms:.0f} ms")
+    print(f"  completed calls   {results.calls}  ({results.calls / elapsed:.2f} calls/s)")
+    print(f"  turns             {results.turns}  ({results.turns / elapsed:.2f} turns/s), errors {results.errors}")
+    print(f"  admission         {results.refused} calls refused, queue wait p50 "
+          f"{percentile(results.queue_wait_ms, 0.5):.0f} ms, p95 {percentile(results.queue_wait_ms, 0.95):.0f} ms; "
+          f"{results.failed_turns} turns answered with an error")
+    for name, p in admission["providers"].items():
+        print(f"  {name:<17} {p['rate_limited']} rate limited, {p['retries']} retries, {p['throttled']} throttled, "
+              f"slot wait p95 {p['wait_ms']['p95']:.0f} ms")
+    print(f"{'caller side (ms)':>22} | {'p50':>7} | {'p95':>7} | {'p99':>7}")
+    for name, values in (("utterance -> 1st audio", results.first_audio_ms), ("utterance -> reply done", results.reply_done_ms)):
+        print(f"{name:>22} | {percentile(values, 0.5):>7.0f} | {percentile(values, 0.95):>7.0f} | {percentile(values, 0.99):>7.0f}")
+    print(f"{'server stage (ms)':>22} | {'p50':>7} | {'p95':>7} | {'p99':>7} | {'count':>6}")
+    for stage, h in stages.items():
+        print(f"{stage:>22} | {h['p50']:>7.1f} | {h['p95']:>7.1f} | {h['p99']:>7.1f} | {h['count']:>6}")
+    perceived = [m.get("perceived_latency", 0) for m in results.server_metrics if m.get("perceived_latency")]
+    if perceived:
+        print(f"  perceived latency (server, with backchannel) p50 {percentile(perceived, 0.5):.0f} ms, "
+              f"p95 {percentile(perceived, 0.95):.0f} ms")
+    print(f"  event-loop lag    p50 {final['lag_p50']:.1f} ms, p99 {final['lag_p99']:.1f} ms, max {final['lag_max']:.0f} ms")
+    per_session = (peak["rss_mb"] - idle["rss_mb"]) / sessions if sessions else 0
+    print(f"  server RSS        idle {idle['rss_mb']:.0f} MB, peak {peak['rss_mb']:.0f} MB at "
+          f"{peak['active_sessions']} sessions -> {per_session * 1024:.0f} KB per session "
+          f"(max {sessions} open)")
+    if results.server_metrics:
+        print(f"  mean prompt size  {statistics.mean(m.get('prompt_tokens', 0) for m in results.server_metrics):.0f} tokens")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command")
+    server = sub.add_parser("serve", help="internal: run the app with the LLM stand-in")
+    server.add_argument("--port", type=int, required=True)
+    for p in (parser, server):
+        p.add_argument("--llm-ms", type=float, default=400, help="MockLLM time to first token")
+        p.add_argument("--llm-jitter-ms", type=float, default=100)
+        p.add_argument("--token-ms", type=float, default=20)
+        p.add_argument("--llm-capacity", type=int, default=0, help="MockLLM streams at once before 429s (0 = any)")
+    parser.add_argument("--callers", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=60, help="seconds; calls in progress are finished")
+    parser.add_argument("--ramp-s", type=float, default=10, help="callers start evenly over this many seconds")
+    parser.add_argument("--turns", type=int, default=3, help="turns per call")
+    parser.add_argument("--think-s", type=float, default=1.5, help="median pause before the caller answers")
+    parser.add_argument("--mode", choices=["batch", "streaming"], default="batch")
+    parser.add_argument("--audio", help="directory of .webm utterances (streaming: whole calls); default synthetic")
+    parser.add_argument("--call-seconds", type=float, default=10, help="streaming: length of each --audio call")
+    parser.add_argument("--timeslice-ms", type=float, default=250)
+    parser.add_argument("--audio-format", default="mp3", help="?audio= for the calls")
+    parser.add_argument("--stt-ms", type=float, default=600, help="batch: AssemblyAI processing; streaming: finalize")
+    parser.add_argument("--stt-jitter-ms", type=float, default=200)
+    parser.add_argument("--tts-ms", type=float, default=150, help="ElevenLabs time to first audio")
+    parser.add_argument("--tts-jitter-ms", type=float, default=50)
+    parser.add_argument("--stt-max-active", type=int, default=0, help="batch: AssemblyAI transcripts at once before 429s")
+    parser.add_argument("--max-calls", type=int, default=0, help="server MAX_ACTIVE_CALLS (0 = no admission control)")
+    parser.add_argument("--queue-size", type=int, default=50, help="server ADMISSION_QUEUE_SIZE")
+    parser.add_argument("--queue-timeout-s", type=float, default=30, help="server ADMISSION_QUEUE_TIMEOUT_S")
+    parser.add_argument("--provider-limits", default="", help="server PROVIDER_LIMITS, e.g. gemini=40,assemblyai=60:20")
+    parser.add_argument("--timeout", type=float, default=30, help="per reply")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args)
+        return
+    base, procs = start_stack(args)
+    try:
+        asyncio.run(run(args, base))
+    finally:
+        stop_stack(procs)
+
+
+if __name__ == "__main__":
+    main()
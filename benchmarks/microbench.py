@@ -0,0 +1,421 @@
+"""
+Per-turn hot paths in isolation, with a stored baseline and regression gate.
+
+Cases (time per operation, best of --repeat runs):
+
+  role_confusion     fix_role_confusion() on a clean reply
+  pacing             apply_natural_pacing() on a three-sentence reply
+  reply_stream       SentenceChunker + IncrementalReplyFilter over a streamed reply
+  prompt             ConversationContext.build_prompt() with summary + recent turns
+  keyword_state      review classifier update() of conversation_state
+  audio_decode       parse_audio_message() on a 100 ms base64 ElevenLabs packet
+  pcm_framing        PCMRingBuffer write + peek/release, per 50 ms frame
+                     (what AAIStreamingSTT does with ffmpeg's stdout)
+  call_replay        a recorded 6-turn call through the real agent_voice handler,
+                     per turn, with in-process fakes for the caller's socket, STT,
+                     the VAD decoder, Gemini and ElevenLabs (no network, no
+                     ffmpeg, zero provider latency - what's left is our own work).
+                     Needs the app requirements (fastapi, langchain); skipped
+                     when they aren't installed.
+
+Timings are divided by a fixed pure-Python calibration loop before they are
+compared with the baseline, so a baseline recorded on another machine still
+means something; --no-normalize compares raw nanoseconds.
+
+Usage:
+    python -m benchmarks.microbench                      # run, compare with the baseline
+    python -m benchmarks.microbench --save               # record a new baseline
+    python -m benchmarks.microbench --only prompt pacing --threshold 0.1
+Exits with status 1 if any case is more than --threshold slower than its
+baseline, and still is after --confirm re-runs.
+"""
+import os
+import sys
+import json
+import time
+import base64
+import random
+import asyncio
+import argparse
+import platform
+
+from app.services.reply_filters import (
+    fix_role_confusion, apply_natural_pacing, SentenceChunker, IncrementalReplyFilter,
+)
+from app.services.conversation_context import ConversationContext, Turn
+from app.services.review_classifier import get_classifier
+from app.services.tts_service import parse_audio_message, bytes_per_second, OUTPUT_FORMAT
+from app.services.pcm_framer import PCMRingBuffer, FRAME_BYTES
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+REPLY = ("Oh that's wonderful to hear! I'm so glad the grip is working for you. "
+         "Has it helped your game at all, or is it mostly about comfort?")
+# (what the customer says, seconds of speech) - the recorded call for call_replay
+CALL = [
+    ("Yeah sure, I've got a minute.", 1.2),
+    ("Honestly it's been great, the grip is really comfortable and my wrist doesn't hurt anymore.", 3.5),
+    ("Mostly comfort, but I think my serves got a bit better too.", 2.4),
+    ("One of the paddles chipped on the edge after a couple of weeks though.", 2.8),
+    ("We play on the concrete court at the park, three times a week.", 2.6),
+    ("No that's it, thanks for calling.", 1.4),
+]
+
+
+# ---------- timing ----------
+
+def ns_per_op(run, repeat: int, min_time: float = 0.05) -> float:
+    """run(n) does n operations. Picks n so one run takes ~min_time, returns the best ns/op."""
+    n = 1
+    while True:
+        t0 = time.perf_counter_ns()
+        run(n)
+        elapsed = time.perf_counter_ns() - t0
+        if elapsed >= min_time * 1e9:
+            break
+        n = max(n * 2, int(n * min_time * 1e9 / max(elapsed, 1)))
+    best = elapsed / n
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter_ns()
+        run(n)
+        best = min(best, (time.perf_counter_ns() - t0) / n)
+    return best
+
+
+def calibration(n):
+    """Fixed interpreter workload: string, dict and list operations, like the cases."""
+    for _ in range(n):
+        d = {"a": 1, "b": "Grip"}
+        s = " ".join([d["b"]] * 4)
+        _ = s.lower().split()
+
+
+# ---------- cases ----------
+
+def case_role_confusion(n):
+    for _ in range(n):
+        fix_role_confusion(REPLY)
+
+
+def case_pacing(n):
+    for _ in range(n):
+        apply_natural_pacing(REPLY)
+
+
+REPLY_TOKENS = [word + " " for word in REPLY.split()]
+
+
+def case_reply_stream(n):
+    for _ in range(n):
+        chunker, reply_filter = SentenceChunker(), IncrementalReplyFilter()
+        for token in REPLY_TOKENS:
+            for sentence in chunker.feed(token):
+                reply_filter.process(sentence)
+        for sentence in chunker.flush():
+            reply_filter.process(sentence, last=True)
+
+
+def make_context() -> ConversationContext:
+    context = ConversationContext()
+    context.summary = ("Customer plays most weekends and doubles with neighbours; likes the grip and bag; "
+                       "one paddle chipped.")
+    context.recent = [Turn(said, REPLY) for said, _ in CALL[:context.recent_turns]]
+    return context
+
+
+def case_prompt(n):
+    context = make_context()
+    state = {"turn_count": 5, "topics_covered": ["grip", "durability"], "customer_sentiment": "positive"}
+    for _ in range(n):
+        context.build_prompt(CALL[4][0], state)
+
+
+def case_keyword_state(n):
+    classifier = get_classifier()
+    utterances = [said for said, _ in CALL]
+    for i in range(n):
+        classifier.update({"topics_covered": [], "customer_sentiment": "neutral"}, utterances[i % len(utterances)])
+
+
+AUDIO_PACKET = json.dumps({
+    "audio": base64.b64encode(bytes(bytes_per_second(OUTPUT_FORMAT) // 10)).decode(),
+    "isFinal": None, "normalizedAlignment": None,
+})
+
+
+def case_audio_decode(n):
+    for _ in range(n):
+        parse_audio_message(AUDIO_PACKET)
+
+
+PCM_READS = [bytes(4096)] * 100  # ffmpeg stdout pipe reads
+
+
+def case_pcm_framing(n):
+    ring = PCMRingBuffer(FRAME_BYTES, capacity_frames=128)
+    frames = 0
+    while frames < n:
+        for chunk in PCM_READS:
+            ring.write(chunk)
+            view = ring.peek()
+            while view is not None:
+                frames += len(view) // FRAME_BYTES
+                ring.release(view)
+                view = ring.peek()
+    return frames
+
+
+CASES = {
+    "role_confusion": (case_role_confusion, "reply"),
+    "pacing": (case_pacing, "reply"),
+    "reply_stream": (case_reply_stream, "reply"),
+    "prompt": (case_prompt, "prompt"),
+    "keyword_state": (case_keyword_state, "utterance"),
+    "audio_decode": (case_audio_decode, "packet"),
+    "pcm_framing": (case_pcm_framing, "frame"),
+}
+
+
+# ---------- call replay (in-process fakes) ----------
+
+class FakeElevenLabsSocket:
+    """
+    Enough of an aiohttp ClientWebSocketResponse for TTSStream: every flushed
+    text yields 100 ms base64 packets (one per ~8 characters, like real speech
+    at the default format), the end marker yields isFinal.
+    """
+
+    def __init__(self):
+        import aiohttp
+        self._text = aiohttp.WSMsgType.TEXT
+        self._message = aiohttp.WSMessage
+        self._incoming: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+
+    async def send_json(self, data: dict):
+        text = data.get("text")
+        if text is None or text == " ":
+            return
+        if text == "":
+            self._incoming.put_nowait(self._message(self._text, '{"audio": null, "isFinal": true}', None))
+            return
+        for _ in range(max(1, len(text) // 8)):
+            self._incoming.put_nowait(self._message(self._text, AUDIO_PACKET, None))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.closed:
+            raise StopAsyncIteration
+        return await self._incoming.get()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeCaller:
+    """
+    The caller's end of the FastAPI WebSocket: plays the queued utterances,
+    then hangs up; records what the server sends.
+    """
+
+    class _State:
+        name = "CONNECTED"
+
+    def __init__(self, utterances, query_params=None):
+        self.query_params = query_params or {}
+        self.application_state = self.client_state = self._State()
+        self._incoming = [{"type": "websocket.receive", "bytes": blob} for blob in utterances]
+        self._incoming.append({"type": "websocket.disconnect"})
+        self.sent_json = []
+        self.audio_bytes = 0
+
+    async def accept(self):
+        pass
+
+    async def receive(self) -> dict:
+        await asyncio.sleep(0)
+        return self._incoming.pop(0)
+
+    async def send_json(self, data: dict):
+        self.sent_json.append(data)
+
+    async def send_bytes(self, data: bytes):
+        self.audio_bytes += len(data)
+
+    async def close(self):
+        pass
+
+
+def replay_setup():
+    """Swap the providers for in-process fakes. Returns replay(n_calls) or raises ImportError."""
+    import numpy as np
+    from app.api import agent_voice
+    from app.services import vad, tts_service, tts_cache, stt_router
+    from app.services.tts_service import TTSConnectionManager, TTSStream
+    from benchmarks.audio_fixtures import synth_pcm
+    from benchmarks.mock_services import MockLLM
+
+    class InProcessTTSManager(TTSConnectionManager):
+        async def _open(self, key, background=False):
+            self.counters["opened"] += 1
+            return TTSStream(FakeElevenLabsSocket(), key)
+
+    async def transcribe(audio_bytes: bytes):
+        said = transcripts.pop(0)
+        return {"text": said, "upload_time": 0, "processing_time": 0, "total_time": 0,
+                "audio_duration": len(audio_bytes) / 32000}
+
+    async def decode_pcm16(audio_bytes: bytes, sample_rate: int = vad.SAMPLE_RATE):
+        return np.frombuffer(audio_bytes, dtype=np.int16)  # the "recording" is PCM already
+
+    async def encode_webm(pcm, sample_rate: int = vad.SAMPLE_RATE):
+        return pcm.tobytes()
+
+    tts_service._manager = InProcessTTSManager(api_key="fake")
+    tts_cache._cache = tts_cache.TTSCache(manager=tts_service._manager, cache_dir=None)
+    vad.decode_pcm16, vad.encode_webm = decode_pcm16, encode_webm
+    stt_router._router = stt_router.STTRouter([stt_router.STTBackend("scripted", transcribe)])
+    agent_voice.llm = MockLLM(base_ms=0, ms_per_1k_tokens=0, token_ms=0, summary_ms=0)
+    recordings = [synth_pcm([("silence", 0.3), ("speech", seconds), ("silence", 0.3)]) for _, seconds in CALL]
+    transcripts = []
+
+    async def replay(n_calls: int):
+        for _ in range(n_calls):
+            random.seed(0)  # MockLLM picks its replies at random
+            transcripts[:] = [said for said, _ in CALL]
+            caller = FakeCaller(recordings)
+            await agent_voice.agent_voice(caller)
+            replies = [m for m in caller.sent_json if "metrics" in m]
+            if len(replies) != len(CALL):
+                raise RuntimeError(f"replay finished {len(replies)} of {len(CALL)} turns: {caller.sent_json[-1]}")
+
+    return replay
+
+
+def run_replay(repeat: int) -> float:
+    """ns per turn of a replayed call."""
+    replay = replay_setup()
+
+    async def main():
+        await replay(2)  # warm up: TTS cache, backchannel clips, warm sockets
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter_ns()
+            await replay(5)
+            best = min(best, (time.perf_counter_ns() - t0) / (5 * len(CALL)))
+        return best
+
+    return asyncio.run(main())
+
+
+# ---------- report / baseline ----------
+
+def run_all(names, repeat: int) -> dict:
+    results = {}
+    for name in names:
+        if name == "call_replay":
+            try:
+                results[name] = {"ns": run_replay(repeat), "unit": "turn"}
+            except ImportError as e:
+                print(f"  call_replay skipped: {e}")
+            continue
+        run, unit = CASES[name]
+        results[name] = {"ns": ns_per_op(run, repeat), "unit": unit}
+    return results
+
+
+def slower(results: dict, baseline: dict, scale: float, threshold: float) -> list:
+    """Cases more than threshold slower than the (scaled) baseline."""
+    return [name for name, result in results.items() if name in baseline["cases"]
+            and result["ns"] / (baseline["cases"][name]["ns"] * scale) - 1 > threshold]
+
+
+def compare(results: dict, scale: float, baseline: dict, threshold: float) -> list:
+    regressions = []
+    print(f"{'case':>15} | {'now':>18} | {'baseline':>12} | {'change':>7}")
+    for name, result in results.items():
+        now = f"{format_ns(result['ns'])}/{result['unit']}"
+        base = baseline["cases"].get(name)
+        if base is None:
+            print(f"{name:>15} | {now:>18} | {'-':>12} | {'new':>7}")
+            continue
+        change = result["ns"] / (base["ns"] * scale) - 1
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{name:>15} | {now:>18} | {format_ns(base['ns'] * scale):>12} | {change * 100:>+6.1f}%{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def format_ns(ns: float) -> str:
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f} ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f} us"
+    return f"{ns:.0f} ns"
+
+
+def main():
+    names = list(CASES) + ["call_replay"]
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=names, help="run just these cases")
+    parser.add_argument("--repeat", type=int, default=9)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%")
+    parser.add_argument("--confirm", type=int, default=2, help="re-runs of a case before it counts as a regression")
+    parser.add_argument("--no-normalize", dest="normalize", action="store_false",
+                        help="compare raw timings (same machine only)")
+    args = parser.parse_args()
+
+    calibration_ns = ns_per_op(calibration, args.repeat)
+    results = run_all(args.only or names, args.repeat)
+    calibration_ns = min(calibration_ns, ns_per_op(calibration, args.repeat))  # before and after: the quieter one
+
+    if args.save:
+        baseline = {"calibration_ns": calibration_ns, "cases": {}}
+        if args.only and os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)  # keep the other cases, re-scaled to this machine
+            scale = calibration_ns / baseline["calibration_ns"]
+            baseline["cases"] = {name: {**r, "ns": r["ns"] * scale} for name, r in baseline["cases"].items()}
+            baseline["calibration_ns"] = calibration_ns
+        baseline["machine"] = f"{platform.machine()} / Python {platform.python_version()}"
+        baseline["cases"].update({name: {"ns": round(r["ns"], 1), "unit": r["unit"]} for name, r in results.items()})
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        for name, r in results.items():
+            print(f"{name:>15} | {format_ns(r['ns'])}/{r['unit']}")
+        print(f"baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        for name, r in results.items():
+            print(f"{name:>15} | {format_ns(r['ns'])}/{r['unit']}")
+        print(f"no baseline at {args.baseline} - record one with --save")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    scale = calibration_ns / baseline["calibration_ns"] if args.normalize else 1.0
+    # a noisy neighbour can make any one run slow: a regression has to show up again
+    for _ in range(args.confirm):
+        suspects = slower(results, baseline, scale, args.threshold)
+        if not suspects:
+            break
+        for name, rerun in run_all(suspects, args.repeat).items():
+            results[name]["ns"] = min(results[name]["ns"], rerun["ns"])
+    regressions = compare(results, scale, baseline, args.threshold)
+    if args.normalize:
+        print(f"(baseline scaled by {scale:.2f}: calibration loop {calibration_ns:.0f} ns now, "
+              f"{baseline['calibration_ns']:.0f} ns when recorded on {baseline.get('machine', '?')})")
+    if regressions:
+        print(f"{len(regressions)} case(s) more than {args.threshold * 100:.0f}% slower than the baseline: "
+              f"{', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
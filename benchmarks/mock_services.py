@@ -0,0 +1,496 @@
+# Local stand-ins for the external providers, so benchmarks run offline.
+# Each create_*_app() returns an aiohttp.web.Application; start_app() runs it
+# on the current loop and start_app_in_thread() runs it on a background loop.
+# MockLLM and ScriptedStreamingSTT are in-process stand-ins (no HTTP).
+import json
+import time
+import uuid
+import base64
+import random
+import asyncio
+import threading
+from array import array
+
+import aiohttp
+from aiohttp import web
+
+
+def _delay(base_ms: float, jitter_ms: float) -> float:
+    """Seconds to wait for a simulated provider call."""
+    return max(0.0, base_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000
+
+
+async def start_app(app: web.Application, host: str = "127.0.0.1", port: int = 0):
+    """Start an app on a free port. Returns (runner, base_url); call runner.cleanup() when done."""
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{port}"
+
+
+def start_app_in_thread(app: web.Application, host: str = "127.0.0.1", port: int = 0):
+    """
+    Run an app on its own event loop in a daemon thread, so code that blocks
+    the caller's loop (e.g. the old requests-based STT) can still reach it.
+    Returns (base_url, stop).
+    """
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    state = {}
+
+    def _run():
+        asyncio.set_event_loop(loop)
+        state["runner"], state["base_url"] = loop.run_until_complete(start_app(app, host, port))
+        ready.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=_run, daemon=True)
+    thread.start()
+    ready.wait()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(state["runner"].cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=2)
+
+    return state["base_url"], stop
+
+
+# ---------- AssemblyAI (batch) ----------
+
+def create_assemblyai_app(
+    processing_ms: float = 500,
+    jitter_ms: float = 0,
+    upload_ms: float = 20,
+    transcript_text: str = "It's been really great actually, the grip is so comfortable.",
+    webhook_delay_ms: float = 5,
+    max_active: int = 0,
+    stall_rate: float = 0,
+    stall_ms: float = 5000,
+    error_rate: float = 0,
+    upload_kbps: float = 0,
+) -> web.Application:
+    """
+    Mock of the AssemblyAI batch API:
+      POST /v2/upload            -> {"upload_url": ...}
+      POST /v2/transcript        -> {"id": ..., "status": "queued"}
+      GET  /v2/transcript/{id}   -> "processing" until processing_ms has passed, then "completed"
+
+    If the submit payload has a webhook_url, the mock POSTs
+    {"transcript_id", "status"} to it (webhook_delay_ms after completion),
+    with the webhook_auth_header_name/value header when given.
+
+    With max_active > 0, a submit while that many transcripts are still
+    processing gets 429 + Retry-After, like a plan's concurrency limit.
+
+    Uploads take upload_ms after the last byte, plus the body's transfer
+    time at upload_kbps if set (0 = instant). A chunked upload is read as it
+    arrives, so its transfer time overlaps the sender producing it.
+
+    Faults: stall_rate of the transcripts take stall_ms longer, error_rate of
+    the submits fail with 500. Both can be changed while it runs through
+    app["faults"] (e.g. an outage from second 10 to 20).
+    """
+    faults = {"stall_rate": stall_rate, "stall_ms": stall_ms, "error_rate": error_rate}
+    transcripts = {}
+    stats = {"uploads": 0, "submits": 0, "polls": 0, "callbacks": 0, "throttled": 0, "stalled": 0, "errors": 0}
+
+    async def fire_callback(app: web.Application, transcript_id: str, payload: dict, ready_at: float):
+        await asyncio.sleep(max(0.0, ready_at - time.monotonic()) + webhook_delay_ms / 1000)
+        headers = {}
+        if payload.get("webhook_auth_header_name"):
+            headers[payload["webhook_auth_header_name"]] = payload.get("webhook_auth_header_value", "")
+        try:
+            async with app["http"].post(
+                payload["webhook_url"],
+                json={"transcript_id": transcript_id, "status": "completed"},
+                headers=headers,
+            ) as resp:
+                await resp.read()
+            stats["callbacks"] += 1
+        except aiohttp.ClientError:
+            pass  # a lost callback is exactly what the polling fallback is for
+
+    async def upload(request: web.Request):
+        size = 0
+        async for chunk in request.content.iter_any():
+            size += len(chunk)
+            if upload_kbps:
+                await asyncio.sleep(len(chunk) * 8 / (upload_kbps * 1000))
+        stats["uploads"] += 1
+        await asyncio.sleep(_delay(upload_ms, 0))
+        return web.json_response({"upload_url": f"mock://upload/{uuid.uuid4().hex}", "size": size})
+
+    async def submit(request: web.Request):
+        payload = await request.json()
+        stats["submits"] += 1
+        if max_active:
+            now = time.monotonic()
+            if sum(1 for t in transcripts.values() if t["ready_at"] > now) >= max_active:
+                stats["throttled"] += 1
+                return web.json_response({"error": "Too many concurrent transcriptions"}, status=429,
+                                         headers={"Retry-After": "1"})
+        if random.random() < faults["error_rate"]:
+            stats["errors"] += 1
+            return web.json_response({"error": "Internal server error"}, status=500)
+        transcript_id = uuid.uuid4().hex
+        ready_at = time.monotonic() + _delay(processing_ms, jitter_ms)
+        if random.random() < faults["stall_rate"]:
+            stats["stalled"] += 1
+            ready_at += faults["stall_ms"] / 1000
+        transcripts[transcript_id] = {"ready_at": ready_at, "payload": payload}
+        if payload.get("webhook_url"):
+            asyncio.ensure_future(fire_callback(request.app, transcript_id, payload, ready_at))
+        return web.json_response({"id": transcript_id, "status": "queued"})
+
+    async def poll(request: web.Request):
+        stats["polls"] += 1
+        transcript_id = request.match_info["transcript_id"]
+        entry = transcripts.get(transcript_id)
+        if entry is None:
+            return web.json_response({"error": "not found"}, status=404)
+        if time.monotonic() < entry["ready_at"]:
+            return web.json_response({"id": transcript_id, "status": "processing"})
+        return web.json_response({
+            "id": transcript_id,
+            "status": "completed",
+            "text": transcript_text,
+            "audio_duration": 2.5,
+        })
+
+    async def open_http(app):
+        app["http"] = aiohttp.ClientSession()
+
+    async def close_http(app):
+        await app["http"].close()
+
+    app = web.Application(client_max_size=50 * 1024 * 1024)
+    app.on_startup.append(open_http)
+    app.on_cleanup.append(close_http)
+    app["stats"] = stats
+    app["faults"] = faults
+    app["transcripts"] = transcripts
+    app.router.add_post("/v2/upload", upload)
+    app.router.add_post("/v2/transcript", submit)
+    app.router.add_get("/v2/transcript/{transcript_id}", poll)
+    return app
+
+
+# ---------- ElevenLabs stream-input TTS ----------
+
+def create_elevenlabs_app(
+    handshake_ms: float = 150,
+    first_audio_ms: float = 120,
+    jitter_ms: float = 0,
+    chunk_bytes: int = 4096,
+    chunks_per_flush: int = 6,
+    chunk_interval_ms: float = 20,
+    idle_timeout_s: float = 180,
+    packet_ms: float = 0,
+    alignment: bool = False,
+) -> web.Application:
+    """
+    Mock of wss://api.elevenlabs.io/v1/text-to-speech/{voice}/stream-input.
+
+    handshake_ms is paid before the WebSocket upgrade (stands in for TCP + TLS +
+    upgrade to the real API). After the init frame, every flush (or the end
+    marker) produces chunks_per_flush base64 audio packets; the end marker is
+    followed by {"isFinal": true} and a close, like the real service.
+
+    With packet_ms set, each packet carries packet_ms of audio at the bitrate
+    of the requested ?output_format= instead of chunk_bytes. alignment=True
+    adds per-character normalizedAlignment like the real packets.
+    """
+    stats = {"connections": 0, "utterances": 0, "audio_packets": 0}
+
+    def packet_json(output_format: str) -> str:
+        size = chunk_bytes
+        if packet_ms:
+            from app.services.tts_service import bytes_per_second
+            size = bytes_per_second(output_format) * int(packet_ms) // 1000
+        packet = {"audio": base64.b64encode(bytes(size)).decode(), "isFinal": None, "normalizedAlignment": None}
+        if alignment:
+            n_chars = max(1, int((packet_ms or 200) / 70))  # ~70 ms per character of speech
+            packet["normalizedAlignment"] = {
+                "chars": list("hello there"[:n_chars].ljust(n_chars)),
+                "charStartTimesMs": [i * 70 for i in range(n_chars)],
+                "charDurationsMs": [70] * n_chars,
+            }
+        return json.dumps(packet)
+
+    async def stream_input(request: web.Request):
+        packet = packet_json(request.query.get("output_format", "mp3_44100_128"))
+        await asyncio.sleep(_delay(handshake_ms, jitter_ms))
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        stats["connections"] += 1
+
+        async def emit_audio():
+            await asyncio.sleep(_delay(first_audio_ms, jitter_ms))
+            for _ in range(chunks_per_flush):
+                try:
+                    await ws.send_str(packet)
+                except ConnectionError:
+                    return  # the client hung up mid-utterance
+                stats["audio_packets"] += 1
+                await asyncio.sleep(chunk_interval_ms / 1000)
+
+        initialized = False
+        pending_text = ""
+        while True:
+            try:
+                msg = await ws.receive(timeout=idle_timeout_s)
+            except asyncio.TimeoutError:
+                break  # inactivity timeout, like the real API
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                break
+            data = json.loads(msg.data)
+            text = data.get("text")
+            if not initialized:
+                initialized = True  # init frame: " " + settings
+                continue
+            if text == "":
+                if pending_text.strip():
+                    await emit_audio()
+                stats["utterances"] += 1
+                await ws.send_str(json.dumps({"audio": None, "isFinal": True}))
+                break
+            pending_text += text or ""
+            if data.get("flush") and pending_text.strip():
+                pending_text = ""
+                await emit_audio()
+
+        await ws.close()
+        return ws
+
+    app = web.Application()
+    app["stats"] = stats
+    app.router.add_get("/v1/text-to-speech/{voice_id}/stream-input", stream_input)
+    return app
+
+
+# ---------- AssemblyAI streaming (v3 WebSocket) ----------
+
+def create_assemblyai_streaming_app(
+    transcripts=None,
+    silence_ms: float = 600,
+    finalize_ms: float = 150,
+    interim_every_ms: float = 300,
+    energy_threshold: float = 500,
+) -> web.Application:
+    """
+    Mock of wss://streaming.assemblyai.com/v3/ws (pcm_s16le input).
+
+    A crude energy detector stands in for the real model: a run of loud
+    frames is speech, and once `silence_ms` of quiet follows it the mock
+    sends a final Turn (end_of_turn=true) with the next scripted transcript,
+    `finalize_ms` later. While speech is going on it sends interim Turns with
+    a growing prefix of that transcript every `interim_every_ms`.
+    """
+    transcripts = transcripts or [
+        "Oh hi yeah sure I have a few minutes",
+        "It's been really great actually the grip is so comfortable",
+        "The paddles feel durable and my game has improved",
+    ]
+    stats = {"sessions": 0, "frames": 0, "turns": 0, "interims": 0}
+
+    async def streaming(request: web.Request):
+        sample_rate = int(request.query.get("sample_rate", 16000))
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        stats["sessions"] += 1
+        await ws.send_str(json.dumps({"type": "Begin", "id": uuid.uuid4().hex}))
+
+        turn_index = 0
+        speech_ms = 0.0
+        silence_run_ms = 0.0
+        since_interim_ms = 0.0
+
+        async for msg in ws:
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                if json.loads(msg.data).get("type") == "Terminate":
+                    await ws.send_str(json.dumps({"type": "Termination"}))
+                    break
+                continue
+            if msg.type != aiohttp.WSMsgType.BINARY:
+                break
+
+            stats["frames"] += 1
+            samples = array("h", msg.data[: len(msg.data) // 2 * 2])
+            frame_ms = len(samples) * 1000 / sample_rate
+            rms = (sum(s * s for s in samples) / max(1, len(samples))) ** 0.5
+            words = transcripts[turn_index % len(transcripts)].split()
+
+            if rms >= energy_threshold:
+                speech_ms += frame_ms
+                silence_run_ms = 0.0
+                since_interim_ms += frame_ms
+                if since_interim_ms >= interim_every_ms:
+                    since_interim_ms = 0.0
+                    n = min(len(words), max(1, int(speech_ms / 250)))
+                    stats["interims"] += 1
+                    await ws.send_str(json.dumps({
+                        "type": "Turn", "turn_order": turn_index,
+                        "transcript": " ".join(words[:n]), "end_of_turn": False,
+                    }))
+            elif speech_ms > 0:
+                silence_run_ms += frame_ms
+                if silence_run_ms >= silence_ms:
+                    await asyncio.sleep(finalize_ms / 1000)
+                    stats["turns"] += 1
+                    await ws.send_str(json.dumps({
+                        "type": "Turn", "turn_order": turn_index,
+                        "transcript": " ".join(words), "end_of_turn": True,
+                    }))
+                    turn_index += 1
+                    speech_ms = silence_run_ms = since_interim_ms = 0.0
+
+        await ws.close()
+        return ws
+
+    app = web.Application()
+    app["stats"] = stats
+    app.router.add_get("/v3/ws", streaming)
+    return app
+
+
+# ---------- LLM (in-process) ----------
+
+class MockRateLimited(Exception):
+    """What the Gemini client raises when over quota (google-api-core's ResourceExhausted has code 429)."""
+
+    code = 429
+
+
+class MockLLM:
+    """
+    Stand-in for the LangChain chat model: astream() waits base_ms (+/- jitter_ms)
+    plus ms_per_1k_tokens of "prefill" (so bigger prompts are slower), then yields
+    a scripted reply word by word every token_ms. ainvoke() returns a short
+    summary after summary_ms. Counts calls and how many were cancelled.
+
+    With max_concurrent > 0, a stream started while that many are running
+    fails with MockRateLimited before its first token.
+    """
+
+    def __init__(self, base_ms: float = 250, ms_per_1k_tokens: float = 300, token_ms: float = 15,
+                 summary_ms: float = 400, replies=None, jitter_ms: float = 0, max_concurrent: int = 0):
+        self.base_ms = base_ms
+        self.jitter_ms = jitter_ms
+        self.ms_per_1k = ms_per_1k_tokens
+        self.token_ms = token_ms
+        self.summary_ms = summary_ms
+        self.replies = replies or [
+            "Oh that's wonderful to hear! What do you love most about the set?",
+            "I'm so glad the grip is working for you! Has it helped your game at all?",
+            "Oh no, I'm sorry about the chipping. Which paddle was it, and how often do you play?",
+            "That's lovely! Do the kids find the paddles easy to handle?",
+            "Thanks for telling me about the balls. What kind of court do you usually play on?",
+        ]
+        self.max_concurrent = max_concurrent
+        self.active = 0
+        self.stats = {"calls": 0, "cancelled": 0, "summaries": 0, "rate_limited": 0}
+
+    def first_token_ms(self, prompt_text: str) -> float:
+        return _delay(self.base_ms, self.jitter_ms) * 1000 + self.ms_per_1k * len(prompt_text) / 4 / 1000
+
+    async def astream(self, prompt_text: str):
+        self.stats["calls"] += 1
+        if self.max_concurrent and self.active >= self.max_concurrent:
+            self.stats["rate_limited"] += 1
+            raise MockRateLimited("429 Resource has been exhausted")
+        self.active += 1
+        try:
+            await asyncio.sleep(self.first_token_ms(prompt_text) / 1000)
+            for i, word in enumerate(random.choice(self.replies).split()):
+                if i:
+                    await asyncio.sleep(self.token_ms / 1000)
+                yield word + " "
+        except (asyncio.CancelledError, GeneratorExit):
+            self.stats["cancelled"] += 1
+            raise
+        finally:
+            self.active -= 1
+
+    async def ainvoke(self, prompt_text: str):
+        self.stats["summaries"] += 1
+        await asyncio.sleep((self.summary_ms + self.first_token_ms(prompt_text) - self.base_ms) / 1000)
+        return "Customer plays most weekends and doubles with neighbours; likes the grip and bag; " \
+               "one paddle chipped; balls too bouncy on concrete; Sarah already asked about grip and court."
+
+
+# ---------- AssemblyAI streaming transcripts (in-process, no audio) ----------
+
+class ScriptedStreamingSTT:
+    """
+    Transcript events of a streaming STT session without audio or ffmpeg:
+    same on_interim / get_final_turn surface as AsyncAAIStreamingSTT.
+
+    speak() plays one utterance: a word every word_ms, an interim every
+    interim_every_ms, an optional pause after `pause_after` words (the
+    customer thinking mid-sentence), and the final transcript endpoint_ms
+    after the last word - optionally revised (`final_text`).
+    """
+
+    def __init__(self, word_ms: float = 250, interim_every_ms: float = 250, endpoint_ms: float = 750,
+                 on_interim=None):
+        self.word_ms = word_ms
+        self.interim_every_ms = interim_every_ms
+        self.endpoint_ms = endpoint_ms
+        self.on_interim = on_interim
+        self._final_turn_q: "asyncio.Queue[str]" = asyncio.Queue()
+
+    async def speak(self, text: str, pause_after: int = 0, pause_ms: float = 0, final_text: str = None):
+        words = text.split()
+        spoken, since_interim = 0, 0.0
+        while spoken < len(words):
+            await asyncio.sleep(self.word_ms / 1000)
+            spoken += 1
+            since_interim += self.word_ms
+            if since_interim >= self.interim_every_ms or spoken == len(words):
+                since_interim = 0.0
+                if self.on_interim:
+                    self.on_interim(" ".join(words[:spoken]))
+            if spoken == pause_after and pause_ms:
+                await asyncio.sleep(pause_ms / 1000)
+        await asyncio.sleep(self.endpoint_ms / 1000)
+        self._final_turn_q.put_nowait(final_text or text)
+        return time.perf_counter()  # when the final transcript was delivered
+
+    async def get_final_turn(self, timeout: float = 5.0):
+        try:
+            return await asyncio.wait_for(self._final_turn_q.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+MOCKS = {
+    "assemblyai": create_assemblyai_app,
+    "assemblyai-streaming": create_assemblyai_streaming_app,
+    "elevenlabs": create_elevenlabs_app,
+}
+
+
+if __name__ == "__main__":
+    # Run one mock as its own process, e.g. so a benchmark's RSS/CPU numbers don't include it:
+    #   python -m benchmarks.mock_services assemblyai-streaming --port 8765
+    #   python -m benchmarks.mock_services assemblyai --set processing_ms=800 --set jitter_ms=200
+    import argparse
+
+    def option(text: str):
+        key, _, value = text.partition("=")
+        try:
+            return key, json.loads(value)
+        except ValueError:
+            return key, value
+
+    parser = argparse.ArgumentParser(description="Run a local provider stand-in")
+    parser.add_argument("mock", choices=sorted(MOCKS))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--set", type=option, action="append", default=[], metavar="KEY=VALUE",
+                        help="keyword argument for the mock's create_*_app(), e.g. jitter_ms=50")
+    args = parser.parse_args()
+    web.run_app(MOCKS[args.mock](**dict(args.set)), host=args.host, port=args.port, access_log=None, print=None)
@@ -9,15 +9,40 @@ class VoiceReviewCollector {
         this.callDurationInterval = null;
         this.audioChunks = [];
         
+        // Continuous streaming mode: one MediaRecorder for the whole call, sending timesliced chunks
+        this.streamingMode = false;
+        this.streamingTimeslice = 250; // ms per chunk
+        this.utteranceTimeslice = 250; // batch mode: ms per chunk of an utterance
+        this.sendQueue = Promise.resolve();
+        
         // Global AudioContext - will be created on user interaction for macOS compatibility
         this.audioContext = null;
         this.audioQueue = Promise.resolve();
         
+        // Voice audio format negotiated with the server (?audio=...), confirmed by its audio_format message
+        this.playbackFormat = 'mp3_44100_128';
+        this.pcmPlayhead = 0; // AudioContext time where the next PCM frame starts
+        
         // Audio buffering for streaming chunks
         this.currentAudioChunks = [];
         this.isReceivingAudio = false;
         this.audioTimeoutId = null;
         
+        // Barge-in: talking over the agent stops its audio and tells the server to cancel the reply
+        this.currentAudio = null;          // HTML5 Audio element playing right now
+        this.stopCurrentAudio = null;      // settles the playback promise of currentAudio
+        this.pcmSources = [];              // scheduled PCM frames
+        this.playbackGeneration = 0;       // bumped on interrupt so queued playback is dropped
+        this.discardAudio = false;         // drop frames of the cancelled reply until the server acks
+        this.replyAudioStartedAt = null;   // when the caller started hearing this reply
+        
+        // Resume: a dropped socket reconnects with ?resume=<token> and the call carries on
+        this.resumeToken = null;
+        this.reconnectAttempts = 0;
+        this.maxReconnectAttempts = 3;
+        this.endingCall = false;
+        this.queuePosition = null;         // set while the server has us waiting for a free line
+        
         // Statistics
         this.stats = {
             totalCalls: 0,
@@ -29,17 +54,31 @@ class VoiceReviewCollector {
         this.metrics = {
             sttTime: 0,
             sttUploadTime: 0,
+            sttUploadHiddenTime: 0,
             sttProcessingTime: 0,
             llmTime: 0,
+            llmFirstTokenTime: 0,
+            promptTokens: 0,
+            speculation: '',
+            speculationHeadStart: 0,
+            interrupted: false,
+            bargeInCancelMs: 0,
+            bargeInTimeSavedMs: 0,
             ttsTime: 0,
+            ttsFirstAudioTime: 0,
             totalResponseTime: 0,
+            perceivedLatency: 0,
+            actualLatency: 0,
+            backchannelPlayed: false,
             audioLength: 0,
             audioFormat: '',
             responseLength: 0,
             turnCount: 0,
             audioChunks: 0,
             wsLatency: 0,
-            efficiencyRatio: 0
+            efficiencyRatio: 0,
+            vadBytesSaved: 0,
+            vadSttMsSaved: 0
         };
         
         this.initializeElements();
@@ -53,6 +92,8 @@ class VoiceReviewCollector {
         this.recordBtn = document.getElementById('recordBtn');
         this.endCallBtn = document.getElementById('endCallBtn');
         this.clearBtn = document.getElementById('clearConversation');
+        this.streamingModeToggle = document.getElementById('streamingModeToggle');
+        this.audioFormatSelect = document.getElementById('audioFormatSelect');
         
         // Status elements
         this.connectionStatus = document.getElementById('connectionStatus');
@@ -68,10 +109,18 @@ class VoiceReviewCollector {
         this.debugContent = document.getElementById('debugContent');
         this.sttTimeEl = document.getElementById('sttTime');
         this.sttUploadTimeEl = document.getElementById('sttUploadTime');
+        this.sttUploadHiddenTimeEl = document.getElementById('sttUploadHiddenTime');
         this.sttProcessingTimeEl = document.getElementById('sttProcessingTime');
         this.llmTimeEl = document.getElementById('llmTime');
+        this.llmFirstTokenTimeEl = document.getElementById('llmFirstTokenTime');
+        this.promptTokensEl = document.getElementById('promptTokens');
+        this.speculationEl = document.getElementById('speculation');
+        this.bargeInEl = document.getElementById('bargeIn');
         this.ttsTimeEl = document.getElementById('ttsTime');
+        this.ttsFirstAudioTimeEl = document.getElementById('ttsFirstAudioTime');
         this.totalResponseEl = document.getElementById('totalResponse');
+        this.perceivedLatencyEl = document.getElementById('perceivedLatency');
+        this.actualLatencyEl = document.getElementById('actualLatency');
         this.audioLengthEl = document.getElementById('audioLength');
         this.audioFormatEl = document.getElementById('audioFormat');
         this.responseLengthEl = document.getElementById('responseLength');
@@ -80,6 +129,8 @@ class VoiceReviewCollector {
         this.wsLatencyEl = document.getElementById('wsLatency');
         this.connectionHealthEl = document.getElementById('connectionHealth');
         this.efficiencyRatioEl = document.getElementById('efficiencyRatio');
+        this.vadBytesSavedEl = document.getElementById('vadBytesSaved');
+        this.vadSttMsSavedEl = document.getElementById('vadSttMsSaved');
         
         // Initialize debug panel
         this.updateMetrics();
@@ -132,50 +183,15 @@ class VoiceReviewCollector {
                 }
             });
             
-            // Connect to WebSocket
-            this.ws = new WebSocket('ws://localhost:8000/api/agent/voice');
-            
-            this.ws.onopen = () => {
-                this.isConnected = true;
-                this.updateConnectionStatus(true);
-                this.startCallBtn.disabled = true;
-                this.recordBtn.disabled = false;
-                this.endCallBtn.disabled = false;
-                this.instructions.style.display = 'none'; // Hide instructions during call
-                this.connectionHealthEl.textContent = 'Connected';
-                this.connectionHealthEl.className = 'metric-value good';
-                this.connectionStatus.textContent = 'Connected';
-                this.navStatus.classList.add('connected');
-                this.navStatus.querySelector('span').textContent = 'Connected';
-                this.callStartTime = Date.now();
-                this.startCallDurationTimer();
-                this.showToast('Connected! Click to talk or press Spacebar to start recording.', 'success');
-                this.stats.totalCalls++;
-                this.metrics.turnCount = 0; // Reset turn count for new call
-                this.updateStats();
-                this.updateMetrics();
-            };
-            
-            this.ws.onmessage = (event) => {
-                if (typeof event.data === 'string') {
-                    // Text message with conversation data
-                    const data = JSON.parse(event.data);
-                    this.handleConversationMessage(data);
-                } else {
-                    // Binary audio data - buffer streaming chunks
-                    this.handleAudioChunk(event.data);
-                }
-            };
-            
-            this.ws.onclose = () => {
-                this.handleDisconnection();
-            };
-            
-            this.ws.onerror = (error) => {
-                console.error('WebSocket error:', error);
-                this.showToast('Connection error. Please try again.', 'error');
-                this.handleDisconnection();
-            };
+            // Connect to WebSocket (streaming mode is chosen per connection)
+            this.streamingMode = this.streamingModeToggle.checked;
+            this.streamingModeToggle.disabled = true;
+            this.audioFormatSelect.disabled = true;
+            this.resumeToken = null;
+            this.reconnectAttempts = 0;
+            this.endingCall = false;
+            this.queuePosition = null;
+            this.openSocket();
             
         } catch (error) {
             console.error('Error starting call:', error);
@@ -183,7 +199,86 @@ class VoiceReviewCollector {
         }
     }
     
+    openSocket() {
+        const params = new URLSearchParams({ audio: this.audioFormatSelect.value });
+        if (this.streamingMode) params.set('mode', 'streaming');
+        if (this.resumeToken) params.set('resume', this.resumeToken);
+        const resuming = !!this.resumeToken;
+        this.ws = new WebSocket(`ws://localhost:8000/api/agent/voice?${params}`);
+        this.ws.binaryType = 'arraybuffer'; // PCM frames are played straight from the buffer
+        
+        this.ws.onopen = () => {
+            this.isConnected = true;
+            this.updateConnectionStatus(true);
+            this.recordBtn.disabled = false;
+            this.connectionHealthEl.textContent = 'Connected';
+            this.connectionHealthEl.className = 'metric-value good';
+            this.connectionStatus.textContent = 'Connected';
+            if (resuming) {
+                // same call, new socket: keep the timer, transcript and turn count
+                this.reconnectAttempts = 0;
+                this.showToast('Reconnected - picking the call up where it left off.', 'success');
+                return;
+            }
+            this.startCallBtn.disabled = true;
+            this.endCallBtn.disabled = false;
+            this.instructions.style.display = 'none'; // Hide instructions during call
+            this.navStatus.classList.add('connected');
+            this.navStatus.querySelector('span').textContent = 'Connected';
+            this.callStartTime = Date.now();
+            this.startCallDurationTimer();
+            this.showToast('Connected! Click to talk or press Spacebar to start recording.', 'success');
+            this.stats.totalCalls++;
+            this.metrics.turnCount = 0; // Reset turn count for new call
+            this.updateStats();
+            this.updateMetrics();
+        };
+        
+        this.ws.onmessage = (event) => {
+            if (typeof event.data === 'string') {
+                // Text message with conversation data
+                const data = JSON.parse(event.data);
+                this.handleConversationMessage(data);
+            } else {
+                // Binary audio data - buffer streaming chunks
+                this.handleAudioChunk(event.data);
+            }
+        };
+        
+        this.ws.onclose = () => {
+            if (this.ws !== null && !this.endingCall && this.tryReconnect()) return;
+            this.handleDisconnection();
+        };
+        
+        this.ws.onerror = (error) => {
+            console.error('WebSocket error:', error);
+            // onclose follows and decides whether to reconnect
+        };
+    }
+    
+    tryReconnect() {
+        // Only calls the server has already given a resume token can be picked up again
+        if (!this.resumeToken || this.reconnectAttempts >= this.maxReconnectAttempts) return false;
+        this.reconnectAttempts++;
+        this.isConnected = false;
+        this.recordBtn.disabled = true;
+        this.connectionHealthEl.textContent = 'Reconnecting';
+        this.connectionHealthEl.className = 'metric-value warning';
+        this.connectionStatus.textContent = 'Reconnecting...';
+        this.stopPlayback();
+        if (this.isRecording) this.stopRecording();
+        if (this.streamingMode && this.mediaRecorder && this.mediaRecorder.state !== 'inactive') {
+            // the new socket needs a fresh WebM stream (with its header)
+            this.mediaRecorder.stop();
+            this.mediaRecorder = null;
+        }
+        this.showToast(`Connection lost - reconnecting (${this.reconnectAttempts}/${this.maxReconnectAttempts})...`, 'info');
+        setTimeout(() => this.openSocket(), 500 * 2 ** (this.reconnectAttempts - 1));
+        return true;
+    }
+    
     endCall() {
+        this.endingCall = true;
         if (this.ws) {
             this.ws.close();
         }
@@ -197,6 +292,8 @@ class VoiceReviewCollector {
         this.startCallBtn.disabled = false;
         this.recordBtn.disabled = true;
         this.endCallBtn.disabled = true;
+        this.streamingModeToggle.disabled = false;
+        this.audioFormatSelect.disabled = false;
         this.instructions.style.display = 'block'; // Show instructions when disconnected
         this.recordingStatus.style.display = 'none'; // Hide recording status
         this.connectionHealthEl.textContent = 'Disconnected';
@@ -230,6 +327,11 @@ class VoiceReviewCollector {
     async startRecording() {
         if (!this.isConnected || this.isRecording) return;
         
+        // Talking over the agent: stop its voice now and cancel the rest of the reply
+        if (this.isAgentSpeaking()) {
+            this.interruptAgent();
+        }
+        
         try {
             this.isRecording = true;
             this.recordBtn.classList.add('recording');
@@ -237,6 +339,12 @@ class VoiceReviewCollector {
             this.recordingStatus.style.display = 'block';
             this.startAudioVisualizer();
             
+            // Streaming mode keeps one recorder for the call - just un-mute it
+            if (this.streamingMode && this.mediaRecorder && this.mediaRecorder.state === 'paused') {
+                this.mediaRecorder.resume();
+                return;
+            }
+            
             this.audioChunks = [];
             // Use WebM format (most widely supported by browsers)
             // We'll handle the conversion on the server side
@@ -263,14 +371,25 @@ class VoiceReviewCollector {
                 mimeType: mimeType
             });
             
+            if (this.streamingMode) {
+                this.startStreamingRecorder();
+                return;
+            }
+            
+            // Send the utterance in timeslices while the customer talks, between
+            // start/end markers: the server uploads it to STT as it arrives,
+            // so only the last slice is left to send when they stop
+            this.queueSend(JSON.stringify({ type: 'utterance_start' }));
             this.mediaRecorder.ondataavailable = (event) => {
                 if (event.data.size > 0) {
                     this.audioChunks.push(event.data);
+                    this.queueSend(event.data);
                 }
             };
             
             this.mediaRecorder.onstop = async () => {
-                // When recording stops, send the audio to server
+                // the last slice is queued by now: close the utterance
+                this.queueSend(JSON.stringify({ type: 'utterance_end' }));
                 const audioBlob = new Blob(this.audioChunks, { type: mimeType });
                 
                 // Calculate audio length
@@ -281,12 +400,10 @@ class VoiceReviewCollector {
                     this.updateMetrics();
                     URL.revokeObjectURL(audioUrl);
                 });
-                
-                this.sendAudioToServer(audioBlob);
             };
 
             
-            this.mediaRecorder.start();
+            this.mediaRecorder.start(this.utteranceTimeslice);
             
         } catch (error) {
             console.error('Error starting recording:', error);
@@ -295,6 +412,24 @@ class VoiceReviewCollector {
         }
     }
     
+    startStreamingRecorder() {
+        // Send each timeslice as soon as it's ready; the server's streaming STT
+        // decides where a turn ends, so there's no per-utterance stop/upload.
+        this.mediaRecorder.ondataavailable = (event) => {
+            if (event.data.size === 0) return;
+            this.queueSend(event.data);
+        };
+        this.mediaRecorder.start(this.streamingTimeslice);
+    }
+    
+    queueSend(data) {
+        // keep chunks (and the markers around them) in order even though arrayBuffer() is async
+        this.sendQueue = this.sendQueue.then(async () => {
+            if (!this.ws || this.ws.readyState !== WebSocket.OPEN) return;
+            this.ws.send(data instanceof Blob ? await data.arrayBuffer() : data);
+        }).catch(error => console.error('Error sending audio:', error));
+    }
+    
     stopRecording() {
         if (!this.isRecording) return;
         
@@ -304,26 +439,99 @@ class VoiceReviewCollector {
         this.recordingStatus.style.display = 'none';
         this.stopAudioVisualizer();
         
+        // Streaming mode: pause (mute) instead of stopping, so the WebM stream stays continuous
+        if (this.streamingMode) {
+            if (this.mediaRecorder && this.mediaRecorder.state === 'recording') {
+                this.mediaRecorder.pause();
+            }
+            return;
+        }
+        
         if (this.mediaRecorder && this.mediaRecorder.state !== 'inactive') {
             this.mediaRecorder.stop();
         }
     }
     
-    async sendAudioToServer(audioBlob) {
-        if (!this.ws || this.ws.readyState !== WebSocket.OPEN) return;
-        
-        try {
-            // Convert to ArrayBuffer and send
-            const arrayBuffer = await audioBlob.arrayBuffer();
-            this.ws.send(arrayBuffer);
-            
-        } catch (error) {
-            console.error('Error sending audio:', error);
-            this.showToast('Failed to send audio. Please try again.', 'error');
+    isAgentSpeaking() {
+        const pcmPlaying = this.audioContext && this.pcmPlayhead > this.audioContext.currentTime;
+        return !!(this.currentAudio || pcmPlaying || this.isReceivingAudio || this.currentAudioChunks.length);
+    }
+    
+    interruptAgent() {
+        const message = { type: 'interrupt' };
+        if (this.replyAudioStartedAt) {
+            message.played_ms = Date.now() - this.replyAudioStartedAt;
+        }
+        if (this.ws && this.ws.readyState === WebSocket.OPEN) {
+            this.ws.send(JSON.stringify(message));
+            this.discardAudio = true; // frames already in flight belong to the cancelled reply
+        }
+        this.stopPlayback();
+        console.log('Barge-in: agent interrupted', message);
+    }
+    
+    stopPlayback() {
+        this.playbackGeneration++;
+        clearTimeout(this.audioTimeoutId);
+        this.currentAudioChunks = [];
+        this.isReceivingAudio = false;
+        if (this.currentAudio) {
+            this.currentAudio.pause();
         }
+        if (this.stopCurrentAudio) {
+            this.stopCurrentAudio();
+        }
+        this.pcmSources.forEach(source => {
+            try { source.stop(); } catch (e) { /* already finished */ }
+        });
+        this.pcmSources = [];
+        this.pcmPlayhead = 0;
+        this.audioQueue = Promise.resolve();
+        this.replyAudioStartedAt = null;
     }
     
     handleConversationMessage(data) {
+        if (data.queued) {
+            // every line is taken: wait in line, the first real message means we're through
+            this.recordBtn.disabled = true;
+            this.connectionStatus.textContent = `Waiting - number ${data.position} in line`;
+            if (data.position !== this.queuePosition) {
+                this.showToast(`All agents are busy - you're number ${data.position} in line.`, 'info');
+            }
+            this.queuePosition = data.position;
+            return;
+        }
+        
+        if (data.audio_format && this.queuePosition) {
+            this.queuePosition = null;
+            this.recordBtn.disabled = false;
+            this.connectionStatus.textContent = 'Connected';
+        }
+        
+        if (data.busy) {
+            // the server is full (or we waited too long) - it closes the socket after this
+            this.resumeToken = null;
+        }
+        
+        if (data.interrupted || data.user_text) {
+            // the server has stopped the old reply - any audio from here on is new
+            this.discardAudio = false;
+            this.replyAudioStartedAt = null;
+        }
+        
+        if (data.audio_format) {
+            this.playbackFormat = data.audio_format;
+            console.log('Agent voice format:', data.audio_format);
+        }
+        
+        if (data.resume_token) {
+            this.resumeToken = data.resume_token;
+            if (data.resumed) {
+                this.metrics.turnCount = data.turn_count || 0;
+                this.turnCountDisplay.textContent = this.metrics.turnCount;
+            }
+        }
+        
         if (data.user_text) {
             this.addMessageToConversation('user', data.user_text);
         }
@@ -342,11 +550,27 @@ class VoiceReviewCollector {
         if (data.metrics) {
             this.metrics.sttTime = data.metrics.stt_total_time || 0;
             this.metrics.sttUploadTime = data.metrics.stt_upload_time || 0;
+            this.metrics.sttUploadHiddenTime = data.metrics.stt_upload_hidden_time || 0;
             this.metrics.sttProcessingTime = data.metrics.stt_processing_time || 0;
             this.metrics.llmTime = data.metrics.llm_time || 0;
+            this.metrics.llmFirstTokenTime = data.metrics.llm_first_token_time || 0;
+            this.metrics.promptTokens = data.metrics.prompt_tokens || 0;
+            this.metrics.speculation = data.metrics.speculation || '';
+            this.metrics.speculationHeadStart = data.metrics.speculation_head_start || 0;
+            this.metrics.interrupted = !!data.metrics.interrupted;
+            this.metrics.bargeInCancelMs = data.metrics.barge_in_cancel_ms || 0;
+            this.metrics.bargeInTimeSavedMs = data.metrics.barge_in_time_saved_ms || 0;
             this.metrics.ttsTime = data.metrics.tts_time || 0;
-            this.metrics.totalResponseTime = this.metrics.sttTime + this.metrics.llmTime + this.metrics.ttsTime;
+            this.metrics.ttsFirstAudioTime = data.metrics.tts_first_audio_time || 0;
+            // LLM and TTS stream in parallel, so prefer the server's end-to-end number
+            this.metrics.totalResponseTime = data.metrics.total_response_time ||
+                (this.metrics.sttTime + this.metrics.llmTime + this.metrics.ttsTime);
             this.metrics.efficiencyRatio = data.metrics.efficiency_ratio || 0;
+            this.metrics.perceivedLatency = data.metrics.perceived_latency || 0;
+            this.metrics.actualLatency = data.metrics.actual_latency || 0;
+            this.metrics.backchannelPlayed = !!data.metrics.backchannel_played;
+            this.metrics.vadBytesSaved = data.metrics.vad_bytes_saved || 0;
+            this.metrics.vadSttMsSaved = data.metrics.vad_stt_ms_saved || 0;
             
             // Update audio length from backend if available
             if (data.metrics.audio_duration) {
@@ -386,6 +610,16 @@ class VoiceReviewCollector {
     }
     
     handleAudioChunk(audioData) {
+        if (this.discardAudio) return; // tail of an interrupted reply
+        
+        // Raw PCM frames can be played as they arrive - no container to wait for
+        if (this.playbackFormat.startsWith('pcm')) {
+            this.playPcmFrame(audioData);
+            this.metrics.audioChunks++;
+            this.updateMetrics();
+            return;
+        }
+        
         // Simple approach: collect chunks and play when done
         if (!this.isReceivingAudio) {
             this.isReceivingAudio = true;
@@ -415,7 +649,8 @@ class VoiceReviewCollector {
         console.log(`Playing ${this.currentAudioChunks.length} audio chunks`);
         
         // Combine all chunks into one audio file
-        const completeAudio = new Blob(this.currentAudioChunks, { type: 'audio/mpeg' });
+        const mimeType = this.playbackFormat.startsWith('opus') ? 'audio/ogg; codecs=opus' : 'audio/mpeg';
+        const completeAudio = new Blob(this.currentAudioChunks, { type: mimeType });
         
         // Reset for next audio
         this.currentAudioChunks = [];
@@ -425,9 +660,38 @@ class VoiceReviewCollector {
         await this.playAudioResponse(completeAudio);
     }
     
+    playPcmFrame(arrayBuffer) {
+        // s16le mono -> Float32, scheduled right after the previous frame so playback is gapless
+        const sampleRate = parseInt(this.playbackFormat.split('_')[1], 10) || 16000;
+        const samples = new Int16Array(arrayBuffer, 0, arrayBuffer.byteLength >> 1);
+        if (!samples.length || !this.audioContext) return;
+        
+        const buffer = this.audioContext.createBuffer(1, samples.length, sampleRate);
+        const channel = buffer.getChannelData(0);
+        for (let i = 0; i < samples.length; i++) {
+            channel[i] = samples[i] / 32768;
+        }
+        const source = this.audioContext.createBufferSource();
+        source.buffer = buffer;
+        source.connect(this.audioContext.destination);
+        
+        const startAt = Math.max(this.audioContext.currentTime, this.pcmPlayhead);
+        source.start(startAt);
+        this.pcmPlayhead = startAt + buffer.duration;
+        if (!this.replyAudioStartedAt) {
+            this.replyAudioStartedAt = Date.now() + (startAt - this.audioContext.currentTime) * 1000;
+        }
+        this.pcmSources.push(source);
+        source.onended = () => {
+            this.pcmSources = this.pcmSources.filter(s => s !== source);
+        };
+    }
+    
     async playAudioResponse(audioData) {
         // Simplified audio playback - just use HTML5 Audio (works better)
+        const generation = this.playbackGeneration;
         this.audioQueue = this.audioQueue.then(async () => {
+            if (generation !== this.playbackGeneration) return; // interrupted before it started
             try {
                 // Convert audio data to a blob that browser can play
                 const audioBlob = audioData instanceof Blob ? 
@@ -443,22 +707,32 @@ class VoiceReviewCollector {
                 const audioUrl = URL.createObjectURL(audioBlob);
                 const audio = new Audio(audioUrl);
                 
-                // Play the audio and wait for it to finish
+                // Play the audio and wait for it to finish (or to be interrupted)
                 return new Promise((resolve) => {
-                    audio.onended = () => {
+                    const done = () => {
                         URL.revokeObjectURL(audioUrl); // Clean up memory
-                        console.log('Audio finished playing');
+                        if (this.currentAudio === audio) {
+                            this.currentAudio = null;
+                            this.stopCurrentAudio = null;
+                        }
                         resolve();
                     };
+                    this.currentAudio = audio;
+                    this.stopCurrentAudio = done;
+                    audio.onplay = () => {
+                        if (!this.replyAudioStartedAt) this.replyAudioStartedAt = Date.now();
+                    };
+                    audio.onended = () => {
+                        console.log('Audio finished playing');
+                        done();
+                    };
                     audio.onerror = (e) => {
                         console.error('Audio playback error:', e);
-                        URL.revokeObjectURL(audioUrl);
-                        resolve();
+                        done();
                     };
                     audio.play().catch(e => {
                         console.error('Could not play audio:', e);
-                        URL.revokeObjectURL(audioUrl);
-                        resolve();
+                        done();
                     });
                 });
                 
@@ -563,10 +837,21 @@ class VoiceReviewCollector {
     updateMetrics() {
         this.sttTimeEl.textContent = this.metrics.sttTime ? `${this.metrics.sttTime}ms` : '--';
         this.sttUploadTimeEl.textContent = this.metrics.sttUploadTime ? `${this.metrics.sttUploadTime}ms` : '--';
+        this.sttUploadHiddenTimeEl.textContent = this.metrics.sttUploadHiddenTime ? `${this.metrics.sttUploadHiddenTime}ms` : '--';
         this.sttProcessingTimeEl.textContent = this.metrics.sttProcessingTime ? `${this.metrics.sttProcessingTime}ms` : '--';
         this.llmTimeEl.textContent = this.metrics.llmTime ? `${this.metrics.llmTime}ms` : '--';
+        this.llmFirstTokenTimeEl.textContent = this.metrics.llmFirstTokenTime ? `${this.metrics.llmFirstTokenTime}ms` : '--';
+        this.promptTokensEl.textContent = this.metrics.promptTokens ? `~${this.metrics.promptTokens} tokens` : '--';
+        this.speculationEl.textContent = this.metrics.speculation === 'hit' ?
+            `hit (+${this.metrics.speculationHeadStart}ms)` : (this.metrics.speculation || '--');
+        this.bargeInEl.textContent = this.metrics.interrupted ?
+            `stopped in ${this.metrics.bargeInCancelMs}ms, ${this.metrics.bargeInTimeSavedMs}ms saved` : '--';
         this.ttsTimeEl.textContent = this.metrics.ttsTime ? `${this.metrics.ttsTime}ms` : '--';
+        this.ttsFirstAudioTimeEl.textContent = this.metrics.ttsFirstAudioTime ? `${this.metrics.ttsFirstAudioTime}ms` : '--';
         this.totalResponseEl.textContent = this.metrics.totalResponseTime ? `${this.metrics.totalResponseTime}ms` : '--';
+        this.perceivedLatencyEl.textContent = this.metrics.perceivedLatency ?
+            `${this.metrics.perceivedLatency}ms${this.metrics.backchannelPlayed ? ' (ack)' : ''}` : '--';
+        this.actualLatencyEl.textContent = this.metrics.actualLatency ? `${this.metrics.actualLatency}ms` : '--';
         this.audioLengthEl.textContent = this.metrics.audioLength ? `${this.metrics.audioLength}s` : '--';
         this.audioFormatEl.textContent = this.metrics.audioFormat || '--';
         this.responseLengthEl.textContent = this.metrics.responseLength ? `${this.metrics.responseLength} chars` : '--';
@@ -574,6 +859,8 @@ class VoiceReviewCollector {
         this.audioChunksEl.textContent = this.metrics.audioChunks || '--';
         this.wsLatencyEl.textContent = this.metrics.wsLatency ? `${this.metrics.wsLatency}ms` : '--';
         this.efficiencyRatioEl.textContent = this.metrics.efficiencyRatio ? `${this.metrics.efficiencyRatio.toFixed(2)}x` : '--';
+        this.vadBytesSavedEl.textContent = this.metrics.vadBytesSaved ? `${(this.metrics.vadBytesSaved / 1024).toFixed(1)} KB` : '--';
+        this.vadSttMsSavedEl.textContent = this.metrics.vadSttMsSaved ? `~${this.metrics.vadSttMsSaved}ms` : '--';
         
         // Add color coding for performance
         this.addPerformanceColors();
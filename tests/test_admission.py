@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from app.services.admission import AdmissionController, AdmissionRejected
+
+
+def test_callers_wait_in_line_and_are_told_their_position():
+    async def run():
+        admission = AdmissionController(max_active=1, max_queue=2, queue_timeout_s=5)
+        await admission.acquire()
+        positions = {"a": [], "b": []}
+
+        async def wait(name):
+            async def on_position(n):
+                positions[name].append(n)
+            return await admission.acquire(on_position)
+
+        a = asyncio.ensure_future(wait("a"))
+        await asyncio.sleep(0)
+        b = asyncio.ensure_future(wait("b"))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as busy:
+            await admission.acquire()
+        assert busy.value.reason == "busy"
+
+        admission.release()
+        await a
+        assert not b.done()
+        await asyncio.sleep(0)
+        admission.release()
+        await b
+        return admission, positions
+
+    admission, positions = asyncio.run(run())
+    assert positions == {"a": [1], "b": [2, 1]}
+    assert admission.active == 1
+    assert (admission.counters["admitted"], admission.counters["queued"], admission.counters["rejected_full"]) == (3, 2, 1)
+
+
+def test_timeout():
+    async def run():
+        admission = AdmissionController(max_active=1, queue_timeout_s=0.01)
+        await admission.acquire()
+        with pytest.raises(AdmissionRejected) as timeout:
+            await admission.acquire()
+        return admission, timeout.value.reason
+
+    admission, reason = asyncio.run(run())
+    assert reason == "timeout" and admission.counters["timed_out"] == 1
+    assert admission.stats()["queue_depth"] == 0
+
+
+def test_hang_up_while_waiting_gives_up_the_place_in_line():
+    async def run():
+        admission = AdmissionController(max_active=1, queue_timeout_s=5)
+        await admission.acquire()
+
+        async def hung_up(position):
+            raise ConnectionError("socket closed")
+
+        with pytest.raises(ConnectionError):
+            await admission.acquire(hung_up)
+        admission.release()
+        return admission
+
+    admission = asyncio.run(run())
+    assert admission.counters["abandoned"] == 1
+    assert admission.active == 0 and admission.stats()["queue_depth"] == 0
+
+
+def test_slot_granted_while_giving_up_is_passed_on():
+    async def run():
+        admission = AdmissionController(max_active=1, queue_timeout_s=5)
+        await admission.acquire()
+        sending = asyncio.Event()
+
+        async def hangs_up_mid_send(position):
+            sending.set()
+            await asyncio.sleep(0.01)
+            raise ConnectionError("socket closed")
+
+        first = asyncio.ensure_future(admission.acquire(hangs_up_mid_send))
+        await sending.wait()
+        second = asyncio.ensure_future(admission.acquire())
+        await asyncio.sleep(0)
+
+        admission.release()  # first is admitted while its position update is still being sent
+        with pytest.raises(ConnectionError):
+            await first
+        await second
+        return admission
+
+    assert asyncio.run(run()).active == 1
@@ -0,0 +1,96 @@
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.services import async_stt_service
+from app.services.async_stt_service import AsyncAssemblyAIClient
+from app.services.transcript_registry import TranscriptRegistry
+
+
+def make_client(get_transcript):
+    client = AsyncAssemblyAIClient(api_key="test", base_url="http://127.0.0.1:9", webhook_url=None,
+                                   poll_initial_delay=0.01, poll_max_delay=0.01, max_wait_time=1)
+
+    async def upload(audio_bytes):
+        return "https://uploads/clip"
+
+    async def submit(upload_url, **options):
+        return "t1"
+
+    client.upload = upload
+    client.submit = submit
+    client.get_transcript = get_transcript
+    return client
+
+
+@pytest.mark.parametrize("error", [aiohttp.ClientConnectionError("reset"), asyncio.TimeoutError()])
+def test_poll_errors_become_error_result(error):
+    async def get_transcript(transcript_id):
+        raise error
+
+    result = asyncio.run(make_client(get_transcript).transcribe(b"audio"))
+    assert result["text"] == "[ERROR] Could not get transcript"
+    assert result["upload_time"] >= 0 and result["processing_time"] >= 0
+
+
+def test_completed_transcript():
+    async def get_transcript(transcript_id):
+        return {"status": "completed", "text": "great paddle", "audio_duration": 2}
+
+    result = asyncio.run(make_client(get_transcript).transcribe(b"audio"))
+    assert result["text"] == "great paddle"
+    assert result["audio_duration"] == 2
+
+
+def test_webhook_needs_a_secret():
+    assert AsyncAssemblyAIClient(webhook_url="https://example.com/api/stt/webhook", webhook_secret=None).webhook_url is None
+    client = AsyncAssemblyAIClient(webhook_url="https://example.com/api/stt/webhook", webhook_secret="s3cret")
+    assert client._webhook_options()["webhook_auth_header_value"] == "s3cret"
+
+
+def test_failed_fallback_poll_keeps_waiting_for_the_webhook(monkeypatch):
+    monkeypatch.setattr(async_stt_service, "WEBHOOK_FALLBACK_POLL_DELAY", 0.01)
+    monkeypatch.setattr(async_stt_service, "WEBHOOK_FALLBACK_POLL_MAX_DELAY", 0.01)
+
+    async def run():
+        registry = TranscriptRegistry()
+        client = AsyncAssemblyAIClient(api_key="test", webhook_url="https://example.com/api/stt/webhook",
+                                       webhook_secret="s3cret", registry=registry, max_wait_time=1)
+        fetches = []
+
+        async def get_transcript(transcript_id):
+            fetches.append(transcript_id)
+            if len(fetches) == 1:
+                raise aiohttp.ClientConnectionError("reset")  # the fallback poll
+            return {"status": "completed", "text": "great paddle"}
+
+        client.get_transcript = get_transcript
+        asyncio.get_running_loop().call_later(0.05, registry.resolve, "t1", {"status": "completed"})
+        return client, await client.wait_for_transcript("t1")
+
+    client, result = asyncio.run(run())
+    assert result["text"] == "great paddle"
+    assert client.stats["webhook_hits"] == 1
+
+
+@pytest.mark.parametrize("status", [401, 404, 500])
+def test_transcript_fetch_raises_on_bad_status(status):
+    async def transcript(request):
+        return web.json_response({"error": "nope"}, status=status)
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/v2/transcript/{id}", transcript)
+        async with TestServer(app) as server:
+            client = AsyncAssemblyAIClient(api_key="test", base_url=str(server.make_url("")), webhook_url=None)
+            try:
+                with pytest.raises(aiohttp.ClientResponseError) as error:
+                    await client.get_transcript("t1")
+            finally:
+                await client.close()
+        return error.value.status
+
+    assert asyncio.run(run()) == status
@@ -0,0 +1,54 @@
+import io
+import wave
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services import audio_io
+from app.services.audio_io import (
+    AudioClip, FFmpegError, decode_pcm16, decode_pcm16_sync, duration_s, run_ffmpeg, run_ffmpeg_sync, to_float32,
+    to_wav,
+)
+
+PCM = (np.sin(np.arange(1600) / 5) * 8000).astype(np.int16)
+
+
+def test_to_wav_round_trip():
+    with wave.open(io.BytesIO(to_wav(PCM, 16000))) as wav:
+        assert (wav.getnchannels(), wav.getsampwidth(), wav.getframerate()) == (1, 2, 16000)
+        assert np.array_equal(np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16), PCM)
+
+
+def test_samples():
+    assert duration_s(PCM) == 0.1
+    assert duration_s(PCM, 8000) == 0.2
+    floats = to_float32(np.array([-32768, 0, 16384], dtype=np.int16))
+    assert floats.dtype == np.float32 and floats.tolist() == [-1.0, 0.0, 0.5]
+
+
+def test_clip_is_bytes_and_keeps_its_samples():
+    clip = AudioClip(b"webm", pcm=PCM)
+    assert clip == b"webm" and isinstance(clip, bytes)
+    assert clip.uploads == {} and clip.upload_hidden_ms() == 0.0
+
+    reused = audio_io.stats["decodes_reused"]
+    assert decode_pcm16_sync(clip) is PCM
+    assert asyncio.run(decode_pcm16(clip)) is PCM
+    assert audio_io.stats["decodes_reused"] == reused + 2
+
+
+def test_clip_at_another_rate_is_decoded_again(monkeypatch):
+    monkeypatch.setattr(audio_io, "run_ffmpeg_sync", lambda args, data: PCM[:10].tobytes())
+    decoded = decode_pcm16_sync(AudioClip(b"webm", pcm=PCM), sample_rate=8000)
+    assert np.array_equal(decoded, PCM[:10])
+
+
+def test_missing_ffmpeg_raises_ffmpeg_error(monkeypatch):
+    monkeypatch.setenv("PATH", "")
+    errors = audio_io.stats["ffmpeg_errors"]
+    with pytest.raises(FFmpegError):
+        run_ffmpeg_sync(["-version"], b"")
+    with pytest.raises(FFmpegError):
+        asyncio.run(run_ffmpeg(["-version"], b""))
+    assert audio_io.stats["ffmpeg_errors"] == errors + 2
@@ -0,0 +1,77 @@
+import asyncio
+import base64
+
+import pytest
+
+from app.services.audio_relay import AudioCoalescer, coalesce, frame_bytes_for
+from app.services.tts_service import OUTPUT_FORMAT, bytes_per_second, negotiate_output_format, parse_audio_message
+
+
+@pytest.mark.parametrize("requested, expected", [
+    (None, OUTPUT_FORMAT),
+    ("", OUTPUT_FORMAT),
+    ("opus", "opus_48000_32"),
+    ("PCM", "pcm_16000"),
+    ("mp3_22050_32", "mp3_22050_32"),
+    ("wav", OUTPUT_FORMAT),
+    ("pcm_44100", OUTPUT_FORMAT),
+])
+def test_negotiate_output_format(requested, expected):
+    assert negotiate_output_format(requested) == expected
+
+
+@pytest.mark.parametrize("output_format, per_second", [
+    ("mp3_44100_128", 16000), ("opus_48000_32", 4000), ("pcm_16000", 32000), ("pcm_24000", 48000),
+])
+def test_bytes_per_second(output_format, per_second):
+    assert bytes_per_second(output_format) == per_second
+    assert frame_bytes_for(output_format, 200) == per_second // 5
+
+
+def test_parse_audio_message():
+    packet = '{"audio": "%s", "isFinal": false, "alignment": null}' % base64.b64encode(b"mp3 bytes").decode()
+    assert parse_audio_message(packet) == (b"mp3 bytes", False, None)
+    assert parse_audio_message('{"audio": null, "isFinal": true}') == (None, True, {"audio": None, "isFinal": True})
+
+
+def test_coalescer_builds_frames_of_min_bytes():
+    coalescer = AudioCoalescer(min_bytes=10)
+    assert coalescer.add(b"abcd") is None
+    assert coalescer.add(b"efgh") is None
+    assert coalescer.add(b"ijkl") == b"abcdefghijkl"
+    assert coalescer.add(b"x" * 12) == b"x" * 12  # big enough on its own
+    assert coalescer.add(b"tail") is None
+    assert coalescer.flush() == b"tail"
+    assert coalescer.flush() is None
+    assert coalescer.counters == {"packets_in": 5, "frames_out": 3, "bytes": 28}
+
+
+async def paced(packets, gap_s):
+    for packet in packets:
+        await asyncio.sleep(gap_s)
+        yield packet
+
+
+async def collect(frames):
+    return [frame async for frame in frames]
+
+
+def test_coalesce_keeps_every_byte_in_order():
+    packets = [bytes([i]) * 7 for i in range(20)]
+    frames = asyncio.run(collect(coalesce(paced(packets, 0), frame_ms=1, max_delay_ms=1000,
+                                          coalescer=AudioCoalescer(min_bytes=30))))
+    assert b"".join(frames) == b"".join(packets)
+    assert all(len(frame) >= 30 for frame in frames[:-1])
+    assert len(frames) < len(packets)
+
+
+def test_coalesce_flushes_after_max_delay():
+    # packets far apart: each one waits max_delay at most, then goes out alone
+    frames = asyncio.run(collect(coalesce(paced([b"a", b"b", b"c"], 0.05), max_delay_ms=5,
+                                          coalescer=AudioCoalescer(min_bytes=1000))))
+    assert frames == [b"a", b"b", b"c"]
+
+
+def test_coalesce_passthrough_when_disabled():
+    frames = asyncio.run(collect(coalesce(paced([b"a", b"b"], 0), coalescer=AudioCoalescer(min_bytes=0))))
+    assert frames == [b"a", b"b"]
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+
+from app.services.backchannel import BackchannelLibrary, LatencyMasker
+from app.services.tts_cache import cache_key
+
+
+class FlakyCache:
+    """prewarm() fails the first `failures` times, then every line is cached."""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.prewarms = 0
+
+    async def prewarm(self, lines, output_format=None):
+        self.prewarms += 1
+        if self.prewarms <= self.failures:
+            raise ConnectionError("TTS unreachable")
+        self.entries = {cache_key(line, output_format=output_format): [b"clip-", line.encode()] for line in lines}
+
+    async def get(self, key):
+        return self.entries.get(key)
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_failed_load_is_logged_and_retried_once(caplog):
+    async def run():
+        cache = FlakyCache(failures=1)
+        library = BackchannelLibrary(lines=["Okay..."], cache=cache, output_format="mp3_44100_128")
+        library.ensure_loaded()
+        await settle()
+        assert library.clips == []
+        assert "retrying on the next turn" in caplog.text
+        library.ensure_loaded()
+        await settle()
+        assert library.clips == [[b"clip-Okay..."]]
+        library.ensure_loaded()
+        await settle()
+        assert cache.prewarms == 2
+
+    with caplog.at_level(logging.ERROR, logger="app.services.backchannel"):
+        asyncio.run(run())
+
+
+def test_load_gives_up_after_the_retry(caplog):
+    async def run():
+        cache = FlakyCache(failures=5)
+        library = BackchannelLibrary(lines=["Okay..."], cache=cache)
+        for _ in range(4):
+            library.ensure_loaded()
+            await settle()
+        assert cache.prewarms == 2
+        assert library.pick() is None
+        assert "turns go without them" in caplog.text
+
+    with caplog.at_level(logging.ERROR, logger="app.services.backchannel"):
+        asyncio.run(run())
+
+
+def test_masker_plays_a_clip_only_after_the_deadline():
+    async def run():
+        library = BackchannelLibrary(lines=["Okay..."], cache=FlakyCache(failures=0))
+        await library.load()
+        sent = []
+
+        async def send(chunk):
+            sent.append(chunk)
+
+        fast = LatencyMasker(send, library=library, deadline_ms=50)
+        fast.start()
+        await fast.send(b"reply")
+        await asyncio.sleep(0.08)
+        assert sent == [b"reply"] and not fast.played
+
+        sent.clear()
+        slow = LatencyMasker(send, library=library, deadline_ms=10)
+        slow.start()
+        await asyncio.sleep(0.05)
+        await slow.send(b"reply")
+        assert sent == [b"clip-Okay...", b"reply"] and slow.played
+        assert slow.metrics()["perceived_latency"] <= slow.metrics()["actual_latency"]
+
+    asyncio.run(run())
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from app.services.barge_in import BargeIn, spoken_prefix
+from app.services.turn_pipeline import _until_interrupted
+
+
+@pytest.mark.parametrize("played_ms, expected", [
+    (0, ""),
+    (65 * 4, ""),                    # still inside the first word
+    (65 * 5, "Sure"),
+    (65 * 12, "Sure, the"),          # cut at a word boundary, trailing comma dropped
+    (65 * 100, "Sure, the paddles ship tomorrow."),
+])
+def test_spoken_prefix(played_ms, expected):
+    assert spoken_prefix("Sure, the paddles ship tomorrow.", played_ms) == expected
+
+
+def test_interrupt_only_counts_during_a_reply():
+    async def run():
+        acks = []
+
+        async def send_ack():
+            acks.append(True)
+
+        barge_in = BargeIn(send_ack=send_ack)
+        barge_in.on_control({"type": "interrupt"})
+        await asyncio.sleep(0)
+        assert acks == [True] and not barge_in.event.is_set()
+
+        barge_in.start_reply()
+        barge_in.on_control({"type": "interrupt", "played_ms": 1200})
+        barge_in.interrupt("speech")  # the first reason wins
+        assert barge_in.event.is_set()
+        assert (barge_in.reason, barge_in.client_played_ms) == ("client", 1200.0)
+
+        barge_in.end_reply()
+        barge_in.start_reply()
+        assert not barge_in.event.is_set() and barge_in.reason is None
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("min_words, text, interrupted", [
+    (2, "hmm", False),
+    (2, "wait no", True),
+    (0, "wait no stop", False),  # interrupt messages only
+])
+def test_interim_speech(min_words, text, interrupted):
+    async def run():
+        barge_in = BargeIn(min_words=min_words)
+        barge_in.start_reply()
+        barge_in.on_interim(text)
+        return barge_in.event.is_set()
+
+    assert asyncio.run(run()) == interrupted
+
+
+def test_until_interrupted():
+    async def run():
+        interrupt = asyncio.Event()
+        assert await _until_interrupted(asyncio.sleep(0), interrupt) is None
+
+        cancelled = []
+
+        async def reply():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        asyncio.get_running_loop().call_later(0.01, interrupt.set)
+        cancel_ms = await _until_interrupted(reply(), interrupt)
+        return cancel_ms, cancelled
+
+    cancel_ms, cancelled = asyncio.run(run())
+    assert cancelled == [True] and 0 <= cancel_ms < 200
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from app.services.conversation_context import ConversationContext, estimate_tokens, truncate_to_tokens
+
+
+class FakeLLM:
+    def __init__(self, reply="Customer likes the paddles, the bag zipper broke.", fail=False):
+        self.reply = reply
+        self.fail = fail
+        self.prompts = []
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt)
+        if self.fail:
+            raise RuntimeError("quota")
+        return self.reply
+
+
+@pytest.mark.parametrize("text, tokens", [("", 0), ("abcd", 1), ("abcde", 2), ("x" * 400, 100)])
+def test_estimate_tokens(text, tokens):
+    assert estimate_tokens(text) == tokens
+
+
+def test_truncate_keeps_the_end():
+    text = " ".join(f"word{i}" for i in range(100))
+    cut = truncate_to_tokens(text, 10)
+    assert cut.startswith("...") and text.endswith(cut[3:])
+    assert estimate_tokens(cut) <= 12
+    assert truncate_to_tokens("short", 10) == "short"
+    assert truncate_to_tokens(text, 0) == ""
+
+
+def test_old_turns_are_summarized_in_the_background():
+    async def run():
+        llm = FakeLLM()
+        context = ConversationContext(llm=llm, recent_turns=2, prefix="PREFIX\n")
+        for i in range(4):
+            context.add_turn(f"answer {i}", f"question {i}")
+        await asyncio.sleep(0.01)
+        assert context.summary == llm.reply
+        assert [t.user_text for t in context.recent] == ["answer 2", "answer 3"]
+        assert context.counters["turns_summarized"] == 2
+        prompt = context.build_prompt("it's great", {"turn_count": 5})
+        assert prompt.startswith("PREFIX\n")
+        assert llm.reply in prompt and "Customer: answer 3" in prompt and "answer 0" not in prompt
+        assert 'Customer just said: "it\'s great"' in prompt and "Turn #5" in prompt
+
+    asyncio.run(run())
+
+
+def test_failed_summary_keeps_raw_turns():
+    async def run():
+        context = ConversationContext(llm=FakeLLM(fail=True), recent_turns=1, summary_tokens=50)
+        context.add_turn("the bag zipper broke", "Sorry to hear that!")
+        context.add_turn("yes", "Anything else?")
+        await asyncio.sleep(0.01)
+        assert "the bag zipper broke" in context.summary
+        assert context.counters["summary_failures"] == 1
+
+    asyncio.run(run())
+
+
+def test_prompt_stays_within_budget():
+    async def run():
+        context = ConversationContext(llm=None, max_tokens=200, recent_turns=10, prefix="P" * 200)
+        for i in range(10):
+            context.add_turn("a fairly long answer about the paddles " * 3, "and a follow-up question?")
+        prompt = context.build_prompt("and the balls are fine " * 20)
+        assert estimate_tokens(prompt) <= 200
+        assert "balls are fine" in prompt  # the customer's own words go last
+        assert context.counters["trimmed_prompts"] == 1
+
+    asyncio.run(run())
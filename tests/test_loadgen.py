@@ -0,0 +1,23 @@
+import pytest
+
+from benchmarks.loadgen import Results, percentile, record_streaming_turn
+
+
+@pytest.mark.parametrize("values, q, expected", [
+    ([], 0.5, 0.0),
+    ([3, 1, 2], 0.5, 2),
+    ([3, 1, 2], 0.99, 3),
+    (list(range(100)), 0.95, 95),
+])
+def test_percentile(values, q, expected):
+    assert percentile(values, q) == expected
+
+
+def test_streaming_turn_is_timed_from_end_of_speech():
+    results = Results()
+    record_streaming_turn(results, {"metrics": {"stt_total_time": 300, "tts_first_audio_time": 450,
+                                                "tts_time": 2000}}, at=0)
+    record_streaming_turn(results, {"metrics": {}}, at=0)
+    assert results.turns == 2
+    assert results.first_audio_ms == [750, 0]
+    assert results.reply_done_ms == [2300, 0]
@@ -0,0 +1,64 @@
+import json
+import queue
+import logging
+import contextvars
+
+import pytest
+
+from app.services.logging_config import (
+    BoundedQueueHandler, ContextFilter, JsonFormatter, SampleFilter, TextFormatter, log_context, parse_levels, stats,
+)
+
+
+def make_record(msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord("app.test", logging.INFO, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("", {}),
+    ("app.services.vad=WARNING", {"app.services.vad": logging.WARNING}),
+    (" a = debug , b=ERROR", {"a": logging.DEBUG, "b": logging.ERROR}),
+    ("a=LOUD,=INFO,b", {}),
+])
+def test_parse_levels(spec, expected):
+    assert parse_levels(spec) == expected
+
+
+def test_sample_filter_limits_each_key():
+    sample = SampleFilter(per_second=1)
+    assert sample.filter(make_record())  # unkeyed
+    assert sample.filter(make_record())
+    records = [make_record(sample="chunk") for _ in range(4)]
+    assert [sample.filter(r) for r in records] == [True, False, False, False]
+    assert sample.filter(make_record(sample="other"))
+
+    sample._next["chunk"] = 0.0  # a second later
+    record = make_record(sample="chunk")
+    assert sample.filter(record) and record.suppressed == 3
+
+
+def test_queue_handler_drops_when_full():
+    handler = BoundedQueueHandler(queue.Queue(maxsize=1))
+    dropped = stats["dropped"]
+    handler.handle(make_record())
+    handler.handle(make_record())
+    assert stats["dropped"] == dropped + 1
+    record = handler.queue.get_nowait()
+    assert record.msg == "hello world" and record.args is None
+
+
+def test_formatters_carry_the_call_context():
+    def in_call():
+        log_context(session_id="abc", turn_id=3)
+        ContextFilter().filter(record)
+
+    record = make_record(suppressed=2, stage="stt")
+    contextvars.copy_context().run(in_call)  # keeps the tags out of the other tests
+
+    assert TextFormatter().format(record) == "[INFO] app.test: hello world  session=abc turn=3  (+2 similar suppressed)"
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["msg"] == "hello world" and entry["logger"] == "app.test"
+    assert (entry["session_id"], entry["turn_id"], entry["stage"]) == ("abc", 3, "stt")
@@ -0,0 +1,21 @@
+import pytest
+
+from benchmarks.microbench import format_ns, slower
+
+BASELINE = {"cases": {"pacing": {"ns": 1000, "unit": "reply"}, "prompt": {"ns": 5000, "unit": "turn"}}}
+
+
+@pytest.mark.parametrize("results, scale, expected", [
+    ({"pacing": {"ns": 1100}, "prompt": {"ns": 5000}}, 1.0, []),
+    ({"pacing": {"ns": 1300}, "prompt": {"ns": 5000}}, 1.0, ["pacing"]),
+    ({"pacing": {"ns": 1300}, "prompt": {"ns": 5000}}, 1.5, []),      # a slower machine
+    ({"pacing": {"ns": 1000}, "prompt": {"ns": 5000}}, 0.5, ["pacing", "prompt"]),
+    ({"call_replay": {"ns": 10 ** 9}}, 1.0, []),                      # not in the baseline yet
+])
+def test_slower(results, scale, expected):
+    assert slower(results, BASELINE, scale, threshold=0.2) == expected
+
+
+@pytest.mark.parametrize("ns, text", [(850, "850 ns"), (1500, "1.50 us"), (2.5e6, "2.50 ms")])
+def test_format_ns(ns, text):
+    assert format_ns(ns) == text
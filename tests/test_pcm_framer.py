@@ -0,0 +1,103 @@
+import io
+import threading
+
+import pytest
+
+from app.services.pcm_framer import PCMRingBuffer, ThreadedPCMFramer
+
+
+def drain(ring):
+    out = b""
+    while True:
+        frames = ring.peek()
+        if frames is None:
+            return out
+        out += bytes(frames)
+        ring.release(frames)
+
+
+@pytest.mark.parametrize("writes", [[10], [4, 6], [3, 3, 3, 1], [7, 9, 2, 11, 1]])
+def test_frames_come_out_in_order(writes):
+    ring = PCMRingBuffer(frame_bytes=4, capacity_frames=4, max_coalesce=2)
+    data = bytes(range(sum(writes)))
+    sent = b""
+    pos = 0
+    for n in writes:
+        chunk = data[pos:pos + n]
+        accepted = 0
+        while accepted < len(chunk):  # the consumer keeps up, so everything fits eventually
+            accepted += ring.write(chunk[accepted:])
+            sent += drain(ring)
+        pos += n
+    sent += ring.tail()
+    assert sent == data
+    assert ring.counters["dropped"] == 0
+    assert ring.counters["sent"] == len(data) // 4
+
+
+def test_write_stops_when_full():
+    ring = PCMRingBuffer(frame_bytes=4, capacity_frames=2)
+    assert ring.write(bytes(10)) == 8
+    assert ring.free_bytes() == 0
+    assert ring.frames_available() == 2
+
+
+def test_backlog_is_coalesced_up_to_max():
+    ring = PCMRingBuffer(frame_bytes=4, capacity_frames=8, max_coalesce=3)
+    ring.write(bytes(20))
+    first = ring.peek()
+    assert len(first) == 12
+    ring.release(first)
+    assert len(ring.peek()) == 8
+    assert ring.counters["coalesced"] == 2
+
+
+def test_peek_stops_at_the_wrap():
+    ring = PCMRingBuffer(frame_bytes=4, capacity_frames=4, max_coalesce=4)
+    ring.write(bytes(12))
+    ring.release(ring.peek())
+    ring.write(b"abcdefgh")  # frame 3 at the end of the buffer, frame 4 wraps to the start
+    assert bytes(ring.peek()) == b"abcd"
+
+
+def test_tail_only_after_whole_frames():
+    ring = PCMRingBuffer(frame_bytes=4, capacity_frames=4)
+    ring.write(b"abcdef")
+    assert ring.tail() == b""  # a whole frame is still waiting
+    ring.release(ring.peek())
+    assert ring.tail() == b"ef"
+    assert ring.tail() == b""
+
+
+def test_drop_oldest_is_counted():
+    ring = PCMRingBuffer(frame_bytes=4, capacity_frames=4)
+    ring.write(bytes(12))
+    ring.drop_oldest(5)
+    assert ring.counters["dropped"] == 3
+    assert ring.peek() is None
+
+
+def test_threaded_framer_delivers_everything():
+    data = bytes(i % 251 for i in range(4 * 1000 + 3))
+    framer = ThreadedPCMFramer(frame_bytes=4, capacity_frames=8, max_coalesce=4)
+    stream = io.BufferedReader(io.BytesIO(data), buffer_size=7)
+    received = []
+
+    def reader():
+        while framer.readinto_from(stream):
+            pass
+        framer.close()
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    while True:
+        view = framer.get_frames(timeout=0.5)
+        if view is None:
+            if not thread.is_alive():
+                break
+            continue
+        received.append(bytes(view))
+        framer.done(view)
+    thread.join()
+    assert b"".join(received) + framer.ring.tail() == data
+    assert framer.counters["dropped"] == 0
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from app.services.provider_limits import (
+    ProviderLimiter, RateLimited, Throttled, TokenBucket, is_rate_limited, parse_limits, retry_after_s,
+    start_turn_budget,
+)
+
+
+class HTTPError(Exception):
+    def __init__(self, status):
+        self.status = status
+
+
+@pytest.mark.parametrize("error, limited", [
+    (RateLimited(), True),
+    (HTTPError(429), True),
+    (HTTPError(503), True),
+    (HTTPError(500), False),
+    (type("ResourceExhausted", (Exception,), {})(), True),
+    (ValueError(), False),
+])
+def test_is_rate_limited(error, limited):
+    assert is_rate_limited(error) == limited
+
+
+@pytest.mark.parametrize("headers, seconds", [(None, None), ({}, None), ({"Retry-After": "2"}, 2.0),
+                                              ({"Retry-After": "Wed, 21 Oct 2026 07:28:00 GMT"}, None)])
+def test_retry_after(headers, seconds):
+    assert retry_after_s(headers) == seconds
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("", {}),
+    ("gemini=20:5:10,elevenlabs=8:10", {"gemini": (20, 5.0, 10.0), "elevenlabs": (8, 10.0, None)}),
+    ("assemblyai=32", {"assemblyai": (32, 0.0, None)}),
+    ("bad=x:1,=3", {}),
+])
+def test_parse_limits(spec, expected):
+    assert parse_limits(spec) == expected
+
+
+def test_token_bucket_paces_after_the_burst():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.reserve() == 0 and bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    bucket.refund()
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert TokenBucket(rate=0).reserve() == 0  # no limit
+
+
+def test_token_bucket_pause():
+    bucket = TokenBucket(rate=10, burst=5)
+    bucket.pause(1.0)
+    assert bucket.reserve() == pytest.approx(1.1, abs=0.01)
+
+
+def test_rate_limited_requests_are_retried():
+    async def run():
+        limiter = ProviderLimiter("test", retry_attempts=3, retry_base_ms=1)
+        answers = [RateLimited(), RateLimited(retry_after=0.002), "ok"]
+
+        async def call():
+            answer = answers.pop(0)
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+
+        return limiter, await limiter.request(call)
+
+    limiter, result = asyncio.run(run())
+    assert result == "ok"
+    assert (limiter.counters["rate_limited"], limiter.counters["retries"]) == (2, 2)
+
+
+def test_throttled_when_retries_run_out():
+    async def run():
+        limiter = ProviderLimiter("test", retry_attempts=1, retry_base_ms=1)
+
+        async def call():
+            raise RateLimited()
+
+        with pytest.raises(Throttled):
+            await limiter.request(call)
+        return limiter
+
+    assert asyncio.run(run()).counters["throttled"] == 1
+
+
+def test_no_free_slot_within_the_turn_budget():
+    async def run():
+        limiter = ProviderLimiter("test", max_concurrency=1)
+        async with limiter.concurrency():
+            start_turn_budget(20)
+            with pytest.raises(Throttled):
+                async with limiter.concurrency():
+                    pass
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert limiter.in_flight == 0 and limiter.counters["throttled"] == 1
+
+
+def test_stream_holds_a_slot_until_closed():
+    async def run():
+        limiter = ProviderLimiter("test", max_concurrency=1)
+
+        async def words(prompt):
+            for word in prompt.split():
+                yield word
+
+        stream = limiter.stream(words, "sure the paddles ship")
+        first = await stream.__anext__()
+        busy = limiter.in_flight
+        await stream.aclose()
+        return first, busy, limiter.in_flight
+
+    assert asyncio.run(run()) == ("sure", 1, 0)
@@ -0,0 +1,63 @@
+import pytest
+
+from app.services.reply_filters import (
+    FALLBACK_REPLY, IncrementalReplyFilter, SentenceChunker, apply_natural_pacing, fix_role_confusion,
+)
+
+
+def chunk(tokens, min_chars=8):
+    chunker = SentenceChunker(min_chars=min_chars)
+    sentences = []
+    for token in tokens:
+        sentences += chunker.feed(token)
+    return sentences + chunker.flush()
+
+
+@pytest.mark.parametrize("tokens, expected", [
+    (["That's great to hear. ", "How often do you play?"],
+     ["That's great to hear.", "How often do you play?"]),
+    # a sentence is only cut once the whitespace after it arrives
+    (["It weighs 2", ".5 ounces. ", "Nice!"], ["It weighs 2.5 ounces.", "Nice!"]),
+    (["Wow", "!", "!", " Tell me more."], ["Wow!! Tell me more."]),
+    # short sentences are joined to the next one
+    (["Oh! ", "I see what you mean. ", "Thanks."], ["Oh! I see what you mean.", "Thanks."]),
+    (["Closing quote works.\" ", "Next one here."], ["Closing quote works.\"", "Next one here."]),
+    ([], []),
+])
+def test_sentence_chunker(tokens, expected):
+    assert chunk(tokens) == expected
+
+
+def test_sentence_chunker_waits_for_whitespace():
+    chunker = SentenceChunker()
+    assert chunker.feed("The paddle is great.") == []
+    assert chunker.feed(" And") == ["The paddle is great."]
+    assert chunker.flush() == ["And"]
+
+
+def test_whole_reply_filters():
+    assert fix_role_confusion("Hi Sarah, thanks for calling!") == FALLBACK_REPLY
+    assert fix_role_confusion("How is the paddle?") == "How is the paddle?"
+    assert apply_natural_pacing("Thanks. Bye") == "Thanks... Bye."
+    assert apply_natural_pacing("Great!") == "Great!"
+
+
+def test_incremental_filter_matches_whole_reply():
+    sentences = ["Great! ", "How often do you play?"]
+    reply_filter = IncrementalReplyFilter()
+    out = [reply_filter.process(s.strip(), last=i == len(sentences) - 1) for i, s in enumerate(sentences)]
+    assert "".join(out) == apply_natural_pacing("".join(sentences))
+    assert reply_filter.text() == "".join(out)
+
+
+def test_incremental_filter_role_confusion():
+    first = IncrementalReplyFilter()
+    assert first.process("Hi Sarah, nice to meet you.") == apply_natural_pacing(FALLBACK_REPLY)
+    assert first.replaced and first.stop
+    assert first.process("Anything else.") is None
+
+    later = IncrementalReplyFilter()
+    assert later.process("That's good to hear.")
+    assert later.process("Thanks for calling!") is None
+    assert later.stop and not later.replaced
+    assert later.text() == "That's good to hear..."
@@ -0,0 +1,67 @@
+import pytest
+
+from app.services.review_classifier import PICKLEBALL_TAXONOMY, ReviewClassifier, Taxonomy
+
+classifier = ReviewClassifier(PICKLEBALL_TAXONOMY)
+
+
+@pytest.mark.parametrize("text, sentiment, topics", [
+    # plain sentiment and topics
+    ("I love it", "positive", []),
+    ("The grip is great", "positive", ["grip"]),
+    ("the handle is comfortable", "positive", ["grip"]),
+    ("It feels cheap and flimsy", "negative", []),
+    ("I love the paddles but the bag broke", "mixed", ["bag", "durability"]),
+    ("shipping was fast and the balls are good", "positive", ["delivery", "balls"]),
+    ("We've been playing every weekend", None, ["performance"]),
+    ("It’s not great", "negative", []),
+    # inflections only: "likely" is not "like"
+    ("It will likely break soon", "negative", ["durability"]),
+    ("I liked it and I'm loving the spin", "positive", ["performance"]),
+    ("It's a lovely set", "positive", []),
+    # negation
+    ("not great", "negative", []),
+    ("I don't like the grip", "negative", ["grip"]),
+    ("The paddles are not very good", "negative", []),
+    ("I haven't had any problems", "positive", []),
+    ("It hasn't been an issue", "positive", []),
+    ("Nothing bad to say", "positive", []),
+    ("it wouldn't break even if you tried", "positive", ["durability"]),
+    ("I didn't find it comfortable", "negative", ["grip"]),
+    ("I don't think it's good", "negative", []),
+    ("I would not say it is durable", "negative", ["durability"]),
+    # ... that stays in its clause
+    ("No I love it", "positive", []),
+    ("No, I love it", "positive", []),
+    ("Not really, it's great", "positive", []),
+    ("it's not heavy and the grip is good", "positive", ["weight", "grip"]),
+    # "case" is not the bag
+    ("in any case the paddle is great", "positive", []),
+    ("Just OK", None, []),
+])
+def test_classify(text, sentiment, topics):
+    result = classifier.classify(text)
+    assert (result.sentiment, result.topics) == (sentiment, topics)
+
+
+def test_update_folds_into_state():
+    state = {}
+    classifier.update(state, "The grip is great")
+    classifier.update(state, "Nothing else really")
+    classifier.update(state, "but the bag broke")
+    assert state == {"customer_sentiment": "negative", "topics_covered": ["grip", "bag", "durability"]}
+
+
+def test_summarize_and_batch():
+    transcript = ["I love it", "the bag broke", "ok"]
+    summary = classifier.summarize(transcript)
+    assert summary == {"sentiments": {"positive": 1, "negative": 1, "mixed": 0, "none": 1},
+                       "topics": {"bag": 1, "durability": 1}, "score": 0}
+    assert classifier.classify_batch([transcript, transcript]) == [summary, summary]
+
+
+def test_custom_taxonomy():
+    taxonomy = Taxonomy.from_dict({"product": "Kettle", "topics": {"lid": ["lid"]},
+                                   "positive": ["quick"], "negative": ["leak"]})
+    result = ReviewClassifier(taxonomy).classify("the lid leaks")
+    assert (result.sentiment, result.topics) == ("negative", ["lid"])
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from app.services import session_store
+from app.services.conversation_context import ConversationContext
+from app.services.session_store import (
+    MemorySessionStore, SQLiteSessionStore, SnapshotWriter, call_snapshot, decode_snapshot, encode_snapshot,
+)
+
+
+class FakeLLM:
+    async def ainvoke(self, prompt):
+        return "Summary so far."
+
+
+SNAPSHOT = {"v": 1, "session_id": "abc", "state": {"satisfaction": "positive"}, "context": {"turns": []}}
+
+
+@pytest.mark.parametrize("compress_above, tag", [(10 ** 6, b"j"), (10, b"z")])
+def test_snapshot_round_trip(compress_above, tag):
+    blob = encode_snapshot(SNAPSHOT, compress_above=compress_above)
+    assert blob[:1] == tag
+    assert decode_snapshot(blob) == SNAPSHOT
+
+
+@pytest.mark.parametrize("blob", [b"znot zlib", b"j{not json", b'j{"v": 0}'])
+def test_unusable_snapshots_start_the_call_over(blob):
+    assert decode_snapshot(blob) is None
+
+
+def test_context_survives_a_resume():
+    async def run():
+        context = ConversationContext(llm=FakeLLM(), recent_turns=2, prefix="")
+        for i in range(3):
+            context.add_turn(f"question {i}", f"answer {i}")
+        blob = encode_snapshot(call_snapshot("abc", {"topic": "bag"}, context))
+
+        snapshot = decode_snapshot(blob)
+        resumed = ConversationContext(llm=FakeLLM(), recent_turns=2, prefix="")
+        resumed.restore(snapshot["context"])
+        await asyncio.sleep(0.01)  # the background summary of the oldest turn
+        return context, resumed, snapshot
+
+    context, resumed, snapshot = asyncio.run(run())
+    assert snapshot["state"] == {"topic": "bag"}
+    assert resumed.counters["turns"] == context.counters["turns"] == 3
+    assert [t.user_text for t in resumed.recent] == ["question 1", "question 2"]
+    assert resumed.summary == "Summary so far."
+
+
+def test_memory_store_expires_and_evicts():
+    async def run():
+        store = MemorySessionStore(ttl_s=60, max_sessions=2)
+        for token in "abc":
+            await store.save(token, b"j{}")
+        assert await store.load("a") is None  # evicted
+        assert await store.load("c") == b"j{}"
+        store._data["b"] = (0.0, b"j{}")
+        assert await store.load("b") is None  # expired
+        return store.stats()
+
+    stats = asyncio.run(run())
+    assert (stats["evicted"], stats["expired"], stats["hits"], stats["misses"]) == (1, 1, 1, 1)
+
+
+def test_sqlite_store_is_shared_between_workers(tmp_path):
+    async def run():
+        path = str(tmp_path / "sessions.db")
+        one, two = SQLiteSessionStore(path), SQLiteSessionStore(path)
+        await one.save("token", b"j{}")
+        loaded = await two.load("token")
+        await two.delete("token")
+        gone = await one.load("token")
+        await one.close()
+        await two.close()
+        return loaded, gone
+
+    assert asyncio.run(run()) == (b"j{}", None)
+
+
+def test_writer_keeps_only_the_newest_pending_snapshot():
+    class SlowStore(MemorySessionStore):
+        async def save(self, token, blob):
+            await asyncio.sleep(0.01)
+            await super().save(token, blob)
+
+    async def run():
+        store = SlowStore()
+        writer = SnapshotWriter(store, "token")
+        for n in range(4):
+            writer.save({**SNAPSHOT, "n": n})
+            await asyncio.sleep(0)  # the first write is in flight from here on
+        await writer.close()
+        return store
+
+    coalesced = session_store.stats["coalesced"]
+    store = asyncio.run(run())
+    assert store.counters["saves"] == 2  # the first, then only the newest of the rest
+    assert session_store.stats["coalesced"] == coalesced + 3
+    assert decode_snapshot(asyncio.run(store.load("token")))["n"] == 3
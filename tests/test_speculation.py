@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from app.services.speculation import Speculator, _CommittedLLM, similarity
+
+
+class SlowLLM:
+    """Streams its words one by one, then waits until released."""
+
+    def __init__(self, words=("Sure,", " the", " paddles", " ship", " tomorrow.")):
+        self.words = words
+        self.release = asyncio.Event()
+        self.prompts = []
+        self.cancelled = False
+
+    async def astream(self, prompt_text):
+        self.prompts.append(prompt_text)
+        try:
+            for word in self.words:
+                yield word
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("", "", 1.0),
+    ("The bag is great.", "the bag is great", 1.0),
+    ("the bag is great", "", 0.0),
+])
+def test_similarity(a, b, expected):
+    assert similarity(a, b) == expected
+
+
+def test_similarity_drops_when_the_customer_keeps_talking():
+    assert similarity("the bag is great", "the bag is great but the zipper broke") < 0.9
+
+
+def speculate(llm, interim="the bag is great", final="The bag is great."):
+    """Run one turn: an interim that stays stable, then the final. Returns the llm for stream_reply."""
+    async def run():
+        speculator = Speculator(llm, build_prompt=lambda text: f"Q: {text}", stable_ms=10)
+        speculator.arm()
+        speculator.observe(interim)
+        await asyncio.sleep(0.05)
+        return speculator, speculator.resolve(final)
+    return run
+
+
+def test_hit_replays_the_speculative_tokens():
+    async def run():
+        llm = SlowLLM()
+        speculator, chosen = await speculate(llm)()
+        assert isinstance(chosen, _CommittedLLM)
+        assert speculator.last_result["speculation"] == "hit"
+        assert llm.prompts == ["Q: the bag is great"]
+        llm.release.set()
+        return [token async for token in chosen.astream("ignored")]
+
+    assert "".join(asyncio.run(run())) == "Sure, the paddles ship tomorrow."
+
+
+def test_miss_falls_back_to_the_real_llm():
+    async def run():
+        llm = SlowLLM()
+        speculator, chosen = await speculate(llm, final="the bag is great but the zipper broke")()
+        await asyncio.sleep(0)
+        return llm, speculator, chosen, llm.cancelled
+
+    llm, speculator, chosen, cancelled = asyncio.run(run())
+    assert chosen is llm and cancelled
+    assert speculator.last_result["speculation"] == "miss"
+
+
+def test_closing_a_committed_reply_early_cancels_the_llm_call():
+    async def run():
+        llm = SlowLLM()
+        _, chosen = await speculate(llm)()
+        tokens = chosen.astream("ignored")
+        assert await tokens.__anext__() == "Sure,"
+        await tokens.aclose()  # role-confusion stop or barge-in
+        await asyncio.sleep(0)
+        return llm.cancelled  # checked before asyncio.run cancels whatever is left
+
+    assert asyncio.run(run())
+
+
+def test_cancel_stops_a_committed_reply_that_was_never_read():
+    async def run():
+        llm = SlowLLM()
+        _, chosen = await speculate(llm)()
+        chosen.cancel()
+        await asyncio.sleep(0)
+        return llm.cancelled  # checked before asyncio.run cancels whatever is left
+
+    assert asyncio.run(run())
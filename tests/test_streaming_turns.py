@@ -0,0 +1,181 @@
+import asyncio
+
+from app.services.audio_io import AudioClip, PendingUpload
+from app.services.streaming_turns import BatchTurnSource, StreamingTurnSource
+
+
+class FakeSocket:
+    """ASGI-style receive() over a list of messages, then disconnect."""
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.close_code = None
+
+    async def receive(self):
+        await asyncio.sleep(0)
+        if self.messages:
+            return self.messages.pop(0)
+        return {"type": "websocket.disconnect"}
+
+    async def close(self, code=1000):
+        self.close_code = code
+        self.messages = []
+
+
+class FakeSTT:
+    def __init__(self):
+        self.fed = []
+        self.finals: asyncio.Queue = asyncio.Queue()
+        self.on_interim = None
+        self.stopped = False
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        self.stopped = True
+
+    async def feed_webm(self, chunk):
+        self.fed.append(chunk)
+        if chunk == b"end-of-turn":
+            self.finals.put_nowait("the paddle is great")
+
+    async def get_final_turn(self, timeout=5.0):
+        try:
+            return await asyncio.wait_for(self.finals.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+def receive(message):
+    return {"type": "websocket.receive", **message}
+
+
+def test_streaming_turns_and_controls():
+    async def run():
+        controls = []
+        stt = FakeSTT()
+        ws = FakeSocket([receive({"bytes": b"abc"}), receive({"text": '{"type": "interrupt"}'}),
+                         receive({"text": "not json"}), receive({"bytes": b"end-of-turn"})])
+        source = StreamingTurnSource(ws, stt=stt, poll_timeout=0.05, on_control=controls.append)
+        await source.start()
+        turn = await source.next_turn()
+        assert turn["text"] == "the paddle is great"
+        assert turn["upload_time"] == 0
+        assert turn["audio_size"] == len(b"abc") + len(b"end-of-turn")
+        assert controls == [{"type": "interrupt"}]
+        assert await source.next_turn() is None  # caller hung up
+        await source.stop()
+        assert stt.stopped
+
+    asyncio.run(run())
+
+
+def test_interim_callback_is_passed_to_stt():
+    async def run():
+        stt = FakeSTT()
+        interims = []
+        StreamingTurnSource(FakeSocket([]), stt=stt, on_interim=interims.append)
+        stt.on_interim("the pad")
+        assert interims == ["the pad"]
+
+    asyncio.run(run())
+
+
+async def collect(source):
+    clips = []
+    while True:
+        clip = await source.next_audio()
+        if clip is None:
+            return clips
+        clips.append(clip)
+
+
+def test_batch_blobs_chunked_utterances_and_controls():
+    async def run():
+        controls, utterances = [], []
+        ws = FakeSocket([
+            receive({"bytes": b"whole"}),
+            receive({"text": '{"type": "utterance_start"}'}),
+            receive({"bytes": b"one "}),
+            receive({"text": '{"type": "interrupt", "played_ms": 300}'}),
+            receive({"bytes": b"two"}),
+            receive({"text": '{"type": "utterance_end"}'}),
+            receive({"text": '{"type": "utterance_start"}'}),
+            receive({"text": '{"type": "utterance_end"}'}),  # nothing recorded
+        ])
+        source = BatchTurnSource(ws, on_control=controls.append, on_utterance=utterances.append)
+        source.start()
+        clips = await collect(source)
+        return clips, controls, utterances, ws
+
+    clips, controls, utterances, ws = asyncio.run(run())
+    assert clips == [b"whole", b"one two"] and all(isinstance(c, AudioClip) for c in clips)
+    assert clips[1].speech_end is not None
+    assert controls == [{"type": "interrupt", "played_ms": 300}]
+    assert len(utterances) == 2 and ws.close_code is None
+
+
+def test_batch_utterance_streams_its_chunks_to_the_early_upload():
+    async def run():
+        uploaded = []
+
+        async def upload(chunks):
+            async for chunk in chunks:
+                uploaded.append(chunk)
+            return "https://upload/1"
+
+        def on_utterance(utterance):
+            utterance.uploads["assemblyai"] = PendingUpload(upload(utterance.stream()))
+
+        ws = FakeSocket([receive({"text": '{"type": "utterance_start"}'}), receive({"bytes": b"a"}),
+                         receive({"bytes": b"b"}), receive({"text": '{"type": "utterance_end"}'})])
+        source = BatchTurnSource(ws, on_utterance=on_utterance)
+        source.start()
+        clip = await source.next_audio()
+        url = await clip.uploads["assemblyai"].url()
+        return clip, url, uploaded
+
+    clip, url, uploaded = asyncio.run(run())
+    assert url == "https://upload/1" and uploaded == [b"a", b"b"]
+    assert clip.upload_hidden_ms() >= 0
+
+
+def test_failed_early_upload_falls_back():
+    async def run():
+        async def upload(chunks):
+            raise ConnectionError("reset")
+
+        pending = PendingUpload(upload(None))
+        return await pending.url(), pending.succeeded, AudioClip(b"x", uploads={"a": pending},
+                                                                  speech_end=0).upload_hidden_ms()
+
+    assert asyncio.run(run()) == (None, False, 0.0)
+
+
+def test_batch_hang_up_mid_utterance_cancels_its_upload():
+    async def run():
+        uploads = []
+
+        def on_utterance(utterance):
+            uploads.append(PendingUpload(asyncio.sleep(10, result="https://upload/1")))
+            utterance.uploads["assemblyai"] = uploads[-1]
+
+        ws = FakeSocket([receive({"text": '{"type": "utterance_start"}'}), receive({"bytes": b"a"})])
+        source = BatchTurnSource(ws, on_utterance=on_utterance)
+        source.start()
+        clips = await collect(source)
+        await asyncio.sleep(0)
+        return clips, uploads[0].task.cancelled()
+
+    assert asyncio.run(run()) == ([], True)
+
+
+def test_batch_closes_on_a_non_json_text_frame():
+    async def run():
+        ws = FakeSocket([receive({"text": "hello?"}), receive({"bytes": b"late"})])
+        source = BatchTurnSource(ws)
+        source.start()
+        return await collect(source), ws.close_code, source.closed
+
+    assert asyncio.run(run()) == ([], 4000, True)
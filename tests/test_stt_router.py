@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from app.services.stt_router import CircuitBreaker, STTBackend, STTRouter, is_error
+
+BUSY = {"text": "[ERROR] Speech recognition is busy", "upload_time": 0, "processing_time": 0, "total_time": 0,
+        "throttled": True}
+
+
+def backend(name, *answers, delay=0.0, breaker=None):
+    """A backend that gives `answers` in turn (an exception is raised), after `delay` seconds."""
+    answers = list(answers)
+
+    async def transcribe(audio_bytes):
+        await asyncio.sleep(delay)
+        answer = answers.pop(0) if len(answers) > 1 else answers[0]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    return STTBackend(name, transcribe, breaker=breaker)
+
+
+def ok(text="hello"):
+    return {"text": text, "upload_time": 0, "processing_time": 0, "total_time": 0}
+
+
+@pytest.mark.parametrize("result, error", [
+    ({"text": "hello"}, False),
+    ({"text": ""}, False),
+    ({"text": "[ERROR] Could not get transcript"}, True),
+    ({"text": None}, True),
+    ("plain text", False),
+    ("[ERROR] timeout", True),
+])
+def test_is_error(result, error):
+    assert is_error(result) == error
+
+
+def test_breaker_opens_then_takes_one_trial():
+    breaker = CircuitBreaker(window=4, min_calls=4, error_rate=0.5, cooldown_s=0)
+    for failed in (False, True, False, True):
+        breaker.record(failed)
+    assert breaker.state == "open" and breaker.trips == 1
+
+    assert breaker.allow() and breaker.state == "half_open"  # cooldown over
+    breaker.start()
+    assert not breaker.allow()  # one trial at a time
+    breaker.abandon()
+    assert breaker.allow()
+    breaker.start()
+    breaker.record(False)
+    assert breaker.state == "closed"
+
+
+def test_failover_to_the_next_backend():
+    async def run():
+        first = backend("first", RuntimeError("boom"))
+        second = backend("second", ok("from second"))
+        router = STTRouter([first, second], hedge=False)
+        return router, await router.transcribe(b"audio")
+
+    router, result = asyncio.run(run())
+    assert (result["text"], result["stt_backend"]) == ("from second", "second")
+    assert router.counters["failovers"] == 1
+    assert router.backends[0].counters["errors"] == 1
+
+
+def test_slow_backend_is_hedged():
+    async def run():
+        slow = backend("slow", ok("slow"), delay=1.0)
+        fast = backend("fast", ok("fast"))
+        router = STTRouter([slow, fast], hedge_default_ms=10, hedge_min_ms=10, hedge_max_fraction=1.0)
+        return router, await router.transcribe(b"audio")
+
+    router, result = asyncio.run(run())
+    assert (result["stt_backend"], result["stt_hedged"]) == ("fast", True)
+    assert router.counters["hedge_wins"] == 1
+    assert router.backends[0].counters["cancelled"] == 1
+
+
+def test_throttled_result_does_not_trip_the_breaker():
+    async def run():
+        breaker = CircuitBreaker(window=2, min_calls=2, error_rate=0.5)
+        busy = backend("busy", BUSY, breaker=breaker)
+        router = STTRouter([busy, backend("other", ok("from other"))], hedge=False)
+        results = [await router.transcribe(b"audio") for _ in range(3)]
+        return router, results
+
+    router, results = asyncio.run(run())
+    assert all(r["stt_backend"] == "other" for r in results)
+    busy = router.backends[0]
+    assert busy.breaker.state == "closed" and busy.breaker.trips == 0
+    assert (busy.counters["throttled"], busy.counters["errors"]) == (3, 0)
+
+
+def test_throttled_everywhere_is_returned_as_throttled():
+    async def run():
+        router = STTRouter([backend("only", BUSY)], hedge=False)
+        return await router.transcribe(b"audio")
+
+    result = asyncio.run(run())
+    assert result["throttled"] and result["stt_backend"] is None
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from app.services.tracing import Histogram, Tracer
+
+
+def test_empty_histogram():
+    assert Histogram().snapshot() == {"count": 0, "mean": 0, "p50": 0, "p95": 0, "p99": 0, "max": 0}
+
+
+@pytest.mark.parametrize("q", [0.5, 0.95, 0.99])
+def test_percentiles_within_one_bucket(q):
+    rng = random.Random(7)
+    samples = sorted(rng.lognormvariate(5, 1) for _ in range(5000))
+    histogram = Histogram()
+    for ms in samples:
+        histogram.record(ms)
+    exact = samples[int(q * len(samples)) - 1]
+    assert histogram.percentile(q) == pytest.approx(exact, rel=0.05)
+
+
+def test_out_of_range_samples():
+    histogram = Histogram()
+    for ms in (0.0, 0.001, 1e9):
+        histogram.record(ms)
+    assert histogram.count == 3 and histogram.max == 1e9
+    assert histogram.percentile(0.01) < 0.02
+    assert histogram.percentile(1.0) <= 1e9
+
+
+def test_turn_spans_feed_the_histograms():
+    tracer = Tracer(recent_turns=2)
+    session = tracer.session("abc")
+    turn = session.turn(1)
+    with turn.span("stt"):
+        pass
+    turn.add("llm", 120)
+    turn.add("llm", 30)
+    turn.add("tts", None)
+    turn.add("tts", -1)
+    spans = turn.finish()
+    assert spans["llm"] == 150 and "tts" not in spans and "turn" in spans
+    assert tracer.histograms["llm"].count == 2 and tracer.histograms["tts"].count == 0
+
+    summary = tracer.summary()
+    assert summary["sessions"] == summary["active_sessions"] == 1
+    assert set(summary["stages"]) == {"stt", "llm", "turn"}
+    assert summary["recent_turns"][0]["session_id"] == "abc"
+
+    session.close()
+    session.close()
+    assert tracer.active_sessions == 0
+
+
+def test_prometheus_text():
+    tracer = Tracer()
+    tracer.session().turn(1).add("llm", 100)
+    text = tracer.render_prometheus()
+    assert 'voice_turn_stage_ms_count{stage="llm"} 1\n' in text
+    assert 'voice_turn_stage_ms{stage="llm",quantile="0.5"} 100.000' in text
+    assert text.endswith("voice_sessions_active 1\n")
@@ -0,0 +1,91 @@
+import asyncio
+
+import aiohttp
+
+from app.services.tts_cache import TTSCache
+from app.services.tts_service import TTSConnectionManager, TTSStream
+
+AUDIO = '{"audio": "AAAA", "isFinal": false}'
+FINAL = '{"audio": null, "isFinal": true}'
+
+
+class FakeSocket:
+    """Plays a script of ElevenLabs messages, then closes (like a dropped socket if FINAL isn't in it)."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.closed = False
+
+    async def send_json(self, data):
+        pass
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(0)
+        if self.closed or not self.script:
+            self.closed = True
+            raise StopAsyncIteration
+        return aiohttp.WSMessage(aiohttp.WSMsgType.TEXT, self.script.pop(0), None)
+
+    async def close(self):
+        self.closed = True
+
+
+class ScriptedManager(TTSConnectionManager):
+    def __init__(self, *scripts):
+        super().__init__(api_key="test", warm_per_voice=0)
+        self.scripts = list(scripts)
+
+    async def _open(self, key, background=False):
+        return TTSStream(FakeSocket(self.scripts.pop(0)), key)
+
+
+async def play(cache, text="Hi there!"):
+    return [chunk async for chunk in cache.stream_text(text)]
+
+
+def test_complete_utterance_is_cached():
+    async def run():
+        cache = TTSCache(ScriptedManager([AUDIO, AUDIO, FINAL]), cache_dir=None)
+        first = await play(cache)
+        second = await play(cache)
+        assert len(first) == 2 and second == first
+        assert cache.counters["misses"] == 1 and cache.counters["memory_hits"] == 1
+
+    asyncio.run(run())
+
+
+def test_truncated_utterance_is_not_cached(tmp_path):
+    async def run():
+        # the socket drops after one packet, then the next try is complete
+        cache = TTSCache(ScriptedManager([AUDIO], [AUDIO, AUDIO, FINAL]), cache_dir=str(tmp_path))
+        assert len(await play(cache)) == 1
+        assert cache.stats()["entries"] == 0
+        assert list(tmp_path.iterdir()) == []
+        assert len(await play(cache)) == 2  # synthesized again, in full this time
+        assert cache.counters["misses"] == 2
+        assert cache.stats()["entries"] == 1
+
+    asyncio.run(run())
+
+
+def test_error_message_before_final_is_not_cached():
+    async def run():
+        error = '{"message": "quota exceeded", "error": "quota_exceeded"}'
+        cache = TTSCache(ScriptedManager([AUDIO, error]), cache_dir=None)
+        await play(cache)
+        assert cache.stats()["entries"] == 0
+
+    asyncio.run(run())
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    async def run():
+        await play(TTSCache(ScriptedManager([AUDIO, FINAL]), cache_dir=str(tmp_path)))
+        fresh = TTSCache(ScriptedManager(), cache_dir=str(tmp_path))
+        assert len(await play(fresh)) == 1
+        assert fresh.counters["disk_hits"] == 1
+
+    asyncio.run(run())
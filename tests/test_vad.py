@@ -0,0 +1,121 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services import vad
+from app.services.audio_io import AudioClip, FFmpegError, decode_pcm16
+from app.services.vad import SAMPLE_RATE, SilenceTrimmer, trim_silence
+
+
+def level(db: float) -> float:
+    return 10 ** (db / 20) * 32768
+
+
+def tone(seconds: float, db: float, hz: float = 200) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return level(db) * np.sqrt(2) * np.sin(2 * np.pi * hz * t)
+
+
+def noise(seconds: float, db: float, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(0, level(db), int(seconds * SAMPLE_RATE))
+
+
+def silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SAMPLE_RATE))
+
+
+def pcm(*parts) -> np.ndarray:
+    return np.clip(np.concatenate(parts), -32768, 32767).astype(np.int16)
+
+
+def click(ms: int = 20, db: float = -10) -> np.ndarray:
+    return tone(ms / 1000, db, hz=300)
+
+
+@pytest.mark.parametrize("name, audio, has_speech, speech_ms", [
+    ("digital silence", pcm(silence(2)), False, 0),
+    ("quiet room", pcm(noise(2, -65)), False, 0),
+    ("one 20 ms click", pcm(silence(1), click(), silence(1)), False, 0),
+    ("three clicks", pcm(silence(0.5), click(), silence(0.5), click(), silence(0.5), click(), silence(0.5)), False, 0),
+    ("1 s of speech", pcm(silence(0.5), tone(1, -20), silence(0.5)), True, 1000),
+    # the detector finds nothing, but the clip is loud: fail open, send it all
+    ("speech 8 dB over steady noise", pcm(noise(2, -45) + np.concatenate([silence(0.5), tone(1, -37), silence(0.5)])), True, None),
+    ("continuous tone", pcm(tone(2, -20)), True, None),
+])
+def test_trim_silence(name, audio, has_speech, speech_ms):
+    kept, segments, measured = trim_silence(audio)
+    assert (len(kept) > 0) == has_speech, name
+    if speech_ms is not None:
+        assert abs(measured - speech_ms) <= 40, name
+
+
+def test_speech_ms_is_not_padded():
+    # 200 ms of speech: padding would make it ~600 ms
+    _, _, speech_ms = trim_silence(pcm(silence(1), tone(0.2, -20), silence(1)))
+    assert 160 <= speech_ms <= 240
+
+
+def test_edges_trimmed_and_long_pauses_collapsed():
+    audio = pcm(silence(1), tone(0.5, -20), silence(2), tone(0.5, -20), silence(1))
+    kept, segments, _ = trim_silence(audio)
+    assert len(segments) == 2
+    kept_ms = len(kept) * 1000 // SAMPLE_RATE
+    # 2 x (500 ms speech + 2 x 200 ms pad) + the 300 ms pause left of the gap
+    assert kept_ms == pytest.approx(2 * 900 + vad.VAD_KEEP_GAP_MS, abs=60)
+
+
+def test_fail_open_returns_the_whole_clip():
+    audio = pcm(tone(2, -20))
+    kept, segments, _ = trim_silence(audio)
+    assert len(kept) == len(audio)
+    assert segments == [(0, 2000)]
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_prepare_sends_original_when_ffmpeg_fails(monkeypatch):
+    async def broken_decode(audio_bytes, sample_rate=SAMPLE_RATE):
+        raise FFmpegError("ffmpeg failed to run: not found")
+
+    monkeypatch.setattr(vad, "decode_pcm16", broken_decode)
+    trimmer = SilenceTrimmer()
+    prepared = run(trimmer.prepare_for_stt(b"webm bytes"))
+    assert prepared.has_speech
+    assert prepared.audio_bytes == b"webm bytes"
+    assert not prepared.trimmed
+    assert trimmer.stats["undecoded"] == 1
+
+
+def test_prepare_keeps_original_when_encode_fails(monkeypatch):
+    audio = pcm(silence(1), tone(0.5, -20), silence(1))
+
+    async def decode(audio_bytes, sample_rate=SAMPLE_RATE):
+        return audio
+
+    async def broken_encode(kept, sample_rate=SAMPLE_RATE):
+        raise FFmpegError("ffmpeg exited with 1")
+
+    monkeypatch.setattr(vad, "decode_pcm16", decode)
+    monkeypatch.setattr(vad, "encode_webm", broken_encode)
+    prepared = run(SilenceTrimmer().prepare_for_stt(b"x" * 10_000))
+    assert prepared.has_speech and not prepared.trimmed
+    assert prepared.audio_bytes == b"x" * 10_000
+    assert isinstance(prepared.audio_bytes, AudioClip) and prepared.audio_bytes.pcm is audio
+
+
+def test_prepare_skips_quiet_clip(monkeypatch):
+    async def decode(audio_bytes, sample_rate=SAMPLE_RATE):
+        return pcm(silence(1), click(), silence(1))
+
+    monkeypatch.setattr(vad, "decode_pcm16", decode)
+    prepared = run(SilenceTrimmer().prepare_for_stt(b"clip"))
+    assert not prepared.has_speech
+
+
+def test_undecodable_audio_raises_ffmpeg_error():
+    # ffmpeg missing (FileNotFoundError) or exiting non-zero on garbage: both are FFmpegError
+    with pytest.raises(FFmpegError):
+        run(decode_pcm16(b"definitely not audio"))
@@ -0,0 +1,92 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faster_whisper")
+pytest.importorskip("soundfile")
+pytest.importorskip("onnxruntime")
+
+from app.services import whisper_service  # noqa: E402
+from app.services.whisper_service import (  # noqa: E402
+    DECODE_OPTIONS, SAMPLE_RATE, EngineClosed, WhisperBatchEngine, _transcribe_batch, _transcribe_one,
+)
+
+
+@pytest.fixture
+def no_model(monkeypatch):
+    """Batching on, the model never loaded: _transcribe_one just reports how long its clip was."""
+    monkeypatch.setattr(whisper_service, "BATCHING_SUPPORTED", True)
+    monkeypatch.setattr(whisper_service, "get_model", lambda: None)
+    monkeypatch.setattr(whisper_service, "_transcribe_one",
+                        lambda model, audio, beam_size, language: f"one:{len(audio)}")
+
+
+def test_clips_without_speech_skip_the_model(no_model, monkeypatch):
+    monkeypatch.setattr(whisper_service, "_speech_only", lambda audio: audio[:0])
+    assert _transcribe_batch([np.zeros(16000), np.zeros(8000)], 2, "en") == ["", ""]
+
+
+def test_long_speech_falls_back_to_one_at_a_time(no_model, monkeypatch):
+    monkeypatch.setattr(whisper_service, "_speech_only", lambda audio: audio)
+    long = np.zeros(31 * SAMPLE_RATE, dtype=np.float32)
+    assert _transcribe_batch([long, np.zeros(10)], 2, "en") == [f"one:{len(long)}", "one:10"]
+
+
+def test_engine_batches_utterances_that_arrive_together(monkeypatch):
+    monkeypatch.setattr(whisper_service, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(whisper_service, "_init_worker", lambda *args: None)
+    monkeypatch.setattr(whisper_service, "_transcribe_batch",
+                        lambda audios, beam_size, language: [f"clip {len(a)}" for a in audios])
+
+    async def run():
+        engine = WhisperBatchEngine(workers=1, max_batch=4, batch_window_ms=20)
+        results = await asyncio.gather(*(engine.transcribe(np.zeros(n)) for n in (100, 200, 300)))
+        await engine.close()
+        return engine, results
+
+    engine, results = asyncio.run(run())
+    assert [r["text"] for r in results] == ["clip 100", "clip 200", "clip 300"]
+    assert {r["batch_size"] for r in results} == {3}
+    assert (engine.stats["batches"], engine.stats["utterances"]) == (1, 3)
+
+
+def test_both_paths_decode_without_timestamps():
+    class Model:
+        def transcribe(self, audio, **options):
+            self.options = options
+            return [], None
+
+    model = Model()
+    _transcribe_one(model, np.zeros(10, dtype=np.float32), 2, "en")
+    assert {k: model.options[k] for k in DECODE_OPTIONS} == DECODE_OPTIONS
+    assert DECODE_OPTIONS["without_timestamps"]  # what the batched prompt is built with
+
+
+def test_close_fails_utterances_still_waiting(monkeypatch):
+    monkeypatch.setattr(whisper_service, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(whisper_service, "_init_worker", lambda *args: None)
+    release = __import__("threading").Event()
+
+    def slow_batch(audios, beam_size, language):
+        release.wait(5)
+        return ["" for _ in audios]
+
+    monkeypatch.setattr(whisper_service, "_transcribe_batch", slow_batch)
+
+    async def run():
+        engine = WhisperBatchEngine(workers=1, max_batch=1, batch_window_ms=0)
+        running = asyncio.ensure_future(engine.transcribe(np.zeros(10)))
+        await asyncio.sleep(0.05)  # the only worker is busy from here on
+        waiting = [asyncio.ensure_future(engine.transcribe(np.zeros(10))) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        closing = asyncio.ensure_future(engine.close())
+        await asyncio.sleep(0.05)
+        release.set()
+        await closing
+        return await asyncio.gather(running, *waiting, return_exceptions=True)
+
+    first, *rest = asyncio.run(run())
+    assert first["text"] == ""
+    assert all(isinstance(r, EngineClosed) for r in rest)